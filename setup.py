@@ -53,7 +53,7 @@ setuptools.setup(
         'Topic :: Scientific/Engineering :: Bio-Informatics',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
     ],
     entry_points={
         'console_scripts': [
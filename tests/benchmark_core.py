@@ -0,0 +1,465 @@
+""" Benchmarks of the overhead of :obj:`wc_env_manager.core.WcEnvManager`
+
+The benchmarks run against a :obj:`fake_docker_engine.FakeDockerEngine`, which simulates any number
+of images, layers, and containers and adds a fixed latency to each request. Consequently, the
+benchmarks measure the cost of the orchestration done by the manager (its round trips to the
+Docker daemon and its own processing), rather than the cost of the work done by Docker (e.g.,
+running containers or transferring layers). The number of requests of each operation is also
+recorded; unlike timings, these counts are deterministic.
+
+Each run is appended to a JSON lines file (default: `.benchmarks/wc_env_manager.jsonl` in the
+root of the repository), together with the git commit of the code, so that runs of different
+commits can be compared::
+
+    python tests/benchmark_core.py
+    python tests/benchmark_core.py --compare           # compare with the previous run
+    python tests/benchmark_core.py --compare 1d7623f   # compare with the latest run of a commit
+    python tests/benchmark_core.py --benchmark get_containers --latency 0.002 --repeats 10
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from datetime import datetime
+from fake_docker_engine import FakeDockerEngine
+import argparse
+import collections
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+import wc_env_manager.core  # noqa: E402
+
+DEFAULT_RESULTS_PATH = os.path.join(BASE_DIR, '.benchmarks', 'wc_env_manager.jsonl')
+
+DEFAULT_LATENCY = 0.0005
+# latency of each request to the Docker daemon (seconds); about the latency of a local daemon
+
+DEFAULT_REPEATS = 5
+
+DEFAULT_REGRESSION_THRESHOLD = 1.25
+# ratio of the median time of a benchmark to that of the baseline above which the benchmark has regressed
+
+IMAGE_REPO = 'karrlab/wc_env'
+IMAGE_TAGS = ['0.0.1', 'latest']
+
+MANAGER_CONFIG = {
+    'verbose': False,
+    'image': {
+        'repo': IMAGE_REPO,
+        'tags': IMAGE_TAGS,
+    },
+    'container': {
+        'name_format': 'wc_env-%Y-%m-%d-%H-%M-%S',
+        'python_packages': '\n'.join('package_{}'.format(i_package) for i_package in range(20)),
+        'setup_script': 'true',
+    },
+}
+
+
+class BenchmarkResult(object):
+    """ Result of a benchmark
+
+    Attributes:
+        name (:obj:`str`): name of the benchmark
+        params (:obj:`dict`): parameters of the benchmark (e.g., the number of containers)
+        times (:obj:`list` of :obj:`float`): duration of each repetition (seconds)
+        requests (:obj:`float`): mean number of requests to the Docker daemon per repetition
+        bytes (:obj:`int`): number of bytes transferred by each repetition, or :obj:`None`
+    """
+
+    def __init__(self, name, params, times, requests, bytes=None):
+        """
+        Args:
+            name (:obj:`str`): name of the benchmark
+            params (:obj:`dict`): parameters of the benchmark
+            times (:obj:`list` of :obj:`float`): duration of each repetition (seconds)
+            requests (:obj:`float`): mean number of requests to the Docker daemon per repetition
+            bytes (:obj:`int`, optional): number of bytes transferred by each repetition
+        """
+        self.name = name
+        self.params = params
+        self.times = times
+        self.requests = requests
+        self.bytes = bytes
+
+    @property
+    def key(self):
+        """ Get a key which identifies the benchmark and its parameters
+
+        Returns:
+            :obj:`str`: key
+        """
+        return '{}({})'.format(self.name, ', '.join('{}={}'.format(key, val) for key, val in sorted(self.params.items())))
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the result
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the result
+        """
+        median = statistics.median(self.times)
+        return {
+            'name': self.name,
+            'params': self.params,
+            'key': self.key,
+            'times': self.times,
+            'min': min(self.times),
+            'median': median,
+            'mean': statistics.mean(self.times),
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'throughput': self.bytes / median if self.bytes and median else None,
+        }
+
+
+def time_calls(func, repeats, setup=None):
+    """ Time repeated calls to a function
+
+    Args:
+        func (:obj:`callable`): function
+        repeats (:obj:`int`): number of calls
+        setup (:obj:`callable`, optional): function which is called, untimed, before each call
+
+    Returns:
+        :obj:`list` of :obj:`float`: duration of each call (seconds)
+    """
+    times = []
+    for i_repeat in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def make_result(name, params, engine, times, bytes=None):
+    """ Make the result of a benchmark from the requests which the engine has received since
+    it was last reset
+
+    Args:
+        name (:obj:`str`): name of the benchmark
+        params (:obj:`dict`): parameters of the benchmark
+        engine (:obj:`FakeDockerEngine`): engine
+        times (:obj:`list` of :obj:`float`): duration of each repetition (seconds)
+        bytes (:obj:`int`, optional): number of bytes transferred by each repetition
+
+    Returns:
+        :obj:`BenchmarkResult`: result
+    """
+    requests = sum(count for endpoint, count in engine.requests.items() if endpoint != 'GET /events')
+    return BenchmarkResult(name, params, times, requests / len(times), bytes=bytes)
+
+
+def benchmark_init(latency, repeats):
+    """ Time the construction of managers, which discover the images and the latest container """
+    for num_containers in (10, 100):
+        with FakeDockerEngine(num_images=1, num_containers=num_containers, latency=latency) as engine:
+            with engine.environ():
+                engine.reset_requests()
+                times = time_calls(lambda: wc_env_manager.core.WcEnvManager(MANAGER_CONFIG), repeats)
+                yield make_result('init', {'containers': num_containers}, engine, times)
+
+
+def benchmark_get_containers(latency, repeats):
+    """ Time listing the containers, with and without sorting them by their activity, and with an index """
+    for num_containers in (10, 100, 1000):
+        with FakeDockerEngine(num_images=1, num_containers=num_containers, latency=latency) as engine:
+            with engine.environ():
+                mgr = wc_env_manager.core.WcEnvManager(MANAGER_CONFIG)
+
+                engine.reset_requests()
+                times = time_calls(mgr.get_containers, repeats)
+                yield make_result('get_containers', {'containers': num_containers}, engine, times)
+
+                if num_containers <= 100:
+                    engine.reset_requests()
+                    times = time_calls(lambda: mgr.get_containers(sort_by_read_time=True), repeats)
+                    yield make_result('get_containers_sorted', {'containers': num_containers}, engine, times)
+
+                mgr.start_index()
+                try:
+                    engine.reset_requests()
+                    times = time_calls(mgr.get_containers, repeats)
+                    yield make_result('get_containers_indexed', {'containers': num_containers}, engine, times)
+                finally:
+                    mgr.stop_index()
+
+
+def benchmark_setup_container(latency, repeats):
+    """ Time setting up a container (installing packages and running the setup script in a session)
+
+    The copying of paths is measured separately by :obj:`benchmark_copy_path_to_container`.
+    """
+    with FakeDockerEngine(num_images=1, num_containers=1, latency=latency) as engine:
+        with engine.environ():
+            mgr = wc_env_manager.core.WcEnvManager(MANAGER_CONFIG)
+            mgr.get_paths_to_copy = lambda: []
+            num_packages = len(MANAGER_CONFIG['container']['python_packages'].split('\n'))
+
+            engine.reset_requests()
+            times = time_calls(mgr.setup_container, repeats)
+            yield make_result('setup_container', {'packages': num_packages}, engine, times)
+
+
+def benchmark_copy_path_to_container(latency, repeats):
+    """ Time copying a file to a container with the Docker command line program """
+    if not shutil.which('docker'):
+        print('Skipping copy_path_to_container because the Docker command line program isn\'t installed',
+              file=sys.stderr)
+        return
+
+    size = 64 * 1024 * 1024
+    temp_dir_name = tempfile.mkdtemp()
+    filename = os.path.join(temp_dir_name, 'file')
+    with open(filename, 'wb') as file:
+        file.write(os.urandom(size))
+
+    try:
+        with FakeDockerEngine(num_images=1, num_containers=1, latency=latency) as engine:
+            with engine.environ():
+                mgr = wc_env_manager.core.WcEnvManager(MANAGER_CONFIG)
+
+                engine.reset_requests()
+                times = time_calls(lambda: mgr.copy_path_to_container(filename, '/tmp/'), repeats)
+                yield make_result('copy_path_to_container', {'size': size}, engine, times,
+                                  bytes=engine.archive_bytes // repeats)
+    finally:
+        shutil.rmtree(temp_dir_name)
+
+
+def benchmark_push_pull_image(latency, repeats):
+    """ Time the orchestration of pushing and pulling the tags of an image """
+    for num_layers in (10, 100):
+        with FakeDockerEngine(num_images=1, num_layers=num_layers, latency=latency) as engine:
+            with engine.environ():
+                mgr = wc_env_manager.core.WcEnvManager(MANAGER_CONFIG)
+
+                engine.reset_requests()
+                times = time_calls(lambda: mgr.push_image(IMAGE_REPO, IMAGE_TAGS), repeats)
+                yield make_result('push_image', {'layers': num_layers, 'tags': len(IMAGE_TAGS)}, engine, times)
+
+                engine.reset_requests()
+                times = time_calls(lambda: mgr.pull_image(IMAGE_REPO, IMAGE_TAGS), repeats,
+                                   setup=engine.images.clear)
+                yield make_result('pull_image', {'layers': num_layers, 'tags': len(IMAGE_TAGS)}, engine, times)
+
+
+BENCHMARKS = collections.OrderedDict([
+    ('init', benchmark_init),
+    ('get_containers', benchmark_get_containers),
+    ('setup_container', benchmark_setup_container),
+    ('copy_path_to_container', benchmark_copy_path_to_container),
+    ('push_pull_image', benchmark_push_pull_image),
+])
+
+
+def run(latency=DEFAULT_LATENCY, repeats=DEFAULT_REPEATS, names=None):
+    """ Run benchmarks
+
+    Args:
+        latency (:obj:`float`, optional): latency of each request to the Docker daemon (seconds)
+        repeats (:obj:`int`, optional): number of repetitions of each benchmark
+        names (:obj:`list` of :obj:`str`, optional): names of the benchmarks to run; default: all benchmarks
+
+    Returns:
+        :obj:`list` of :obj:`BenchmarkResult`: results
+    """
+    results = []
+    for name, benchmark in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results.extend(benchmark(latency, repeats))
+    return results
+
+
+def get_commit():
+    """ Get the git commit of the code, and whether the working tree has uncommitted changes
+
+    Returns:
+        :obj:`tuple`:
+
+            * :obj:`str`: commit, or :obj:`None` if the code isn't in a git repository
+            * :obj:`bool`: :obj:`True` if the working tree has uncommitted changes
+    """
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+        status = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BASE_DIR,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return (None, False)
+    return (commit, bool(status))
+
+
+def make_record(results, latency, repeats):
+    """ Make a record of a run of the benchmarks
+
+    Args:
+        results (:obj:`list` of :obj:`BenchmarkResult`): results
+        latency (:obj:`float`): latency of each request to the Docker daemon (seconds)
+        repeats (:obj:`int`): number of repetitions of each benchmark
+
+    Returns:
+        :obj:`dict`: record
+    """
+    commit, dirty = get_commit()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'latency': latency,
+        'repeats': repeats,
+        'results': [result.to_dict() for result in results],
+    }
+
+
+def save_record(record, path=DEFAULT_RESULTS_PATH):
+    """ Append a record to a file of records
+
+    Args:
+        record (:obj:`dict`): record
+        path (:obj:`str`, optional): path to the file
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as file:
+        file.write(json.dumps(record) + '\n')
+
+
+def read_records(path=DEFAULT_RESULTS_PATH):
+    """ Read the records of previous runs
+
+    Args:
+        path (:obj:`str`, optional): path to the file of records
+
+    Returns:
+        :obj:`list` of :obj:`dict`: records, from oldest to newest
+    """
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def get_baseline(records, commit=None):
+    """ Get the record to compare a run with
+
+    Args:
+        records (:obj:`list` of :obj:`dict`): records of previous runs, from oldest to newest
+        commit (:obj:`str`, optional): commit of the baseline; default: the most recent record
+
+    Returns:
+        :obj:`dict`: most recent record of the commit, or :obj:`None` if there is no such record
+    """
+    for record in reversed(records):
+        if commit is None or (record['commit'] and (record['commit'].startswith(commit) or commit.startswith(record['commit']))):
+            return record
+    return None
+
+
+def compare(record, baseline, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """ Compare the results of a run with those of a baseline
+
+    Args:
+        record (:obj:`dict`): record of the run
+        baseline (:obj:`dict`): record of the baseline
+        threshold (:obj:`float`, optional): ratio of median times above which a benchmark has regressed
+
+    Returns:
+        :obj:`list` of :obj:`dict`: comparison of each benchmark (`key`, `ratio`, `requests_delta`,
+            and `regressed`), in the order of the results of the run
+    """
+    baseline_results = {result['key']: result for result in baseline['results']}
+    comparisons = []
+    for result in record['results']:
+        baseline_result = baseline_results.get(result['key'], None)
+        if baseline_result is None:
+            continue
+        ratio = result['median'] / baseline_result['median'] if baseline_result['median'] else None
+        requests_delta = result['requests'] - baseline_result['requests']
+        comparisons.append({
+            'key': result['key'],
+            'ratio': ratio,
+            'requests_delta': requests_delta,
+            'regressed': (ratio is not None and ratio > threshold) or requests_delta > 0,
+        })
+    return comparisons
+
+
+def format_results(record, comparisons=None):
+    """ Format the results of a run as a table
+
+    Args:
+        record (:obj:`dict`): record of the run
+        comparisons (:obj:`list` of :obj:`dict`, optional): comparison with a baseline
+
+    Returns:
+        :obj:`str`: table
+    """
+    comparisons = {comparison['key']: comparison for comparison in comparisons or []}
+    lines = ['{:<52} {:>11} {:>11} {:>9} {:>11} {:>9}'.format(
+        'Benchmark', 'Median (ms)', 'Min (ms)', 'Requests', 'MB/s', 'Change')]
+    for result in record['results']:
+        comparison = comparisons.get(result['key'], None)
+        if comparison is None or comparison['ratio'] is None:
+            change = ''
+        else:
+            change = '{:+.0%}{}'.format(comparison['ratio'] - 1, ' !' if comparison['regressed'] else '')
+        lines.append('{:<52} {:>11.2f} {:>11.2f} {:>9.0f} {:>11} {:>9}'.format(
+            result['key'], result['median'] * 1e3, result['min'] * 1e3, result['requests'],
+            '{:.1f}'.format(result['throughput'] / 1e6) if result['throughput'] else '', change))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the overhead of wc_env_manager against a fake Docker Engine')
+    parser.add_argument('--benchmark', dest='benchmarks', action='append', choices=list(BENCHMARKS.keys()),
+                        help='Benchmark to run (can be repeated); default: all benchmarks')
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help='Latency of each request to the Docker daemon (seconds)')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='Number of repetitions of each benchmark')
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH, help='Path to the file of results')
+    parser.add_argument('--no-save', action='store_true', default=False, help="Don't save the results")
+    parser.add_argument('--compare', nargs='?', const='', default=None, metavar='COMMIT',
+                        help='Compare with the latest run of a commit; default: the previous run')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help='Ratio of median times above which a benchmark has regressed')
+    args = parser.parse_args(argv)
+
+    previous_records = read_records(args.results)
+    results = run(latency=args.latency, repeats=args.repeats, names=args.benchmarks)
+    record = make_record(results, args.latency, args.repeats)
+    if not args.no_save:
+        save_record(record, args.results)
+
+    comparisons = None
+    if args.compare is not None:
+        baseline = get_baseline(previous_records, commit=args.compare or None)
+        if baseline is None:
+            print('No previous results{} to compare with'.format(
+                ' of commit ' + args.compare if args.compare else ''), file=sys.stderr)
+        else:
+            print('Compared with commit {} ({})'.format(baseline['commit'], baseline['time']))
+            comparisons = compare(record, baseline, threshold=args.threshold)
+
+    print(format_results(record, comparisons))
+    if comparisons and any(comparison['regressed'] for comparison in comparisons):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
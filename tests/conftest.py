@@ -0,0 +1,12 @@
+""" Configuration of the tests
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import os
+
+# don't read or write the user's cache of configurations from the managers which the tests create
+os.environ['WC_ENV_MANAGER_CONFIG_CACHE'] = '0'
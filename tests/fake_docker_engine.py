@@ -0,0 +1,919 @@
+""" Fake Docker Engine which serves the subset of the Docker Engine API used by wc_env_manager
+
+:obj:`FakeDockerEngine` listens on a unix socket (`DOCKER_HOST=unix://...`) and simulates a Docker
+daemon with any number of images, layers, and containers, without running any containers. It
+injects a configurable latency into each request, and counts the requests to each endpoint of the
+API, so that the overhead of wc_env_manager (the number and cost of its round trips to the Docker
+daemon) can be measured and asserted independently of the cost of the work done by the daemon.
+Execs simulate processes which exit successfully; execs attached to standard input (e.g., the
+shells of :obj:`wc_env_manager.session.ContainerSession`) answer the markers which signal the end
+of each command::
+
+    with FakeDockerEngine(num_containers=100, latency=0.001) as engine:
+        with engine.environ():
+            mgr = wc_env_manager.core.WcEnvManager()
+        print(engine.requests['GET /containers/{id}/json'])
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from datetime import datetime, timedelta, timezone
+import base64
+import collections
+import contextlib
+import hashlib
+import http.server
+import json
+import os
+import queue
+import re
+import shutil
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+
+API_VERSION = '1.41'
+
+ROUTES = [
+    ('GET', r'/_ping', 'ping'),
+    ('HEAD', r'/_ping', 'ping'),
+    ('GET', r'/version', 'version'),
+    ('GET', r'/info', 'info'),
+    ('POST', r'/auth', 'auth'),
+    ('GET', r'/events', 'events'),
+    ('GET', r'/images/json', 'list_images'),
+    ('POST', r'/images/create', 'pull_image'),
+    ('POST', r'/images/prune', 'prune_images'),
+    ('GET', r'/images/(?P<name>.+)/json', 'inspect_image'),
+    ('GET', r'/images/(?P<name>.+)/history', 'image_history'),
+    ('POST', r'/images/(?P<name>.+)/push', 'push_image'),
+    ('POST', r'/images/(?P<name>.+)/tag', 'tag_image'),
+    ('DELETE', r'/images/(?P<name>.+)', 'remove_image'),
+    ('GET', r'/containers/json', 'list_containers'),
+    ('POST', r'/containers/create', 'create_container'),
+    ('GET', r'/containers/(?P<id>[^/]+)/json', 'inspect_container'),
+    ('GET', r'/containers/(?P<id>[^/]+)/stats', 'container_stats'),
+    ('GET', r'/containers/(?P<id>[^/]+)/logs', 'container_logs'),
+    ('POST', r'/containers/(?P<id>[^/]+)/(?P<action>start|stop|restart|kill|pause|unpause)', 'change_container_state'),
+    ('POST', r'/containers/(?P<id>[^/]+)/exec', 'create_exec'),
+    ('HEAD', r'/containers/(?P<id>[^/]+)/archive', 'stat_archive'),
+    ('PUT', r'/containers/(?P<id>[^/]+)/archive', 'put_archive'),
+    ('GET', r'/containers/(?P<id>[^/]+)/archive', 'get_archive'),
+    ('DELETE', r'/containers/(?P<id>[^/]+)', 'remove_container'),
+    ('POST', r'/exec/(?P<id>[^/]+)/start', 'start_exec'),
+    ('GET', r'/exec/(?P<id>[^/]+)/json', 'inspect_exec'),
+    ('GET', r'/networks', 'list_networks'),
+    ('POST', r'/networks/create', 'create_network'),
+    ('GET', r'/networks/(?P<name>[^/]+)', 'inspect_network'),
+    ('DELETE', r'/networks/(?P<name>[^/]+)', 'remove_network'),
+]
+# routes of the API: method, pattern of the path (without the version prefix), and name of the handler
+
+SESSION_STDOUT_MARKER_PATTERN = re.compile(r'^printf "\\n%s %d\\n" "(\S+)" ')
+SESSION_STDERR_MARKER_PATTERN = re.compile(r'^printf "\\n%s\\n" "(\S+)" >&2$')
+
+HIJACK_DELAY = 0.002
+# delay between the response which upgrades a connection and the output of an exec, so that the
+# client reads the headers of the response before the output (seconds)
+
+
+def make_id():
+    """ Generate an id of a resource
+
+    Returns:
+        :obj:`str`: id
+    """
+    return uuid.uuid4().hex + uuid.uuid4().hex
+
+
+def format_time(timestamp):
+    """ Format a time in the format of the Docker Engine API
+
+    Args:
+        timestamp (:obj:`float`): time (seconds since the epoch)
+
+    Returns:
+        :obj:`str`: formatted time
+    """
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class FakeDockerEngine(object):
+    """ Fake Docker Engine
+
+    Attributes:
+        latency (:obj:`float`): latency added to each request (seconds)
+        num_layers (:obj:`int`): number of layers of each new image
+        layer_size (:obj:`int`): size of each layer (bytes)
+        images (:obj:`collections.OrderedDict`): dictionary which maps the id of each image to its attributes
+        containers (:obj:`collections.OrderedDict`): dictionary which maps the id of each container to its attributes
+        execs (:obj:`dict`): dictionary which maps the id of each exec to its attributes
+        networks (:obj:`dict`): dictionary which maps the name of each network to its attributes
+        requests (:obj:`collections.Counter`): number of requests to each endpoint (e.g., `GET /containers/{id}/json`)
+        archive_bytes (:obj:`int`): number of bytes of archives copied to containers
+        socket_path (:obj:`str`): path to the socket of the engine
+        _temp_dir (:obj:`str`): temporary directory which contains the socket
+        _server (:obj:`socketserver.ThreadingUnixStreamServer`): server
+        _thread (:obj:`threading.Thread`): thread which runs the server
+        _subscribers (:obj:`list` of :obj:`queue.Queue`): queues of the streams of events
+        _lock (:obj:`threading.RLock`): lock for the state of the engine
+        _stopped (:obj:`threading.Event`): event which signals the streams of events to stop
+    """
+
+    def __init__(self, num_images=0, num_containers=0, num_layers=10, layer_size=1024 * 1024, latency=0.,
+                 image_repo='karrlab/wc_env', container_name_format='wc_env-%Y-%m-%d-%H-%M-%S'):
+        """
+        Args:
+            num_images (:obj:`int`, optional): number of versions of the image of `image_repo`
+            num_containers (:obj:`int`, optional): number of running containers of the image
+            num_layers (:obj:`int`, optional): number of layers of each image
+            layer_size (:obj:`int`, optional): size of each layer (bytes)
+            latency (:obj:`float`, optional): latency added to each request (seconds)
+            image_repo (:obj:`str`, optional): repository of the images
+            container_name_format (:obj:`str`, optional): format of the names of the containers
+        """
+        self.latency = latency
+        self.num_layers = num_layers
+        self.layer_size = layer_size
+        self.images = collections.OrderedDict()
+        self.containers = collections.OrderedDict()
+        self.execs = {}
+        self.networks = {}
+        self.requests = collections.Counter()
+        self.archive_bytes = 0
+        self.socket_path = None
+        self._temp_dir = None
+        self._server = None
+        self._thread = None
+        self._subscribers = []
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+
+        image = None
+        for i_image in range(num_images):
+            tags = ['0.0.{}'.format(i_image + 1)]
+            if i_image == num_images - 1:
+                tags.append('latest')
+            image = self.add_image(image_repo, tags)
+
+        start = datetime(2026, 1, 1)
+        for i_container in range(num_containers):
+            name = (start + timedelta(seconds=i_container)).strftime(container_name_format)
+            self.add_container(name, image['RepoTags'][0] if image else image_repo + ':latest')
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def docker_host(self):
+        """ Get the address of the engine (the value of `DOCKER_HOST`)
+
+        Returns:
+            :obj:`str`: address
+        """
+        return 'unix://' + self.socket_path
+
+    def start(self):
+        """ Start serving the API """
+        engine = self
+
+        class Handler(RequestHandler):
+            pass
+        Handler.engine = engine
+
+        self._temp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self._temp_dir, 'docker.sock')
+        self._stopped.clear()
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name='fake_docker_engine')
+        self._thread.start()
+
+    def stop(self):
+        """ Stop serving the API """
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        shutil.rmtree(self._temp_dir)
+
+    @contextlib.contextmanager
+    def environ(self):
+        """ Context in which Docker clients created from the environment (e.g., :obj:`docker.from_env`)
+        connect to the engine
+        """
+        keys = ['DOCKER_HOST', 'DOCKER_TLS_VERIFY', 'DOCKER_CERT_PATH']
+        previous = {key: os.environ.get(key, None) for key in keys}
+        for key in keys:
+            os.environ.pop(key, None)
+        os.environ['DOCKER_HOST'] = self.docker_host
+        try:
+            yield self
+        finally:
+            for key, val in previous.items():
+                if val is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = val
+
+    def reset_requests(self):
+        """ Reset the counts of the requests """
+        with self._lock:
+            self.requests.clear()
+            self.archive_bytes = 0
+
+    def add_image(self, repo, tags, num_layers=None):
+        """ Add an image
+
+        Args:
+            repo (:obj:`str`): repository
+            tags (:obj:`list` of :obj:`str`): tags
+            num_layers (:obj:`int`, optional): number of layers; default: :obj:`num_layers`
+
+        Returns:
+            :obj:`dict`: attributes of the image
+        """
+        num_layers = self.num_layers if num_layers is None else num_layers
+        refs = ['{}:{}'.format(repo, tag) for tag in tags]
+        with self._lock:
+            for image in self.images.values():
+                image['RepoTags'] = [ref for ref in image['RepoTags'] if ref not in refs]
+            id = 'sha256:' + make_id()
+            image = self.images[id] = {
+                'Id': id,
+                'RepoTags': refs,
+                'RepoDigests': [],
+                'Created': format_time(time.time()),
+                'Size': num_layers * self.layer_size,
+                'Config': {'Labels': {}, 'Env': [], 'Cmd': ['bash']},
+                'RootFS': {'Type': 'layers', 'Layers': ['sha256:' + make_id() for i_layer in range(num_layers)]},
+            }
+        self.publish_event('image', 'tag', id, {'name': refs[0] if refs else id})
+        return image
+
+    def add_container(self, name, image, labels=None, status='running'):
+        """ Add a container
+
+        Args:
+            name (:obj:`str`): name
+            image (:obj:`str`): reference of the image
+            labels (:obj:`dict`, optional): labels
+            status (:obj:`str`, optional): status (e.g., `running` or `exited`)
+
+        Returns:
+            :obj:`dict`: attributes of the container
+        """
+        now = time.time()
+        image_attrs = self.get_image(image)
+        with self._lock:
+            id = make_id()
+            container = self.containers[id] = {
+                'Id': id,
+                'Name': '/' + name,
+                'Created': format_time(now),
+                'Image': image_attrs['Id'] if image_attrs else image,
+                'State': {
+                    'Status': status,
+                    'Running': status == 'running',
+                    'Paused': status == 'paused',
+                    'ExitCode': 0,
+                    'StartedAt': format_time(now) if status != 'created' else '0001-01-01T00:00:00Z',
+                    'FinishedAt': '0001-01-01T00:00:00Z',
+                },
+                'Config': {'Image': image, 'Labels': labels or {}, 'Env': [], 'Cmd': ['bash'], 'WorkingDir': '',
+                           'Tty': True},
+                'HostConfig': {'NetworkMode': 'default'},
+                'NetworkSettings': {'Networks': {}},
+                'Mounts': [],
+                'ExecIDs': None,
+            }
+        self.publish_event('container', 'create', id, {'name': name})
+        return container
+
+    def get_image(self, name):
+        """ Get an image by its reference or id
+
+        Args:
+            name (:obj:`str`): reference (e.g., `karrlab/wc_env` or `karrlab/wc_env:0.0.1`) or id
+
+        Returns:
+            :obj:`dict`: attributes of the image, or :obj:`None` if there is no such image
+        """
+        ref = name if ':' in name.rpartition('/')[2] else name + ':latest'
+        with self._lock:
+            for image in self.images.values():
+                if name == image['Id'] or ref in image['RepoTags'] or \
+                        (len(name) >= 12 and image['Id'].partition(':')[2].startswith(name.partition(':')[2] or name)):
+                    return image
+        return None
+
+    def get_container(self, id):
+        """ Get a container by its name or id
+
+        Args:
+            id (:obj:`str`): name, id, or prefix of the id of the container
+
+        Returns:
+            :obj:`dict`: attributes of the container, or :obj:`None` if there is no such container
+        """
+        with self._lock:
+            if id in self.containers:
+                return self.containers[id]
+            for container in self.containers.values():
+                if container['Name'] == '/' + id or (len(id) >= 12 and container['Id'].startswith(id)):
+                    return container
+        return None
+
+    def publish_event(self, type, action, id, attributes):
+        """ Publish an event to the streams of events
+
+        Args:
+            type (:obj:`str`): type of the resource (e.g., `container`)
+            action (:obj:`str`): action (e.g., `start`)
+            id (:obj:`str`): id of the resource
+            attributes (:obj:`dict`): attributes of the resource (e.g., `name`)
+        """
+        now = time.time()
+        event = {'Type': type, 'Action': action, 'Actor': {'ID': id, 'Attributes': attributes},
+                 'time': int(now), 'timeNano': int(now * 1e9)}
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(event)
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    """ Handler of requests to the Docker Engine API
+
+    Attributes:
+        engine (:obj:`FakeDockerEngine`): engine
+    """
+
+    protocol_version = 'HTTP/1.1'
+    engine = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_HEAD(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_PUT(self):
+        self.dispatch()
+
+    def do_DELETE(self):
+        self.dispatch()
+
+    def dispatch(self):
+        """ Route a request to its handler """
+        url = urllib.parse.urlsplit(self.path)
+        path = re.sub(r'^/v\d+\.\d+', '', url.path)
+        self.query = {key: vals[-1] for key, vals in urllib.parse.parse_qs(url.query).items()}
+
+        for method, pattern, handler in ROUTES:
+            if method != self.command:
+                continue
+            match = re.match('^' + pattern + '$', path)
+            if match:
+                template = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', pattern)
+                if handler == 'change_container_state':
+                    template = template.replace('{action}', match.group('action'))
+                with self.engine._lock:
+                    self.engine.requests['{} {}'.format(method, template)] += 1
+                if self.engine.latency:
+                    time.sleep(self.engine.latency)
+                kwargs = {key: urllib.parse.unquote(val) for key, val in match.groupdict().items()}
+                getattr(self, handler)(**kwargs)
+                return
+
+        self.read_body()
+        self.send_json({'message': 'page not found'}, status=404)
+
+    # utilities
+    def read_body(self):
+        """ Read the body of the request
+
+        Returns:
+            :obj:`bytes`: body
+        """
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        return self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+
+    def read_json(self):
+        """ Read the body of the request as JSON
+
+        Returns:
+            :obj:`object`: decoded body
+        """
+        body = self.read_body()
+        return json.loads(body.decode()) if body else {}
+
+    def send_body(self, body, status=200, content_type='application/json', headers=None):
+        """ Send a response
+
+        Args:
+            body (:obj:`bytes`): body
+            status (:obj:`int`, optional): status
+            content_type (:obj:`str`, optional): type of the body
+            headers (:obj:`dict`, optional): additional headers
+        """
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Api-Version', API_VERSION)
+        for key, val in (headers or {}).items():
+            self.send_header(key, val)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_json(self, data, status=200):
+        """ Send a JSON response
+
+        Args:
+            data (:obj:`object`): data
+            status (:obj:`int`, optional): status
+        """
+        self.send_body(json.dumps(data).encode(), status=status)
+
+    def send_json_stream(self, messages):
+        """ Send a stream of JSON messages (e.g., the progress of a pull)
+
+        Args:
+            messages (:obj:`list` of :obj:`dict`): messages
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for message in messages:
+            data = json.dumps(message).encode() + b'\r\n'
+            self.wfile.write('{:x}\r\n'.format(len(data)).encode() + data + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def send_no_content(self, status=204):
+        """ Send an empty response
+
+        Args:
+            status (:obj:`int`, optional): status
+        """
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_not_found(self, kind, name):
+        """ Send an error which indicates that a resource doesn't exist
+
+        Args:
+            kind (:obj:`str`): kind of the resource
+            name (:obj:`str`): name of the resource
+        """
+        self.send_json({'message': 'No such {}: {}'.format(kind, name)}, status=404)
+
+    def upgrade(self):
+        """ Upgrade the connection to a raw stream (e.g., for the output of an exec) """
+        self.wfile.write(('HTTP/1.1 101 UPGRADED\r\n'
+                          'Content-Type: application/vnd.docker.raw-stream\r\n'
+                          'Connection: Upgrade\r\n'
+                          'Upgrade: tcp\r\n'
+                          '\r\n').encode())
+        self.wfile.flush()
+        self.close_connection = True
+
+    def send_frame(self, stream, data):
+        """ Send a frame of a multiplexed stream
+
+        Args:
+            stream (:obj:`int`): stream (1: stdout, 2: stderr)
+            data (:obj:`bytes`): data
+        """
+        self.wfile.write(struct.pack('>BxxxL', stream, len(data)) + data)
+        self.wfile.flush()
+
+    # system
+    def ping(self):
+        self.send_body(b'OK', content_type='text/plain')
+
+    def version(self):
+        self.send_json({'ApiVersion': API_VERSION, 'MinAPIVersion': '1.12', 'Version': '20.10.0',
+                        'Os': 'linux', 'Arch': 'amd64', 'KernelVersion': '5.0.0'})
+
+    def info(self):
+        self.send_json({'Containers': len(self.engine.containers), 'Images': len(self.engine.images),
+                        'NCPU': 1, 'MemTotal': 1 << 30, 'OperatingSystem': 'fake', 'Driver': 'overlay2'})
+
+    def auth(self):
+        self.read_body()
+        self.send_json({'Status': 'Login Succeeded', 'IdentityToken': ''})
+
+    def events(self):
+        subscriber = queue.Queue()
+        with self.engine._lock:
+            self.engine._subscribers.append(subscriber)
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.flush()
+            while not self.engine._stopped.is_set():
+                try:
+                    event = subscriber.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                data = json.dumps(event).encode() + b'\n'
+                self.wfile.write('{:x}\r\n'.format(len(data)).encode() + data + b'\r\n')
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            with self.engine._lock:
+                self.engine._subscribers.remove(subscriber)
+            self.close_connection = True
+
+    # images
+    def list_images(self):
+        filters = json.loads(self.query.get('filters', '{}'))
+        references = filters.get('reference', None) or []
+        if isinstance(references, dict):
+            references = list(references.keys())
+        if self.query.get('filter', None):
+            references.append(self.query['filter'])
+
+        summaries = []
+        with self.engine._lock:
+            for image in self.engine.images.values():
+                tags = image['RepoTags']
+                if references and not any(ref == reference or ref.rpartition(':')[0] == reference
+                                          for ref in tags for reference in references):
+                    continue
+                summaries.append({'Id': image['Id'], 'RepoTags': tags, 'RepoDigests': [], 'ParentId': '',
+                                  'Created': 0, 'Size': image['Size'], 'Labels': {}, 'Containers': -1})
+        self.send_json(summaries)
+
+    def inspect_image(self, name):
+        image = self.engine.get_image(name)
+        if image is None:
+            return self.send_not_found('image', name)
+        self.send_json(image)
+
+    def image_history(self, name):
+        image = self.engine.get_image(name)
+        if image is None:
+            return self.send_not_found('image', name)
+        self.send_json([{'Id': layer, 'Created': 0, 'CreatedBy': '', 'Size': self.engine.layer_size, 'Tags': None}
+                        for layer in reversed(image['RootFS']['Layers'])])
+
+    def pull_image(self):
+        repo = self.query.get('fromImage', '')
+        tag = self.query.get('tag', None) or 'latest'
+        if '@' not in repo and ':' in repo.rpartition('/')[2]:
+            repo, _, tag = repo.rpartition(':')
+        ref = '{}:{}'.format(repo, tag)
+
+        image = self.engine.get_image(ref)
+        if image is None:
+            image = self.engine.add_image(repo, [tag])
+            messages = [{'status': 'Pulling from {}'.format(repo), 'id': tag}]
+            for layer in image['RootFS']['Layers']:
+                layer_id = layer.partition(':')[2][0:12]
+                messages.append({'status': 'Pulling fs layer', 'progressDetail': {}, 'id': layer_id})
+                for current in (self.engine.layer_size // 2, self.engine.layer_size):
+                    messages.append({'status': 'Downloading', 'id': layer_id,
+                                     'progressDetail': {'current': current, 'total': self.engine.layer_size}})
+                messages.append({'status': 'Pull complete', 'progressDetail': {}, 'id': layer_id})
+            messages.append({'status': 'Digest: sha256:' + hashlib.sha256(ref.encode()).hexdigest()})
+            messages.append({'status': 'Status: Downloaded newer image for {}'.format(ref)})
+        else:
+            messages = [{'status': 'Status: Image is up to date for {}'.format(ref)}]
+        self.engine.publish_event('image', 'pull', ref, {'name': ref})
+        self.send_json_stream(messages)
+
+    def push_image(self, name):
+        self.read_body()
+        tag = self.query.get('tag', None) or 'latest'
+        ref = '{}:{}'.format(name, tag)
+        image = self.engine.get_image(ref)
+        if image is None:
+            return self.send_json_stream([{'errorDetail': {'message': 'An image does not exist locally with the tag: ' + ref},
+                                           'error': 'An image does not exist locally with the tag: ' + ref}])
+
+        digest = 'sha256:' + hashlib.sha256(image['Id'].encode()).hexdigest()
+        messages = [{'status': 'The push refers to repository [docker.io/{}]'.format(name)}]
+        for layer in image['RootFS']['Layers']:
+            layer_id = layer.partition(':')[2][0:12]
+            messages.append({'status': 'Preparing', 'progressDetail': {}, 'id': layer_id})
+            for current in (self.engine.layer_size // 2, self.engine.layer_size):
+                messages.append({'status': 'Pushing', 'id': layer_id,
+                                 'progressDetail': {'current': current, 'total': self.engine.layer_size}})
+            messages.append({'status': 'Pushed', 'progressDetail': {}, 'id': layer_id})
+        messages.append({'status': '{}: digest: {} size: {}'.format(tag, digest, 528 * len(image['RootFS']['Layers']))})
+        messages.append({'progressDetail': {}, 'aux': {'Tag': tag, 'Digest': digest, 'Size': image['Size']}})
+        self.engine.publish_event('image', 'push', ref, {'name': ref})
+        self.send_json_stream(messages)
+
+    def tag_image(self, name):
+        self.read_body()
+        image = self.engine.get_image(name)
+        if image is None:
+            return self.send_not_found('image', name)
+        ref = '{}:{}'.format(self.query['repo'], self.query.get('tag', None) or 'latest')
+        with self.engine._lock:
+            for other_image in self.engine.images.values():
+                if ref in other_image['RepoTags']:
+                    other_image['RepoTags'].remove(ref)
+            image['RepoTags'].append(ref)
+        self.engine.publish_event('image', 'tag', image['Id'], {'name': ref})
+        self.send_no_content(201)
+
+    def remove_image(self, name):
+        image = self.engine.get_image(name)
+        if image is None:
+            return self.send_not_found('image', name)
+        ref = name if ':' in name.rpartition('/')[2] else name + ':latest'
+        with self.engine._lock:
+            deleted = []
+            if ref in image['RepoTags']:
+                image['RepoTags'].remove(ref)
+                deleted.append({'Untagged': ref})
+            if not image['RepoTags'] or name == image['Id']:
+                self.engine.images.pop(image['Id'])
+                deleted.append({'Deleted': image['Id']})
+        self.engine.publish_event('image', 'untag', image['Id'], {'name': ref})
+        if image['Id'] not in self.engine.images:
+            self.engine.publish_event('image', 'delete', image['Id'], {'name': image['Id']})
+        self.send_json(deleted)
+
+    def prune_images(self):
+        self.read_body()
+        with self.engine._lock:
+            dangling = [id for id, image in self.engine.images.items() if not image['RepoTags']]
+            for id in dangling:
+                self.engine.images.pop(id)
+        self.send_json({'ImagesDeleted': [{'Deleted': id} for id in dangling], 'SpaceReclaimed': 0})
+
+    # containers
+    def list_containers(self):
+        filters = json.loads(self.query.get('filters', '{}'))
+        labels = filters.get('label', None) or []
+        names = filters.get('name', None) or []
+        statuses = filters.get('status', None) or []
+        if isinstance(labels, dict):
+            labels = list(labels.keys())
+
+        summaries = []
+        with self.engine._lock:
+            for container in self.engine.containers.values():
+                status = container['State']['Status']
+                if self.query.get('all', '0') in ('0', 'false') and status != 'running':
+                    continue
+                if statuses and status not in statuses:
+                    continue
+                if names and not any(name in container['Name'] for name in names):
+                    continue
+                container_labels = container['Config']['Labels']
+                if not all(key in container_labels and (not sep or container_labels[key] == val)
+                           for key, sep, val in (label.partition('=') for label in labels)):
+                    continue
+                summaries.append({
+                    'Id': container['Id'],
+                    'Names': [container['Name']],
+                    'Image': container['Config']['Image'],
+                    'ImageID': container['Image'],
+                    'Labels': container_labels,
+                    'State': status,
+                    'Status': status,
+                    'Created': 0,
+                })
+        self.send_json(summaries)
+
+    def create_container(self):
+        body = self.read_json()
+        image = self.engine.get_image(body.get('Image', ''))
+        if image is None:
+            return self.send_not_found('image', body.get('Image', ''))
+        name = self.query.get('name', None) or 'container_' + uuid.uuid4().hex[0:8]
+        if self.engine.get_container(name):
+            return self.send_json({'message': 'Conflict. The container name "/{}" is already in use'.format(name)},
+                                  status=409)
+        container = self.engine.add_container(name, body['Image'], labels=body.get('Labels', None), status='created')
+        container['HostConfig'].update(body.get('HostConfig', None) or {})
+        container['Config']['Env'] = body.get('Env', None) or []
+        self.send_json({'Id': container['Id'], 'Warnings': []}, status=201)
+
+    def inspect_container(self, id):
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        self.send_json(container)
+
+    def container_stats(self, id):
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        cpu_stats = {'cpu_usage': {'total_usage': 0, 'percpu_usage': [0]}, 'system_cpu_usage': 0, 'online_cpus': 1}
+        self.send_json({
+            'read': format_time(time.time()),
+            'preread': format_time(time.time() - 1.),
+            'cpu_stats': cpu_stats,
+            'precpu_stats': cpu_stats,
+            'memory_stats': {'usage': 0, 'limit': 1 << 30, 'stats': {}},
+            'blkio_stats': {'io_service_bytes_recursive': []},
+            'networks': {},
+        })
+
+    def container_logs(self, id):
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        self.send_body(b'', content_type='application/vnd.docker.raw-stream')
+
+    def change_container_state(self, id, action):
+        self.read_body()
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        state = container['State']
+        status = {'start': 'running', 'restart': 'running', 'unpause': 'running', 'stop': 'exited',
+                  'kill': 'exited', 'pause': 'paused'}[action]
+        with self.engine._lock:
+            state['Status'] = status
+            state['Running'] = status in ('running', 'paused')
+            state['Paused'] = status == 'paused'
+            if action in ('start', 'restart'):
+                state['StartedAt'] = format_time(time.time())
+            elif status == 'exited':
+                state['FinishedAt'] = format_time(time.time())
+        self.engine.publish_event('container', {'stop': 'die', 'kill': 'die'}.get(action, action), container['Id'],
+                                  {'name': container['Name'][1:]})
+        self.send_no_content()
+
+    def remove_container(self, id):
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        if container['State']['Status'] == 'running' and self.query.get('force', '0') in ('0', 'false'):
+            return self.send_json({'message': 'You cannot remove a running container'}, status=409)
+        with self.engine._lock:
+            self.engine.containers.pop(container['Id'])
+        self.engine.publish_event('container', 'destroy', container['Id'], {'name': container['Name'][1:]})
+        self.send_no_content()
+
+    # execs
+    def create_exec(self, id):
+        body = self.read_json()
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        if container['State']['Status'] != 'running':
+            return self.send_json({'message': 'Container {} is not running'.format(id)}, status=409)
+        exec_id = make_id()
+        with self.engine._lock:
+            self.engine.execs[exec_id] = {
+                'ID': exec_id,
+                'ContainerID': container['Id'],
+                'Running': False,
+                'ExitCode': None,
+                'OpenStdin': bool(body.get('AttachStdin', False)),
+                'ProcessConfig': {'entrypoint': (body.get('Cmd', None) or [''])[0],
+                                  'arguments': (body.get('Cmd', None) or [''])[1:],
+                                  'user': body.get('User', '')},
+            }
+            container['ExecIDs'] = (container['ExecIDs'] or []) + [exec_id]
+        self.send_json({'Id': exec_id}, status=201)
+
+    def start_exec(self, id):
+        self.read_body()
+        exec = self.engine.execs.get(id, None)
+        if exec is None:
+            return self.send_not_found('exec instance', id)
+        exec['Running'] = True
+        self.upgrade()
+        try:
+            if exec['OpenStdin']:
+                self.run_shell()
+            else:
+                time.sleep(HIJACK_DELAY)
+                args = exec['ProcessConfig']['arguments']
+                if exec['ProcessConfig']['entrypoint'] == 'echo':
+                    self.send_frame(1, ' '.join(args).encode() + b'\n')
+        except OSError:
+            pass
+        finally:
+            exec['Running'] = False
+            exec['ExitCode'] = 0
+
+    def run_shell(self):
+        """ Simulate a shell which reads commands from the standard input, and answers the markers
+        which signal the end of each command of a session
+        """
+        while True:
+            line = self.rfile.readline()
+            if not line or line.strip() == b'exit':
+                break
+            line = line.decode(errors='replace').rstrip('\n')
+            match = SESSION_STDOUT_MARKER_PATTERN.match(line)
+            if match:
+                self.send_frame(1, '\n{} 0\n'.format(match.group(1)).encode())
+                continue
+            match = SESSION_STDERR_MARKER_PATTERN.match(line)
+            if match:
+                self.send_frame(2, '\n{}\n'.format(match.group(1)).encode())
+
+    def inspect_exec(self, id):
+        exec = self.engine.execs.get(id, None)
+        if exec is None:
+            return self.send_not_found('exec instance', id)
+        self.send_json(exec)
+
+    # archives
+    def stat_archive(self, id):
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        stat = {'name': os.path.basename(self.query.get('path', '/')), 'size': 4096, 'mode': (1 << 31) | 0o755,
+                'mtime': format_time(time.time()), 'linkTarget': ''}
+        self.send_body(b'', content_type='application/x-tar', headers={
+            'X-Docker-Container-Path-Stat': base64.b64encode(json.dumps(stat).encode()).decode()})
+
+    def put_archive(self, id):
+        body = self.read_body()
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        with self.engine._lock:
+            self.engine.archive_bytes += len(body)
+        self.send_no_content(200)
+
+    def get_archive(self, id):
+        import io
+        import tarfile
+
+        container = self.engine.get_container(id)
+        if container is None:
+            return self.send_not_found('container', id)
+        file = io.BytesIO()
+        with tarfile.open(fileobj=file, mode='w') as archive:
+            info = tarfile.TarInfo(os.path.basename(self.query.get('path', 'file')) or 'file')
+            info.size = 0
+            archive.addfile(info, io.BytesIO(b''))
+        self.send_body(file.getvalue(), content_type='application/x-tar')
+
+    # networks
+    def list_networks(self):
+        with self.engine._lock:
+            self.send_json(list(self.engine.networks.values()))
+
+    def create_network(self):
+        body = self.read_json()
+        with self.engine._lock:
+            if body['Name'] in self.engine.networks:
+                return self.send_json({'message': 'network with name {} already exists'.format(body['Name'])},
+                                      status=409)
+            network = self.engine.networks[body['Name']] = {
+                'Id': make_id(), 'Name': body['Name'], 'Driver': body.get('Driver', None) or 'bridge',
+                'Internal': body.get('Internal', False), 'Options': body.get('Options', None) or {}, 'Containers': {},
+            }
+        self.engine.publish_event('network', 'create', network['Id'], {'name': network['Name']})
+        self.send_json({'Id': network['Id'], 'Warning': ''}, status=201)
+
+    def inspect_network(self, name):
+        with self.engine._lock:
+            network = self.engine.networks.get(name, None)
+        if network is None:
+            return self.send_not_found('network', name)
+        self.send_json(network)
+
+    def remove_network(self, name):
+        with self.engine._lock:
+            network = self.engine.networks.pop(name, None)
+        if network is None:
+            return self.send_not_found('network', name)
+        self.engine.publish_event('network', 'destroy', network['Id'], {'name': name})
+        self.send_no_content()
@@ -0,0 +1,246 @@
+""" Tests for wc_env_manager.aio
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import asyncio
+import io
+import json
+import mock
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import time
+import unittest
+import wc_env_manager.aio
+import wc_env_manager.core
+import whichcraft
+
+
+class AsyncWcEnvManagerUtilsTestCase(unittest.TestCase):
+    def test_demultiplex(self):
+        stream = b''.join([
+            struct.pack('>BxxxL', 1, 4), b'abc\n',
+            struct.pack('>BxxxL', 2, 4), b'def\n',
+            struct.pack('>BxxxL', 1, 0),
+        ])
+        self.assertEqual(wc_env_manager.aio.AsyncWcEnvManager._demultiplex(stream), b'abc\ndef\n')
+        self.assertEqual(wc_env_manager.aio.AsyncWcEnvManager._demultiplex(b''), b'')
+
+    def test_extract_archive(self):
+        temp_dir_name = tempfile.mkdtemp()
+
+        os.mkdir(os.path.join(temp_dir_name, 'src'))
+        with open(os.path.join(temp_dir_name, 'src', 'a.txt'), 'w') as file:
+            file.write('abc')
+        archive_filename = os.path.join(temp_dir_name, 'archive.tar')
+        with tarfile.open(archive_filename, mode='w') as tar_file:
+            tar_file.add(os.path.join(temp_dir_name, 'src'), arcname='src')
+
+        # directory which doesn't exist
+        with open(archive_filename, 'rb') as archive:
+            wc_env_manager.aio.AsyncWcEnvManager._extract_archive(archive, os.path.join(temp_dir_name, 'dest'))
+        with open(os.path.join(temp_dir_name, 'dest', 'a.txt'), 'r') as file:
+            self.assertEqual(file.read(), 'abc')
+
+        # existing directory
+        with open(os.path.join(temp_dir_name, 'dest', 'b.txt'), 'w') as file:
+            file.write('def')
+        with open(archive_filename, 'rb') as archive:
+            wc_env_manager.aio.AsyncWcEnvManager._extract_archive(archive, os.path.join(temp_dir_name, 'dest'))
+        self.assertEqual(sorted(os.listdir(os.path.join(temp_dir_name, 'dest'))), ['a.txt', 'b.txt'])
+
+        shutil.rmtree(temp_dir_name)
+
+    def test_extract_unsafe_archive(self):
+        temp_dir_name = tempfile.mkdtemp()
+        dest = os.path.join(temp_dir_name, 'dir', 'dest')
+
+        def make_archive(*members):
+            archive = io.BytesIO()
+            with tarfile.open(fileobj=archive, mode='w') as tar_file:
+                for member in members:
+                    data = b'abc' if member.isfile() else b''
+                    member.size = len(data)
+                    tar_file.addfile(member, io.BytesIO(data))
+            archive.seek(0)
+            return archive
+
+        def make_member(name, type=tarfile.REGTYPE, linkname=''):
+            member = tarfile.TarInfo(name)
+            member.type = type
+            member.linkname = linkname
+            return member
+
+        unsafe_archives = [
+            ('outside of the destination', [make_member('../a.txt')]),
+            ('outside of the destination', [make_member('/tmp/a.txt')]),
+            ('outside of the destination', [make_member('src/../../a.txt')]),
+            ('links outside', [make_member('src', tarfile.DIRTYPE),
+                               make_member('src/link', tarfile.SYMTYPE, '../../..')]),
+            ('links outside', [make_member('src', tarfile.DIRTYPE),
+                               make_member('src/link', tarfile.SYMTYPE, '/etc')]),
+            ('links outside', [make_member('src', tarfile.DIRTYPE),
+                               make_member('src/link', tarfile.LNKTYPE, '../a.txt')]),
+            ('is a device', [make_member('src', tarfile.DIRTYPE),
+                             make_member('src/dev', tarfile.CHRTYPE)]),
+        ]
+        for message, members in unsafe_archives:
+            with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, message):
+                wc_env_manager.aio.AsyncWcEnvManager._extract_archive(make_archive(*members), dest)
+        self.assertEqual(os.listdir(temp_dir_name), [])
+
+        # links within the archive are extracted
+        archive = make_archive(make_member('src', tarfile.DIRTYPE),
+                               make_member('src/a.txt'),
+                               make_member('src/link', tarfile.SYMTYPE, 'a.txt'))
+        wc_env_manager.aio.AsyncWcEnvManager._extract_archive(archive, os.path.join(temp_dir_name, 'dest'))
+        with open(os.path.join(temp_dir_name, 'dest', 'link'), 'r') as file:
+            self.assertEqual(file.read(), 'abc')
+
+        shutil.rmtree(temp_dir_name)
+
+    def test_docker_host_error(self):
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'unix socket'):
+            wc_env_manager.aio.AsyncWcEnvManager(docker_host='tcp://127.0.0.1:2375')
+
+    def test_run_process_in_container(self):
+        mgr = wc_env_manager.aio.AsyncWcEnvManager(config={'container': {'resources': {'thread_env': True}}})
+        mgr.set_container('container')
+
+        attrs = {
+            'Id': '0123',
+            'State': {'Status': 'paused'},
+            'HostConfig': {'NanoCpus': 2000000000},
+            'Config': {'Env': ['OMP_NUM_THREADS=1']},
+        }
+        requests = []
+
+        async def request(method, path, params=None, json_data=None, data=None, headers=None):
+            requests.append((method, path, json_data))
+            if path == '/containers/container/json':
+                return 200, json.dumps(attrs).encode()
+            if path == '/containers/container/exec':
+                if attrs['State']['Status'] == 'paused':
+                    raise wc_env_manager.core.WcEnvManagerError('Docker API error (409 {}): paused'.format(path))
+                return 201, json.dumps({'Id': 'exec'}).encode()
+            if path == '/containers/0123/unpause':
+                attrs['State']['Status'] = 'running'
+                return 204, b''
+            if path == '/exec/exec/start':
+                return 200, struct.pack('>BxxxL', 1, 5) + b'abc\n\n'
+            if path == '/exec/exec/json':
+                return 200, json.dumps({'ExitCode': 0}).encode()
+            raise Exception('Unexpected request {} {}'.format(method, path))
+
+        with mock.patch.object(mgr, '_request', side_effect=request):
+            output, exit_code = asyncio.get_event_loop().run_until_complete(
+                mgr.run_process_in_container(['echo', 'abc'], env={'KEY': 'val'}))
+
+        # only the trailing newline is removed from the output
+        self.assertEqual(output, 'abc\n')
+        self.assertEqual(exit_code, 0)
+
+        # the hibernated container is unpaused
+        self.assertIn(('POST', '/containers/0123/unpause', None), requests)
+
+        # the thread pools are limited to the CPUs of the container
+        exec_config = [json_data for method, path, json_data in requests if path == '/containers/container/exec'][-1]
+        self.assertIn('KEY=val', exec_config['Env'])
+        self.assertIn('MKL_NUM_THREADS=2', exec_config['Env'])
+        self.assertNotIn('OMP_NUM_THREADS=2', exec_config['Env'])
+
+    def test_copy_path_to_container_without_dirname(self):
+        mgr = wc_env_manager.aio.AsyncWcEnvManager()
+        mgr.set_container('container')
+
+        temp_dir_name = tempfile.mkdtemp()
+        temp_file_name = os.path.join(temp_dir_name, 'test.txt')
+        with open(temp_file_name, 'w') as file:
+            file.write('abc')
+
+        async def request(method, path, params=None, json_data=None, data=None, headers=None):
+            self.assertEqual(params, {'path': '/'})
+            with tarfile.open(fileobj=data) as tar_file:
+                self.assertEqual(tar_file.getnames(), ['test.txt'])
+            return 200, b''
+
+        with mock.patch.object(mgr, '_request', side_effect=request) as mock_request:
+            asyncio.get_event_loop().run_until_complete(mgr.copy_path_to_container(temp_file_name, 'test.txt'))
+        mock_request.assert_called_once()
+
+        shutil.rmtree(temp_dir_name)
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class AsyncWcEnvManagerContainerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sync_mgr = sync_mgr = wc_env_manager.core.WcEnvManager()
+        sync_mgr.pull_image(sync_mgr.config['base_image']['repo'], sync_mgr.config['base_image']['tags'])
+
+        sync_mgr.config['image']['tags'] = ['test']
+        sync_mgr.config['image']['python_packages'] = ''
+        sync_mgr.build_image()
+
+        sync_mgr.config['network']['name'] = '__test__'
+        sync_mgr.config['network']['containers'] = {}
+        sync_mgr.config['container']['paths_to_mount'] = {}
+
+        self.containers = [sync_mgr.build_container().name]
+        time.sleep(1.)
+        self.containers.append(sync_mgr.build_container().name)
+
+    def tearDown(self):
+        sync_mgr = self.sync_mgr
+        sync_mgr.remove_containers(force=True)
+        sync_mgr.remove_network()
+        sync_mgr.remove_image(sync_mgr.config['image']['repo'], sync_mgr.config['image']['tags'])
+
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test(self):
+        async def test():
+            async with wc_env_manager.aio.AsyncWcEnvManager() as mgr:
+                # get containers
+                containers = await mgr.get_containers()
+                self.assertEqual(sorted(container['Names'][0].lstrip('/') for container in containers),
+                                 sorted(self.containers))
+
+                # run processes concurrently
+                results = await asyncio.gather(*[
+                    mgr.run_process_in_container(['bash', '-c', 'echo $KEY'], env={'KEY': name}, container=name)
+                    for name in self.containers])
+                self.assertEqual(results, [(name, 0) for name in self.containers])
+
+                with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, '  exit code: 126'):
+                    await mgr.run_process_in_container(['__undefined__'])
+
+                # stats
+                stats = await mgr.get_container_stats()
+                self.assertIn('memory_stats', stats)
+
+                # copy
+                temp_dir_name = tempfile.mkdtemp()
+                temp_file_name = os.path.join(temp_dir_name, 'test.txt')
+                with open(temp_file_name, 'w') as file:
+                    file.write('abc')
+                await mgr.copy_path_to_container(temp_file_name, '/tmp/test.txt')
+                with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'exists'):
+                    await mgr.copy_path_to_container(temp_file_name, '/tmp/test.txt', overwrite=False)
+                os.remove(temp_file_name)
+                await mgr.copy_path_from_container('/tmp/test.txt', temp_file_name)
+                with open(temp_file_name, 'r') as file:
+                    self.assertEqual(file.read(), 'abc')
+                shutil.rmtree(temp_dir_name)
+
+                # remove
+                await mgr.remove_containers(force=True)
+                self.assertEqual(await mgr.get_containers(), [])
+
+        self.run_async(test())
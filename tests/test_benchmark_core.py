@@ -0,0 +1,171 @@
+""" Tests of the fake Docker Engine and the benchmarks of wc_env_manager
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from fake_docker_engine import FakeDockerEngine
+import benchmark_core
+import docker
+import os
+import shutil
+import tempfile
+import unittest
+import wc_env_manager.core
+import wc_env_manager.session
+
+
+class FakeDockerEngineTestCase(unittest.TestCase):
+    def test_images(self):
+        with FakeDockerEngine(num_images=2, num_layers=3) as engine:
+            client = docker.DockerClient(base_url=engine.docker_host)
+
+            self.assertEqual(sorted(tag for image in client.images.list(name='karrlab/wc_env') for tag in image.tags),
+                             ['karrlab/wc_env:0.0.1', 'karrlab/wc_env:0.0.2', 'karrlab/wc_env:latest'])
+            self.assertEqual(client.images.get('karrlab/wc_env').tags, ['karrlab/wc_env:0.0.2', 'karrlab/wc_env:latest'])
+            self.assertEqual(len(client.images.get('karrlab/wc_env:0.0.1').attrs['RootFS']['Layers']), 3)
+            with self.assertRaises(docker.errors.ImageNotFound):
+                client.images.get('karrlab/wc_env:0.0.3')
+
+            image = client.images.pull('karrlab/wc_env', tag='0.0.3')
+            self.assertEqual(image.tags, ['karrlab/wc_env:0.0.3'])
+
+            messages = list(client.images.push('karrlab/wc_env', '0.0.3', stream=True, decode=True))
+            self.assertEqual(len([message for message in messages if message.get('status', None) == 'Pushed']), 3)
+            self.assertIn('aux', messages[-1])
+
+            client.images.remove('karrlab/wc_env:0.0.3')
+            with self.assertRaises(docker.errors.ImageNotFound):
+                client.images.get('karrlab/wc_env:0.0.3')
+
+            self.assertEqual(engine.requests['POST /images/create'], 1)
+            self.assertEqual(engine.requests['POST /images/{name}/push'], 1)
+
+    def test_containers(self):
+        with FakeDockerEngine(num_images=1, num_containers=3) as engine:
+            client = docker.DockerClient(base_url=engine.docker_host)
+            engine.reset_requests()
+
+            containers = client.containers.list(all=True)
+            self.assertEqual([container.name for container in containers],
+                             ['wc_env-2026-01-01-00-00-00', 'wc_env-2026-01-01-00-00-01', 'wc_env-2026-01-01-00-00-02'])
+            self.assertEqual(engine.requests['GET /containers/json'], 1)
+            self.assertEqual(engine.requests['GET /containers/{id}/json'], 3)
+
+            container = client.containers.run('karrlab/wc_env', name='test', labels={'key': 'val'}, detach=True)
+            container.reload()
+            self.assertEqual(container.status, 'running')
+            self.assertEqual([c.name for c in client.containers.list(filters={'label': 'key=val'})], ['test'])
+
+            result = container.exec_run(['echo', 'abc'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.output, b'abc\n')
+
+            self.assertIn('read', container.stats(stream=False))
+
+            container.stop()
+            container.reload()
+            self.assertEqual(container.status, 'exited')
+            with self.assertRaises(docker.errors.APIError):
+                container.exec_run(['echo', 'abc'])
+
+            container.remove()
+            with self.assertRaises(docker.errors.NotFound):
+                client.containers.get('test')
+
+    def test_session(self):
+        with FakeDockerEngine(num_images=1, num_containers=1) as engine:
+            client = docker.DockerClient(base_url=engine.docker_host)
+            container = client.containers.list()[0]
+            with wc_env_manager.session.ContainerSession(client, container) as session:
+                result = session.run(['pip', 'install', 'wc_lang'])
+                self.assertEqual(result.exit_code, 0)
+                self.assertEqual(result.output, '')
+                self.assertEqual(session.run('cd /tmp').exit_code, 0)
+            self.assertEqual(engine.requests['POST /exec/{id}/start'], 1)
+
+    def test_events(self):
+        with FakeDockerEngine(num_images=1, num_containers=1) as engine:
+            client = docker.DockerClient(base_url=engine.docker_host)
+            events = client.events(decode=True)
+            client.containers.list()[0].stop()
+            event = next(events)
+            events.close()
+            self.assertEqual(event['Type'], 'container')
+            self.assertEqual(event['Action'], 'die')
+
+    def test_latency(self):
+        with FakeDockerEngine(latency=0.05) as engine:
+            client = docker.DockerClient(base_url=engine.docker_host)
+            times = benchmark_core.time_calls(client.ping, 2)
+            self.assertGreaterEqual(min(times), 0.05)
+
+    def test_environ(self):
+        with FakeDockerEngine() as engine:
+            docker_host = os.environ.get('DOCKER_HOST', None)
+            with engine.environ():
+                self.assertEqual(os.environ['DOCKER_HOST'], engine.docker_host)
+                self.assertTrue(docker.from_env().ping())
+            self.assertEqual(os.environ.get('DOCKER_HOST', None), docker_host)
+
+
+class BenchmarksTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_run(self):
+        results = benchmark_core.run(latency=0., repeats=1, names=['init', 'setup_container', 'push_pull_image'])
+        keys = [result.key for result in results]
+        self.assertIn('init(containers=10)', keys)
+        self.assertIn('setup_container(packages=20)', keys)
+        self.assertIn('pull_image(layers=10, tags=2)', keys)
+
+        # the number of requests is independent of the latency
+        init = results[keys.index('init(containers=10)')]
+        self.assertEqual(len(init.times), 1)
+        self.assertGreater(init.requests, 10)
+
+    def test_records(self):
+        path = os.path.join(self.dirname, 'results.jsonl')
+        self.assertEqual(benchmark_core.read_records(path), [])
+
+        result = benchmark_core.BenchmarkResult('get_containers', {'containers': 10}, [0.1, 0.3, 0.2], 11)
+        self.assertEqual(result.to_dict()['median'], 0.2)
+        self.assertEqual(result.to_dict()['throughput'], None)
+        record = benchmark_core.make_record([result], 0.001, 3)
+        record['commit'] = 'abc1234'
+        benchmark_core.save_record(record, path)
+
+        slow_result = benchmark_core.BenchmarkResult('get_containers', {'containers': 10}, [0.4], 12)
+        other_record = benchmark_core.make_record([slow_result], 0.001, 1)
+        other_record['commit'] = 'def5678'
+        benchmark_core.save_record(other_record, path)
+
+        records = benchmark_core.read_records(path)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(benchmark_core.get_baseline(records)['commit'], 'def5678')
+        self.assertEqual(benchmark_core.get_baseline(records, 'abc1234567')['commit'], 'abc1234')
+        self.assertEqual(benchmark_core.get_baseline(records, '0000000'), None)
+
+        comparisons = benchmark_core.compare(other_record, records[0])
+        self.assertEqual(len(comparisons), 1)
+        self.assertAlmostEqual(comparisons[0]['ratio'], 2.)
+        self.assertEqual(comparisons[0]['requests_delta'], 1)
+        self.assertTrue(comparisons[0]['regressed'])
+        self.assertFalse(benchmark_core.compare(records[0], records[0])[0]['regressed'])
+
+        table = benchmark_core.format_results(other_record, comparisons)
+        self.assertRegex(table, r'get_containers\(containers=10\) +400\.00 +400\.00 +12 +\+100% !')
+
+    def test_main(self):
+        path = os.path.join(self.dirname, 'results.jsonl')
+        self.assertEqual(benchmark_core.main(['--benchmark', 'setup_container', '--repeats', '1', '--latency', '0',
+                                              '--results', path]), 0)
+        self.assertEqual(benchmark_core.main(['--benchmark', 'setup_container', '--repeats', '1', '--latency', '0',
+                                              '--results', path, '--compare', '--threshold', '1000']), 0)
+        self.assertEqual(len(benchmark_core.read_records(path)), 2)
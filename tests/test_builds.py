@@ -0,0 +1,315 @@
+""" Tests for wc_env_manager.builds
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from fake_docker_engine import FakeDockerEngine
+import capturer
+import contextlib
+import docker
+import json
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import wc_env_manager.builds
+import wc_env_manager.core
+
+
+def make_context(dirname, content='FROM ubuntu', build_args=None):
+    os.makedirs(dirname)
+    dockerfile_path = os.path.join(dirname, 'Dockerfile')
+    with open(dockerfile_path, 'w') as file:
+        file.write(content)
+    os.makedirs(os.path.join(dirname, 'root', '.wc'))
+    with open(os.path.join(dirname, 'root', '.wc', 'wc_lang.cfg'), 'w') as file:
+        file.write('[wc_lang]\n')
+    return wc_env_manager.core.ImageContext(dirname, dockerfile_path, build_args or {})
+
+
+class FingerprintTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_get_fingerprint(self):
+        get_fingerprint = wc_env_manager.builds.get_fingerprint
+        context_1 = make_context(os.path.join(self.dirname, '1'))
+        context_2 = make_context(os.path.join(self.dirname, '2'))
+        fingerprint = get_fingerprint(context_1, 'karrlab/wc_env', ['0.0.1', 'latest'])
+        self.assertRegex(fingerprint, r'^[0-9a-f]{64}$')
+
+        # the fingerprint only depends on the content of the context, not its location
+        self.assertEqual(get_fingerprint(context_2, 'karrlab/wc_env', ['0.0.1', 'latest']), fingerprint)
+
+        self.assertNotEqual(get_fingerprint(context_1, 'karrlab/wc_env', ['0.0.2', 'latest']), fingerprint)
+        self.assertNotEqual(get_fingerprint(context_1, 'karrlab/wc_env_dependencies', ['0.0.1', 'latest']), fingerprint)
+        self.assertEqual(get_fingerprint(context_1, 'karrlab/wc_env', ['0.0.1', 'latest'], inputs={}), fingerprint)
+        self.assertNotEqual(get_fingerprint(context_1, 'karrlab/wc_env', ['0.0.1', 'latest'],
+                                            inputs={'base_image': 'sha256:1'}), fingerprint)
+        self.assertNotEqual(get_fingerprint(context_1, 'karrlab/wc_env', ['0.0.1', 'latest'],
+                                            inputs={'base_image': 'sha256:1'}),
+                            get_fingerprint(context_1, 'karrlab/wc_env', ['0.0.1', 'latest'],
+                                            inputs={'base_image': 'sha256:2'}))
+
+        context_2.build_args['image_tag'] = '0.0.1'
+        self.assertNotEqual(get_fingerprint(context_2, 'karrlab/wc_env', ['0.0.1', 'latest']), fingerprint)
+        context_2.build_args.clear()
+
+        with open(os.path.join(context_2.path, 'root', '.wc', 'wc_lang.cfg'), 'a') as file:
+            file.write('key = val\n')
+        self.assertNotEqual(get_fingerprint(context_2, 'karrlab/wc_env', ['0.0.1', 'latest']), fingerprint)
+
+        os.remove(os.path.join(context_2.path, 'root', '.wc', 'wc_lang.cfg'))
+        self.assertNotEqual(get_fingerprint(context_2, 'karrlab/wc_env', ['0.0.1', 'latest']), fingerprint)
+
+
+class BuildCoordinatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.lock_path = os.path.join(self.dirname, 'builds')
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def make_coordinator(self, **kwargs):
+        kwargs.setdefault('poll_interval', 0.01)
+        return wc_env_manager.builds.BuildCoordinator(self.lock_path, **kwargs)
+
+    def test_from_config(self):
+        self.assertIsNone(wc_env_manager.builds.BuildCoordinator.from_config({'lock_path': None}))
+
+        coordinator = wc_env_manager.builds.BuildCoordinator.from_config({
+            'lock_path': '~/builds',
+            'max_concurrent_builds': 2,
+            'timeout': '2m',
+            'poll_interval': 0.5,
+        })
+        self.assertEqual(coordinator.lock_path, os.path.expanduser('~/builds'))
+        self.assertEqual(coordinator.max_concurrent_builds, 2)
+        self.assertEqual(coordinator.timeout, 120.)
+        self.assertEqual(coordinator.poll_interval, 0.5)
+
+        coordinator = wc_env_manager.builds.BuildCoordinator.from_config({'lock_path': self.lock_path})
+        self.assertEqual(coordinator.max_concurrent_builds, 1)
+        self.assertIsNone(coordinator.timeout)
+
+    def test_build(self):
+        coordinator = self.make_coordinator()
+        image = mock.Mock(id='sha256:1', tags=['karrlab/wc_env:latest'])
+
+        with coordinator.coordinate('karrlab/wc_env', 'abc') as ticket:
+            self.assertIsNone(ticket.result)
+            self.assertIsNone(ticket.get_image(mock.Mock()))
+            ticket.save_result(image)
+
+        self.assertEqual(oct(os.stat(self.lock_path).st_mode & 0o7777), oct(0o1777))
+        with open(os.path.join(self.lock_path, 'karrlab_wc_env', 'abc.json')) as file:
+            result = json.load(file)
+        self.assertEqual(result['image_id'], 'sha256:1')
+        self.assertEqual(result['tags'], ['karrlab/wc_env:latest'])
+        self.assertEqual(result['pid'], os.getpid())
+        self.assertRegex(result['build_id'], r'^[0-9a-f]{32}$')
+
+        # the result of a build which completed before the request isn't reused
+        with coordinator.coordinate('karrlab/wc_env', 'abc') as ticket:
+            self.assertIsNone(ticket.result)
+
+    def test_coalesce_identical_builds(self):
+        coordinator = self.make_coordinator()
+        image = mock.Mock(id='sha256:1', tags=['karrlab/wc_env:latest'])
+        tickets = {}
+        started = threading.Event()
+
+        def build():
+            with coordinator.coordinate('karrlab/wc_env', 'abc') as ticket:
+                started.set()
+                time.sleep(0.2)
+                ticket.save_result(image)
+            tickets['build'] = ticket
+
+        def wait():
+            started.wait()
+            with coordinator.coordinate('karrlab/wc_env', 'abc', verbose=True) as ticket:
+                tickets['wait'] = ticket
+
+        threads = [threading.Thread(target=build), threading.Thread(target=wait)]
+        with capturer.CaptureOutput(relay=False) as capture_output:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            text = capture_output.get_text()
+        self.assertIn('Waiting for an identical build of karrlab/wc_env', text)
+        self.assertIn('Reusing image sha256:1', text)
+
+        self.assertIsNone(tickets['build'].result)
+        waiting_ticket = tickets['wait']
+        self.assertEqual(waiting_ticket.result['image_id'], 'sha256:1')
+        self.assertGreater(waiting_ticket.wait_time, 0.1)
+
+        docker_client = mock.Mock()
+        docker_client.images.get.return_value = image
+        self.assertEqual(waiting_ticket.get_image(docker_client), image)
+        docker_client.images.get.assert_called_once_with('sha256:1')
+
+        docker_client.images.get.side_effect = docker.errors.ImageNotFound('sha256:1')
+        self.assertIsNone(waiting_ticket.get_image(docker_client))
+
+    def test_coalesce_identical_builds_with_skewed_clocks(self):
+        coordinator = self.make_coordinator()
+        image = mock.Mock(id='sha256:1', tags=['karrlab/wc_env:latest'])
+        tickets = {}
+        started = threading.Event()
+
+        def build():
+            with coordinator.coordinate('karrlab/wc_env', 'abc') as ticket:
+                started.set()
+                time.sleep(0.2)
+                # e.g., the clock of the container of the process which built the image is behind
+                with mock.patch('time.time', return_value=0.):
+                    ticket.save_result(image)
+
+        def wait():
+            started.wait()
+            with coordinator.coordinate('karrlab/wc_env', 'abc') as ticket:
+                tickets['wait'] = ticket
+
+        threads = [threading.Thread(target=build), threading.Thread(target=wait)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(tickets['wait'].result['image_id'], 'sha256:1')
+
+    def test_failed_build_isnt_reused(self):
+        coordinator = self.make_coordinator()
+        tickets = []
+        started = threading.Event()
+
+        def build():
+            try:
+                with coordinator.coordinate('karrlab/wc_env', 'abc'):
+                    started.set()
+                    time.sleep(0.1)
+                    raise ValueError('build failed')
+            except ValueError:
+                pass
+
+        def wait():
+            started.wait()
+            with coordinator.coordinate('karrlab/wc_env', 'abc') as ticket:
+                tickets.append(ticket)
+
+        threads = [threading.Thread(target=build), threading.Thread(target=wait)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIsNone(tickets[0].result)
+
+    def test_queue_different_builds(self):
+        for max_concurrent_builds, overlap in [(1, False), (2, True)]:
+            coordinator = self.make_coordinator(max_concurrent_builds=max_concurrent_builds)
+            intervals = []
+
+            def build(fingerprint):
+                with coordinator.coordinate('karrlab/wc_env', fingerprint):
+                    start = time.time()
+                    time.sleep(0.1)
+                    intervals.append((start, time.time()))
+
+            threads = [threading.Thread(target=build, args=(fingerprint,)) for fingerprint in ['abc', 'def']]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            intervals.sort()
+            self.assertEqual(intervals[1][0] < intervals[0][1], overlap)
+
+    def test_timeout(self):
+        coordinator = self.make_coordinator(timeout=0.05)
+        with coordinator.coordinate('karrlab/wc_env', 'abc'):
+            with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'Timed out'):
+                with coordinator.coordinate('karrlab/wc_env_dependencies', 'def'):
+                    pass  # pragma: no cover
+
+
+class ManagerBuildTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.engine = FakeDockerEngine(num_images=1)
+        self.engine.start()
+
+    def tearDown(self):
+        self.engine.stop()
+        shutil.rmtree(self.dirname)
+
+    def make_manager(self, lock_path):
+        with self.engine.environ():
+            mgr = wc_env_manager.core.WcEnvManager({
+                'verbose': False,
+                'build': {'lock_path': lock_path, 'poll_interval': 0.01},
+            })
+        return mgr
+
+    def test_coalesce_identical_builds(self):
+        lock_path = os.path.join(self.dirname, 'builds')
+        mgrs = [self.make_manager(lock_path) for i in range(2)]
+        image = mgrs[0]._docker_client.images.get('karrlab/wc_env')
+        build_image = mock.Mock(side_effect=lambda *args: time.sleep(0.2) or image)
+        images = []
+        contexts = [make_context(os.path.join(self.dirname, 'context-{}'.format(i_build))) for i_build in range(2)]
+
+        def build(mgr, context):
+            with mock.patch.object(mgr, '_build_image', build_image):
+                images.append(mgr.build_image(context))
+
+        threads = [threading.Thread(target=build, args=(mgr, context)) for mgr, context in zip(mgrs, contexts)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+
+        build_image.assert_called_once()
+        self.assertEqual([image.id for image in images], [image.id, image.id])
+        self.assertEqual([mgr._image.id for mgr in mgrs], [image.id, image.id])
+        self.assertFalse(any(os.path.isdir(context.path) for context in contexts))
+
+    def test_without_coordination(self):
+        mgr = self.make_manager(None)
+        image = mgr._docker_client.images.get('karrlab/wc_env')
+        context = make_context(os.path.join(self.dirname, 'context'))
+        with mock.patch.object(mgr, '_build_image', return_value=image) as build_image:
+            self.assertEqual(mgr.build_image(context), image)
+        build_image.assert_called_once()
+        self.assertFalse(os.path.isdir(os.path.join(self.dirname, 'builds')))
+
+    def test_fingerprint_inputs(self):
+        mgr = self.make_manager(os.path.join(self.dirname, 'builds'))
+        image = mgr._docker_client.images.get('karrlab/wc_env')
+        mgr.config['base_image']['slim']['enabled'] = True
+
+        context = make_context(os.path.join(self.dirname, 'context-1'))
+        with mock.patch.object(mgr, '_coordinate_build', return_value=contextlib.nullcontext()) as coordinate_build, \
+                mock.patch.object(mgr, '_build_base_image', return_value=image):
+            mgr.build_base_image(context)
+        self.assertEqual(coordinate_build.call_args[1]['inputs']['slim']['enabled'], True)
+
+        context = make_context(os.path.join(self.dirname, 'context-2'))
+        with mock.patch.object(mgr, '_coordinate_build', return_value=contextlib.nullcontext()) as coordinate_build, \
+                mock.patch.object(mgr, '_build_image', return_value=image), \
+                mock.patch.object(docker.models.images.ImageCollection, 'get', return_value=mock.Mock(id='sha256:base')):
+            mgr.build_image(context)
+        self.assertEqual(coordinate_build.call_args[1]['inputs'], {'base_image': 'sha256:base'})
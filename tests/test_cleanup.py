@@ -0,0 +1,188 @@
+""" Tests for wc_env_manager.cleanup
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import mock
+import unittest
+import wc_env_manager.cleanup
+import wc_env_manager.core
+import whichcraft
+
+
+def make_config(**kwargs):
+    gc_config = {
+        'keep_tags': 2,
+        'stopped_container_max_age': '7d',
+        'build_cache_max_size': '10g',
+        'prune_dangling_images': True,
+        'max_workers': 4,
+    }
+    gc_config.update(kwargs)
+    return {
+        'base_image': {'repo_unsquashed': 'karrlab/deps_unsquashed', 'repo': 'karrlab/deps', 'tags': ['latest', '0.0.52']},
+        'image': {'repo': 'karrlab/wc_env', 'tags': ['latest', '0.0.52']},
+        'container': {'name_format': 'wc_env-%Y-%m-%d-%H-%M-%S'},
+        'gc': gc_config,
+    }
+
+
+class CleanupTestCase(unittest.TestCase):
+    def test_parse_version(self):
+        self.assertEqual(wc_env_manager.cleanup.parse_version('latest'), None)
+        self.assertEqual(wc_env_manager.cleanup.parse_version('0.0'), None)
+        self.assertLess(wc_env_manager.cleanup.parse_version('0.0.9'), wc_env_manager.cleanup.parse_version('0.0.10'))
+        self.assertLess(wc_env_manager.cleanup.parse_version('0.9.9'), wc_env_manager.cleanup.parse_version('1.0.0'))
+        self.assertLess(wc_env_manager.cleanup.parse_version('1.0.0rc1'), wc_env_manager.cleanup.parse_version('1.0.0'))
+        self.assertEqual(wc_env_manager.cleanup.parse_version('v1.2.3')[0:3], (1, 2, 3))
+
+    def test_get_tags_to_remove(self):
+        tags = ['latest', '0.0.10', '0.0.9', '0.0.52', '0.0.8', 'dev', '0.0.52']
+        self.assertEqual(wc_env_manager.cleanup.get_tags_to_remove(tags, 2), ['0.0.8', '0.0.9'])
+        self.assertEqual(wc_env_manager.cleanup.get_tags_to_remove(tags, 2, protected_tags={'0.0.8'}), ['0.0.9'])
+        self.assertEqual(wc_env_manager.cleanup.get_tags_to_remove(tags, 0), ['0.0.8', '0.0.9', '0.0.10', '0.0.52'])
+        self.assertEqual(wc_env_manager.cleanup.get_tags_to_remove(tags, 10), [])
+
+    def test_report(self):
+        report = wc_env_manager.cleanup.GarbageCollectionReport(dry_run=True)
+        report.removed_images.append('karrlab/wc_env:0.0.1')
+        self.assertEqual(report.to_dict(), {
+            'dry_run': True,
+            'removed_images': ['karrlab/wc_env:0.0.1'],
+            'removed_containers': [],
+            'pruned_images': 0,
+            'pruned_build_cache': 0,
+            'space_reclaimed': 0,
+            'errors': [],
+        })
+
+    def test_init(self):
+        mgr = mock.Mock(config=make_config())
+        collector = wc_env_manager.cleanup.GarbageCollector(mgr)
+        self.assertEqual(collector.keep_tags, 2)
+        self.assertEqual(collector.stopped_container_max_age, 7 * 24 * 3600.)
+        self.assertEqual(collector.build_cache_max_size, 10 * 1024 ** 3)
+        self.assertEqual(collector.max_workers, 4)
+
+        mgr = mock.Mock(config=make_config(stopped_container_max_age='', build_cache_max_size=''))
+        collector = wc_env_manager.cleanup.GarbageCollector(mgr, keep_tags=5)
+        self.assertEqual(collector.keep_tags, 5)
+        self.assertEqual(collector.stopped_container_max_age, None)
+        self.assertEqual(collector.build_cache_max_size, None)
+
+    def test_get_images_to_remove(self):
+        images = [
+            mock.Mock(id='a', tags=['karrlab/wc_env:0.0.1', 'karrlab/wc_env:old']),
+            mock.Mock(id='b', tags=['karrlab/wc_env:0.0.2']),
+            mock.Mock(id='c', tags=['karrlab/wc_env:0.0.3', 'other/wc_env:0.0.3']),
+            mock.Mock(id='d', tags=['karrlab/wc_env:0.0.50']),
+            mock.Mock(id='e', tags=['karrlab/wc_env:0.0.51']),
+            mock.Mock(id='f', tags=['karrlab/wc_env:0.0.52', 'karrlab/wc_env:latest']),
+        ]
+        client = mock.Mock()
+        client.images.list.side_effect = lambda name: images if name == 'karrlab/wc_env' else []
+        client.containers.list.return_value = [mock.Mock(attrs={'Image': 'b'})]
+        mgr = mock.Mock(config=make_config(), _docker_client=client)
+
+        collector = wc_env_manager.cleanup.GarbageCollector(mgr, keep_tags=1)
+        self.assertEqual(collector.get_images_to_remove(), [
+            'karrlab/wc_env:0.0.1',
+            'karrlab/wc_env:0.0.3',
+            'karrlab/wc_env:0.0.50',
+            'karrlab/wc_env:0.0.51',
+        ])
+
+    def test_get_containers_to_remove(self):
+        containers = [
+            mock.Mock(status='running', attrs={'State': {'FinishedAt': '0001-01-01T00:00:00Z'}}),
+            mock.Mock(status='exited', attrs={'State': {'FinishedAt': '2026-10-01T00:00:00Z'}}),
+            mock.Mock(status='exited', attrs={'State': {'FinishedAt': '2026-10-17T00:00:00Z'}}),
+            mock.Mock(status='created', attrs={'State': {'FinishedAt': '0001-01-01T00:00:00Z'},
+                                               'Created': '2026-09-01T00:00:00Z'}),
+        ]
+        mgr = mock.Mock(config=make_config())
+        mgr.get_containers.return_value = containers
+        now = wc_env_manager.cleanup.dateutil.parser.parse('2026-10-18T00:00:00Z').timestamp()
+
+        collector = wc_env_manager.cleanup.GarbageCollector(mgr)
+        self.assertEqual(collector.get_containers_to_remove(now=now), [containers[1], containers[3]])
+
+        collector.stopped_container_max_age = None
+        self.assertEqual(collector.get_containers_to_remove(now=now), [])
+
+    def test_run(self):
+        client = mock.Mock()
+        client.images.list.return_value = []
+        client.containers.list.return_value = []
+        client.df.side_effect = [
+            {'LayersSize': 1000, 'Containers': [{'SizeRw': 100}], 'BuildCache': [{'Size': 500}]},
+            {'LayersSize': 600, 'Containers': [], 'BuildCache': [{'Size': 200}]},
+        ]
+        client.images.prune.return_value = {'ImagesDeleted': [{'Deleted': 'sha256:1'}], 'SpaceReclaimed': 10}
+        client.api.prune_builds.return_value = {'CachesDeleted': ['1', '2'], 'SpaceReclaimed': 300}
+        client.images.remove.side_effect = [None, wc_env_manager.cleanup.docker.errors.APIError('conflict')]
+
+        container = mock.Mock()
+        container.name = 'wc_env-2026-10-01-00-00-00'
+        mgr = mock.Mock(config=make_config(), _docker_client=client)
+        collector = wc_env_manager.cleanup.GarbageCollector(mgr)
+        collector.get_images_to_remove = lambda: ['karrlab/wc_env:0.0.1', 'karrlab/wc_env:0.0.2']
+        collector.get_containers_to_remove = lambda: [container]
+
+        report = collector.run(dry_run=True)
+        self.assertTrue(report.dry_run)
+        self.assertEqual(report.removed_images, ['karrlab/wc_env:0.0.1', 'karrlab/wc_env:0.0.2'])
+        self.assertEqual(report.removed_containers, [container.name])
+        container.remove.assert_not_called()
+
+        collector.max_workers = 1
+        report = collector.run()
+        self.assertFalse(report.dry_run)
+        container.remove.assert_called_once_with(force=True)
+        mgr.remove_path_overlays.assert_called_once_with(container.name)
+        self.assertEqual(report.removed_containers, [container.name])
+        self.assertEqual(report.removed_images, ['karrlab/wc_env:0.0.1'])
+        self.assertEqual(len(report.errors), 1)
+        self.assertIn('karrlab/wc_env:0.0.2', report.errors[0])
+        self.assertEqual(report.pruned_images, 1)
+        self.assertEqual(report.pruned_build_cache, 2)
+        client.api.prune_builds.assert_called_once_with(keep_storage=10 * 1024 ** 3)
+        self.assertEqual(report.space_reclaimed, 800)
+
+    def test_run_errors(self):
+        client = mock.Mock()
+        client.df.return_value = {}
+        client.images.remove.side_effect = [wc_env_manager.cleanup.docker.errors.ImageNotFound('not found')]
+
+        container = mock.Mock()
+        container.name = 'wc_env-2026-10-01-00-00-00'
+        mgr = mock.Mock(config=make_config(prune_dangling_images=False, build_cache_max_size=''), _docker_client=client)
+        mgr.remove_path_overlays.side_effect = wc_env_manager.core.WcEnvManagerError('overlays are busy')
+        collector = wc_env_manager.cleanup.GarbageCollector(mgr)
+        collector.get_images_to_remove = lambda: ['karrlab/wc_env:0.0.1']
+        collector.get_containers_to_remove = lambda: [container]
+
+        report = collector.run()
+        self.assertEqual(report.removed_containers, [])
+        self.assertEqual(report.errors, ['wc_env-2026-10-01-00-00-00: overlays are busy'])
+
+        # tags which were already removed with other tags of the same image are removed
+        self.assertEqual(report.removed_images, ['karrlab/wc_env:0.0.1'])
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class GarbageCollectorTestCase(unittest.TestCase):
+    def test(self):
+        mgr = wc_env_manager.core.WcEnvManager()
+        collector = wc_env_manager.cleanup.GarbageCollector(mgr, keep_tags=1000, stopped_container_max_age='3650d',
+                                                            build_cache_max_size='1000g')
+        report = collector.run(dry_run=True)
+        self.assertEqual(report.removed_images, [])
+        self.assertEqual(report.removed_containers, [])
+
+        report = collector.run()
+        self.assertEqual(report.errors, [])
+        self.assertGreaterEqual(report.space_reclaimed, 0)
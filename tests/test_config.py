@@ -6,9 +6,12 @@
 :License: MIT
 """
 
+import configobj
+import mock
 import os
 import pathlib
-import pkg_resources
+import shutil
+import tempfile
 import unittest
 import wc_env_manager.config.core
 
@@ -16,7 +19,7 @@ import wc_env_manager.config.core
 class Test(unittest.TestCase):
 
     def test_get_config(self):
-        config = wc_env_manager.config.core.get_config()
+        config = wc_env_manager.config.core.get_config(cache_dir=None)
         self.assertIn('base_image', config['wc_env_manager'])
         self.assertIsInstance(config['wc_env_manager']['base_image']['repo'], str)
 
@@ -30,7 +33,7 @@ class Test(unittest.TestCase):
                 },
             },
         }
-        config = wc_env_manager.config.core.get_config(extra=extra)
+        config = wc_env_manager.config.core.get_config(extra=extra, cache_dir=None)
         self.assertEqual(config['wc_env_manager']['base_image']['build_args']['timezone'], 'America/Los_Angeles')
 
     def test_get_config_context(self):
@@ -41,7 +44,141 @@ class Test(unittest.TestCase):
                 },
             },
         }
-        config = wc_env_manager.config.core.get_config(extra=extra)
+        config = wc_env_manager.config.core.get_config(extra=extra, cache_dir=None)
         self.assertEqual(
             config['wc_env_manager']['base_image']['dockerfile_template_path'],
             '{}/Dockerfile'.format(pathlib.Path.home()))
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        wc_env_manager.config.core._memory_cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        wc_env_manager.config.core._memory_cache.clear()
+
+    def get_config(self, extra=None):
+        return wc_env_manager.config.core.get_config(extra=extra, cache_dir=self.cache_dir)
+
+    def test_cache(self):
+        extra = {'wc_env_manager': {'verbose': True}}
+        config = self.get_config(extra=extra)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # the configuration is read from the memory cache
+        with mock.patch.object(wc_env_manager.config.core, 'read_config', side_effect=Exception()):
+            cached_config = self.get_config(extra=extra)
+        self.assertEqual(cached_config, config)
+        self.assertIsNot(cached_config, config)
+        self.assertEqual(cached_config['wc_env_manager']['verbose'], True)
+
+        # the configuration is read from the file cache
+        wc_env_manager.config.core._memory_cache.clear()
+        with mock.patch.object(wc_env_manager.config.core, 'read_config', side_effect=Exception()):
+            cached_config = self.get_config(extra=extra)
+        self.assertEqual(cached_config, config)
+
+        # copies of the configuration are independent
+        cached_config['wc_env_manager']['verbose'] = False
+        self.assertEqual(self.get_config(extra=extra)['wc_env_manager']['verbose'], True)
+
+        # other extra configuration is cached separately
+        other_config = self.get_config(extra={'wc_env_manager': {'verbose': False}})
+        self.assertEqual(other_config['wc_env_manager']['verbose'], False)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_invalidate(self):
+        self.get_config()
+
+        # environment variables
+        with mock.patch.dict(os.environ, {'CONFIG__DOT__wc_env_manager__DOT__verbose': 'False'}):
+            self.assertEqual(self.get_config()['wc_env_manager']['verbose'], False)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        # modified and new configuration files
+        filename = os.path.join(self.cache_dir, 'wc_env_manager.cfg')
+        key = wc_env_manager.config.core.get_cache_key([filename], None, {})
+        with open(filename, 'w') as file:
+            file.write('[wc_env_manager]\n')
+        key2 = wc_env_manager.config.core.get_cache_key([filename], None, {})
+        self.assertNotEqual(key2, key)
+
+        stat = os.stat(filename)
+        os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        self.assertNotEqual(wc_env_manager.config.core.get_cache_key([filename], None, {}), key2)
+
+    def test_invalidate_readers_and_schema(self):
+        filename = os.path.join(self.cache_dir, 'core.schema.cfg')
+        with open(filename, 'w') as file:
+            file.write('[wc_env_manager]\n')
+        key = wc_env_manager.config.core.get_cache_key([filename], None, {})
+
+        # contents of the schema, even if its modification time and size are unchanged
+        stat = os.stat(filename)
+        with open(filename, 'w') as file:
+            file.write('[wc_env_managex]\n')
+        os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        key2 = wc_env_manager.config.core.get_cache_key([filename], None, {})
+        self.assertNotEqual(key2, key)
+
+        # versions of the readers of the configuration
+        with mock.patch.object(wc_env_manager.config.core, 'get_reader_versions',
+                               return_value={'wc_utils': '0.0.0', 'configobj': '0.0.0'}):
+            self.assertNotEqual(wc_env_manager.config.core.get_cache_key([filename], None, {}), key2)
+
+    def test_get_reader_versions(self):
+        versions = wc_env_manager.config.core.get_reader_versions()
+        self.assertEqual(sorted(versions.keys()), ['configobj', 'wc_utils'])
+        self.assertEqual(versions['configobj'], configobj.__version__)
+
+    def test_cache_env_var(self):
+        get_cache_dir = wc_env_manager.config.core.get_cache_dir
+        default_cache_dir = wc_env_manager.config.core.CACHE_DIR
+
+        with mock.patch.dict(os.environ, {wc_env_manager.config.core.CACHE_ENV_VAR: self.cache_dir}):
+            self.assertEqual(get_cache_dir(default_cache_dir), self.cache_dir)
+            self.assertEqual(get_cache_dir(None), None)
+            wc_env_manager.config.core.get_config()
+            self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        for value in ['0', 'false', 'Off', '']:
+            with mock.patch.dict(os.environ, {wc_env_manager.config.core.CACHE_ENV_VAR: value}):
+                self.assertEqual(get_cache_dir(default_cache_dir), None)
+                self.assertEqual(get_cache_dir(self.cache_dir), self.cache_dir)
+
+        env = dict(os.environ)
+        env.pop(wc_env_manager.config.core.CACHE_ENV_VAR, None)
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertEqual(get_cache_dir(default_cache_dir), default_cache_dir)
+
+    def test_corrupt_cache(self):
+        config = self.get_config()
+        filename = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(filename, 'wb') as file:
+            file.write(b'corrupt')
+        wc_env_manager.config.core._memory_cache.clear()
+        self.assertEqual(self.get_config(), config)
+        with open(filename, 'rb') as file:
+            self.assertNotEqual(file.read(), b'corrupt')
+
+    def test_no_cache(self):
+        config = wc_env_manager.config.core.get_config(cache_dir=None)
+        self.assertIn('base_image', config['wc_env_manager'])
+        self.assertEqual(wc_env_manager.config.core._memory_cache, {})
+
+    def test_unwritable_cache(self):
+        cache_dir = os.path.join(self.cache_dir, 'file')
+        with open(cache_dir, 'w'):
+            pass
+        config = wc_env_manager.config.core.get_config(cache_dir=cache_dir)
+        self.assertIn('base_image', config['wc_env_manager'])
+
+    def test_max_cached_configs(self):
+        with mock.patch.object(wc_env_manager.config.core, 'MAX_CACHED_CONFIGS', 2):
+            for verbose in [True, False, True]:
+                self.get_config(extra={'wc_env_manager': {'verbose': verbose}, 'other': 1})
+                self.get_config(extra={'wc_env_manager': {'verbose': verbose}})
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertLessEqual(len(wc_env_manager.config.core._memory_cache), 2)
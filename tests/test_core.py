@@ -8,9 +8,12 @@
 """
 
 import capturer
+import contextlib
 import datetime
 import docker
 import git
+import io
+import logging
 import mock
 import os
 import re
@@ -127,10 +130,15 @@ class WcEnvManagerBuildRemoveBaseImageTestCase(unittest.TestCase):
     def test_build_base_image_verbose(self):
         mgr = self.mgr
         mgr.config['verbose'] = True
+        num_root_handlers = len(logging.getLogger().handlers)
         with capturer.CaptureOutput(relay=False) as capture_output:
             mgr.build_base_image()
             self.assertRegex(capture_output.get_text(), r'Step 1/\d+ : FROM ubuntu')
 
+        # the handlers for the messages of squashing the image are removed
+        self.assertEqual(len(logging.getLogger().handlers), num_root_handlers)
+        self.assertEqual(logging.getLogger('wc_env_manager.core.squash').handlers, [])
+
     def test_build_base_image_context_error(self):
         mgr = self.mgr
 
@@ -217,6 +225,20 @@ class WcEnvManagerBuildRemoveBaseImageTestCase(unittest.TestCase):
             with self.assertRaises(docker.errors.ImageNotFound):
                 mgr._docker_client.images.get(mgr.config['base_image']['repo'] + ':' + tag)
 
+    def test_remove_image_with_several_tags(self):
+        mgr = self.mgr
+
+        images = {'repo:a': mock.Mock(id='1'), 'repo:b': mock.Mock(id='1'), 'repo:c': mock.Mock(id='2')}
+        removed = []
+        with mock.patch.object(docker.models.images.ImageCollection, 'get', side_effect=lambda ref: images[ref]):
+            with mock.patch.object(docker.models.images.ImageCollection, 'remove',
+                                   side_effect=lambda ref, force: removed.append((ref, force))):
+                mgr.remove_image('repo', ['a', 'b', 'c'])
+        self.assertEqual(sorted(removed), [('repo:a', False), ('repo:b', False), ('repo:c', False)])
+
+        # the tags of the same image are removed sequentially
+        self.assertLess(removed.index(('repo:a', False)), removed.index(('repo:b', False)))
+
     def test_set_image(self):
         mgr = self.mgr
         mgr.build_base_image()
@@ -489,6 +511,80 @@ class WcEnvManagerNetworkTestCase(unittest.TestCase):
             time.sleep(1.)
         self.assertTrue(connected)
 
+    def test_build_with_options(self):
+        mgr = self.mgr
+        mgr.config['network']['mtu'] = 1400
+        mgr.config['network']['internal'] = True
+        mgr.config['network']['options'] = {'com.docker.network.bridge.enable_icc': 'true'}
+        mgr.config['network']['containers']['test_db_container__']['tmpfs'] = {'/scratch': 'rw,size=16m'}
+
+        mgr.build_network()
+
+        network = mgr._docker_client.networks.get('test_network__')
+        self.assertEqual(network.attrs['Driver'], 'bridge')
+        self.assertTrue(network.attrs['Internal'])
+        self.assertEqual(network.attrs['Options']['com.docker.network.driver.mtu'], '1400')
+        self.assertEqual(network.attrs['Options']['com.docker.network.bridge.enable_icc'], 'true')
+
+        db_container = mgr._docker_client.containers.get('test_db_container__')
+        self.assertEqual(db_container.attrs['HostConfig']['Tmpfs'], {'/scratch': 'rw,size=16m'})
+
+    def test_build_overlay_network(self):
+        mgr = self.mgr
+        mgr.config['network']['driver'] = 'overlay'
+        mgr.config['network']['containers'] = {}
+        with mock.patch.object(docker.models.networks.NetworkCollection, 'create') as create:
+            mgr.build_network()
+        self.assertEqual(create.call_args[1]['driver'], 'overlay')
+        self.assertTrue(create.call_args[1]['attachable'])
+
+    def test_host_network(self):
+        mgr = self.mgr
+        mgr.config['network']['driver'] = 'host'
+        self.assertTrue(mgr.is_host_network())
+        self.assertEqual(mgr.get_network_run_args(), {'network_mode': 'host'})
+
+        mgr.build_network()
+        with self.assertRaises(docker.errors.NotFound):
+            mgr._docker_client.networks.get('test_network__')
+        db_container = mgr._docker_client.containers.get('test_db_container__')
+        self.assertEqual(db_container.attrs['HostConfig']['NetworkMode'], 'host')
+
+        mgr.remove_network()
+        with self.assertRaises(docker.errors.NotFound):
+            mgr._docker_client.containers.get('test_db_container__')
+
+    def test_wait_for_network_containers(self):
+        mgr = self.mgr
+        mgr.config['network']['containers']['test_db_container__']['readiness'] = {
+            'tcp_port': 5432,
+            'log_regex': 'database system is ready to accept connections',
+            'timeout': 60.,
+        }
+
+        mgr.build_network()
+        mgr.wait_for_network_containers()
+
+        # the database accepts connections as soon as it is ready
+        container = mgr._docker_client.containers.run('karrlab/wc_env_dependencies',
+                                                      name='test_client_container__',
+                                                      network='test_network__',
+                                                      detach=True,
+                                                      stdin_open=True, tty=True,
+                                                      entrypoint=[], command="bash")
+        result = container.exec_run("psql -h test_db_container__ -U postgres TestDatabase -c '\\l'")
+        self.assertEqual(result.exit_code, 0)
+
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'not a container of network'):
+            mgr.wait_for_network_containers(['__undefined__'])
+
+        mgr.config['network']['containers']['test_db_container__']['readiness'] = {
+            'log_regex': '__undefined__',
+            'timeout': 1.,
+        }
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'not ready within'):
+            mgr.wait_for_network_containers()
+
     def test_remove(self):
         mgr = self.mgr
 
@@ -556,10 +652,109 @@ class WcEnvManagerContainerTestCase(unittest.TestCase):
         shutil.rmtree(temp_dir_name_a)
         shutil.rmtree(temp_dir_name_b)
 
+    def test_build_container_with_mounted_paths_to_copy(self):
+        mgr = self.mgr
+
+        temp_dir_name = tempfile.mkdtemp()
+        os.mkdir(os.path.join(temp_dir_name, 'bind'))
+        with open(os.path.join(temp_dir_name, 'bind', 'test.txt'), 'w') as file:
+            file.write('abc')
+        os.mkdir(os.path.join(temp_dir_name, 'overlay'))
+        with open(os.path.join(temp_dir_name, 'overlay', 'test.txt'), 'w') as file:
+            file.write('def')
+        with open(os.path.join(temp_dir_name, 'file.txt'), 'w') as file:
+            file.write('ghi')
+
+        mgr.config['container']['overlay_path'] = os.path.join(temp_dir_name, 'overlays')
+        mgr.config['image']['paths_to_copy'] = {
+            'bind': {
+                'host': os.path.join(temp_dir_name, 'bind'),
+                'image': '/root/bind',
+                'mode': 'bind',
+            },
+            'overlay': {
+                'host': os.path.join(temp_dir_name, 'overlay'),
+                'image': '/root/overlay',
+                'mode': 'overlay',
+            },
+            'file': {
+                'host': os.path.join(temp_dir_name, 'file.txt'),
+                'image': '/root/file.txt',
+                'mode': 'overlay',
+            },
+        }
+        self.assertTrue(mgr.is_path_mountable(os.path.join(temp_dir_name, 'bind'), wc_env_manager.core.PathCopyMode.bind))
+        self.assertFalse(mgr.is_path_mountable(os.path.join(temp_dir_name, 'file.txt'), wc_env_manager.core.PathCopyMode.overlay))
+        self.assertFalse(mgr.is_path_mountable(os.path.join(temp_dir_name, 'bind'), wc_env_manager.core.PathCopyMode.copy))
+
+        container = mgr.build_container()
+        mgr.setup_container()
+        mounts = {mount['Destination']: mount for mount in container.attrs['Mounts']}
+        self.assertEqual(mounts['/root/bind']['Type'], 'bind')
+        self.assertFalse(mounts['/root/bind']['RW'])
+        self.assertEqual(mounts['/root/overlay']['Type'], 'volume')
+        self.assertNotIn('/root/file.txt', mounts)
+
+        # bind mounts are read-only
+        output, _ = mgr.run_process_in_container(['cat', '/root/bind/test.txt'])
+        self.assertEqual(output, 'abc')
+        with self.assertRaises(wc_env_manager.WcEnvManagerError):
+            mgr.run_process_in_container(['touch', '/root/bind/test2.txt'])
+
+        # changes to overlays are not written to the host
+        mgr.run_process_in_container(['bash', '-c', 'echo xyz > /root/overlay/test.txt'])
+        output, _ = mgr.run_process_in_container(['cat', '/root/overlay/test.txt'])
+        self.assertEqual(output, 'xyz')
+        with open(os.path.join(temp_dir_name, 'overlay', 'test.txt'), 'r') as file:
+            self.assertEqual(file.read(), 'def')
+
+        # files which can't be overlaid are copied
+        output, _ = mgr.run_process_in_container(['cat', '/root/file.txt'])
+        self.assertEqual(output, 'ghi')
+
+        mgr.remove_container(force=True)
+        self.assertEqual(mgr._docker_client.volumes.list(
+            filters={'label': '{}={}'.format(mgr.OVERLAY_VOLUME_LABEL, container.name)}), [])
+        self.assertFalse(os.path.isdir(os.path.join(temp_dir_name, 'overlays', container.name)))
+
+        shutil.rmtree(temp_dir_name, ignore_errors=True)
+
+    def test_is_path_mountable_relative_overlay_path(self):
+        mgr = self.mgr
+        temp_dir_name = tempfile.mkdtemp()
+        mgr.config['container']['overlay_path'] = os.path.join('__undefined__', 'overlays')
+        self.assertIsInstance(mgr.is_path_mountable(temp_dir_name, wc_env_manager.core.PathCopyMode.overlay), bool)
+        shutil.rmtree(temp_dir_name)
+
+    def test_remove_path_overlays_owned_by_root(self):
+        mgr = self.mgr
+        temp_dir_name = tempfile.mkdtemp()
+        mgr.config['container']['overlay_path'] = temp_dir_name
+
+        def rmtree(path, onerror):
+            onerror(os.rmdir, path, None)
+
+        os.makedirs(os.path.join(temp_dir_name, 'container', '0', 'upper'))
+        with mock.patch('shutil.rmtree', side_effect=rmtree):
+            mgr.remove_path_overlays('container')
+        self.assertFalse(os.path.isdir(os.path.join(temp_dir_name, 'container')))
+
+        os.makedirs(os.path.join(temp_dir_name, 'container', '0', 'upper'))
+        with mock.patch('shutil.rmtree', side_effect=rmtree):
+            with mock.patch.object(docker.models.containers.ContainerCollection, 'run',
+                                   side_effect=docker.errors.APIError('message')):
+                with self.assertRaisesRegex(wc_env_manager.WcEnvManagerError, 'could not be removed'):
+                    mgr.remove_path_overlays('container')
+
+        shutil.rmtree(temp_dir_name)
+
     def test_make_container_name(self):
         mgr = self.mgr
         mgr.config['container']['name_format'] = 'wc_env-%Y'
-        self.assertEqual(mgr.make_container_name(), 'wc_env-{}'.format(datetime.datetime.now().year))
+        name = mgr.make_container_name()
+        self.assertRegex(name, r'^wc_env-{}-[0-9a-f]{{8}}$'.format(datetime.datetime.now().year))
+        self.assertNotEqual(mgr.make_container_name(), name)
+        self.assertTrue(mgr.is_container_name(name, mgr.config['container']['name_format']))
 
     def test_setup_container(self):
         mgr = self.mgr
@@ -730,6 +925,136 @@ class WcEnvManagerContainerTestCase(unittest.TestCase):
         with self.assertRaisesRegex(wc_env_manager.WcEnvManagerError, '    key: val'):
             mgr.run_process_in_container(['__undefined__'], env={'key': 'val'})
 
+    def test_run_process_in_container_stream(self):
+        mgr = self.mgr
+        mgr.build_container()
+
+        stdout = []
+        stderr = []
+        output, exit_code = mgr.run_process_in_container(
+            ['bash', '-c', 'for i in $(seq 1 100); do echo out-$i; echo err-$i >&2; done'],
+            stream=True, stdout_callback=stdout.append, stderr_callback=stderr.append,
+            max_output_lines=10)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stdout, ['out-{}'.format(i) for i in range(1, 101)])
+        self.assertEqual(stderr, ['err-{}'.format(i) for i in range(1, 101)])
+        self.assertEqual(len(output.split('\n')), 10)
+        self.assertIn('err-100', output)
+
+        output, exit_code = mgr.run_process_in_container(
+            ['bash', '-c', 'for i in $(seq 1 100); do echo out-$i; done'],
+            stream=True, stdout_callback=stdout.append, max_output_size=20)
+        self.assertEqual(output, 'out-98\nout-99\nout-100')
+
+        # verbose
+        mgr.config['verbose'] = True
+        with capturer.CaptureOutput(relay=False) as capture_output:
+            mgr.run_process_in_container(['echo', 'here'], stream=True)
+            self.assertEqual(capture_output.get_text(), 'here')
+
+        # error
+        mgr.config['verbose'] = False
+        with self.assertRaisesRegex(wc_env_manager.WcEnvManagerError, '  exit code: 3\n  output: abc'):
+            mgr.run_process_in_container(['bash', '-c', 'echo abc; exit 3'], stream=True)
+
+    def test_run_process_in_containers(self):
+        mgr = self.mgr
+        container_1 = mgr.build_container()
+        time.sleep(1.)
+        container_2 = mgr.build_container()
+
+        results = mgr.run_process_in_containers(['bash', '-c', 'hostname; exit $CODE'], env={'CODE': '0'})
+        self.assertEqual(sorted(result.container for result in results), sorted([container_1.name, container_2.name]))
+        for result in results:
+            self.assertIsInstance(result, wc_env_manager.core.ContainerProcessResult)
+            self.assertTrue(result.success)
+            self.assertEqual(result.output, mgr._docker_client.containers.get(result.container).attrs['Config']['Hostname'])
+            self.assertGreater(result.duration, 0.)
+
+        results = mgr.run_process_in_containers(['bash', '-c', 'exit 3'], containers=[container_1.name], max_workers=1)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].exit_code, 3)
+        self.assertFalse(results[0].success)
+        self.assertEqual(results[0].to_dict()['container'], container_1.name)
+
+        # containers which don't exist are reported as failures of their processes
+        results = mgr.run_process_in_containers(['true'], containers=['__undefined__', container_2.name])
+        self.assertEqual([result.container for result in results], ['__undefined__', container_2.name])
+        self.assertIsNone(results[0].exit_code)
+        self.assertRegex(results[0].error, '^NotFound: ')
+        self.assertTrue(results[1].success)
+
+        self.assertEqual(mgr.run_process_in_containers(['true'], label='__undefined_label__'), [])
+
+    def test_build_containers(self):
+        mgr = self.mgr
+        container = mgr.build_container()
+        containers = mgr.build_containers(3, group='test-group', setup=False)
+        self.assertEqual(len(containers), 3)
+        self.assertEqual(len(set(container.name for container in containers)), 3)
+        self.assertEqual(mgr._container.name, containers[-1].name)
+        for replica in containers:
+            self.assertEqual(replica.labels[mgr.GROUP_LABEL], 'test-group')
+
+        self.assertEqual(sorted(replica.name for replica in mgr.get_containers(group='test-group')),
+                         sorted(replica.name for replica in containers))
+        self.assertEqual(len(mgr.get_containers()), 4)
+
+        mgr.remove_containers(force=True, group='test-group')
+        self.assertEqual([replica.name for replica in mgr.get_containers()], [container.name])
+
+        # default group name
+        containers = mgr.build_containers(2, setup=False)
+        self.assertEqual(len(set(replica.labels[mgr.GROUP_LABEL] for replica in containers)), 1)
+
+    def test_build_containers_builds_network_once(self):
+        mgr = self.mgr
+        with mock.patch.object(mgr, 'build_network', wraps=mgr.build_network) as build_network:
+            mgr.build_containers(3, group='test-group', setup=False)
+        build_network.assert_called_once_with()
+        mgr.remove_containers(force=True, group='test-group')
+
+    def test_build_containers_removes_replicas_on_failure(self):
+        mgr = self.mgr
+        container = mgr.build_container()
+
+        calls = []
+
+        def setup_container(upgrade=False, container=None):
+            calls.append(container)
+            if len(calls) == 2:
+                raise Exception('message')
+
+        with mock.patch.object(mgr, 'setup_container', side_effect=setup_container):
+            with self.assertRaisesRegex(wc_env_manager.WcEnvManagerError, '1 of 3 replicas of group test-group'):
+                mgr.build_containers(3, group='test-group', max_workers=1)
+        self.assertEqual(mgr.get_containers(group='test-group'), [])
+        self.assertEqual([replica.name for replica in mgr.get_containers()], [container.name])
+
+        # the replicas didn't replace the current container
+        self.assertEqual(mgr._container.name, container.name)
+
+    def test_build_containers_with_shared_ipc(self):
+        mgr = self.mgr
+        mgr.config['container']['resources']['shm_size'] = '128m'
+        containers = mgr.build_containers(3, group='test-group', setup=False, shared_ipc=True)
+        for replica in containers:
+            replica.reload()
+
+        owner = containers[0]
+        self.assertEqual(owner.attrs['HostConfig']['IpcMode'], 'shareable')
+        self.assertEqual(owner.attrs['HostConfig']['ShmSize'], 128 * 2 ** 20)
+        for replica in containers[1:]:
+            self.assertEqual(replica.attrs['HostConfig']['IpcMode'], 'container:' + owner.name)
+
+        # shared memory which is written in one replica is visible in the others
+        result = containers[1].exec_run(['bash', '-c', 'echo abc > /dev/shm/wc_env.test'])
+        self.assertEqual(result.exit_code, 0)
+        result = containers[2].exec_run(['cat', '/dev/shm/wc_env.test'])
+        self.assertEqual(result.output.decode().strip(), 'abc')
+
+        mgr.remove_containers(force=True, group='test-group')
+
     def test_get_container_stats(self):
         mgr = self.mgr
         mgr.build_container()
@@ -761,6 +1086,74 @@ class WcEnvManagerContainerTestCase(unittest.TestCase):
         self.assertEqual(mgr._container, None)
         self.assertEqual(mgr.get_containers(), [])
 
+    def test_remove_containers_errors(self):
+        mgr = self.mgr
+        containers = [mock.Mock(), mock.Mock(), mock.Mock()]
+        for i_container, container in enumerate(containers):
+            container.name = 'container-{}'.format(i_container)
+        containers[0].remove.side_effect = docker.errors.APIError('container is busy')
+        mgr._container = containers[1]
+
+        def remove_path_overlays(container_name):
+            if container_name == 'container-2':
+                raise wc_env_manager.core.WcEnvManagerError('overlays are busy')
+
+        with mock.patch.object(mgr, 'get_containers', return_value=containers):
+            with mock.patch.object(mgr, 'remove_path_overlays', side_effect=remove_path_overlays):
+                with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError,
+                                            '2 of 3 containers could not be removed') as context:
+                    mgr.remove_containers(force=True)
+        self.assertIn('container-0: container is busy', str(context.exception))
+        self.assertIn('container-2: overlays are busy', str(context.exception))
+        for container in containers:
+            container.remove.assert_called_once_with(force=True)
+        self.assertEqual(mgr._container, None)
+
+
+class ContainerNameTestCase(unittest.TestCase):
+    def test_is_container_name(self):
+        name_format = 'wc_env-%Y-%m-%d-%H-%M-%S'
+        is_container_name = wc_env_manager.core.WcEnvManager.is_container_name
+        self.assertTrue(is_container_name('wc_env-2026-10-18-12-30-00', name_format))
+        self.assertTrue(is_container_name('wc_env-2026-10-18-12-30-00-0123abcd', name_format))
+        self.assertFalse(is_container_name('wc_env-2026-10-18-12-30-00-0123', name_format))
+        self.assertFalse(is_container_name('wc_env-2026-10-18-12-30-00-0123ABCD', name_format))
+        self.assertFalse(is_container_name('other-0123abcd', name_format))
+
+
+class LineSplitterTestCase(unittest.TestCase):
+    def test(self):
+        lines = []
+        splitter = wc_env_manager.core.LineSplitter(lines.append)
+        splitter.write(b'abc\nde')
+        self.assertEqual(lines, ['abc'])
+        splitter.write(b'f\n\xc3')
+        self.assertEqual(lines, ['abc', 'def'])
+        splitter.write(b'\xa9\nghi')
+        self.assertEqual(lines, ['abc', 'def', '\u00e9'])
+        splitter.close()
+        self.assertEqual(lines, ['abc', 'def', '\u00e9', 'ghi'])
+
+    def test_carriage_returns(self):
+        lines = []
+        splitter = wc_env_manager.core.LineSplitter(lines.append)
+        splitter.write(b'10%\r20%\r')
+        self.assertEqual(lines, ['10%'])
+        splitter.write(b'\nabc\r\ndef\r')
+        self.assertEqual(lines, ['10%', '20%', 'abc'])
+        splitter.close()
+        self.assertEqual(lines, ['10%', '20%', 'abc', 'def'])
+
+    def test_max_line_size(self):
+        lines = []
+        splitter = wc_env_manager.core.LineSplitter(lines.append, max_line_size=4)
+        splitter.write(b'abcdefghij')
+        self.assertEqual(lines, ['abcd', 'efgh'])
+        splitter.write(b'k\nl')
+        self.assertEqual(lines, ['abcd', 'efgh', 'ijk'])
+        splitter.close()
+        self.assertEqual(lines, ['abcd', 'efgh', 'ijk', 'l'])
+
 
 @unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
 class WcEnvHostTestCase(unittest.TestCase):
@@ -780,6 +1173,15 @@ class WcEnvHostTestCase(unittest.TestCase):
             mgr.run_process_on_host(['echo', 'here'])
             self.assertEqual(capture_output.get_text(), 'here')
 
+        # the output follows the redirection of sys.stdout (e.g., to the clients of the daemon)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            mgr.run_process_on_host(['echo', 'here'])
+        self.assertEqual(stdout.getvalue(), 'here\n')
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            mgr.run_process_on_host(['false'])
+
 
 @unittest.skipIf(not RUN_LONG_TESTS or whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
 class FullWcEnvTestCase(unittest.TestCase):
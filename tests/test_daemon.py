@@ -0,0 +1,183 @@
+""" Tests of the resident manager daemon
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from wc_env_manager import daemon
+import io
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import wc_env_manager
+import whichcraft
+
+
+class DaemonTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.dirname, 'daemon.sock')
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def start_daemon(self, watch_events=False):
+        manager_daemon = daemon.ManagerDaemon(socket_path=self.socket_path)
+        manager_daemon.start(watch_events=watch_events)
+        thread = threading.Thread(target=manager_daemon.serve_forever, daemon=True)
+        thread.start()
+        return manager_daemon, thread
+
+    def test_get_socket_path(self):
+        with mock.patch.dict(os.environ, {daemon.SOCKET_PATH_ENV_VAR: self.socket_path}):
+            self.assertEqual(daemon.get_socket_path(), self.socket_path)
+
+        env = dict(os.environ)
+        env.pop(daemon.SOCKET_PATH_ENV_VAR, None)
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertEqual(daemon.get_socket_path(), daemon.DEFAULT_SOCKET_PATH)
+
+    def test_is_forwardable(self):
+        self.assertTrue(daemon.is_forwardable(['container', 'run', 'ls']))
+        self.assertTrue(daemon.is_forwardable(['--version']))
+        self.assertFalse(daemon.is_forwardable(['daemon', 'start']))
+        self.assertFalse(daemon.is_forwardable(['history', 'record']))
+        self.assertTrue(daemon.is_forwardable(['history', 'report']))
+        self.assertFalse(daemon.is_forwardable(['container', 'idle', '--timeout', '1h']))
+        self.assertFalse(daemon.is_forwardable(['container', 'stats', '--watch']))
+        self.assertTrue(daemon.is_forwardable(['container', 'stats', '--json']))
+        self.assertTrue(daemon.is_forwardable(['--help']))
+
+        # the values of options aren't mistaken for commands
+        self.assertFalse(daemon.is_forwardable(['--trace', 'container', 'container', 'idle']))
+        self.assertTrue(daemon.is_forwardable(['--trace', 'daemon', 'container', 'list']))
+
+    def test_messages(self):
+        file = io.BytesIO()
+        daemon.send_message(file, {'stream': 'stdout', 'data': 'abc\n'})
+        daemon.send_message(file, {'exit_code': 0})
+        file.seek(0)
+        self.assertEqual(daemon.receive_message(file), {'stream': 'stdout', 'data': 'abc\n'})
+        self.assertEqual(daemon.receive_message(file), {'exit_code': 0})
+        self.assertEqual(daemon.receive_message(file), None)
+
+    def test_stream_writer(self):
+        file = io.BytesIO()
+        writer = daemon.StreamWriter(file, 'stderr', threading.Lock())
+        self.assertEqual(writer.write('abc'), 3)
+        self.assertEqual(writer.write(''), 0)
+        writer.flush()
+        self.assertFalse(writer.isatty())
+        file.seek(0)
+        self.assertEqual(daemon.receive_message(file), {'stream': 'stderr', 'data': 'abc'})
+        self.assertEqual(daemon.receive_message(file), None)
+
+    def test_manager_pool(self):
+        pool = daemon.ManagerPool()
+        with mock.patch('wc_env_manager.core.WcEnvManager') as WcEnvManager:
+            mgr = pool.get_manager({'verbose': False})
+            self.assertEqual(WcEnvManager.call_count, 1)
+            self.assertEqual(pool.get_manager({'verbose': False}), mgr)
+            self.assertEqual(WcEnvManager.call_count, 1)
+            mgr.refresh.assert_not_called()
+
+            pool.invalidate()
+            self.assertEqual(pool.get_manager({'verbose': False}), mgr)
+            mgr.refresh.assert_called_once_with()
+            pool.get_manager({'verbose': False})
+            mgr.refresh.assert_called_once_with()
+
+            pool.get_manager({'verbose': True})
+            self.assertEqual(WcEnvManager.call_count, 2)
+
+            pool.clear()
+            pool.get_manager({'verbose': False})
+            self.assertEqual(WcEnvManager.call_count, 3)
+
+    def test_not_running(self):
+        self.assertEqual(daemon.connect(self.socket_path), None)
+        self.assertEqual(daemon.forward(['--version'], socket_path=self.socket_path), None)
+
+        # the arguments are only parsed if a daemon is running
+        with mock.patch.object(daemon, 'is_forwardable') as is_forwardable:
+            self.assertEqual(daemon.forward(['container', 'list'], socket_path=self.socket_path), None)
+        is_forwardable.assert_not_called()
+        self.assertEqual(daemon.send_command('status', socket_path=self.socket_path), None)
+
+    def test_forward(self):
+        manager_daemon, thread = self.start_daemon()
+
+        status = daemon.send_command('status', socket_path=self.socket_path)
+        self.assertEqual(status['pid'], os.getpid())
+        self.assertEqual(status['socket'], self.socket_path)
+
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        exit_code = daemon.forward(['--version'], socket_path=self.socket_path, stdout=stdout, stderr=stderr)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stdout.getvalue().strip(), wc_env_manager.__version__)
+
+        # commands which aren't forwarded
+        self.assertEqual(daemon.forward(['daemon', 'status'], socket_path=self.socket_path), None)
+        with mock.patch.dict(os.environ, {daemon.NO_DAEMON_ENV_VAR: '1'}):
+            self.assertEqual(daemon.forward(['--version'], socket_path=self.socket_path), None)
+
+        # the daemon refuses the commands of clients which connect to a different Docker daemon
+        with mock.patch.dict(os.environ, {'DOCKER_HOST': 'tcp://__undefined__:2376'}):
+            self.assertEqual(daemon.forward(['--version'], socket_path=self.socket_path), None)
+
+        # another daemon can't listen on the same socket
+        with self.assertRaisesRegex(wc_env_manager.WcEnvManagerError, 'already listening'):
+            daemon.ManagerDaemon(socket_path=self.socket_path).start(watch_events=False)
+
+        self.assertEqual(daemon.send_command('stop', socket_path=self.socket_path)['pid'], os.getpid())
+        thread.join(10.)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_invalid_request(self):
+        manager_daemon = daemon.ManagerDaemon(socket_path=self.socket_path)
+
+        rfile = io.BytesIO()
+        daemon.send_message(rfile, {'command': 'unknown'})
+        rfile.seek(0)
+        wfile = io.BytesIO()
+        manager_daemon.handle(rfile, wfile)
+        wfile.seek(0)
+        self.assertEqual(daemon.receive_message(wfile), {'error': 'Invalid request'})
+
+    def test_remove_stale_socket(self):
+        with open(self.socket_path, 'w'):
+            pass
+        manager_daemon, thread = self.start_daemon()
+        self.assertNotEqual(daemon.send_command('status', socket_path=self.socket_path), None)
+        daemon.send_command('stop', socket_path=self.socket_path)
+        thread.join(10.)
+
+    @unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+    def test_invalidate_after_docker_events(self):
+        import docker
+
+        manager_daemon, thread = self.start_daemon(watch_events=True)
+        try:
+            with mock.patch('wc_env_manager.core.WcEnvManager'):
+                mgr = manager_daemon.pool.get_manager({'verbose': False})
+
+                docker_client = docker.from_env()
+                network = docker_client.networks.create('wc_env_manager_test_daemon')
+                network.remove()
+
+                for i_attempt in range(50):
+                    if manager_daemon.pool._stale:
+                        break
+                    threading.Event().wait(0.1)
+                self.assertEqual(manager_daemon.pool.get_manager({'verbose': False}), mgr)
+                mgr.refresh.assert_called_once_with()
+        finally:
+            daemon.send_command('stop', socket_path=self.socket_path)
+            thread.join(10.)
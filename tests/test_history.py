@@ -0,0 +1,258 @@
+""" Tests for wc_env_manager.history
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import mock
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import wc_env_manager.core
+import wc_env_manager.history
+import wc_env_manager.telemetry
+import whichcraft
+
+
+def make_sample(container, time, cpu_percent=10., memory_working_set=100, pids=1):
+    return wc_env_manager.telemetry.StatsSample(
+        container=container, time=time, cpu_percent=cpu_percent,
+        memory_working_set=memory_working_set, memory_limit=1000,
+        block_io_read_rate=0., block_io_write_rate=0., network_rx_rate=0., network_tx_rate=0.,
+        pids=pids)
+
+
+class ResourceHistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir_name = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir_name, 'history', 'history.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir_name)
+
+    def test_add_samples(self):
+        with wc_env_manager.history.ResourceHistory(self.filename) as history:
+            history.add_samples([
+                make_sample('a', 10.2, cpu_percent=10., memory_working_set=100),
+                make_sample('a', 10.7, cpu_percent=30., memory_working_set=300),
+                make_sample('a', 11.1, cpu_percent=50., memory_working_set=200),
+                make_sample('b', 10.5),
+            ])
+            history.add_samples([])
+
+            samples = history.get_samples('a')
+            self.assertEqual([(sample['resolution'], sample['time'], sample['num_samples']) for sample in samples],
+                             [(1, 10., 2), (1, 11., 1)])
+            self.assertAlmostEqual(samples[0]['cpu_percent_mean'], 20.)
+            self.assertEqual(samples[0]['cpu_percent_max'], 30.)
+            self.assertEqual(samples[0]['memory_working_set_max'], 300)
+            self.assertEqual(len(history.get_samples('b')), 1)
+            self.assertEqual(history.get_samples('a', since=11., until=11.5), samples[1:])
+
+        # persistent
+        with wc_env_manager.history.ResourceHistory(self.filename) as history:
+            self.assertEqual(len(history.get_samples('a')), 2)
+
+    def test_downsample(self):
+        retention = {1: 120, 60: 7200, 3600: 4 * 3600}
+        with wc_env_manager.history.ResourceHistory(self.filename, retention=retention) as history:
+            history.add_samples([make_sample('a', float(t), cpu_percent=float(t), memory_working_set=t)
+                                 for t in range(0, 300)])
+
+            now = 300.
+            history.downsample(now=now)
+            samples = history.get_samples('a')
+            self.assertEqual([(sample['resolution'], sample['time']) for sample in samples if sample['resolution'] == 60],
+                             [(60, 0.), (60, 60.), (60, 120.)])
+            self.assertEqual(samples[0]['num_samples'], 60)
+            self.assertAlmostEqual(samples[0]['cpu_percent_mean'], 29.5)
+            self.assertEqual(samples[0]['cpu_percent_max'], 59.)
+            self.assertEqual(samples[1]['memory_working_set_max'], 119)
+            self.assertEqual(min(sample['time'] for sample in samples if sample['resolution'] == 1), 180.)
+            self.assertEqual(sum(sample['num_samples'] for sample in samples), 300)
+
+            # samples which are downsampled later are merged into existing coarser samples
+            history.add_samples([make_sample('a', 30., cpu_percent=1000.)])
+            history.downsample(now=now)
+            samples = history.get_samples('a', resolution=60)
+            self.assertEqual(samples[0]['num_samples'], 61)
+            self.assertEqual(samples[0]['cpu_percent_max'], 1000.)
+            self.assertAlmostEqual(samples[0]['cpu_percent_mean'], (29.5 * 60 + 1000.) / 61)
+
+            # downsample to 1 h and delete samples which are older than the retention
+            history.downsample(now=now + 3 * 3600)
+            samples = history.get_samples('a')
+            self.assertEqual([(sample['resolution'], sample['time']) for sample in samples], [(3600, 0.)])
+            self.assertEqual(samples[0]['num_samples'], 301)
+
+            history.downsample(now=now + 5 * 3600)
+            self.assertEqual(history.get_samples('a'), [])
+
+    def test_get_peak_usage(self):
+        retention = {1: 120, 60: 7200, 3600: 4 * 3600}
+        with wc_env_manager.history.ResourceHistory(self.filename, retention=retention) as history:
+            history.add_samples([make_sample('a', float(t), cpu_percent=10., memory_working_set=t) for t in range(0, 300)])
+            history.add_samples([make_sample('b', float(t), cpu_percent=20., memory_working_set=50) for t in range(0, 10)])
+            history.downsample(now=300.)
+
+            usages = history.get_peak_usage()
+            self.assertEqual([usage['container'] for usage in usages], ['a', 'b'])
+            self.assertEqual(usages[0]['memory_working_set_max'], 299)
+            self.assertAlmostEqual(usages[0]['memory_working_set_mean'], 149.5)
+            self.assertAlmostEqual(usages[0]['cpu_percent_mean'], 10.)
+            self.assertEqual(usages[0]['num_samples'], 300)
+            self.assertEqual(usages[0]['start_time'], 0.)
+            self.assertEqual(usages[0]['end_time'], 300.)
+            self.assertEqual(usages[1]['memory_working_set_max'], 50)
+
+            usages = history.get_peak_usage(containers=['a'], since=200.)
+            self.assertEqual(len(usages), 1)
+            self.assertEqual(usages[0]['memory_working_set_max'], 299)
+            self.assertEqual(usages[0]['num_samples'], 100)
+
+    def test_commands(self):
+        with wc_env_manager.history.ResourceHistory(self.filename) as history:
+            history.add_samples([make_sample('a', float(t), memory_working_set=t) for t in range(0, 100)])
+
+            history.start_command('a', 'exec-1', 'python -m simulate', 10.)
+            history.start_command('a', 'exec-1', 'python -m simulate', 11.)
+            history.start_command('a', 'exec-2', 'bash', 50.)
+            self.assertEqual(sorted(history.get_running_commands()), [('a', 'exec-1'), ('a', 'exec-2')])
+
+            history.end_command('a', 'exec-1', 20.5, exit_code=0)
+            history.end_command('a', 'exec-1', 30., exit_code=1)
+            self.assertEqual(history.get_running_commands(), [('a', 'exec-2')])
+
+            usages = history.get_command_usage()
+            self.assertEqual([usage['cmd'] for usage in usages], ['python -m simulate', 'bash'])
+            self.assertEqual(usages[0]['start_time'], 10.)
+            self.assertEqual(usages[0]['end_time'], 20.5)
+            self.assertEqual(usages[0]['exit_code'], 0)
+            self.assertEqual(usages[0]['memory_working_set_max'], 20)
+            self.assertEqual(usages[0]['num_samples'], 11)
+            self.assertEqual(usages[1]['end_time'], None)
+            self.assertEqual(usages[1]['memory_working_set_max'], 99)
+
+            self.assertEqual([usage['cmd'] for usage in history.get_command_usage(cmd='simulate')],
+                             ['python -m simulate'])
+            self.assertEqual(history.get_command_usage(containers=['b']), [])
+            self.assertEqual([usage['cmd'] for usage in history.get_command_usage(since=40.)], ['bash'])
+            self.assertEqual([usage['cmd'] for usage in history.get_command_usage(until=40.)],
+                             ['python -m simulate'])
+
+    def test_parse_duration(self):
+        self.assertEqual(wc_env_manager.history.parse_duration(5), 5.)
+        self.assertEqual(wc_env_manager.history.parse_duration('90'), 90.)
+        self.assertEqual(wc_env_manager.history.parse_duration('90s'), 90.)
+        self.assertEqual(wc_env_manager.history.parse_duration('1.5m'), 90.)
+        self.assertEqual(wc_env_manager.history.parse_duration('12h'), 12 * 3600.)
+        self.assertEqual(wc_env_manager.history.parse_duration('7d'), 7 * 24 * 3600.)
+        self.assertEqual(wc_env_manager.history.parse_duration('2w'), 14 * 24 * 3600.)
+        with self.assertRaisesRegex(ValueError, 'Invalid duration'):
+            wc_env_manager.history.parse_duration('7 days')
+
+    def test_get_retention(self):
+        self.assertEqual(wc_env_manager.history.get_retention({
+            'retention_1s': '1h',
+            'retention_1min': '7d',
+            'retention_1h': '365d',
+        }), {
+            1: 3600.,
+            60: 7 * 24 * 3600.,
+            3600: 365 * 24 * 3600.,
+        })
+
+
+class HistoryRecorderEventsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir_name = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir_name, 'history.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir_name)
+
+    def test_exec_events(self):
+        mgr = mock.Mock(config={
+            'container': {'name_format': 'wc_env-%Y-%m-%d-%H-%M-%S'},
+            'history': {'path': self.filename, 'retention_1s': '1h', 'retention_1min': '7d', 'retention_1h': '365d'},
+        })
+        recorder = wc_env_manager.history.HistoryRecorder(mgr)
+
+        name = 'wc_env-2026-10-18-00-00-00'
+        recorder._add_exec_event({'Type': 'container', 'Action': 'exec_start: sleep 0.01', 'timeNano': int(10.5e9),
+                                  'Actor': {'ID': 'c', 'Attributes': {'name': name, 'execID': 'e1'}}})
+        recorder._add_exec_event({'Type': 'container', 'Action': 'exec_die', 'time': 11,
+                                  'Actor': {'ID': 'c', 'Attributes': {'name': name, 'execID': 'e1', 'exitCode': '2'}}})
+
+        # events of other containers and actions are ignored
+        recorder._add_exec_event({'Type': 'container', 'Action': 'exec_start: bash', 'time': 12,
+                                  'Actor': {'ID': 'o', 'Attributes': {'name': 'other', 'execID': 'e2'}}})
+        recorder._add_exec_event({'Type': 'container', 'Action': 'exec_create: bash', 'time': 12,
+                                  'Actor': {'ID': 'c', 'Attributes': {'name': name, 'execID': 'e3'}}})
+
+        self.assertEqual(recorder._pending_commands, [
+            ('start', name, 'e1', 'sleep 0.01', 10.5),
+            ('end', name, 'e1', 11, 2),
+        ])
+
+        with wc_env_manager.history.ResourceHistory(self.filename) as history:
+            recorder.write_commands(history, recorder._pending_commands)
+
+            # polling doesn't change the times of the commands which were recorded from their events
+            mgr._docker_client.api.exec_inspect.return_value = {'Running': False, 'ExitCode': 2}
+            recorder.record_commands(history, [])
+
+            usages = history.get_command_usage()
+            self.assertEqual(len(usages), 1)
+            self.assertEqual(usages[0]['cmd'], 'sleep 0.01')
+            self.assertEqual(usages[0]['start_time'], 10.5)
+            self.assertEqual(usages[0]['end_time'], 11)
+            self.assertEqual(usages[0]['exit_code'], 2)
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class HistoryRecorderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir_name = tempfile.mkdtemp()
+
+        mgr = self.mgr = wc_env_manager.core.WcEnvManager()
+        mgr.pull_image(mgr.config['base_image']['repo'], mgr.config['base_image']['tags'])
+
+        mgr.config['image']['tags'] = ['test']
+        mgr.config['image']['python_packages'] = ''
+        mgr.build_image()
+
+        mgr.config['network']['name'] = '__test__'
+        mgr.config['network']['containers'] = {}
+        mgr.config['container']['paths_to_mount'] = {}
+        mgr.config['history']['path'] = os.path.join(self.temp_dir_name, 'history.sqlite')
+        mgr.build_container()
+
+    def tearDown(self):
+        mgr = self.mgr
+        mgr.remove_containers(force=True)
+        mgr.remove_network()
+        mgr.remove_image(mgr.config['image']['repo'], mgr.config['image']['tags'])
+        shutil.rmtree(self.temp_dir_name)
+
+    def test(self):
+        mgr = self.mgr
+        with wc_env_manager.history.HistoryRecorder(mgr, flush_interval=0.5) as recorder:
+            time.sleep(1.)
+            mgr.run_process_in_container(['sleep', '3'])
+            time.sleep(2.)
+
+        with wc_env_manager.history.ResourceHistory(recorder.filename) as history:
+            usages = history.get_peak_usage()
+            self.assertEqual([usage['container'] for usage in usages], [mgr._container.name])
+            self.assertGreater(usages[0]['num_samples'], 0)
+            self.assertGreater(usages[0]['memory_working_set_max'], 0)
+
+            usages = history.get_command_usage(cmd='sleep 3')
+            self.assertEqual(len(usages), 1)
+            self.assertEqual(usages[0]['exit_code'], 0)
+            self.assertGreater(usages[0]['end_time'], usages[0]['start_time'])
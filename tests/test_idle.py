@@ -0,0 +1,178 @@
+""" Tests for wc_env_manager.idle
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import docker
+import mock
+import time
+import unittest
+import wc_env_manager.core
+import wc_env_manager.idle
+import whichcraft
+
+
+def make_container(name, cpu_usage=0, exec_ids=None, status='running'):
+    container = mock.Mock(status=status, attrs={'ExecIDs': exec_ids})
+    container.name = name
+    container.stats.return_value = {'cpu_stats': {'cpu_usage': {'total_usage': cpu_usage}}}
+    return container
+
+
+def make_mgr(containers, running_exec_ids=()):
+    mgr = mock.Mock(config={'idle': {
+        'timeout': '1h',
+        'cpu_threshold': 1.,
+        'action': 'pause',
+        'interval': 60.,
+    }})
+    mgr.get_containers.return_value = containers
+
+    def exec_inspect(exec_id):
+        if exec_id == 'missing':
+            raise docker.errors.NotFound('missing')
+        return {'Running': exec_id in running_exec_ids}
+    mgr._docker_client.api.exec_inspect.side_effect = exec_inspect
+    return mgr
+
+
+class IdleMonitorTestCase(unittest.TestCase):
+    def test_init(self):
+        monitor = wc_env_manager.idle.IdleMonitor(make_mgr([]))
+        self.assertEqual(monitor.timeout, 3600.)
+        self.assertEqual(monitor.cpu_threshold, 1.)
+        self.assertEqual(monitor.action, wc_env_manager.idle.HibernationAction.pause)
+        self.assertEqual(monitor.interval, 60.)
+
+        monitor = wc_env_manager.idle.IdleMonitor(make_mgr([]), timeout='30m', cpu_threshold=0., action='stop',
+                                                  interval=1.)
+        self.assertEqual(monitor.timeout, 1800.)
+        self.assertEqual(monitor.cpu_threshold, 0.)
+        self.assertEqual(monitor.action, wc_env_manager.idle.HibernationAction.stop)
+        self.assertEqual(monitor.interval, 1.)
+
+    def test_check(self):
+        idle = make_container('idle')
+        busy = make_container('busy')
+        stopped = make_container('stopped', status='exited')
+        mgr = make_mgr([idle, busy, stopped])
+        hibernated = []
+        monitor = wc_env_manager.idle.IdleMonitor(mgr, callbacks=[hibernated.append])
+
+        # the first check starts the idle clock
+        self.assertEqual(monitor.check(now=0.), [])
+        self.assertEqual(monitor._last_activity, {'idle': 0., 'busy': 0.})
+
+        # the busy container uses 10% of a CPU
+        busy.stats.return_value = {'cpu_stats': {'cpu_usage': {'total_usage': int(0.1 * 1800 * 1e9)}}}
+        self.assertEqual(monitor.check(now=1800.), [])
+        self.assertEqual(monitor._last_activity, {'idle': 0., 'busy': 1800.})
+
+        busy.stats.return_value = {'cpu_stats': {'cpu_usage': {'total_usage': int(0.1 * 3600 * 1e9)}}}
+        self.assertEqual(monitor.check(now=3600., dry_run=True), [idle])
+        idle.pause.assert_not_called()
+
+        self.assertEqual(monitor.check(now=3600.), [idle])
+        idle.pause.assert_called_once_with()
+        busy.pause.assert_not_called()
+        stopped.pause.assert_not_called()
+        self.assertEqual(hibernated, [idle])
+        self.assertNotIn('idle', monitor._last_activity)
+
+        # containers which are no longer running are forgotten
+        mgr.get_containers.return_value = []
+        self.assertEqual(monitor.check(now=3700.), [])
+        self.assertEqual(monitor._last_activity, {})
+        self.assertEqual(monitor._cpu_usage, {})
+
+    def test_check_stop(self):
+        container = make_container('idle')
+        monitor = wc_env_manager.idle.IdleMonitor(make_mgr([container]), action='stop')
+        monitor.check(now=0.)
+        monitor.check(now=3600.)
+        container.stop.assert_called_once_with()
+
+        # errors don't interrupt the other containers
+        container1 = make_container('idle-1')
+        container1.pause.side_effect = docker.errors.APIError('error')
+        container2 = make_container('idle-2')
+        monitor = wc_env_manager.idle.IdleMonitor(make_mgr([container1, container2]))
+        monitor.check(now=0.)
+        self.assertEqual(monitor.check(now=3600.), [container2])
+
+    def test_is_active(self):
+        container = make_container('container', exec_ids=['exec-1', 'missing'])
+        monitor = wc_env_manager.idle.IdleMonitor(make_mgr([container], running_exec_ids=['exec-2']),
+                                                  cpu_threshold=1.)
+        self.assertFalse(monitor.is_active(container, 0.))
+
+        # CPU utilization below and above the threshold
+        container.stats.return_value = {'cpu_stats': {'cpu_usage': {'total_usage': int(0.005 * 100 * 1e9)}}}
+        self.assertFalse(monitor.is_active(container, 100.))
+        container.stats.return_value = {'cpu_stats': {'cpu_usage': {'total_usage': int(0.5 * 100 * 1e9)}}}
+        self.assertTrue(monitor.is_active(container, 200.))
+        self.assertFalse(monitor.is_active(container, 300.))
+
+        # new execs
+        container.attrs['ExecIDs'] = ['exec-1', 'missing', 'exec-3']
+        self.assertTrue(monitor.is_active(container, 400.))
+        self.assertFalse(monitor.is_active(container, 500.))
+
+        # running execs
+        container.attrs['ExecIDs'] = ['exec-2']
+        self.assertTrue(monitor.is_active(container, 600.))
+        self.assertTrue(monitor.is_active(container, 700.))
+
+    def test_start_stop(self):
+        container = make_container('idle')
+        mgr = make_mgr([container])
+        with wc_env_manager.idle.IdleMonitor(mgr, timeout=0., interval=0.01):
+            time.sleep(0.2)
+        container.pause.assert_called_with()
+
+        mgr.get_containers.side_effect = docker.errors.APIError('error')
+        with wc_env_manager.idle.IdleMonitor(mgr, interval=0.01):
+            time.sleep(0.05)
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class HibernationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mgr = mgr = wc_env_manager.core.WcEnvManager()
+        mgr.config['image']['repo'] = mgr.config['base_image']['repo']
+        mgr.config['image']['tags'] = mgr.config['base_image']['tags']
+        mgr.config['network']['containers'] = {}
+        mgr.config['container']['paths_to_mount'] = {}
+        mgr.config['container']['python_packages'] = ''
+        mgr.config['container']['setup_script'] = ''
+        mgr.build_container()
+
+    def tearDown(self):
+        self.mgr.remove_containers(force=True)
+
+    def test_wake(self):
+        mgr = self.mgr
+        monitor = wc_env_manager.idle.IdleMonitor(mgr, timeout=0., cpu_threshold=100.)
+        monitor.check()
+        self.assertEqual([container.name for container in monitor.check()], [mgr._container.name])
+        mgr._container.reload()
+        self.assertEqual(mgr._container.status, 'paused')
+
+        # processes transparently unpause the container
+        self.assertEqual(mgr.run_process_in_container(['echo', 'abc'])[0], 'abc')
+        self.assertEqual(mgr._container.status, 'running')
+
+        monitor = wc_env_manager.idle.IdleMonitor(mgr, timeout=0., cpu_threshold=100., action='stop')
+        monitor.check()
+        monitor.check()
+        mgr._container.reload()
+        self.assertEqual(mgr._container.status, 'exited')
+
+        # processes and sessions transparently restart the container
+        with mgr.open_session() as session:
+            self.assertEqual(session.run('echo abc').output, 'abc')
+        self.assertEqual(mgr._container.status, 'running')
+        self.assertFalse(mgr.wake_container())
@@ -0,0 +1,348 @@
+""" Tests for wc_env_manager.index
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import docker
+import mock
+import queue
+import time
+import unittest
+import wc_env_manager.core
+import wc_env_manager.index
+import whichcraft
+
+
+def make_image(id, tags):
+    return mock.Mock(spec=['id', 'tags'], id=id, tags=list(tags))
+
+
+def make_container(id, name, status='running', labels=None, started_at='2026-10-18T00:00:00Z'):
+    container = mock.Mock(id=id, status=status, labels=labels or {},
+                          attrs={'State': {'StartedAt': started_at}, 'Created': started_at})
+    container.name = name
+    return container
+
+
+class FakeEvents(object):
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def __iter__(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            yield event
+
+    def close(self):
+        self.queue.put(None)
+
+
+class FakeDockerClient(object):
+    def __init__(self, images=(), containers=(), network_members=()):
+        self.images_by_id = {image.id: image for image in images}
+        self.containers_by_id = {container.id: container for container in containers}
+        self.fake_events = FakeEvents()
+
+        self.images = mock.Mock()
+        self.images.list.side_effect = lambda name: [
+            image for image in self.images_by_id.values() if any(tag.startswith(name + ':') for tag in image.tags)]
+        self.images.get.side_effect = self.get_image
+
+        self.containers = mock.Mock()
+        self.containers.list.side_effect = lambda all: list(self.containers_by_id.values())
+        self.containers.get.side_effect = self.get_container
+
+        self.networks = mock.Mock()
+        self.networks.get.return_value = mock.Mock(attrs={'Containers': {id: {} for id in network_members}})
+
+    def get_image(self, ref):
+        if ref in self.images_by_id:
+            return self.images_by_id[ref]
+        for image in self.images_by_id.values():
+            if ref in image.tags:
+                return image
+        raise docker.errors.ImageNotFound(ref)
+
+    def get_container(self, id):
+        if id in self.containers_by_id:
+            return self.containers_by_id[id]
+        raise docker.errors.NotFound(id)
+
+    def events(self, decode=True, filters=None):
+        return self.fake_events
+
+
+def make_mgr(client):
+    mgr = mock.Mock(config={
+        'base_image': {'repo_unsquashed': 'karrlab/wc_env_dependencies_unsquashed',
+                       'repo': 'karrlab/wc_env_dependencies'},
+        'image': {'repo': 'karrlab/wc_env'},
+        'container': {'name_format': 'wc_env-%Y-%m-%d-%H-%M-%S'},
+        'network': {'name': 'wc_network', 'containers': {'wc_db': {}}},
+    })
+    mgr._docker_client = client
+    mgr.is_host_network.return_value = False
+    return mgr
+
+
+def container_event(action, container, time=100.):
+    return {'Type': 'container', 'Action': action, 'time': time,
+            'Actor': {'ID': container.id, 'Attributes': {'name': container.name}}}
+
+
+class ResourceIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.image = make_image('sha256:1', ['karrlab/wc_env:latest', 'karrlab/wc_env:0.0.1'])
+        self.other_image = make_image('sha256:2', ['python:3.7'])
+        self.container_1 = make_container('c1', 'wc_env-2026-10-18-00-00-00', started_at='2026-10-18T00:00:00Z')
+        self.container_2 = make_container('c2', 'wc_env-2026-10-18-00-00-01-0123abcd', labels={
+            wc_env_manager.core.WcEnvManager.GROUP_LABEL: 'sims'}, started_at='2026-10-18T01:00:00Z')
+        self.db = make_container('db', 'wc_db')
+        self.other = make_container('other', 'other')
+        self.client = FakeDockerClient(images=[self.image, self.other_image],
+                                       containers=[self.container_1, self.container_2, self.db, self.other],
+                                       network_members=['c1', 'db'])
+        self.mgr = make_mgr(self.client)
+        self.index = wc_env_manager.index.ResourceIndex(self.mgr)
+        self.index.sync()
+
+    def test_sync(self):
+        self.assertEqual(self.index.get_images(), [self.image])
+        self.assertEqual(self.index.get_images('karrlab/wc_env'), [self.image])
+        self.assertEqual(self.index.get_images('karrlab/wc_env_dependencies'), [])
+        self.assertEqual(set(self.index.get_containers()), set([self.container_1, self.container_2]))
+        self.assertEqual(set(self.index.get_network_members()), set([self.container_1, self.db]))
+
+    def test_lookups(self):
+        self.assertEqual(self.index.get_image('karrlab/wc_env'), self.image)
+        self.assertEqual(self.index.get_image('karrlab/wc_env:0.0.1'), self.image)
+        self.assertEqual(self.index.get_image('sha256:1'), self.image)
+        self.assertEqual(self.index.get_image('karrlab/wc_env:0.0.2'), None)
+        self.assertEqual(self.index.get_latest_image('karrlab/wc_env'), self.image)
+        self.assertEqual(self.index.get_latest_image('karrlab/wc_env_dependencies'), None)
+
+        self.assertEqual(self.index.get_container('c1'), self.container_1)
+        self.assertEqual(self.index.get_container('wc_env-2026-10-18-00-00-00'), self.container_1)
+        self.assertEqual(self.index.get_container('wc_db'), self.db)
+        self.assertEqual(self.index.get_container('other'), None)
+
+        self.assertEqual(self.index.get_containers(group='sims'), [self.container_2])
+        self.assertEqual(self.index.get_containers(label=wc_env_manager.core.WcEnvManager.GROUP_LABEL),
+                         [self.container_2])
+        self.assertEqual(self.index.get_containers(label='undefined'), [])
+        self.assertEqual(self.index.get_containers(sort_by_activity=True), [self.container_2, self.container_1])
+        self.assertEqual(self.index.get_latest_container(), self.container_2)
+
+    def test_container_events(self):
+        callback = mock.Mock()
+        self.index.callbacks.append(callback)
+
+        # activity
+        time_1 = self.index._activity['c2'] + 1.
+        self.assertEqual(self.index.apply_event(container_event('exec_start: bash', self.container_1, time_1)), [])
+        self.assertEqual(self.index.get_latest_container(), self.container_1)
+        callback.assert_not_called()
+
+        # new container
+        container_3 = make_container('c3', 'wc_env-2026-10-18-00-00-03')
+        self.client.containers_by_id['c3'] = container_3
+        changes = self.index.apply_event(container_event('start', container_3, time_1 + 1.))
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].kind, 'container')
+        self.assertEqual(changes[0].action, 'start')
+        self.assertEqual(changes[0].name, container_3.name)
+        self.assertEqual(changes[0].resource, container_3)
+        self.assertEqual(changes[0].status, 'running')
+        callback.assert_called_once_with(changes[0])
+        self.assertEqual(self.index.get_latest_container(), container_3)
+
+        # removed container
+        self.client.containers_by_id.pop('c3')
+        changes = self.index.apply_event(container_event('destroy', container_3))
+        self.assertEqual(changes[0].resource, None)
+        self.assertEqual(changes[0].status, 'removed')
+        self.assertNotIn(container_3, self.index.get_containers())
+
+        # containers which aren't part of the environment are ignored
+        self.assertEqual(self.index.apply_event(container_event('start', self.other)), [])
+
+        # other containers of the network
+        changes = self.index.apply_event(container_event('die', self.db))
+        self.assertEqual(changes[0].resource, self.db)
+
+    def test_image_events(self):
+        # tag moved to a new image
+        new_image = make_image('sha256:3', ['karrlab/wc_env:latest'])
+        old_image = self.client.images_by_id['sha256:1'] = make_image('sha256:1', ['karrlab/wc_env:0.0.1'])
+        self.client.images_by_id['sha256:3'] = new_image
+        changes = self.index.apply_event({'Type': 'image', 'Action': 'tag', 'time': 100.,
+                                          'Actor': {'ID': 'sha256:3', 'Attributes': {'name': 'karrlab/wc_env:latest'}}})
+        self.assertEqual(set(change.id for change in changes), set(['sha256:1', 'sha256:3']))
+        self.assertEqual(self.index.get_latest_image('karrlab/wc_env'), new_image)
+        self.assertEqual(self.index.get_image('karrlab/wc_env:0.0.1'), old_image)
+
+        # deleted image
+        self.client.images_by_id.pop('sha256:1')
+        changes = self.index.apply_event({'Type': 'image', 'Action': 'delete', 'time': 100.,
+                                          'Actor': {'ID': 'sha256:1', 'Attributes': {'name': 'sha256:1'}}})
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].status, 'removed')
+        self.assertEqual(self.index.get_images(), [new_image])
+
+        # images of other repositories are ignored
+        self.assertEqual(self.index.apply_event({'Type': 'image', 'Action': 'pull', 'time': 100.,
+                                                 'Actor': {'ID': 'python:3.7', 'Attributes': {'name': 'python:3.7'}}}),
+                         [])
+
+    def test_network_events(self):
+        changes = self.index.apply_event({'Type': 'network', 'Action': 'connect', 'time': 100.,
+                                          'Actor': {'ID': 'n', 'Attributes': {'name': 'wc_network', 'container': 'c2'}}})
+        self.assertEqual(changes[0].resource, self.container_2)
+        self.assertIn(self.container_2, self.index.get_network_members())
+
+        changes = self.index.apply_event({'Type': 'network', 'Action': 'disconnect', 'time': 100.,
+                                          'Actor': {'ID': 'n', 'Attributes': {'name': 'wc_network', 'container': 'c2'}}})
+        self.assertEqual(changes[0].resource, None)
+        self.assertNotIn(self.container_2, self.index.get_network_members())
+
+        self.assertEqual(self.index.apply_event({'Type': 'network', 'Action': 'connect', 'time': 100.,
+                                                 'Actor': {'ID': 'n', 'Attributes': {'name': 'other', 'container': 'c2'}}}),
+                         [])
+
+        changes = self.index.apply_event({'Type': 'network', 'Action': 'destroy', 'time': 100.,
+                                          'Actor': {'ID': 'n', 'Attributes': {'name': 'wc_network'}}})
+        self.assertEqual([change.id for change in changes], ['c1'])
+        self.assertEqual(self.index.get_network_members(), [self.db])
+
+    def test_start_stop(self):
+        changes = queue.Queue()
+        container_3 = make_container('c3', 'wc_env-2026-10-18-00-00-03')
+        self.client.containers_by_id['c3'] = container_3
+
+        with wc_env_manager.index.ResourceIndex(self.mgr, callbacks=[changes.put]) as index:
+            self.assertTrue(index.is_running)
+            self.assertIn(container_3, index.get_containers())
+            self.client.fake_events.queue.put(container_event('stop', container_3))
+            self.assertEqual(changes.get(timeout=5.).resource, container_3)
+        self.assertFalse(index.is_running)
+
+    def test_resubscribe(self):
+        streams = []
+
+        def events(decode=True, filters=None):
+            streams.append(FakeEvents())
+            return streams[-1]
+        self.client.events = events
+
+        with mock.patch.object(wc_env_manager.index.ResourceIndex, 'RESUBSCRIBE_INTERVAL', 0.01):
+            with wc_env_manager.index.ResourceIndex(self.mgr) as index:
+                self.assertTrue(index.is_running)
+
+                # the stream of events is dropped (e.g., the Docker daemon restarted) while a container is created
+                container_3 = make_container('c3', 'wc_env-2026-10-18-00-00-03')
+                self.client.containers_by_id['c3'] = container_3
+                self.assertNotIn(container_3, index.get_containers())
+                streams[0].queue.put(None)
+
+                # the index resubscribes to the events, and rebuilds itself
+                for i_attempt in range(500):
+                    if len(streams) > 1 and index.is_running:
+                        break
+                    time.sleep(0.01)
+                self.assertTrue(index.is_running)
+                self.assertIn(container_3, index.get_containers())
+
+                container_4 = make_container('c4', 'wc_env-2026-10-18-00-00-04')
+                self.client.containers_by_id['c4'] = container_4
+                streams[-1].queue.put(container_event('create', container_4))
+                for i_attempt in range(500):
+                    if container_4 in index.get_containers():
+                        break
+                    time.sleep(0.01)
+                self.assertIn(container_4, index.get_containers())
+        self.assertFalse(index.is_running)
+
+    def test_manager_falls_back_to_docker(self):
+        self.mgr._index = self.index
+        self.assertFalse(wc_env_manager.core.WcEnvManager._is_index_running(self.mgr))
+
+        self.mgr._index = mock.Mock(is_running=True)
+        self.assertTrue(wc_env_manager.core.WcEnvManager._is_index_running(self.mgr))
+
+        self.mgr._index = None
+        self.assertFalse(wc_env_manager.core.WcEnvManager._is_index_running(self.mgr))
+
+    def test_change(self):
+        change = wc_env_manager.index.IndexChange('container', 'start', 'c1', 'wc_env-2026', self.container_1, 0.)
+        self.assertEqual(change.to_dict(), {'kind': 'container', 'action': 'start', 'id': 'c1', 'name': 'wc_env-2026',
+                                            'status': 'running', 'time': 0.})
+        self.assertRegex(change.format(), r'^\d{2}:\d{2}:\d{2} container +start +wc_env-2026 +running$')
+
+        change = wc_env_manager.index.IndexChange('image', 'tag', 'sha256:1', 'karrlab/wc_env:latest', self.image, 0.)
+        self.assertEqual(change.status, 'present')
+
+    def test_update_manager(self):
+        self.mgr._index = self.index
+        self.mgr._container = self.container_1
+
+        # a change of another container doesn't change the current container
+        change = wc_env_manager.index.IndexChange('container', 'start', 'c2', self.container_2.name, self.container_2, 0.)
+        wc_env_manager.core.WcEnvManager._update_from_index(self.mgr, change)
+        self.assertEqual(self.mgr._container, self.container_1)
+
+        # the current container is replaced when it's removed
+        self.index._containers.pop('c1')
+        change = wc_env_manager.index.IndexChange('container', 'destroy', 'c1', self.container_1.name, None, 0.)
+        wc_env_manager.core.WcEnvManager._update_from_index(self.mgr, change)
+        self.assertEqual(self.mgr._container, self.container_2)
+
+        # the images are updated
+        change = wc_env_manager.index.IndexChange('image', 'tag', 'sha256:1', 'karrlab/wc_env:latest', self.image, 0.)
+        wc_env_manager.core.WcEnvManager._update_from_index(self.mgr, change)
+        self.mgr.set_image.assert_any_call('karrlab/wc_env', self.image)
+        self.mgr.set_image.assert_any_call('karrlab/wc_env_dependencies', None)
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class ManagerIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mgr = wc_env_manager.core.WcEnvManager({
+            'base_image': {'repo': 'karrlab/wc_env_dependencies_test'},
+            'image': {'repo': 'karrlab/wc_env_test', 'tags': ['latest']},
+        })
+
+    def tearDown(self):
+        self.mgr.stop_index()
+        self.mgr.remove_containers(force=True)
+
+    def test_index(self):
+        index = self.mgr.start_index()
+        self.assertEqual(self.mgr.start_index(), index)
+        self.assertTrue(index.is_running)
+
+        self.mgr._docker_client.images.pull('alpine', tag='latest')
+        self.mgr._image = self.mgr._docker_client.images.get('alpine:latest')
+        container = self.mgr._docker_client.containers.run('alpine:latest', name=self.mgr.make_container_name(),
+                                                           command='sleep 600', detach=True)
+
+        for i_attempt in range(50):
+            if index.get_container(container.name):
+                break
+            time.sleep(0.1)
+        self.assertEqual(index.get_container(container.name).id, container.id)
+        self.assertIn(container.id, [c.id for c in self.mgr.get_containers()])
+
+        container.remove(force=True)
+        for i_attempt in range(50):
+            if not index.get_container(container.name):
+                break
+            time.sleep(0.1)
+        self.assertEqual(index.get_container(container.name), None)
+
+        self.mgr.stop_index()
+        self.assertFalse(index.is_running)
@@ -0,0 +1,313 @@
+""" Tests for wc_env_manager.layers
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from wc_env_manager import __main__
+import capturer
+import docker
+import hashlib
+import io
+import json
+import mock
+import tarfile
+import unittest
+import wc_env_manager.core
+import wc_env_manager.layers
+
+
+def make_tar(members):
+    """ Make a tar archive
+
+    Args:
+        members (:obj:`list` of :obj:`tuple`): name and content (:obj:`bytes`) of each file, :obj:`None`
+            for directories, or a :obj:`str` target for symbolic links
+
+    Returns:
+        :obj:`bytes`: archive
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as archive:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            if content is None:
+                info.type = tarfile.DIRTYPE
+                archive.addfile(info)
+            elif isinstance(content, str):
+                info.type = tarfile.SYMTYPE
+                info.linkname = content
+                archive.addfile(info)
+            else:
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+LAYERS = [
+    [
+        ('./', None),
+        ('bin/', None),
+        ('bin/sh', b'x' * 50),
+        ('bin/bash', 'sh'),
+        ('usr/', None),
+        ('usr/lib/', None),
+        ('usr/lib/libbig.a', b'x' * 1000),
+        ('var/cache/apt/', None),
+        ('var/cache/apt/pkgcache.bin', b'x' * 500),
+        ('opt/x/', None),
+        ('opt/x/a', b'x' * 100),
+        ('opt/x/b', b'x' * 200),
+        ('.profile', b'x' * 5),
+    ],
+    [
+        ('usr/lib/', None),
+        ('usr/lib/libbig.a', b'x' * 1200),
+        ('var/cache/apt/.wh.pkgcache.bin', b''),
+        ('opt/x/c', b'x' * 10),
+        ('opt/x/.wh..wh..opq', b''),
+        ('root/.cache/pip/wheels/numpy.whl', b'x' * 700),
+    ],
+    [
+        ('root/.wh..cache', b''),
+        ('root/.bashrc', b'x' * 3),
+    ],
+]
+
+HISTORY = [
+    {'created_by': 'ADD file:abc in /'},
+    {'created_by': 'ENV PATH=/usr/bin', 'empty_layer': True},
+    {'created_by': 'RUN apt-get install libbig'},
+    {'created_by': 'RUN rm -rf /root/.cache'},
+]
+
+
+def make_archive(layers=LAYERS, oci=False, repo_tag='karrlab/wc_env:0.0.1'):
+    """ Make the archive of an image in the format of `docker save`
+
+    Args:
+        layers (:obj:`list`): members of each layer (see :obj:`make_tar`)
+        oci (:obj:`bool`, optional): if :obj:`True`, use the OCI image layout, with the manifest after the layers
+
+    Returns:
+        :obj:`bytes`: archive
+    """
+    config = json.dumps({'history': HISTORY}).encode()
+    layer_tars = [make_tar(members) for members in layers]
+    members = []
+    if oci:
+        layer_ids = []
+        for layer_tar in layer_tars:
+            layer_id = 'blobs/sha256/' + hashlib.sha256(layer_tar).hexdigest()
+            layer_ids.append(layer_id)
+            members.append((layer_id, layer_tar))
+        members.append(('blobs/sha256/config', config))
+        members.append(('legacy/layer.tar', '../' + layer_ids[0]))
+        members.append(('oci-layout', b'{"imageLayoutVersion": "1.0.0"}'))
+        members.append(('manifest.json', json.dumps([{
+            'Config': 'blobs/sha256/config',
+            'RepoTags': [repo_tag],
+            'Layers': ['legacy/layer.tar'] + layer_ids[1:],
+        }]).encode()))
+    else:
+        members.append(('manifest.json', json.dumps([{
+            'Config': 'config.json',
+            'RepoTags': [repo_tag],
+            'Layers': ['layer-{}/layer.tar'.format(i_layer) for i_layer in range(len(layers))],
+        }]).encode()))
+        members.append(('config.json', config))
+        for i_layer, layer_tar in enumerate(layer_tars):
+            members.append(('layer-{}/'.format(i_layer), None))
+            members.append(('layer-{}/VERSION'.format(i_layer), b'1.0'))
+            members.append(('layer-{}/layer.tar'.format(i_layer), layer_tar))
+    return make_tar(members)
+
+
+def chunk(data, chunk_size=1000):
+    return (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+
+class AnalyzeImageArchiveTestCase(unittest.TestCase):
+    def assert_analysis(self, analysis):
+        self.assertEqual(analysis.ref, 'karrlab/wc_env:0.0.1')
+        self.assertEqual(len(analysis.layers), 3)
+        self.assertEqual([layer.created_by for layer in analysis.layers],
+                         ['ADD file:abc in /', 'RUN apt-get install libbig', 'RUN rm -rf /root/.cache'])
+        self.assertEqual([layer.num_files for layer in analysis.layers], [7, 3, 1])
+        self.assertEqual([layer.files_size for layer in analysis.layers], [1855, 1910, 3])
+        self.assertEqual([layer.num_deletions for layer in analysis.layers], [0, 2, 1])
+        self.assertTrue(all(layer.size > layer.files_size for layer in analysis.layers))
+
+        self.assertEqual(analysis.get_largest_files(3), [
+            ('/usr/lib/libbig.a', 1200, 1),
+            ('/bin/sh', 50, 0),
+            ('/opt/x/c', 10, 1),
+        ])
+        self.assertNotIn('/var/cache/apt/pkgcache.bin', analysis.files)
+        self.assertNotIn('/opt/x/a', analysis.files)
+        self.assertNotIn('/root/.cache', analysis.files)
+        self.assertNotIn('/root/.cache/pip/wheels/numpy.whl', analysis.files)
+        self.assertIn('/opt/x', analysis.files)
+        self.assertIn('/root/.bashrc', analysis.files)
+        self.assertIn('/.profile', analysis.files)
+        self.assertIn('/bin/bash', analysis.files)
+        self.assertEqual(analysis.files_size, 1200 + 50 + 10 + 5 + 3)
+
+        self.assertEqual(analysis.wasted_size, 1000 + 500 + 100 + 200 + 700)
+        self.assertEqual([(file.path, file.size, file.layer, file.removed_by, file.action)
+                          for file in analysis.get_largest_wasted_files()], [
+            ('/usr/lib/libbig.a', 1000, 0, 1, 'overwritten'),
+            ('/root/.cache/pip/wheels/numpy.whl', 700, 1, 2, 'deleted'),
+            ('/var/cache/apt/pkgcache.bin', 500, 0, 1, 'deleted'),
+            ('/opt/x/b', 200, 0, 1, 'deleted'),
+            ('/opt/x/a', 100, 0, 1, 'deleted'),
+        ])
+
+    def test_docker_archive(self):
+        analysis = wc_env_manager.layers.analyze_image_archive(chunk(make_archive()))
+        self.assert_analysis(analysis)
+
+    def test_oci_archive(self):
+        analysis = wc_env_manager.layers.analyze_image_archive(chunk(make_archive(oci=True), chunk_size=333))
+        self.assert_analysis(analysis)
+
+    def test_ref(self):
+        analysis = wc_env_manager.layers.analyze_image_archive([make_archive()], ref='sha256:abc')
+        self.assertEqual(analysis.ref, 'sha256:abc')
+
+    def test_no_manifest(self):
+        with self.assertRaisesRegex(ValueError, 'does not contain a manifest'):
+            wc_env_manager.layers.analyze_image_archive([make_tar([('config.json', b'{}')])])
+
+    def test_format(self):
+        analysis = wc_env_manager.layers.analyze_image_archive([make_archive()])
+
+        text = analysis.format(num=2)
+        self.assertRegex(text, r'^Image karrlab/wc_env:0\.0\.1: .* in 3 layers; .* in \d+ paths; .* deleted or overwritten')
+        self.assertIn('RUN apt-get install libbig', text)
+        self.assertRegex(text, r'\n +1\.2 KiB +1  /usr/lib/libbig\.a\n')
+        self.assertIn('/usr/lib/libbig.a (overwritten)', text)
+        self.assertIn('/root/.cache/pip/wheels/numpy.whl (deleted)', text)
+        self.assertNotIn('/opt/x/b', text)
+
+        analysis_dict = json.loads(json.dumps(analysis.to_dict(num=2)))
+        self.assertEqual(analysis_dict['wasted_size'], 2500)
+        self.assertEqual(len(analysis_dict['layers']), 3)
+        self.assertEqual(analysis_dict['largest_files'][0], {'path': '/usr/lib/libbig.a', 'size': 1200, 'layer': 1})
+        self.assertEqual(len(analysis_dict['wasted_files']), 2)
+
+    def test_get_directory_sizes(self):
+        analysis = wc_env_manager.layers.analyze_image_archive([make_archive()])
+        self.assertEqual(analysis.get_directory_sizes(depth=1), {
+            '/': 0,
+            '/bin': 50,
+            '/usr': 1200,
+            '/var': 0,
+            '/opt': 10,
+            '/root': 3,
+            '/.profile': 5,
+        })
+        self.assertEqual(analysis.get_directory_sizes(depth=2)['/usr/lib'], 1200)
+
+
+class ImageDiffTestCase(unittest.TestCase):
+    def test(self):
+        new_layers = LAYERS + [[
+            ('usr/lib/python3/', None),
+            ('usr/lib/python3/numpy.so', b'x' * 3000),
+            ('opt/.wh.x', b''),
+        ]]
+        old = wc_env_manager.layers.analyze_image_archive([make_archive()])
+        new = wc_env_manager.layers.analyze_image_archive([make_archive(layers=new_layers, repo_tag='karrlab/wc_env:0.0.2')])
+        diff = wc_env_manager.layers.ImageDiff(old, new, depth=3)
+
+        self.assertEqual(diff.changes, [
+            ('/usr/lib/python3', 0, 3000, 3000),
+            ('/opt/x/c', 10, 0, -10),
+        ])
+
+        text = diff.format()
+        self.assertRegex(text, r'^karrlab/wc_env:0\.0\.1 -> karrlab/wc_env:0\.0\.2: .* \(\+.*\), 3 -> 4 layers')
+        self.assertRegex(text, r'Paths which grew:\n.*\n +0 B +2\.9 KiB +\+2\.9 KiB  /usr/lib/python3\n')
+        self.assertRegex(text, r'Paths which shrank:\n.*\n +10 B +0 B +-10 B  /opt/x/c$')
+
+        diff_dict = diff.to_dict()
+        self.assertEqual(diff_dict['new']['num_layers'], 4)
+        self.assertEqual(diff_dict['grew'], [{'path': '/usr/lib/python3', 'old_size': 0, 'new_size': 3000, 'change': 3000}])
+        self.assertEqual(diff_dict['shrank'], [{'path': '/opt/x/c', 'old_size': 10, 'new_size': 0, 'change': -10}])
+
+        diff = wc_env_manager.layers.ImageDiff(old, new, depth=1)
+        self.assertEqual(diff.changes, [('/usr', 1200, 4200, 3000), ('/opt', 10, 0, -10)])
+
+
+class ImageLayerAnalyzerTestCase(unittest.TestCase):
+    def make_manager(self):
+        mgr = mock.Mock(config={'image': {'repo': 'karrlab/wc_env'}})
+        images = {
+            'karrlab/wc_env:0.0.1': mock.Mock(id='sha256:1', tags=['karrlab/wc_env:0.0.1']),
+            'karrlab/wc_env:0.0.2': mock.Mock(id='sha256:2', tags=['karrlab/wc_env:0.0.2', 'karrlab/wc_env:latest']),
+        }
+        images['karrlab/wc_env:0.0.1'].save.side_effect = lambda chunk_size: chunk(make_archive())
+        images['karrlab/wc_env:0.0.2'].save.side_effect = lambda chunk_size: chunk(make_archive(
+            layers=LAYERS + [[('usr/lib/python3/numpy.so', b'x' * 3000)]], repo_tag='karrlab/wc_env:0.0.2'))
+
+        def get_image(ref):
+            if ref not in images:
+                raise docker.errors.ImageNotFound(ref)
+            return images[ref]
+        mgr._docker_client.images.get.side_effect = get_image
+        mgr._image = images['karrlab/wc_env:0.0.2']
+        return mgr
+
+    def test_analyze(self):
+        mgr = self.make_manager()
+        analyzer = wc_env_manager.layers.ImageLayerAnalyzer(mgr)
+
+        analysis = analyzer.analyze()
+        self.assertEqual(analysis.ref, 'karrlab/wc_env:0.0.2')
+        self.assertEqual(len(analysis.layers), 4)
+
+        analysis = analyzer.analyze('0.0.1')
+        self.assertEqual(analysis.ref, 'karrlab/wc_env:0.0.1')
+        self.assertEqual(len(analysis.layers), 3)
+        mgr._docker_client.images.get.assert_called_with('karrlab/wc_env:0.0.1')
+
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'does not exist'):
+            analyzer.analyze('karrlab/wc_env:0.0.3')
+
+        mgr._image = None
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'has not been built'):
+            analyzer.analyze()
+
+    def test_diff(self):
+        analyzer = wc_env_manager.layers.ImageLayerAnalyzer(self.make_manager())
+        diff = analyzer.diff('0.0.1', 'karrlab/wc_env:0.0.2', depth=2)
+        self.assertEqual(diff.changes, [('/usr/lib', 1200, 4200, 3000)])
+
+    def test_cli(self):
+        mgr = self.make_manager()
+        with mock.patch.object(__main__, 'get_manager', return_value=mgr):
+            with capturer.CaptureOutput(relay=False) as capture_output:
+                with __main__.App(argv=['image', 'analyze', '0.0.1', '--top', '1']) as app:
+                    app.run()
+                text = capture_output.get_text()
+            self.assertIn('Image karrlab/wc_env:0.0.1', text)
+            self.assertIn('/usr/lib/libbig.a (overwritten)', text)
+            self.assertNotIn('/bin/sh', text)
+
+            with capturer.CaptureOutput(relay=False) as capture_output:
+                with __main__.App(argv=['image', 'analyze', '--json']) as app:
+                    app.run()
+                self.assertEqual(json.loads(capture_output.get_text())['ref'], 'karrlab/wc_env:0.0.2')
+
+            with capturer.CaptureOutput(relay=False) as capture_output:
+                with __main__.App(argv=['image', 'diff', '0.0.1', '0.0.2']) as app:
+                    app.run()
+                self.assertIn('/usr/lib/python3', capture_output.get_text())
+
+            with capturer.CaptureOutput(relay=False) as capture_output:
+                with __main__.App(argv=['image', 'diff', '0.0.1', '0.0.2', '--depth', '1', '--json']) as app:
+                    app.run()
+                self.assertEqual(json.loads(capture_output.get_text())['grew'][0]['path'], '/usr')
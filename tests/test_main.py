@@ -7,7 +7,15 @@
 """
 
 from wc_env_manager import __main__
+import capturer
+import json
 import mock
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
 import whichcraft
 
@@ -83,6 +91,21 @@ class MainTestCase(unittest.TestCase):
         with __main__.App(argv=['network', 'remove']) as app:
             app.run()
 
+    def test_network_probe(self):
+        with capturer.CaptureOutput(relay=False) as capture_output:
+            with __main__.App(argv=['network', 'probe', '--size', '1m', '--count', '10']) as app:
+                app.run()
+        self.assertRegex(capture_output.get_text(), 'Throughput: [0-9.]+ MB/s')
+
+        with capturer.CaptureOutput(relay=False) as capture_output:
+            with __main__.App(argv=['network', 'probe', '--size', '1m', '--count', '10', '--json']) as app:
+                app.run()
+        result = json.loads(capture_output.get_text())
+        self.assertEqual(result['size'], 2 ** 20)
+
+        with __main__.App(argv=['network', 'remove']) as app:
+            app.run()
+
     def test_container(self):
         with __main__.App(argv=['container', '--help']) as app:
             with self.assertRaises(SystemExit):
@@ -94,9 +117,58 @@ class MainTestCase(unittest.TestCase):
         with __main__.App(argv=['container', 'build']) as app:
             app.run()
 
+        with __main__.App(argv=['container', 'build', '--cpus', '1', '--placement', 'numa', '--memory', '1g',
+                                '--ulimit', 'nofile=1024:2048', '--tmpfs', '/scratch:size=64m']) as app:
+            app.run()
+
+        with __main__.App(argv=['container', 'exec', '--all', '--', 'echo', 'abc']) as app:
+            app.run()
+            self.assertEqual(app.exit_code, 0)
+
+        with __main__.App(argv=['container', 'exec', '--json', '--', 'bash', '-c', 'exit 1']) as app:
+            app.run()
+            self.assertEqual(app.exit_code, 1)
+
+        with __main__.App(argv=['container', 'stats', '--json']) as app:
+            app.run()
+
+        with mock.patch('time.sleep', side_effect=KeyboardInterrupt):
+            with __main__.App(argv=['container', 'idle', '--timeout', '1h', '--action', 'stop']) as app:
+                app.run()
+
+        with __main__.App(argv=['container', 'build', '--replicas', '2', '--group', 'test-group']) as app:
+            app.run()
+
+        with __main__.App(argv=['container', 'exec', '--group', 'test-group', '--', 'hostname']) as app:
+            app.run()
+            self.assertEqual(app.exit_code, 0)
+
+        with capturer.CaptureOutput(relay=False) as capture_output:
+            with __main__.App(argv=['container', 'list', '--group', 'test-group']) as app:
+                app.run()
+            self.assertEqual(len(capture_output.get_text().split('\n')), 3)
+
+        with mock.patch('time.sleep', side_effect=KeyboardInterrupt):
+            with __main__.App(argv=['container', 'list', '--watch', '--json']) as app:
+                app.run()
+
+        with __main__.App(argv=['container', 'remove', '--group', 'test-group']) as app:
+            app.run()
+
         with __main__.App(argv=['container', 'remove']) as app:
             app.run()
 
+    def test_history(self):
+        with __main__.App(argv=['history', '--help']) as app:
+            with self.assertRaises(SystemExit):
+                app.run()
+
+        with __main__.App(argv=['history', 'peak', '--since', '7d']) as app:
+            app.run()
+
+        with __main__.App(argv=['history', 'commands', '--json']) as app:
+            app.run()
+
     def test_all(self):
         with __main__.App(argv=['pull']) as app:
             app.run()
@@ -110,5 +182,67 @@ class MainTestCase(unittest.TestCase):
         with __main__.App(argv=['remove']) as app:
             app.run()
 
+        with __main__.App(argv=['gc', '--dry-run']) as app:
+            app.run()
+
+        with __main__.App(argv=['gc', '--json', '--keep-tags', '1000', '--stopped-container-max-age', '3650d']) as app:
+            app.run()
+
         with __main__.App(argv=['pull']) as app:
             app.run()
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    """ Test that the command line program starts quickly because it doesn't import the manager
+    and its dependencies until they're needed
+    """
+
+    HEAVY_MODULES = ['configobj', 'dateutil', 'docker', 'docker_squash', 'git', 'jinja2', 'pkg_resources',
+                     'requests', 'requirements', 'wc_env_manager.core', 'wc_utils', 'yaml']
+
+    IMPORT_TIME_BUDGET = 0.2  # seconds
+
+    def test_heavy_modules_not_imported(self):
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            'import sys, wc_env_manager.__main__; print(" ".join(sorted(sys.modules.keys())))'])
+        modules = output.decode().split()
+        imported = [module for module in self.HEAVY_MODULES if module in modules]
+        self.assertEqual(imported, [])
+
+    def test_import_time(self):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import wc_env_manager.__main__'],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        cumulative_time = None
+        for line in result.stderr.decode().split('\n'):
+            match = re.match(r'^import time:\s*(\d+) \|\s*(\d+) \|\s*wc_env_manager\.__main__\s*$', line)
+            if match:
+                cumulative_time = int(match.group(2)) * 1e-6
+        self.assertIsNotNone(cumulative_time)
+        self.assertLess(cumulative_time, self.IMPORT_TIME_BUDGET)
+
+    def test_api(self):
+        import wc_env_manager
+        with self.assertRaisesRegex(AttributeError, 'has no attribute'):
+            wc_env_manager.undefined_attribute
+
+
+class DaemonTestCase(unittest.TestCase):
+
+    def test_not_running(self):
+        dirname = tempfile.mkdtemp()
+        socket_path = os.path.join(dirname, 'daemon.sock')
+        try:
+            for command in ['status', 'stop']:
+                with capturer.CaptureOutput(relay=False) as capture_output:
+                    with __main__.App(argv=['daemon', command, '--socket', socket_path]) as app:
+                        app.run()
+                        self.assertEqual(app.exit_code, 1)
+                    self.assertEqual(capture_output.get_text(), 'The daemon is not running')
+        finally:
+            shutil.rmtree(dirname)
+
+    def test_run(self):
+        with capturer.CaptureOutput(relay=False) as capture_output:
+            self.assertEqual(__main__.run(['daemon']), 0)
+            self.assertRegex(capture_output.get_text(), 'usage: wc-env-manager daemon')
@@ -0,0 +1,87 @@
+""" Tests for wc_env_manager.netprobe
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import json
+import socket
+import subprocess
+import sys
+import unittest
+import wc_env_manager.core
+import wc_env_manager.netprobe
+import whichcraft
+
+
+class NetworkProbeScriptsTestCase(unittest.TestCase):
+    def setUp(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        self.port = sock.getsockname()[1]
+        sock.close()
+
+        self.server = subprocess.Popen([sys.executable, '-c', wc_env_manager.netprobe.SERVER_SCRIPT, str(self.port)],
+                                       stdout=subprocess.PIPE)
+        self.assertEqual(self.server.stdout.readline().strip(), b'listening')
+
+    def tearDown(self):
+        self.server.kill()
+        self.server.wait()
+        self.server.stdout.close()
+
+    def test(self):
+        output = subprocess.check_output([sys.executable, '-c', wc_env_manager.netprobe.CLIENT_SCRIPT,
+                                          '127.0.0.1', str(self.port), str(3 * 2 ** 20 + 1), '20'])
+        result = json.loads(output.decode())
+        self.assertEqual(result['size'], 3 * 2 ** 20 + 1)
+        self.assertGreater(result['throughput'], 0)
+        self.assertGreater(result['latency_median'], 0)
+        self.assertGreaterEqual(result['latency_p99'], result['latency_median'])
+
+
+class NetworkProbeResultTestCase(unittest.TestCase):
+    def test(self):
+        result = wc_env_manager.netprobe.NetworkProbeResult('bridge', 50e-6, 120e-6, 1.5e9, 2 ** 28)
+        self.assertEqual(result.to_dict(), {
+            'driver': 'bridge',
+            'latency_median': 50e-6,
+            'latency_p99': 120e-6,
+            'throughput': 1.5e9,
+            'size': 2 ** 28,
+        })
+        self.assertEqual(result.format(), '\n'.join([
+            'Driver: bridge',
+            'Latency (median): 50.0 us',
+            'Latency (99th percentile): 120.0 us',
+            'Throughput: 1500.0 MB/s',
+        ]))
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class NetworkProbeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mgr = mgr = wc_env_manager.core.WcEnvManager()
+        mgr.config['network']['name'] = 'test_network__'
+        mgr.config['network']['containers'] = {}
+
+    def tearDown(self):
+        self.mgr.remove_network()
+
+    def test_bridge(self):
+        probe = wc_env_manager.netprobe.NetworkProbe(self.mgr, size='4m', count=10)
+        self.assertEqual(probe.size, 4 * 2 ** 20)
+        result = probe.run()
+        self.assertEqual(result.driver, 'bridge')
+        self.assertEqual(result.size, 4 * 2 ** 20)
+        self.assertGreater(result.throughput, 0)
+
+        self.assertEqual(self.mgr._docker_client.containers.list(all=True, filters={'name': 'wc_env_netprobe_'}), [])
+
+    def test_host(self):
+        self.mgr.config['network']['driver'] = 'host'
+        result = wc_env_manager.netprobe.NetworkProbe(self.mgr, size='4m', count=10).run()
+        self.assertEqual(result.driver, 'host')
+        self.assertGreater(result.throughput, 0)
@@ -0,0 +1,175 @@
+""" Tests for wc_env_manager.pipeline
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from fake_docker_engine import FakeDockerEngine
+import mock
+import threading
+import time
+import unittest
+import wc_env_manager.core
+import wc_env_manager.pipeline
+
+
+class PipelineTestCase(unittest.TestCase):
+    def test_run(self):
+        events = []
+        lock = threading.Lock()
+
+        def stage(name, duration, result):
+            def func(*args):
+                with lock:
+                    events.append(('start', name, args))
+                time.sleep(duration)
+                with lock:
+                    events.append(('end', name))
+                return result
+            return func
+
+        pipeline = wc_env_manager.pipeline.Pipeline()
+        pipeline.add_stage('a', stage('a', 0.1, 1))
+        pipeline.add_stage('b', stage('b', 0.01, 2))
+        pipeline.add_stage('c', stage('c', 0.01, 3), ['b'])
+        pipeline.add_stage('d', stage('d', 0.01, 4), ['a', 'c'])
+        results = pipeline.run()
+
+        self.assertEqual(results, {'a': 1, 'b': 2, 'c': 3, 'd': 4})
+
+        # independent stages run concurrently; dependent stages run after their dependencies
+        self.assertEqual(set(events[0:2]), set([('start', 'a', ()), ('start', 'b', ())]))
+        self.assertLess(events.index(('end', 'b')), events.index(('start', 'c', (2,))))
+        self.assertLess(events.index(('start', 'c', (2,))), events.index(('end', 'a')))
+        self.assertEqual(events[-2:], [('start', 'd', (1, 3)), ('end', 'd')])
+
+        self.assertGreaterEqual(pipeline.stages['a'].duration, 0.1)
+        self.assertGreaterEqual(pipeline.stages['d'].start, pipeline.stages['a'].end)
+        self.assertLess(pipeline.duration, 0.2)
+
+        self.assertEqual([stage.name for stage in pipeline.get_critical_path()], ['a', 'd'])
+        self.assertRegex(pipeline.format_critical_path(), r'^Critical path \(0\.\d s\): a \(0\.1 s\) -> d \(0\.0 s\)$')
+
+        table = pipeline.format_stages().split('\n')
+        self.assertEqual(table[0].split(), ['Stage', 'Start', '(s)', 'Time', '(s)', 'Critical'])
+        self.assertEqual(len(table), 5)
+        self.assertRegex(table[1], r'^[ab] ')
+        self.assertRegex(table[4], r'^d +\d+\.\d +\d+\.\d +\*$')
+
+        self.assertEqual(pipeline.stages['d'].to_dict()['dependencies'], ['a', 'c'])
+
+    def test_max_workers(self):
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def func():
+            with lock:
+                running.append(None)
+                max_running.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.pop()
+
+        pipeline = wc_env_manager.pipeline.Pipeline(max_workers=2)
+        for i in range(6):
+            pipeline.add_stage(str(i), func)
+        pipeline.run()
+        self.assertEqual(max(max_running), 2)
+
+    def test_error(self):
+        def fail():
+            time.sleep(0.01)
+            raise ValueError('stage failed')
+
+        slow = mock.Mock(side_effect=lambda: time.sleep(0.05))
+        after = mock.Mock()
+
+        pipeline = wc_env_manager.pipeline.Pipeline()
+        pipeline.add_stage('fail', fail)
+        pipeline.add_stage('slow', slow)
+        pipeline.add_stage('after_fail', after, ['fail'])
+        pipeline.add_stage('after_slow', after, ['slow'])
+        with self.assertRaisesRegex(ValueError, 'stage failed'):
+            pipeline.run()
+
+        slow.assert_called_once_with()
+        after.assert_not_called()
+        self.assertEqual(pipeline.stages['slow'].error, None)
+        self.assertIsNotNone(pipeline.stages['slow'].end)
+        self.assertEqual(str(pipeline.stages['fail'].error), 'stage failed')
+        self.assertEqual(pipeline.stages['fail'].to_dict()['error'], 'stage failed')
+        self.assertIsNone(pipeline.stages['after_slow'].start)
+        self.assertRegex(pipeline.format_stages(), r'after_slow +- +-')
+
+    def test_invalid_stages(self):
+        pipeline = wc_env_manager.pipeline.Pipeline()
+        pipeline.add_stage('a', lambda: None)
+        with self.assertRaisesRegex(ValueError, 'already has stage'):
+            pipeline.add_stage('a', lambda: None)
+        with self.assertRaisesRegex(ValueError, 'not a stage of the pipeline'):
+            pipeline.add_stage('b', lambda: None, ['c'])
+
+    def test_empty(self):
+        pipeline = wc_env_manager.pipeline.Pipeline()
+        self.assertEqual(pipeline.run(), {})
+        self.assertEqual(pipeline.get_critical_path(), [])
+
+
+class BuildAllTestCase(unittest.TestCase):
+    def test_build_all(self):
+        with FakeDockerEngine() as engine:
+            with engine.environ():
+                mgr = wc_env_manager.core.WcEnvManager({'verbose': False})
+
+        base_image_context = wc_env_manager.core.ImageContext('/tmp/base', '/tmp/base/Dockerfile', {})
+        image_context = wc_env_manager.core.ImageContext('/tmp/image', '/tmp/image/Dockerfile', {})
+        base_image = mock.Mock()
+        image = mock.Mock()
+        container = mock.Mock()
+        with mock.patch.object(mgr, 'remove_containers') as remove_containers, \
+                mock.patch.object(mgr, 'get_required_python_packages', return_value=['numpy']), \
+                mock.patch.object(mgr, 'prepare_base_image_context', return_value=base_image_context) as prepare_base, \
+                mock.patch.object(mgr, 'build_base_image', return_value=base_image) as build_base_image, \
+                mock.patch.object(mgr, 'prepare_image_context', return_value=image_context), \
+                mock.patch.object(mgr, 'build_image', return_value=image) as build_image, \
+                mock.patch.object(mgr, 'build_network') as build_network, \
+                mock.patch.object(mgr, 'build_container', return_value=container) as build_container:
+            pipeline = mgr.build_all()
+
+        remove_containers.assert_called_once_with()
+        prepare_base.assert_called_once_with(['numpy'])
+        build_base_image.assert_called_once_with(base_image_context)
+        build_image.assert_called_once_with(image_context)
+        build_network.assert_called_once_with()
+        build_container.assert_called_once_with()
+
+        stages = pipeline.stages
+        self.assertEqual(stages['build_container'].result, container)
+        self.assertGreaterEqual(stages['build_image'].start, stages['build_base_image'].end)
+        self.assertGreaterEqual(stages['build_container'].start, stages['remove_containers'].end)
+        self.assertEqual(pipeline.get_critical_path()[-1].name, 'build_container')
+
+    def test_build_all_removes_unused_contexts(self):
+        with FakeDockerEngine() as engine:
+            with engine.environ():
+                mgr = wc_env_manager.core.WcEnvManager({'verbose': False})
+
+        base_image_context = mock.Mock()
+        image_context = mock.Mock()
+        with mock.patch.object(mgr, 'remove_containers'), \
+                mock.patch.object(mgr, 'get_required_python_packages', return_value=['numpy']), \
+                mock.patch.object(mgr, 'prepare_base_image_context', return_value=base_image_context), \
+                mock.patch.object(mgr, 'build_base_image', side_effect=Exception('message')), \
+                mock.patch.object(mgr, 'prepare_image_context', return_value=image_context), \
+                mock.patch.object(mgr, 'build_image') as build_image, \
+                mock.patch.object(mgr, 'build_network'), \
+                mock.patch.object(mgr, 'build_container'):
+            with self.assertRaisesRegex(Exception, 'message'):
+                mgr.build_all()
+
+        build_image.assert_not_called()
+        base_image_context.remove.assert_not_called()
+        image_context.remove.assert_called_once_with()
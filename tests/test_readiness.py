@@ -0,0 +1,90 @@
+""" Tests for wc_env_manager.readiness
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import mock
+import socket
+import unittest
+import wc_env_manager.core
+import wc_env_manager.readiness
+
+
+def make_container(status='running', state=None, networks=None, logs=b''):
+    container = mock.Mock(status=status, attrs={
+        'State': state or {},
+        'NetworkSettings': {'Networks': networks or {}},
+    })
+    container.name = 'sidecar'
+    container.logs.return_value = logs
+    return container
+
+
+class ReadinessProbeTestCase(unittest.TestCase):
+    def test_from_config(self):
+        probe = wc_env_manager.readiness.ReadinessProbe.from_config({
+            'healthcheck': True, 'tcp_port': 5432, 'log_regex': 'ready', 'timeout': 10., 'interval': 1.,
+        })
+        self.assertEqual((probe.healthcheck, probe.tcp_port, probe.log_regex, probe.timeout, probe.interval),
+                         (True, 5432, 'ready', 10., 1.))
+
+        probe = wc_env_manager.readiness.ReadinessProbe.from_config({})
+        self.assertEqual((probe.healthcheck, probe.tcp_port, probe.log_regex, probe.timeout),
+                         (False, None, None, 60.))
+
+    def test_status(self):
+        probe = wc_env_manager.readiness.ReadinessProbe()
+        self.assertTrue(probe.is_ready(make_container()))
+        self.assertFalse(probe.is_ready(make_container(status='created')))
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'exited with code 1:\n  error'):
+            probe.is_ready(make_container(status='exited', state={'ExitCode': 1}, logs=b'error'))
+
+    def test_healthcheck(self):
+        probe = wc_env_manager.readiness.ReadinessProbe(healthcheck=True)
+        self.assertTrue(probe.is_ready(make_container(state={'Health': {'Status': 'healthy'}})))
+        self.assertFalse(probe.is_ready(make_container(state={'Health': {'Status': 'starting'}})))
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'is unhealthy'):
+            probe.is_ready(make_container(state={'Health': {'Status': 'unhealthy'}}))
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'has no healthcheck'):
+            probe.is_ready(make_container())
+
+    def test_tcp_port(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+
+        probe = wc_env_manager.readiness.ReadinessProbe(tcp_port=port, interval=0.1)
+        networks = {'other': {'IPAddress': '127.0.0.2'}, 'wc': {'IPAddress': '127.0.0.1'}}
+        self.assertTrue(probe.is_ready(make_container(networks=networks), network='wc'))
+        self.assertFalse(probe.is_ready(make_container(networks={'wc': {'IPAddress': ''}}), network='wc'))
+
+        server.close()
+        self.assertFalse(probe.is_ready(make_container(networks=networks), network='wc'))
+
+    def test_get_ip_address(self):
+        get_ip_address = wc_env_manager.readiness.ReadinessProbe.get_ip_address
+        networks = {'a': {'IPAddress': ''}, 'b': {'IPAddress': '172.18.0.2'}}
+        self.assertEqual(get_ip_address(make_container(networks=networks), 'b'), '172.18.0.2')
+        self.assertEqual(get_ip_address(make_container(networks=networks), 'a'), None)
+        self.assertEqual(get_ip_address(make_container(networks=networks)), '172.18.0.2')
+        self.assertEqual(get_ip_address(make_container()), None)
+
+    def test_log_regex(self):
+        probe = wc_env_manager.readiness.ReadinessProbe(log_regex=r'^ready to accept connections$')
+        self.assertTrue(probe.is_ready(make_container(logs=b'starting\nready to accept connections\n')))
+        self.assertFalse(probe.is_ready(make_container(logs=b'starting\n')))
+
+    def test_wait(self):
+        container = make_container(logs=b'')
+        container.logs.side_effect = [b'', b'', b'ready']
+        probe = wc_env_manager.readiness.ReadinessProbe(log_regex='ready', timeout=10., interval=0.01)
+        probe.wait(container)
+        self.assertEqual(container.logs.call_count, 3)
+
+        probe = wc_env_manager.readiness.ReadinessProbe(log_regex='ready', timeout=0.05, interval=0.01)
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'was not ready within 0.05 s'):
+            probe.wait(make_container())
@@ -0,0 +1,296 @@
+""" Tests for wc_env_manager.resources
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import wc_env_manager.core
+import wc_env_manager.resources
+import whichcraft
+
+
+def make_resource_config(**kwargs):
+    config = {
+        'cpus': None,
+        'cpuset_cpus': None,
+        'placement': 'none',
+        'mem_limit': None,
+        'shm_size': None,
+        'blkio_weight': None,
+        'ulimits': {},
+        'tmpfs': {},
+    }
+    config.update(kwargs)
+    return config
+
+
+class ResourcesTestCase(unittest.TestCase):
+    def test_parse_cpu_list(self):
+        self.assertEqual(wc_env_manager.resources.parse_cpu_list('0-3,8,10-11'), [0, 1, 2, 3, 8, 10, 11])
+        self.assertEqual(wc_env_manager.resources.parse_cpu_list(' 5,1-2 \n'), [1, 2, 5])
+        self.assertEqual(wc_env_manager.resources.parse_cpu_list(''), [])
+        self.assertEqual(wc_env_manager.resources.parse_cpu_list(None), [])
+        with self.assertRaisesRegex(ValueError, 'Invalid list'):
+            wc_env_manager.resources.parse_cpu_list('a')
+        with self.assertRaisesRegex(ValueError, 'Invalid list'):
+            wc_env_manager.resources.parse_cpu_list('3-1')
+
+    def test_format_cpu_list(self):
+        self.assertEqual(wc_env_manager.resources.format_cpu_list([11, 0, 1, 2, 3, 8, 10]), '0-3,8,10-11')
+        self.assertEqual(wc_env_manager.resources.format_cpu_list([4]), '4')
+        self.assertEqual(wc_env_manager.resources.format_cpu_list([]), '')
+
+    def test_get_numa_nodes(self):
+        temp_dir_name = tempfile.mkdtemp()
+        for i_node, cpulist in [(0, '0-3,8-11'), (1, '4-7,12-15'), (10, '16')]:
+            os.mkdir(os.path.join(temp_dir_name, 'node{}'.format(i_node)))
+            with open(os.path.join(temp_dir_name, 'node{}'.format(i_node), 'cpulist'), 'w') as file:
+                file.write(cpulist + '\n')
+        os.mkdir(os.path.join(temp_dir_name, 'node2'))
+        os.mkdir(os.path.join(temp_dir_name, 'power'))
+
+        self.assertEqual(wc_env_manager.resources.get_numa_nodes(temp_dir_name), [
+            [0, 1, 2, 3, 8, 9, 10, 11],
+            [4, 5, 6, 7, 12, 13, 14, 15],
+            [16],
+        ])
+
+        self.assertEqual(wc_env_manager.resources.get_numa_node_ids(temp_dir_name), [0, 1, 10])
+
+        shutil.rmtree(temp_dir_name)
+
+        # no NUMA nodes
+        self.assertIsNone(wc_env_manager.resources.get_numa_node_ids(temp_dir_name))
+        nodes = wc_env_manager.resources.get_numa_nodes(temp_dir_name)
+        self.assertEqual(len(nodes), 1)
+        self.assertGreater(len(nodes[0]), 0)
+
+    def test_allocate_cpuset(self):
+        nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+        self.assertEqual(wc_env_manager.resources.allocate_cpuset(2, nodes), [0, 1])
+        self.assertEqual(wc_env_manager.resources.allocate_cpuset(2, nodes, used_cpus={0, 1}), [4, 5])
+        self.assertEqual(wc_env_manager.resources.allocate_cpuset(3, nodes, used_cpus={0, 1}), [4, 5, 6])
+        self.assertEqual(wc_env_manager.resources.allocate_cpuset(2, nodes, used_cpus={0, 1, 4, 5, 6}), [2, 3])
+
+        # spread containers across the nodes
+        used_cpus = set()
+        cpusets = []
+        for _ in range(4):
+            cpusets.append(wc_env_manager.resources.allocate_cpuset(2, nodes, used_cpus=used_cpus))
+            used_cpus.update(cpusets[-1])
+        self.assertEqual(cpusets, [[0, 1], [4, 5], [2, 3], [6, 7]])
+
+        # span nodes
+        self.assertEqual(wc_env_manager.resources.allocate_cpuset(4, nodes, used_cpus={0, 1, 4}), [2, 5, 6, 7])
+
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'only 2 of the 8 CPUs'):
+            wc_env_manager.resources.allocate_cpuset(3, nodes, used_cpus={0, 1, 2, 3, 4, 5})
+
+    def test_parse_ulimit(self):
+        ulimit = wc_env_manager.resources.parse_ulimit('nofile', '65536')
+        self.assertEqual((ulimit.name, ulimit.soft, ulimit.hard), ('nofile', 65536, 65536))
+
+        ulimit = wc_env_manager.resources.parse_ulimit('nofile', '1024:65536')
+        self.assertEqual((ulimit.name, ulimit.soft, ulimit.hard), ('nofile', 1024, 65536))
+
+        ulimit = wc_env_manager.resources.parse_ulimit('memlock', '-1')
+        self.assertEqual((ulimit.soft, ulimit.hard), (-1, -1))
+
+        with self.assertRaisesRegex(ValueError, 'Invalid limit'):
+            wc_env_manager.resources.parse_ulimit('nofile', 'unlimited')
+
+    def test_get_container_run_args(self):
+        self.assertEqual(wc_env_manager.resources.get_container_run_args(make_resource_config()), {})
+
+        args = wc_env_manager.resources.get_container_run_args(make_resource_config(
+            cpus=1.5, cpuset_cpus='3,0-1', mem_limit='16g', shm_size='1g', blkio_weight=500,
+            ulimits={'nofile': '65536'}, tmpfs={'/scratch': 'size=8g'}))
+        ulimits = args.pop('ulimits')
+        self.assertEqual(args, {
+            'nano_cpus': 1500000000,
+            'cpuset_cpus': '0-1,3',
+            'mem_limit': '16g',
+            'shm_size': '1g',
+            'blkio_weight': 500,
+            'tmpfs': {'/scratch': 'size=8g'},
+        })
+        self.assertEqual([(ulimit.name, ulimit.soft) for ulimit in ulimits], [('nofile', 65536)])
+
+    def test_get_container_run_args_numa(self):
+        nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+        args = wc_env_manager.resources.get_container_run_args(
+            make_resource_config(cpus=2.5, placement='numa'), used_cpus={0}, numa_nodes=nodes)
+        self.assertEqual(args['cpuset_cpus'], '4-6')
+        self.assertEqual(args['cpuset_mems'], '1')
+        self.assertEqual(args['nano_cpus'], 2500000000)
+
+        # two containers are placed on different nodes, with their memory bound to their nodes
+        used_cpus = set()
+        placements = []
+        for _ in range(2):
+            args = wc_env_manager.resources.get_container_run_args(
+                make_resource_config(cpus=2, placement='numa'), used_cpus=used_cpus,
+                numa_nodes=nodes, numa_node_ids=[0, 2])
+            used_cpus.update(wc_env_manager.resources.parse_cpu_list(args['cpuset_cpus']))
+            placements.append((args['cpuset_cpus'], args['cpuset_mems']))
+        self.assertEqual(placements, [('0-1', '0'), ('4-5', '2')])
+
+        # containers which span nodes are bound to the memory of each of their nodes
+        args = wc_env_manager.resources.get_container_run_args(
+            make_resource_config(cpus=6, placement='numa'), numa_nodes=nodes)
+        self.assertEqual(args['cpuset_cpus'], '0-5')
+        self.assertEqual(args['cpuset_mems'], '0-1')
+
+        # explicit CPUs take precedence over the placement
+        args = wc_env_manager.resources.get_container_run_args(
+            make_resource_config(cpus=2, cpuset_cpus='6-7', placement='numa'), used_cpus={6}, numa_nodes=nodes)
+        self.assertEqual(args['cpuset_cpus'], '6-7')
+        self.assertNotIn('cpuset_mems', args)
+
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'requires a number of CPUs'):
+            wc_env_manager.resources.get_container_run_args(
+                make_resource_config(placement='numa'), numa_nodes=nodes)
+
+    def test_get_pinned_cpus(self):
+        class Container(object):
+            def __init__(self, cpuset_cpus):
+                self.attrs = {'HostConfig': {'CpusetCpus': cpuset_cpus}}
+
+        self.assertEqual(wc_env_manager.resources.get_pinned_cpus([
+            Container('0-1'), Container(''), Container('4,6'),
+        ]), {0, 1, 4, 6})
+
+    def test_get_allocated_cpus(self):
+        self.assertEqual(wc_env_manager.resources.get_allocated_cpus(), None)
+        self.assertEqual(wc_env_manager.resources.get_allocated_cpus(nano_cpus=4000000000), 4)
+        self.assertEqual(wc_env_manager.resources.get_allocated_cpus(nano_cpus=2500000000), 2)
+        self.assertEqual(wc_env_manager.resources.get_allocated_cpus(nano_cpus=500000000), 1)
+        self.assertEqual(wc_env_manager.resources.get_allocated_cpus(cpu_quota=300000, cpu_period=100000), 3)
+        self.assertEqual(wc_env_manager.resources.get_allocated_cpus(cpu_quota=-1), None)
+        self.assertEqual(wc_env_manager.resources.get_allocated_cpus(cpuset_cpus='0-7'), 8)
+        self.assertEqual(wc_env_manager.resources.get_allocated_cpus(nano_cpus=4000000000, cpuset_cpus='0-1'), 2)
+
+    def test_get_container_allocated_cpus(self):
+        class Container(object):
+            def __init__(self, host_config):
+                self.attrs = {'HostConfig': host_config}
+
+        self.assertEqual(wc_env_manager.resources.get_container_allocated_cpus(Container({
+            'NanoCpus': 0, 'CpuQuota': 0, 'CpuPeriod': 0, 'CpusetCpus': '',
+        })), None)
+        self.assertEqual(wc_env_manager.resources.get_container_allocated_cpus(Container({
+            'NanoCpus': 6000000000, 'CpusetCpus': '0-7',
+        })), 6)
+
+    def test_get_thread_env(self):
+        self.assertEqual(wc_env_manager.resources.get_thread_env(None), {})
+
+        env = wc_env_manager.resources.get_thread_env(4)
+        self.assertEqual(set(env.keys()), set(wc_env_manager.resources.THREAD_ENV_VARS))
+        self.assertEqual(env['OMP_NUM_THREADS'], '4')
+        self.assertEqual(env['NUMEXPR_MAX_THREADS'], '4')
+
+        env = wc_env_manager.resources.get_thread_env(4, {'OMP_NUM_THREADS': '1'})
+        self.assertNotIn('OMP_NUM_THREADS', env)
+        self.assertEqual(env['MKL_NUM_THREADS'], '4')
+
+        env = wc_env_manager.resources.get_thread_env(4, ['PATH=/bin', 'MKL_NUM_THREADS=2'])
+        self.assertNotIn('MKL_NUM_THREADS', env)
+        self.assertEqual(env['OMP_NUM_THREADS'], '4')
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class ContainerResourcesTestCase(unittest.TestCase):
+    def setUp(self):
+        mgr = self.mgr = wc_env_manager.core.WcEnvManager()
+        mgr.pull_image(mgr.config['base_image']['repo'], mgr.config['base_image']['tags'])
+
+        mgr.config['image']['tags'] = ['test']
+        mgr.config['image']['python_packages'] = ''
+        mgr.build_image()
+
+        mgr.config['network']['name'] = '__test__'
+        mgr.config['network']['containers'] = {}
+        mgr.config['container']['paths_to_mount'] = {}
+
+    def tearDown(self):
+        mgr = self.mgr
+        mgr.remove_containers(force=True)
+        mgr.remove_network()
+        mgr.remove_image(mgr.config['image']['repo'], mgr.config['image']['tags'])
+
+    def test(self):
+        mgr = self.mgr
+        mgr.config['container']['resources'].update({
+            'cpus': 1.,
+            'placement': 'numa',
+            'mem_limit': '512m',
+            'shm_size': '128m',
+            'ulimits': {'nofile': '1024:2048'},
+            'tmpfs': {'/scratch': 'size=64m'},
+        })
+        container = mgr.build_container()
+        container.reload()
+        host_config = container.attrs['HostConfig']
+        self.assertEqual(host_config['NanoCpus'], 1000000000)
+        self.assertEqual(len(wc_env_manager.resources.parse_cpu_list(host_config['CpusetCpus'])), 1)
+        self.assertEqual(host_config['Memory'], 512 * 1024 * 1024)
+        self.assertEqual(host_config['ShmSize'], 128 * 1024 * 1024)
+        self.assertEqual(host_config['Tmpfs'], {'/scratch': 'size=64m'})
+
+        output, _ = mgr.run_process_in_container(['bash', '-c', 'ulimit -Sn; ulimit -Hn'])
+        self.assertEqual(output, '1024\n2048')
+
+    def test_wake_repins_container(self):
+        mgr = self.mgr
+        mgr.config['container']['resources'].update({'cpus': 1., 'placement': 'numa'})
+        container_1 = mgr.build_container()
+        container_1.stop()
+
+        # the CPU of the stopped container isn't reserved
+        container_2 = mgr.build_container()
+        container_1.reload()
+        container_2.reload()
+        cpus_1 = container_1.attrs['HostConfig']['CpusetCpus']
+        cpus_2 = container_2.attrs['HostConfig']['CpusetCpus']
+        self.assertEqual(cpus_1, cpus_2)
+
+        # the stopped container is re-pinned when it is restarted
+        self.assertTrue(mgr.wake_container(container_1))
+        self.assertNotEqual(container_1.attrs['HostConfig']['CpusetCpus'], cpus_2)
+
+    def test_thread_env(self):
+        mgr = self.mgr
+        mgr.config['container']['environment'] = {'MKL_NUM_THREADS': '1'}
+        mgr.config['container']['resources']['cpus'] = 2.
+        mgr.build_container()
+
+        output, _ = mgr.run_process_in_container(['bash', '-c', 'echo $OMP_NUM_THREADS $MKL_NUM_THREADS'])
+        self.assertEqual(output, '2 1')
+
+        output, _ = mgr.run_process_in_container(['bash', '-c', 'echo $OMP_NUM_THREADS'],
+                                                 env={'OMP_NUM_THREADS': '8'})
+        self.assertEqual(output, '8')
+
+        with mgr.open_session() as session:
+            self.assertEqual(session.run('echo $NUMBA_NUM_THREADS').output, '2')
+
+        # containers which were created without the variables
+        container = mgr._docker_client.containers.run(
+            mgr.config['image']['repo'] + ':' + mgr.config['image']['tags'][0],
+            name=mgr.make_container_name(), entrypoint=[], command='bash', stdin_open=True, tty=True,
+            detach=True, cpuset_cpus='0', network=mgr.config['network']['name'])
+        output, _ = mgr.run_process_in_container(['bash', '-c', 'echo $OPENBLAS_NUM_THREADS'], container=container)
+        self.assertEqual(output, '1')
+
+        mgr.config['container']['resources']['thread_env'] = False
+        output, _ = mgr.run_process_in_container(['bash', '-c', 'echo $OPENBLAS_NUM_THREADS'], container=container)
+        self.assertEqual(output, '')
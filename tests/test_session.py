@@ -0,0 +1,141 @@
+""" Tests for wc_env_manager.session
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import socket
+import struct
+import time
+import unittest
+import wc_env_manager.core
+import wc_env_manager.session
+import whichcraft
+
+
+class ContainerSessionFramingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.socket, self.other_socket = socket.socketpair()
+        self.session = wc_env_manager.session.ContainerSession.__new__(wc_env_manager.session.ContainerSession)
+        self.session._socket = self.socket
+        self.session._raw_socket = self.socket
+        self.session._marker = b'__marker__'
+        self.session._closed = False
+
+    def tearDown(self):
+        self.socket.close()
+        self.other_socket.close()
+
+    def write_frames(self, *frames):
+        for stream, data in frames:
+            self.other_socket.sendall(struct.pack('>BxxxL', stream, len(data)) + data)
+
+    def test_read_until_markers(self):
+        # markers split across interleaved frames
+        self.write_frames(
+            (1, b'abc\n'),
+            (2, b'def\n'),
+            (1, b'\n__mar'),
+            (2, b'\n__marker'),
+            (1, b'ker__ 3\n'),
+            (2, b'__\n'),
+        )
+        self.assertEqual(self.session._read_until_markers(), ('abc\ndef', 3))
+
+        # no output
+        self.write_frames(
+            (1, b'\n__marker__ 0\n'),
+            (2, b'\n__marker__\n'),
+        )
+        self.assertEqual(self.session._read_until_markers(), ('', 0))
+
+    def test_read_until_markers_shell_exited(self):
+        self.write_frames((1, b'abc\n'))
+        self.other_socket.shutdown(socket.SHUT_WR)
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'Shell of session exited'):
+            self.session._read_until_markers()
+        self.assertTrue(self.session._closed)
+
+    def test_invalid_env(self):
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'invalid: 1KEY, KEY;rm'):
+            self.session.run('echo $KEY', env={'KEY': 'val', 'KEY;rm': 'val', '1KEY': 'val', '_KEY_2': 'val'})
+
+    def test_get_raw_socket(self):
+        get_raw_socket = wc_env_manager.session.ContainerSession._get_raw_socket
+
+        # socket of a response of docker-py
+        socket_io = socket.SocketIO(self.socket, 'rwb')
+        self.assertIs(get_raw_socket(socket_io), self.socket)
+
+        # raw socket (e.g., of an npipe)
+        self.assertIs(get_raw_socket(self.socket), self.socket)
+
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, "can't be written"):
+            get_raw_socket(object())
+
+    def test_trim_frames(self):
+        frames = [(1, b'ab'), (2, b'cd'), (1, b'ef')]
+        wc_env_manager.session.ContainerSession._trim_frames(frames, 1, 3)
+        self.assertEqual(frames, [(1, b'a'), (2, b'cd'), (1, b'')])
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class ContainerSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        mgr = self.mgr = wc_env_manager.core.WcEnvManager()
+        mgr.pull_image(mgr.config['base_image']['repo'], mgr.config['base_image']['tags'])
+
+        mgr.config['image']['tags'] = ['test']
+        mgr.config['image']['python_packages'] = ''
+        mgr.build_image()
+
+        mgr.config['network']['name'] = '__test__'
+        mgr.config['network']['containers'] = {}
+        mgr.config['container']['paths_to_mount'] = {}
+        mgr.build_container()
+
+    def tearDown(self):
+        mgr = self.mgr
+        mgr.remove_containers(force=True)
+        mgr.remove_network()
+        mgr.remove_image(mgr.config['image']['repo'], mgr.config['image']['tags'])
+
+    def test(self):
+        mgr = self.mgr
+
+        with mgr.open_session() as session:
+            result = session.run(['echo', 'abc'])
+            self.assertIsInstance(result, wc_env_manager.core.ContainerProcessResult)
+            self.assertEqual(result.output, 'abc')
+            self.assertEqual(result.exit_code, 0)
+            self.assertGreater(result.duration, 0.)
+
+            # state persists between commands
+            session.run('cd /tmp && export KEY=val')
+            self.assertEqual(session.run('pwd; echo $KEY').output, '/tmp\nval')
+
+            # working directory and environment for individual commands
+            self.assertEqual(session.run('pwd; echo $KEY2', work_dir='/root', env={'KEY2': 'val 2'}).output,
+                             '/root\nval 2')
+            self.assertEqual(session.run('pwd').output, '/tmp')
+
+            # errors
+            result = session.run('echo def >&2; exit_code() { return 3; }; exit_code', check=False)
+            self.assertEqual(result.exit_code, 3)
+            self.assertEqual(result.output, 'def')
+            with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, '  exit code: 126'):
+                session.run('/etc')
+
+            # sequence of commands
+            results = session.run_many([['echo', str(i)] for i in range(10)])
+            self.assertEqual([result.output for result in results], [str(i) for i in range(10)])
+
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'closed'):
+            session.run(['echo', 'abc'])
+
+        # shell exits
+        with mgr.open_session() as session:
+            with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'exited'):
+                session.run('exit 1')
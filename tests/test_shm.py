@@ -0,0 +1,100 @@
+""" Tests for wc_env_manager.shm
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import numpy
+import os
+import shutil
+import tempfile
+import unittest
+import wc_env_manager.shm
+
+
+class SharedBufferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_publish_attach_array(self):
+        array = numpy.arange(12, dtype='float64').reshape((3, 4))
+        with wc_env_manager.shm.publish('state', array, path=self.path) as published:
+            self.assertTrue(published.published)
+            self.assertEqual(wc_env_manager.shm.list_buffers(self.path), ['state'])
+
+            with wc_env_manager.shm.attach('state', path=self.path) as attached:
+                self.assertEqual(attached.shape, (3, 4))
+                self.assertEqual(attached.dtype, numpy.dtype('float64').str)
+                self.assertEqual(attached.nbytes, 96)
+                self.assertEqual(attached._offset % wc_env_manager.shm.ALIGNMENT, 0)
+
+                view = attached.as_array()
+                numpy.testing.assert_array_equal(view, array)
+                self.assertFalse(view.flags.writeable)
+
+                # the attached buffer is a view of the published buffer, rather than a copy
+                published_view = published.as_array()
+                published_view[0, 0] = -1.
+                self.assertEqual(view[0, 0], -1.)
+                del view, published_view
+
+        # published buffers persist until they are unlinked
+        self.assertEqual(wc_env_manager.shm.list_buffers(self.path), ['state'])
+        wc_env_manager.shm.unlink('state', path=self.path)
+        wc_env_manager.shm.unlink('state', path=self.path)
+        self.assertEqual(wc_env_manager.shm.list_buffers(self.path), [])
+
+    def test_publish_attach_bytes(self):
+        wc_env_manager.shm.publish('raw', b'abc', path=self.path).close()
+        with wc_env_manager.shm.attach('raw', path=self.path, writable=True) as buffer:
+            self.assertEqual(buffer.dtype, None)
+            self.assertEqual(buffer.shape, (3,))
+            self.assertEqual(bytes(buffer.buffer), b'abc')
+            buffer.buffer[0:1] = b'x'
+        with wc_env_manager.shm.attach('raw', path=self.path) as buffer:
+            self.assertEqual(bytes(buffer.buffer), b'xbc')
+
+        wc_env_manager.shm.publish('empty', b'', path=self.path).close()
+        with wc_env_manager.shm.attach('empty', path=self.path) as buffer:
+            self.assertEqual(bytes(buffer.buffer), b'')
+
+    def test_create(self):
+        buffer = wc_env_manager.shm.create('state', shape=(2, 2), dtype='int32', path=self.path)
+
+        # unpublished buffers can't be attached
+        self.assertEqual(wc_env_manager.shm.list_buffers(self.path), [])
+        with self.assertRaises(FileNotFoundError):
+            wc_env_manager.shm.attach('state', path=self.path)
+
+        array = buffer.as_array()
+        array[:] = [[1, 2], [3, 4]]
+        del array
+        buffer.publish()
+        buffer.publish()
+        buffer.close()
+
+        with wc_env_manager.shm.attach('state', path=self.path) as buffer:
+            numpy.testing.assert_array_equal(buffer.as_array(), [[1, 2], [3, 4]])
+
+        # names are unique
+        with self.assertRaises(FileExistsError):
+            wc_env_manager.shm.publish('state', numpy.zeros(1), path=self.path)
+        self.assertEqual(os.listdir(self.path), [wc_env_manager.shm.PREFIX + 'state'])
+
+        # unpublished buffers are removed when they are closed
+        wc_env_manager.shm.create('other', shape=10, path=self.path).close()
+        self.assertEqual(os.listdir(self.path), [wc_env_manager.shm.PREFIX + 'state'])
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, 'Invalid name'):
+            wc_env_manager.shm.create('a/b', shape=1, path=self.path)
+
+        with open(os.path.join(self.path, wc_env_manager.shm.PREFIX + 'other'), 'wb') as file:
+            file.write(b'\0' * 100)
+        with self.assertRaisesRegex(ValueError, 'is not a shared buffer'):
+            wc_env_manager.shm.attach('other', path=self.path)
@@ -0,0 +1,297 @@
+""" Tests for wc_env_manager.slimming
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from fake_docker_engine import FakeDockerEngine
+import capturer
+import copy
+import docker
+import docker.models.images
+import mock
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import wc_env_manager.core
+import wc_env_manager.slimming
+import whichcraft
+
+SLIM_CONFIG = {
+    'enabled': True,
+    'strip_debug_symbols': True,
+    'remove_static_libraries': True,
+    'remove_headers': True,
+    'remove_caches': True,
+    'compile_bytecode': True,
+    'paths': ['/usr/local', '/opt/coin-or'],
+    'header_paths': ['/usr/local/include', '/opt/coin-or/*/include'],
+    'keep_headers': ['python*'],
+    'cache_paths': ['/root/.cache/pip', '/var/cache/apt/archives/*.deb', '/var/lib/apt/lists/*'],
+    'python': 'python3',
+    'smoke_test_modules': ['numpy'],
+}
+
+
+def make_manager(verbose=False, **build_args):
+    return mock.Mock(config={
+        'verbose': verbose,
+        'base_image': {'build_args': build_args, 'slim': copy.deepcopy(SLIM_CONFIG)},
+    })
+
+
+def write_file(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(b'x' * size)
+
+
+class ScriptTestCase(unittest.TestCase):
+    """ Run the slimming script on a directory which mimics the installations of the base image """
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def make_slimmer(self, **config):
+        slimmer = wc_env_manager.slimming.ImageSlimmer(make_manager())
+        slimmer.config.update(config)
+        return slimmer
+
+    def run_script(self, slimmer):
+        output = subprocess.check_output(['bash', '-c', slimmer.get_script()]).decode()
+        return wc_env_manager.slimming.parse_script_output(output)
+
+    def test_remove_files(self):
+        local = os.path.join(self.dirname, 'usr', 'local')
+        coin_or = os.path.join(self.dirname, 'opt', 'coin-or')
+        write_file(os.path.join(local, 'lib', 'libsundials_cvode.a'), 1000)
+        write_file(os.path.join(local, 'lib', 'libsundials_cvode.so'), 100)
+        write_file(os.path.join(local, 'include', 'cvode', 'cvode.h'), 200)
+        write_file(os.path.join(local, 'include', 'python3.7m', 'Python.h'), 300)
+        write_file(os.path.join(coin_or, 'qpoases', 'include', 'qpOASES.hpp'), 400)
+        write_file(os.path.join(coin_or, 'qpoases', 'lib', 'libqpOASES.a'), 500)
+        write_file(os.path.join(self.dirname, 'root', '.cache', 'pip', 'wheels', 'numpy.whl'), 600)
+        write_file(os.path.join(self.dirname, 'var', 'cache', 'apt', 'archives', 'gcc.deb'), 700)
+        os.makedirs(os.path.join(self.dirname, 'var', 'cache', 'apt', 'archives', 'partial'))
+
+        slimmer = self.make_slimmer(
+            strip_debug_symbols=False,
+            compile_bytecode=False,
+            paths=[local, coin_or],
+            header_paths=[os.path.join(local, 'include'), os.path.join(coin_or, '*', 'include')],
+            cache_paths=[os.path.join(self.dirname, 'root', '.cache', 'pip'),
+                         os.path.join(self.dirname, 'var', 'cache', 'apt', 'archives', '*.deb'),
+                         os.path.join(self.dirname, 'var', 'lib', 'apt', 'lists', '*')])
+        steps, log = self.run_script(slimmer)
+
+        self.assertEqual([step.name for step in steps], ['remove_static_libraries', 'remove_headers', 'remove_caches'])
+        self.assertGreaterEqual(steps[0].saved, 1500)
+        self.assertGreaterEqual(steps[1].saved, 600)
+        self.assertGreaterEqual(steps[2].saved, 1300)
+        self.assertEqual(log, '')
+
+        self.assertFalse(os.path.isfile(os.path.join(local, 'lib', 'libsundials_cvode.a')))
+        self.assertTrue(os.path.isfile(os.path.join(local, 'lib', 'libsundials_cvode.so')))
+        self.assertFalse(os.path.isdir(os.path.join(local, 'include', 'cvode')))
+        self.assertTrue(os.path.isfile(os.path.join(local, 'include', 'python3.7m', 'Python.h')))
+        self.assertEqual(os.listdir(os.path.join(coin_or, 'qpoases', 'include')), [])
+        self.assertEqual(os.listdir(os.path.join(coin_or, 'qpoases', 'lib')), [])
+        self.assertFalse(os.path.isdir(os.path.join(self.dirname, 'root', '.cache', 'pip')))
+        self.assertEqual(os.listdir(os.path.join(self.dirname, 'var', 'cache', 'apt', 'archives')), ['partial'])
+
+    @unittest.skipIf(whichcraft.which('gcc') is None or whichcraft.which('strip') is None,
+                     'Test requires gcc and strip')
+    def test_strip_debug_symbols(self):
+        local = os.path.join(self.dirname, 'usr', 'local')
+        os.makedirs(os.path.join(local, 'lib'))
+        source_path = os.path.join(self.dirname, 'lib.c')
+        with open(source_path, 'w') as file:
+            file.write('int add(int a, int b) { return a + b; }\n')
+        lib_path = os.path.join(local, 'lib', 'libadd.so.1')
+        subprocess.check_call(['gcc', '-g', '-shared', '-fPIC', '-o', lib_path, source_path])
+        write_file(os.path.join(local, 'bin', 'script'), 10)
+        os.chmod(os.path.join(local, 'bin', 'script'), 0o755)
+        size = os.path.getsize(lib_path)
+
+        slimmer = self.make_slimmer(remove_static_libraries=False, remove_headers=False, remove_caches=False,
+                                    compile_bytecode=False, paths=[local])
+        steps, _ = self.run_script(slimmer)
+
+        self.assertEqual([step.name for step in steps], ['strip_debug_symbols'])
+        self.assertLess(os.path.getsize(lib_path), size)
+        self.assertEqual(steps[0].saved, size - os.path.getsize(lib_path))
+        self.assertEqual(os.path.getsize(os.path.join(local, 'bin', 'script')), 10)
+
+    def test_compile_bytecode(self):
+        lib_dir = os.path.join(self.dirname, 'lib', 'python3')
+        write_file(os.path.join(lib_dir, '__pycache__', 'old.cpython-37.opt-1.pyc'), 1000)
+        write_file(os.path.join(lib_dir, 'site-packages', 'pkg', '__pycache__', 'mod.cpython-37.opt-2.pyc'), 1000)
+        with open(os.path.join(lib_dir, 'site-packages', 'pkg', 'mod.py'), 'w') as file:
+            file.write('x = 1\n')
+
+        # a Python which reports the temporary directory as its standard library and site packages
+        python_path = os.path.join(self.dirname, 'python')
+        with open(python_path, 'w') as file:
+            file.write('#!/bin/bash\n')
+            file.write('if [ "$1" = "-c" ]; then echo "{} {}"; else exec {} "$@"; fi\n'.format(
+                lib_dir, os.path.join(lib_dir, 'site-packages'), sys.executable))
+        os.chmod(python_path, 0o755)
+
+        slimmer = self.make_slimmer(strip_debug_symbols=False, remove_static_libraries=False, remove_headers=False,
+                                    remove_caches=False, python=python_path)
+        steps, _ = self.run_script(slimmer)
+
+        self.assertEqual([step.name for step in steps], ['compile_bytecode'])
+        self.assertGreater(steps[0].saved, 0)
+        self.assertFalse(os.path.isdir(os.path.join(lib_dir, '__pycache__')))
+        pycache = os.listdir(os.path.join(lib_dir, 'site-packages', 'pkg', '__pycache__'))
+        self.assertEqual(len(pycache), 1)
+        self.assertRegex(pycache[0], r'^mod\.cpython-\d+\.pyc$')
+        with open(os.path.join(lib_dir, 'site-packages', 'pkg', '__pycache__', pycache[0]), 'rb') as file:
+            flags = int.from_bytes(file.read(8)[4:8], 'little')
+        self.assertEqual(flags, 0b01)  # unchecked hash-based bytecode
+
+    def test_parse_script_output(self):
+        steps, log = wc_env_manager.slimming.parse_script_output(
+            'Reading package lists...\n'
+            'WC_ENV_MANAGER_SLIM strip_debug_symbols 1000 400\n'
+            'WC_ENV_MANAGER_SLIM compile_bytecode 100 150\n')
+        self.assertEqual([step.to_dict() for step in steps], [
+            {'name': 'strip_debug_symbols', 'size_before': 1000, 'size_after': 400, 'saved': 600},
+            {'name': 'compile_bytecode', 'size_before': 100, 'size_after': 150, 'saved': -50},
+        ])
+        self.assertEqual(log, 'Reading package lists...')
+
+
+class ImageSlimmerTestCase(unittest.TestCase):
+    def make_docker_client(self, status_code=0):
+        container = mock.Mock()
+        container.wait.return_value = {'StatusCode': status_code}
+        container.logs.return_value = (
+            b'WC_ENV_MANAGER_SLIM strip_debug_symbols 3000000 1000000\n'
+            b'WC_ENV_MANAGER_SLIM remove_caches 500000 0\n'
+            b'Removing binutils ...\n')
+        slimmed_image = mock.Mock(id='sha256:2')
+        slimmed_image.tag.return_value = True
+        container.commit.return_value = slimmed_image
+
+        docker_client = mock.Mock()
+        docker_client.containers.run.side_effect = [container, b'']
+        return (docker_client, container, slimmed_image)
+
+    def test_get_smoke_test_modules(self):
+        slimmer = wc_env_manager.slimming.ImageSlimmer(make_manager(
+            sundials_install='True', openbabel_install='True', cbc_install='', soplex_install='True'))
+        self.assertEqual(slimmer.get_smoke_test_modules(), ['openbabel', 'soplex', 'scikits.odes', 'numpy'])
+
+        slimmer.config['smoke_test_modules'] = None
+        self.assertEqual(slimmer.get_smoke_test_modules(), ['openbabel', 'soplex', 'scikits.odes'])
+
+    def test_get_script(self):
+        slimmer = wc_env_manager.slimming.ImageSlimmer(make_manager())
+        script = slimmer.get_script()
+        self.assertIn('strip --strip-debug', script)
+        self.assertIn("-name '*.a' -delete", script)
+        self.assertIn('python*) ;;', script)
+        self.assertIn('rm -rf /root/.cache/pip /var/cache/apt/archives/*.deb /var/lib/apt/lists/*', script)
+        self.assertIn('python3 -m compileall', script)
+
+        for step in ['strip_debug_symbols', 'remove_static_libraries', 'remove_headers', 'remove_caches', 'compile_bytecode']:
+            slimmer.config[step] = False
+        self.assertNotIn('report ', slimmer.get_script())
+
+    def test_slim(self):
+        mgr = make_manager(verbose=True, sundials_install='True')
+        mgr._docker_client, container, slimmed_image = self.make_docker_client()
+        image = mock.Mock(id='sha256:1', attrs={'Config': {'Cmd': ['/bin/sh', '-c', 'bash']}})
+
+        with capturer.CaptureOutput(relay=False) as capture_output:
+            result, report = wc_env_manager.slimming.ImageSlimmer(mgr).slim(
+                image, 'karrlab/wc_env_dependencies_unsquashed', ['latest', '0.0.52'])
+            text = capture_output.get_text()
+
+        self.assertEqual(result, slimmed_image)
+        run_calls = mgr._docker_client.containers.run.call_args_list
+        self.assertEqual(run_calls[0][0][0], 'sha256:1')
+        self.assertEqual(run_calls[0][1]['command'][0:2], ['bash', '-c'])
+        container.commit.assert_called_once_with(repository='karrlab/wc_env_dependencies_unsquashed', tag='latest',
+                                                 changes=['CMD ["/bin/sh", "-c", "bash"]'])
+        container.remove.assert_called_once_with(force=True)
+        slimmed_image.tag.assert_called_once_with('karrlab/wc_env_dependencies_unsquashed', tag='0.0.52')
+
+        # smoke test
+        self.assertEqual(run_calls[1][0][0], 'sha256:2')
+        self.assertEqual(run_calls[1][1]['command'][0:2], ['python3', '-c'])
+        self.assertEqual(run_calls[1][1]['command'][3:], ['scikits.odes', 'numpy'])
+
+        self.assertEqual(report.image_id, 'sha256:2')
+        self.assertEqual(report.saved, 2500000)
+        self.assertEqual(report.to_dict()['steps'][1], {'name': 'remove_caches', 'size_before': 500000,
+                                                        'size_after': 0, 'saved': 500000})
+        self.assertIn('Removing binutils ...', text)
+        self.assertRegex(text, r'Slimming saved 2\.4 MiB in \d+\.\d s\n')
+        self.assertRegex(text, r'  strip_debug_symbols +2\.9 MiB -> +976\.6 KiB \(-1\.9 MiB\)\n')
+        self.assertIn('Smoke test imported scikits.odes, numpy', text)
+
+    def test_slim_error(self):
+        mgr = make_manager()
+        mgr._docker_client, container, _ = self.make_docker_client(status_code=1)
+        image = mock.Mock(id='sha256:1', attrs={'Config': {'Cmd': None}})
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError, 'Slimming of image sha256:1 failed'):
+            wc_env_manager.slimming.ImageSlimmer(mgr).slim(image, 'karrlab/wc_env_dependencies_unsquashed', ['latest'])
+        container.commit.assert_not_called()
+        container.remove.assert_called_once_with(force=True)
+
+    def test_smoke_test_error(self):
+        mgr = make_manager()
+        mgr._docker_client, _, _ = self.make_docker_client()
+        mgr._docker_client.containers.run.side_effect = docker.errors.ContainerError(
+            'abc', 1, 'python3', 'sha256:2', b'numpy: ImportError: libopenblas.so.0: cannot open shared object file\n')
+        with self.assertRaisesRegex(wc_env_manager.core.WcEnvManagerError,
+                                    'Smoke test of the slimmed image sha256:2 failed(.|\n)*numpy: ImportError'):
+            wc_env_manager.slimming.ImageSlimmer(mgr).smoke_test(mock.Mock(id='sha256:2'), ['numpy'])
+
+        mgr._docker_client.containers.run.reset_mock()
+        wc_env_manager.slimming.ImageSlimmer(mgr).smoke_test(mock.Mock(id='sha256:2'), [])
+        mgr._docker_client.containers.run.assert_not_called()
+
+
+class BuildBaseImageTestCase(unittest.TestCase):
+    def test_build_base_image(self):
+        with FakeDockerEngine(num_images=1) as engine:
+            with engine.environ():
+                mgr = wc_env_manager.core.WcEnvManager({'verbose': False, 'base_image': {'slim': {'enabled': True}}})
+
+        config = mgr.config['base_image']
+        context = wc_env_manager.core.ImageContext('/tmp/base', '/tmp/base/Dockerfile', {})
+        image_unsquashed = mock.Mock()
+        slimmed_image = mock.Mock()
+        image = mock.Mock()
+        report = wc_env_manager.slimming.SlimmingReport(steps=[wc_env_manager.slimming.SlimmingStep('remove_caches', 10, 0)])
+        with mock.patch.object(mgr, '_build_image', return_value=image_unsquashed), \
+                mock.patch.object(wc_env_manager.slimming.ImageSlimmer, 'slim',
+                                  return_value=(slimmed_image, report)) as slim, \
+                mock.patch('docker_squash.squash.Squash') as squash, \
+                mock.patch.object(docker.models.images.ImageCollection, 'get', return_value=image):
+            self.assertEqual(mgr._build_base_image(context), image)
+
+        slim.assert_called_once_with(image_unsquashed, config['repo_unsquashed'], config['tags'])
+        squash.assert_called_once()
+        self.assertEqual(mgr._base_image_unsquashed, slimmed_image)
+
+        mgr.config['base_image']['slim']['enabled'] = False
+        with mock.patch.object(mgr, '_build_image', return_value=image_unsquashed), \
+                mock.patch.object(wc_env_manager.slimming.ImageSlimmer, 'slim') as slim, \
+                mock.patch('docker_squash.squash.Squash'), \
+                mock.patch.object(docker.models.images.ImageCollection, 'get', return_value=image):
+            mgr._build_base_image(context)
+        slim.assert_not_called()
+        self.assertEqual(mgr._base_image_unsquashed, image_unsquashed)
@@ -0,0 +1,178 @@
+""" Tests for wc_env_manager.telemetry
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import time
+import unittest
+import urllib.error
+import urllib.request
+import wc_env_manager.core
+import wc_env_manager.telemetry
+import whichcraft
+
+
+def make_stats(read='2026-10-18T00:00:01.000000000Z', cpu_usage=300, precpu_usage=100,
+               system_cpu_usage=2000, presystem_cpu_usage=1000, memory_stats=None,
+               block_io_read_bytes=0, network_rx_bytes=0):
+    return {
+        'read': read,
+        'cpu_stats': {
+            'cpu_usage': {'total_usage': cpu_usage},
+            'system_cpu_usage': system_cpu_usage,
+            'online_cpus': 4,
+        },
+        'precpu_stats': {
+            'cpu_usage': {'total_usage': precpu_usage},
+            'system_cpu_usage': presystem_cpu_usage,
+        },
+        'memory_stats': memory_stats or {
+            'usage': 1000,
+            'limit': 4000,
+            'stats': {'inactive_file': 200},
+        },
+        'blkio_stats': {
+            'io_service_bytes_recursive': [
+                {'major': 8, 'minor': 0, 'op': 'read', 'value': block_io_read_bytes},
+                {'major': 8, 'minor': 0, 'op': 'write', 'value': 10},
+            ],
+        },
+        'networks': {
+            'eth0': {'rx_bytes': network_rx_bytes, 'tx_bytes': 5},
+            'eth1': {'rx_bytes': 1, 'tx_bytes': 5},
+        },
+        'pids_stats': {'current': 3},
+    }
+
+
+class TelemetryTestCase(unittest.TestCase):
+    def test_parse_stats(self):
+        sample = wc_env_manager.telemetry.parse_stats('c', make_stats())
+        self.assertEqual(sample.container, 'c')
+        self.assertEqual(sample.online_cpus, 4)
+        self.assertAlmostEqual(sample.cpu_percent, 200. / 1000. * 4 * 100.)
+        self.assertEqual(sample.memory_usage, 1000)
+        self.assertEqual(sample.memory_working_set, 800)
+        self.assertEqual(sample.memory_limit, 4000)
+        self.assertEqual(sample.block_io_write_bytes, 10)
+        self.assertEqual(sample.network_rx_bytes, 1)
+        self.assertEqual(sample.network_tx_bytes, 10)
+        self.assertEqual(sample.pids, 3)
+        self.assertEqual(sample.block_io_read_rate, 0.)
+        self.assertEqual(sample.network_rx_rate, 0.)
+
+        # cgroups v1
+        sample = wc_env_manager.telemetry.parse_stats('c', make_stats(memory_stats={
+            'usage': 1000,
+            'stats': {'total_inactive_file': 300, 'inactive_file': 200},
+        }))
+        self.assertEqual(sample.memory_working_set, 700)
+        self.assertEqual(sample.memory_limit, None)
+
+        # first report of a stream, which has no previous CPU usage
+        sample = wc_env_manager.telemetry.parse_stats('c', make_stats(presystem_cpu_usage=0))
+        self.assertEqual(sample.cpu_percent, 0.)
+
+    def test_parse_stats_rates(self):
+        previous_sample = wc_env_manager.telemetry.parse_stats('c', make_stats(
+            read='2026-10-18T00:00:01.000000000Z', block_io_read_bytes=100, network_rx_bytes=1000))
+        sample = wc_env_manager.telemetry.parse_stats('c', make_stats(
+            read='2026-10-18T00:00:03.000000000Z', block_io_read_bytes=300, network_rx_bytes=5000),
+            previous_sample=previous_sample)
+        self.assertAlmostEqual(sample.time - previous_sample.time, 2.)
+        self.assertAlmostEqual(sample.block_io_read_rate, 100.)
+        self.assertAlmostEqual(sample.block_io_write_rate, 0.)
+        self.assertAlmostEqual(sample.network_rx_rate, 2000.)
+        self.assertAlmostEqual(sample.network_tx_rate, 0.)
+
+    def test_ring_buffer(self):
+        samples = []
+        monitor = wc_env_manager.telemetry.ContainerMonitor([], buffer_size=3, callbacks=[samples.append])
+        for i in range(5):
+            monitor.add_sample(wc_env_manager.telemetry.StatsSample(container='c', time=float(i)))
+        monitor.add_sample(wc_env_manager.telemetry.StatsSample(container='d', time=10.))
+
+        self.assertEqual([sample.time for sample in monitor.get_samples('c')], [2., 3., 4.])
+        self.assertEqual(monitor.get_samples('e'), [])
+        self.assertEqual({name: sample.time for name, sample in monitor.get_latest_samples().items()},
+                         {'c': 4., 'd': 10.})
+        self.assertEqual(len(samples), 6)
+
+    def test_format_prometheus(self):
+        sample = wc_env_manager.telemetry.parse_stats('c"1', make_stats())
+        text = wc_env_manager.telemetry.format_prometheus([sample])
+        self.assertIn('# TYPE wc_env_container_cpu_percent gauge\n', text)
+        self.assertIn('# TYPE wc_env_container_network_receive_bytes_total counter\n', text)
+        self.assertIn('wc_env_container_memory_working_set_bytes{{container="c\\"1"}} 800 {}\n'.format(
+            int(sample.time * 1000)), text)
+
+        self.assertNotIn('wc_env_container_pids{', wc_env_manager.telemetry.format_prometheus([
+            wc_env_manager.telemetry.StatsSample(container='c', time=1.)]))
+
+    def test_prometheus_server(self):
+        monitor = wc_env_manager.telemetry.ContainerMonitor([])
+        monitor.add_sample(wc_env_manager.telemetry.parse_stats('c', make_stats()))
+        server = wc_env_manager.telemetry.PrometheusServer(monitor, port=0)
+        server.start()
+        try:
+            self.assertNotEqual(server.port, 0)
+            url = 'http://{}:{}'.format(server.host, server.port)
+            with urllib.request.urlopen(url + '/metrics') as response:
+                self.assertEqual(response.status, 200)
+                self.assertIn('wc_env_container_pids{container="c"} 3', response.read().decode())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(url + '/other')
+        finally:
+            server.stop()
+
+    def test_format_bytes(self):
+        self.assertEqual(wc_env_manager.telemetry.format_bytes(None), '-')
+        self.assertEqual(wc_env_manager.telemetry.format_bytes(100), '100 B')
+        self.assertEqual(wc_env_manager.telemetry.format_bytes(1536), '1.5 KiB')
+        self.assertEqual(wc_env_manager.telemetry.format_bytes(3 * 1024 ** 3), '3.0 GiB')
+        self.assertEqual(wc_env_manager.telemetry.format_bytes(2 * 1024 ** 5), '2048.0 TiB')
+
+    def test_format_sample(self):
+        sample = wc_env_manager.telemetry.parse_stats('c', make_stats())
+        self.assertRegex(wc_env_manager.telemetry.format_sample(sample), r'^c +80\.0% +800 B / 3\.9 KiB')
+
+
+@unittest.skipIf(whichcraft.which('docker') is None, 'Test requires Docker and Docker isn''t installed.')
+class ContainerMonitorTestCase(unittest.TestCase):
+    def setUp(self):
+        mgr = self.mgr = wc_env_manager.core.WcEnvManager()
+        mgr.pull_image(mgr.config['base_image']['repo'], mgr.config['base_image']['tags'])
+
+        mgr.config['image']['tags'] = ['test']
+        mgr.config['image']['python_packages'] = ''
+        mgr.build_image()
+
+        mgr.config['network']['name'] = '__test__'
+        mgr.config['network']['containers'] = {}
+        mgr.config['container']['paths_to_mount'] = {}
+        mgr.build_container()
+
+    def tearDown(self):
+        mgr = self.mgr
+        mgr.remove_containers(force=True)
+        mgr.remove_network()
+        mgr.remove_image(mgr.config['image']['repo'], mgr.config['image']['tags'])
+
+    def test(self):
+        mgr = self.mgr
+        container = mgr._container
+
+        with wc_env_manager.telemetry.ContainerMonitor([container], buffer_size=2) as monitor:
+            start_time = time.time()
+            while len(monitor.get_samples(container.name)) < 2 and time.time() - start_time < 10.:
+                mgr.run_process_in_container(['dd', 'if=/dev/zero', 'of=/tmp/test', 'bs=1M', 'count=1'])
+                time.sleep(0.5)
+
+        samples = monitor.get_samples(container.name)
+        self.assertEqual(len(samples), 2)
+        self.assertGreater(samples[-1].time, samples[0].time)
+        self.assertGreater(samples[-1].memory_usage, 0)
+        self.assertGreater(samples[-1].pids, 0)
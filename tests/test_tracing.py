@@ -0,0 +1,292 @@
+""" Tests for wc_env_manager.tracing
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+from fake_docker_engine import FakeDockerEngine
+from wc_env_manager import __main__
+import capturer
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import wc_env_manager.core
+import wc_env_manager.tracing
+
+MANAGER_CONFIG = {
+    'verbose': False,
+    'image': {
+        'repo': 'karrlab/wc_env',
+        'tags': ['0.0.1', 'latest'],
+    },
+    'container': {
+        'name_format': 'wc_env-%Y-%m-%d-%H-%M-%S',
+        'python_packages': 'wc_lang',
+        'setup_script': '',
+    },
+}
+
+
+class TracerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_span(self):
+        tracer = wc_env_manager.tracing.Tracer()
+        with tracer.span('build_image', 'manager', repo='karrlab/wc_env') as operation:
+            with tracer.span('GET /images/{name}/json', 'docker') as call:
+                tracer.annotate(bytes_received=10)
+
+            def work():
+                with tracer.span('POST /images/{name}/tag', 'docker'):
+                    pass
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(operation.attrs, {'repo': 'karrlab/wc_env'})
+        self.assertEqual(call.attrs, {'bytes_received': 10})
+        self.assertEqual(call.parent, operation)
+        self.assertGreaterEqual(operation.duration, call.duration)
+        self.assertEqual(operation.end, operation.start + operation.duration)
+
+        spans = tracer.get_spans()
+        self.assertEqual([span.name for span in spans],
+                         ['GET /images/{name}/json', 'POST /images/{name}/tag', 'build_image'])
+        self.assertEqual(spans[1].parent, operation)
+        self.assertNotEqual(spans[1].thread_id, spans[2].thread_id)
+        self.assertEqual(spans[1].get_operation(), operation)
+        self.assertEqual(spans[1].to_dict()['parent_id'], operation.id)
+
+        self.assertEqual(len(tracer.get_spans(category='docker')), 2)
+        self.assertEqual(len(tracer.get_spans(name='build_image')), 1)
+        self.assertEqual(len(tracer.get_spans(operation='build_image')), 3)
+        self.assertEqual(tracer.get_spans(operation='build_base_image'), [])
+
+        tracer.clear()
+        self.assertEqual(tracer.get_spans(), [])
+
+    def test_span_error(self):
+        tracer = wc_env_manager.tracing.Tracer()
+        with self.assertRaises(ValueError):
+            with tracer.span('build_image', 'manager'):
+                raise ValueError()
+        span = tracer.get_spans()[0]
+        self.assertEqual(span.attrs, {'error': 'ValueError'})
+        self.assertIsNotNone(span.duration)
+
+        with tracer.span('build_image', 'manager') as span:
+            pass
+        self.assertIsNone(span.parent)
+
+    def test_span_without_tracer(self):
+        with wc_env_manager.tracing.span(None, 'clone', 'git') as span:
+            self.assertIsNone(span)
+
+        tracer = wc_env_manager.tracing.Tracer()
+        with wc_env_manager.tracing.span(tracer, 'clone', 'git', url='https://github.com/KarrLab/wc_lang') as span:
+            self.assertEqual(span.attrs, {'url': 'https://github.com/KarrLab/wc_lang'})
+        self.assertEqual(tracer.get_spans(), [span])
+
+    def test_counts(self):
+        tracer = wc_env_manager.tracing.Tracer()
+        with tracer.span('refresh', 'manager'):
+            with tracer.span('get_containers', 'manager'):
+                for i in range(3):
+                    with tracer.span('GET /containers/{id}/json', 'docker', bytes_received=100):
+                        pass
+        with tracer.span('GET /_ping', 'docker', bytes_sent=0):
+            pass
+        with tracer.span('pip install', 'subprocess'):
+            pass
+
+        self.assertEqual(tracer.get_call_counts(), {'GET /containers/{id}/json': 3, 'GET /_ping': 1})
+        self.assertEqual(tracer.get_call_counts(operation='get_containers'), {'GET /containers/{id}/json': 3})
+        self.assertEqual(tracer.get_call_counts(category='subprocess'), {'pip install': 1})
+        self.assertEqual(tracer.get_call_counts_by_operation(), {
+            'refresh': {'GET /containers/{id}/json': 3},
+            None: {'GET /_ping': 1},
+        })
+
+        summary = {(row['category'], row['name']): row for row in tracer.summarize()}
+        self.assertEqual(summary[('docker', 'GET /containers/{id}/json')]['calls'], 3)
+        self.assertEqual(summary[('docker', 'GET /containers/{id}/json')]['bytes'], 300)
+        self.assertEqual(summary[('manager', 'refresh')]['calls'], 1)
+
+    def test_export(self):
+        tracer = wc_env_manager.tracing.Tracer()
+        with tracer.span('build_image', 'manager'):
+            with tracer.span('GET /images/{name}/json', 'docker', status=200):
+                pass
+
+        filename = os.path.join(self.dirname, 'trace.json')
+        tracer.export(filename, format='json')
+        with open(filename) as file:
+            trace = json.load(file)
+        self.assertEqual([span['name'] for span in trace['spans']], ['build_image', 'GET /images/{name}/json'])
+        self.assertEqual(trace['spans'][1]['parent_id'], trace['spans'][0]['id'])
+        self.assertEqual(trace['spans'][1]['attrs'], {'status': 200})
+
+        tracer.export(filename, format='chrome')
+        with open(filename) as file:
+            trace = json.load(file)
+        self.assertEqual(len(trace['traceEvents']), 2)
+        event = trace['traceEvents'][1]
+        self.assertEqual(event['name'], 'GET /images/{name}/json')
+        self.assertEqual(event['cat'], 'docker')
+        self.assertEqual(event['ph'], 'X')
+        self.assertGreaterEqual(event['ts'], trace['traceEvents'][0]['ts'])
+        self.assertEqual(event['args'], {'status': 200})
+
+        with self.assertRaisesRegex(ValueError, 'must be one of'):
+            tracer.export(filename, format='xml')
+
+    def test_trace_methods(self):
+        @wc_env_manager.tracing.trace_methods
+        class Manager(object):
+            UNTRACED_METHODS = ('untraced',)
+
+            def __init__(self):
+                self._tracer = None
+
+            def outer(self):
+                return self.inner() + 1
+
+            def inner(self):
+                return 1
+
+            def untraced(self):
+                return self._private()
+
+            def _private(self):
+                return 2
+
+            @staticmethod
+            def static():
+                return 3
+
+        mgr = Manager()
+        self.assertEqual(mgr.outer(), 2)
+
+        mgr._tracer = tracer = wc_env_manager.tracing.Tracer()
+        self.assertEqual(mgr.outer(), 2)
+        self.assertEqual(mgr.untraced(), 2)
+        self.assertEqual(Manager.static(), 3)
+        self.assertEqual(Manager.outer.__name__, 'outer')
+        self.assertEqual([(span.name, span.category) for span in tracer.get_spans()],
+                         [('inner', 'manager'), ('outer', 'manager')])
+        self.assertEqual(tracer.get_spans()[0].parent.name, 'outer')
+
+    def test_get_docker_endpoint(self):
+        get_docker_endpoint = wc_env_manager.tracing.get_docker_endpoint
+        self.assertEqual(get_docker_endpoint('GET', '/_ping'), 'GET /_ping')
+        self.assertEqual(get_docker_endpoint('GET', '/v1.41/containers/json?all=1'), 'GET /containers/json')
+        self.assertEqual(get_docker_endpoint('POST', '/v1.41/containers/create?name=a'), 'POST /containers/create')
+        self.assertEqual(get_docker_endpoint('GET', '/v1.41/containers/3f4e/json'), 'GET /containers/{id}/json')
+        self.assertEqual(get_docker_endpoint('DELETE', '/v1.41/containers/3f4e?v=False'), 'DELETE /containers/{id}')
+        self.assertEqual(get_docker_endpoint('POST', '/v1.41/exec/3f4e/start'), 'POST /exec/{id}/start')
+        self.assertEqual(get_docker_endpoint('GET', '/v1.41/images/karrlab/wc_env:0.0.1/json'),
+                         'GET /images/{name}/json')
+        self.assertEqual(get_docker_endpoint('DELETE', '/v1.41/images/karrlab/wc_env?force=1'), 'DELETE /images/{name}')
+        self.assertEqual(get_docker_endpoint('POST', '/v1.41/images/create?fromImage=karrlab/wc_env'),
+                         'POST /images/create')
+
+    def test_get_sizes(self):
+        self.assertEqual(wc_env_manager.tracing.get_body_size(None), 0)
+        self.assertEqual(wc_env_manager.tracing.get_body_size('abc'), 3)
+        self.assertEqual(wc_env_manager.tracing.get_body_size(b'abcd'), 4)
+        self.assertEqual(wc_env_manager.tracing.get_body_size(iter([b'abc'])), None)
+
+        os.mkdir(os.path.join(self.dirname, 'dir'))
+        with open(os.path.join(self.dirname, 'a'), 'w') as file:
+            file.write('abc')
+        with open(os.path.join(self.dirname, 'dir', 'b'), 'w') as file:
+            file.write('defgh')
+        os.symlink(os.path.join(self.dirname, 'a'), os.path.join(self.dirname, 'dir', 'c'))
+        self.assertEqual(wc_env_manager.tracing.get_path_size(os.path.join(self.dirname, 'a')), 3)
+        self.assertEqual(wc_env_manager.tracing.get_path_size(self.dirname), 8)
+
+
+class ManagerTracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_docker_api_calls(self):
+        with FakeDockerEngine(num_images=1, num_containers=5) as engine:
+            with engine.environ():
+                mgr = wc_env_manager.core.WcEnvManager(MANAGER_CONFIG)
+                api = mgr._docker_client.api
+
+                tracer = mgr.start_tracing()
+                self.assertIs(mgr._tracer, tracer)
+                containers = mgr.get_containers()
+                self.assertEqual(len(containers), 5)
+                self.assertEqual(tracer.get_call_counts(operation='get_containers'), {
+                    'GET /containers/json': 1,
+                    'GET /containers/{id}/json': 5,
+                })
+
+                span = tracer.get_spans(name='GET /containers/json')[0]
+                self.assertEqual(span.attrs['status'], 200)
+                self.assertEqual(span.attrs['bytes_sent'], 0)
+                self.assertGreater(span.attrs['bytes_received'], 0)
+                self.assertEqual(span.parent.name, 'get_containers')
+
+                tracer.clear()
+                mgr.refresh()
+                counts = tracer.get_call_counts_by_operation()
+                self.assertEqual(list(counts.keys()), ['refresh'])
+                self.assertIn('get_latest_container', [span.name for span in tracer.get_spans(category='manager')])
+
+                # stop tracing
+                self.assertIs(mgr.stop_tracing(), tracer)
+                self.assertIsNone(mgr._tracer)
+                self.assertNotIn('send', vars(api))
+                self.assertIsNone(mgr.stop_tracing())
+
+                tracer.clear()
+                mgr.get_containers()
+                self.assertEqual(tracer.get_spans(), [])
+
+    def test_session_and_subprocess(self):
+        with FakeDockerEngine(num_images=1, num_containers=1) as engine:
+            with engine.environ():
+                mgr = wc_env_manager.core.WcEnvManager(MANAGER_CONFIG)
+                mgr.get_paths_to_copy = lambda: []
+                tracer = mgr.start_tracing()
+
+                mgr.setup_container()
+                self.assertEqual(tracer.get_call_counts(operation='setup_container')['POST /exec/{id}/start'], 1)
+
+                mgr.run_process_on_host(['true'])
+                span = tracer.get_spans(category='subprocess')[0]
+                self.assertEqual(span.name, 'true')
+                self.assertEqual(span.parent.name, 'run_process_on_host')
+                self.assertEqual(span.attrs, {'cmd': ['true']})
+
+    def test_cli(self):
+        filename = os.path.join(self.dirname, 'trace.json')
+        with FakeDockerEngine(num_images=1, num_containers=2) as engine:
+            with engine.environ():
+                with capturer.CaptureOutput(relay=False):
+                    self.assertEqual(__main__.run(['--trace', filename, '--trace-format', 'json',
+                                                   'container', 'list']), 0)
+        self.assertIsNone(__main__._tracer)
+        self.assertEqual(__main__._traced_managers, [])
+
+        with open(filename) as file:
+            trace = json.load(file)
+        names = [span['name'] for span in trace['spans']]
+        self.assertIn('get_containers', names)
+        self.assertIn('GET /containers/json', names)
@@ -2,4 +2,13 @@
 from ._version import __version__
 
 # API
-from .core import WcEnvManager, WcEnvManagerError
+# the API is imported on first use so that importing the package (e.g., to print the help of the
+# command line program) doesn't import Docker and the other dependencies of the manager
+__all__ = ['__version__', 'WcEnvManager', 'WcEnvManagerError']
+
+
+def __getattr__(name):
+    if name in ('WcEnvManager', 'WcEnvManagerError'):
+        from . import core
+        return getattr(core, name)
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
@@ -7,11 +7,169 @@
 """
 
 import cement
+import json
+import sys
+import threading
+import time
 import wc_env_manager
-import wc_env_manager.core
+import wc_env_manager.daemon
+
+# The manager and its dependencies (e.g., the Docker client) are imported by the commands which use
+# them, rather than here, so that the help and version of the program are printed quickly
 
 VERBOSE = True
 
+_manager_pool = None
+# pool of warm managers of the daemon which is running the current command (see :obj:`run`)
+
+_tracer = None
+_traced_managers = []
+# tracer of the current command and the managers which it traces (see `--trace`)
+
+
+def get_manager(extra=None):
+    """ Create a manager, or get a warm manager when the command is run by the daemon
+
+    Args:
+        extra (:obj:`dict`, optional): additional configuration to override
+
+    Returns:
+        :obj:`wc_env_manager.core.WcEnvManager`: manager
+    """
+    config = {'verbose': VERBOSE}
+    config.update(extra or {})
+    if _manager_pool is not None:
+        mgr = _manager_pool.get_manager(config)
+    else:
+        import wc_env_manager.core
+        mgr = wc_env_manager.core.WcEnvManager(config)
+
+    if _tracer is not None:
+        mgr.start_tracing(_tracer)
+        _traced_managers.append(mgr)
+    return mgr
+
+
+def start_tracing(app):
+    """ Start tracing the managers of the command if `--trace` is set (`post_argument_parsing` hook)
+
+    Args:
+        app (:obj:`App`): application
+    """
+    global _tracer
+    if getattr(app.pargs, 'trace', None):
+        import wc_env_manager.tracing
+        _tracer = wc_env_manager.tracing.Tracer()
+
+
+def save_trace(app):
+    """ Stop tracing the managers of the command and save the trace (`pre_close` hook)
+
+    Args:
+        app (:obj:`App`): application
+    """
+    global _tracer
+    if _tracer is None:
+        return
+    tracer = _tracer
+    _tracer = None
+    while _traced_managers:
+        _traced_managers.pop().stop_tracing()
+    tracer.export(app.pargs.trace, format=app.pargs.trace_format)
+
+
+CONTAINER_SELECTION_ARGUMENTS = [
+    (['--container'], dict(dest='containers', action='append', default=None,
+                           help='Name of a container (can be repeated); default: the current container')),
+    (['--label'], dict(type=str, default=None,
+                       help='Select the containers with this label (`key` or `key=value`)')),
+    (['--group'], dict(type=str, default=None,
+                       help='Select the replicas of this group')),
+    (['--all'], dict(action='store_true', default=False,
+                     help='Select all containers')),
+]
+
+
+def get_selected_containers(mgr, args, resolve=True):
+    """ Get the containers selected by the `--container`, `--label`, `--group`, and `--all` arguments
+
+    Args:
+        mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+        args (:obj:`argparse.Namespace`): parsed arguments
+        resolve (:obj:`bool`, optional): if :obj:`False`, return the names of the containers selected
+            by `--container` rather than resolving them, so that the caller can report containers
+            which don't exist individually
+
+    Returns:
+        :obj:`list` of :obj:`docker.models.containers.Container` or :obj:`str`: selected containers
+
+    Raises:
+        :obj:`SystemExit`: if no containers are selected and there is no current container, or a
+            container selected by `--container` doesn't exist
+    """
+    import docker
+
+    if args.containers:
+        if not resolve:
+            return list(args.containers)
+        containers = []
+        for name in args.containers:
+            try:
+                containers.append(mgr._docker_client.containers.get(name))
+            except docker.errors.NotFound:
+                raise SystemExit('Container {} does not exist'.format(name))
+        return containers
+    elif args.label or args.group or args.all:
+        return mgr.get_containers(label=args.label, group=args.group)
+    elif mgr._container:
+        return [mgr._container]
+    else:
+        raise SystemExit('No container is available; use `--container`, `--label`, `--group`, or `--all` to select containers')
+
+
+CONTAINER_RESOURCE_ARGUMENTS = [
+    (['--cpus'], dict(type=float, default=None, help='Number of CPUs (CPU quota)')),
+    (['--cpuset-cpus'], dict(type=str, default=None, help='CPUs to pin the container to (e.g., `0-3,8`)')),
+    (['--placement'], dict(type=str, default=None, choices=['none', 'numa'],
+                           help='Placement of the container on CPUs (`numa`: pin to disjoint CPUs of a NUMA node)')),
+    (['--memory'], dict(dest='mem_limit', type=str, default=None, help='Memory limit (e.g., `16g`)')),
+    (['--shm-size'], dict(type=str, default=None, help='Size of /dev/shm (e.g., `1g`)')),
+    (['--blkio-weight'], dict(type=int, default=None, help='Relative block I/O weight (10-1000)')),
+    (['--ulimit'], dict(dest='ulimits', action='append', default=None,
+                        help='Resource limit (`name=soft[:hard]`, e.g., `nofile=65536`; can be repeated)')),
+    (['--tmpfs'], dict(action='append', default=None,
+                       help='tmpfs scratch mount (`path[:options]`, e.g., `/scratch:size=8g`; can be repeated)')),
+]
+
+
+def get_resource_config(args):
+    """ Get the resource controls of a container (`config['container']['resources']`) from the
+    arguments in :obj:`CONTAINER_RESOURCE_ARGUMENTS`
+
+    Args:
+        args (:obj:`argparse.Namespace`): parsed arguments
+
+    Returns:
+        :obj:`dict`: resource controls which override the configuration
+
+    Raises:
+        :obj:`SystemExit`: if a limit is invalid
+    """
+    config = {}
+    for key in ['cpus', 'cpuset_cpus', 'placement', 'mem_limit', 'shm_size', 'blkio_weight']:
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    if args.ulimits:
+        config['ulimits'] = {}
+        for ulimit in args.ulimits:
+            name, sep, value = ulimit.partition('=')
+            if not sep:
+                raise SystemExit('Invalid limit `{}`; limits must have the format `name=soft[:hard]`'.format(ulimit))
+            config['ulimits'][name] = value
+    if args.tmpfs:
+        config['tmpfs'] = dict((tmpfs.split(':', 1) + [''])[0:2] for tmpfs in args.tmpfs)
+    return config
+
 
 class BaseController(cement.Controller):
     """ Base controller for command line application """
@@ -22,6 +180,10 @@ class BaseController(cement.Controller):
         help = "Whole-cell modeling environment manager"
         arguments = [
             (['-v', '--version'], dict(action='version', version=wc_env_manager.__version__)),
+            (['--trace'], dict(type=str, default=None, metavar='PATH',
+                               help='Save a trace of the operations of the command and their Docker API calls to PATH')),
+            (['--trace-format'], dict(type=str, default='chrome', choices=['json', 'chrome'],
+                                      help='Format of the trace (`chrome`: Chrome trace event format)')),
         ]
 
     @cement.ex(hide=True)
@@ -46,14 +208,14 @@ class BaseImageController(cement.Controller):
 
     @cement.ex(help='Build base image')
     def build(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         mgr.build_base_image()
         print('Built base image {}:{{{}}}'.format(
             mgr.config['base_image']['repo'], ', '.join(mgr.config['base_image']['tags'])))
 
     @cement.ex(help='Push base image')
     def push(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         config = mgr.config['base_image']
         mgr.login_docker_hub()
         mgr.push_image(config['repo_unsquashed'], config['tags'])
@@ -61,21 +223,21 @@ class BaseImageController(cement.Controller):
 
     @cement.ex(help='Pull base image')
     def pull(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         config = mgr.config['base_image']
         mgr.pull_image(config['repo_unsquashed'], config['tags'])
         mgr.pull_image(config['repo'], config['tags'])
 
     @cement.ex(help='Remove base image')
     def remove(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         config = mgr.config['base_image']
         mgr.remove_image(config['repo_unsquashed'], config['tags'], force=True)
         mgr.remove_image(config['repo'], config['tags'], force=True)
 
     @cement.ex(help='Get base image version')
     def version(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         print(mgr.get_image_version(mgr._base_image))
 
 
@@ -96,35 +258,70 @@ class ImageController(cement.Controller):
 
     @cement.ex(help='Build image')
     def build(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         mgr.build_image()
         print('Built image {}:{{{}}}'.format(
             mgr.config['image']['repo'], ', '.join(mgr.config['image']['tags'])))
 
     @cement.ex(help='Push image')
     def push(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         config = mgr.config['image']
         mgr.login_docker_hub()
         mgr.push_image(config['repo'], config['tags'])
 
     @cement.ex(help='Pull image')
     def pull(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         config = mgr.config['image']
         mgr.pull_image(config['repo'], config['tags'])
 
     @cement.ex(help='Remove image')
     def remove(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         config = mgr.config['image']
         mgr.remove_image(config['repo'], config['tags'], force=True)
 
     @cement.ex(help='Get image version')
     def version(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         print(mgr.get_image_version(mgr._image))
 
+    @cement.ex(help='Report the size of each layer, the largest files, and the files deleted or overwritten by later layers',
+               arguments=[
+                   (['ref'], dict(type=str, nargs='?', default=None,
+                                  help='Image or tag of the image (e.g., `0.0.1`); default: the current image')),
+                   (['--top'], dict(type=int, default=20, help='Number of files to report')),
+                   (['--json'], dict(action='store_true', default=False, help='Print the analysis as JSON')),
+               ])
+    def analyze(self):
+        import wc_env_manager.layers
+        args = self.app.pargs
+        mgr = get_manager()
+        analysis = wc_env_manager.layers.ImageLayerAnalyzer(mgr).analyze(args.ref)
+        if args.json:
+            print(json.dumps(analysis.to_dict(num=args.top), indent=2))
+        else:
+            print(analysis.format(num=args.top))
+
+    @cement.ex(help='Compare the sizes of the directories of two versions of the image',
+               arguments=[
+                   (['old'], dict(type=str, help='Old image or tag of the image (e.g., `0.0.1`)')),
+                   (['new'], dict(type=str, help='New image or tag of the image (e.g., `0.0.2`)')),
+                   (['--depth'], dict(type=int, default=3, help='Depth of the directories to compare')),
+                   (['--top'], dict(type=int, default=20, help='Number of directories to report')),
+                   (['--json'], dict(action='store_true', default=False, help='Print the comparison as JSON')),
+               ])
+    def diff(self):
+        import wc_env_manager.layers
+        args = self.app.pargs
+        mgr = get_manager()
+        diff = wc_env_manager.layers.ImageLayerAnalyzer(mgr).diff(args.old, args.new, depth=args.depth)
+        if args.json:
+            print(json.dumps(diff.to_dict(num=args.top), indent=2))
+        else:
+            print(diff.format(num=args.top))
+
 
 class NetworkController(cement.Controller):
     """ Build and remove a Docker network """
@@ -143,14 +340,35 @@ class NetworkController(cement.Controller):
 
     @cement.ex(help='Build network')
     def build(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         mgr.build_network()
 
     @cement.ex(help='Remove network')
     def remove(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         mgr.remove_network()
 
+    @cement.ex(help='Measure the throughput and latency of the network between containers',
+               arguments=[
+                   (['--size'], dict(type=str, default=None,
+                                     help='Amount of data to transfer to measure the throughput (e.g., 256m)')),
+                   (['--count'], dict(type=int, default=None,
+                                      help='Number of round trips to measure the latency')),
+                   (['--image'], dict(type=str, default=None,
+                                      help='Image (with Python) to run the measurements')),
+                   (['--json'], dict(action='store_true', default=False,
+                                     help='Print the measurements in JSON format')),
+               ])
+    def probe(self):
+        import wc_env_manager.netprobe
+        args = self.app.pargs
+        mgr = get_manager()
+        result = wc_env_manager.netprobe.NetworkProbe(mgr, image=args.image, size=args.size, count=args.count).run()
+        if args.json:
+            print(json.dumps(result.to_dict(), indent=2))
+        else:
+            print(result.format())
+
 
 class ContainerController(cement.Controller):
     """ Build and remove containers of *wc_env* """
@@ -168,17 +386,302 @@ class ContainerController(cement.Controller):
     def _default(self):
         self._parser.print_help()
 
-    @cement.ex(help='Build container')
+    @cement.ex(help='Build container',
+               arguments=[
+                   (['--replicas'], dict(type=int, default=1, help='Number of replicas to build concurrently')),
+                   (['--group'], dict(type=str, default=None,
+                                      help='Name of the group of the replicas; default: a new unique name')),
+                   (['--shared-ipc'], dict(action='store_true', default=None,
+                                           help='Share an IPC namespace (and /dev/shm) among the replicas')),
+               ] + CONTAINER_RESOURCE_ARGUMENTS)
     def build(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
-        mgr.build_container()
-        mgr.setup_container()
-        print('Built container {}'.format(mgr._container.name))
-
-    @cement.ex(help='Remove container')
+        args = self.app.pargs
+        mgr = get_manager({'container': {'resources': get_resource_config(args)}})
+        if args.replicas == 1 and not args.group:
+            mgr.build_container()
+            mgr.setup_container()
+            print('Built container {}'.format(mgr._container.name))
+        else:
+            containers = mgr.build_containers(args.replicas, group=args.group, shared_ipc=args.shared_ipc)
+            print('Built {} containers of group {}:'.format(
+                len(containers), containers[0].labels[mgr.GROUP_LABEL] if containers else args.group))
+            for container in containers:
+                print('  {}'.format(container.name))
+
+    @cement.ex(help='Remove container',
+               arguments=[
+                   (['--group'], dict(type=str, default=None, help='Only remove the replicas of this group')),
+               ])
     def remove(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
-        mgr.remove_containers(force=True)
+        mgr = get_manager()
+        mgr.remove_containers(force=True, group=self.app.pargs.group)
+
+    @cement.ex(help='List containers',
+               arguments=[
+                   (['--label'], dict(type=str, default=None,
+                                      help='Only list the containers with this label (`key` or `key=value`)')),
+                   (['--group'], dict(type=str, default=None, help='Only list the replicas of this group')),
+                   (['--watch'], dict(action='store_true', default=False,
+                                      help='Print the changes of the images, containers, and network until interrupted')),
+                   (['--json'], dict(action='store_true', default=False, help='Print the containers and changes as JSON')),
+               ])
+    def list(self):
+        args = self.app.pargs
+        mgr = get_manager()
+        print_lock = threading.Lock()
+
+        def print_change(change):
+            with print_lock:
+                if args.json:
+                    print(json.dumps(change.to_dict()), flush=True)
+                else:
+                    print(change.format(), flush=True)
+
+        started_index = args.watch and mgr._index is None
+        if args.watch:
+            mgr.start_index()
+
+        containers = mgr.get_containers(sort_by_read_time=args.watch, label=args.label, group=args.group)
+        if args.json:
+            for container in containers:
+                print(json.dumps({
+                    'name': container.name,
+                    'status': container.status,
+                    'group': container.labels.get(mgr.GROUP_LABEL, None),
+                    'image': container.attrs.get('Config', {}).get('Image', None),
+                }))
+        else:
+            print('{:<40} {:<10} {:<24} {}'.format('Name', 'Status', 'Group', 'Image'))
+            for container in containers:
+                print('{:<40} {:<10} {:<24} {}'.format(
+                    container.name, container.status, container.labels.get(mgr.GROUP_LABEL, None) or '',
+                    container.attrs.get('Config', {}).get('Image', None) or ''))
+
+        if args.watch:
+            mgr._index.callbacks.append(print_change)
+            try:
+                while True:
+                    time.sleep(1.)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                mgr._index.callbacks.remove(print_change)
+                if started_index:
+                    mgr.stop_index()
+
+    @cement.ex(help='Run a command concurrently in containers',
+               arguments=[
+                   (['cmd'], dict(type=str, nargs='+', help='Command to run (use `--` to separate it from options)')),
+               ] + CONTAINER_SELECTION_ARGUMENTS + [
+                   (['--work-dir'], dict(type=str, default=None, help='Working directory within the containers')),
+                   (['--max-workers'], dict(type=int, default=8, help='Maximum number of concurrent processes')),
+                   (['--json'], dict(action='store_true', default=False, help='Print the results as JSON')),
+               ])
+    def exec(self):
+        args = self.app.pargs
+        mgr = get_manager()
+        containers = get_selected_containers(mgr, args, resolve=False)
+
+        results = mgr.run_process_in_containers(args.cmd, containers=containers,
+                                                work_dir=args.work_dir, max_workers=args.max_workers)
+
+        if args.json:
+            print(json.dumps([result.to_dict() for result in results], indent=2))
+        else:
+            for result in results:
+                if result.error:
+                    status = 'error: {}'.format(result.error)
+                else:
+                    status = 'exit code {}'.format(result.exit_code)
+                print('==> {} ({}, {:.2f} s)'.format(result.container, status, result.duration))
+                if result.output:
+                    print(result.output)
+
+        if not all(result.success for result in results):
+            self.app.exit_code = 1
+
+    @cement.ex(help='Hibernate (pause or stop) idle containers until interrupted',
+               arguments=[
+                   (['--timeout'], dict(type=str, default=None,
+                                        help='Duration of inactivity after which containers are hibernated (e.g., `4h`)')),
+                   (['--cpu-threshold'], dict(type=float, default=None,
+                                              help='CPU utilization below which containers are idle (percent of one CPU)')),
+                   (['--action'], dict(type=str, default=None, choices=['pause', 'stop'],
+                                       help='Action for hibernating idle containers')),
+                   (['--interval'], dict(type=float, default=None, help='Interval between checks (seconds)')),
+               ])
+    def idle(self):
+        import wc_env_manager.idle
+        args = self.app.pargs
+        mgr = get_manager()
+
+        def callback(container):
+            print('{} {} (idle for more than {})'.format(
+                'Paused' if monitor.action == wc_env_manager.idle.HibernationAction.pause else 'Stopped',
+                container.name, args.timeout or mgr.config['idle']['timeout']), flush=True)
+
+        monitor = wc_env_manager.idle.IdleMonitor(mgr, timeout=args.timeout, cpu_threshold=args.cpu_threshold,
+                                                  action=args.action, interval=args.interval, callbacks=[callback])
+        with monitor:
+            print('Hibernating containers which are idle for more than {}'.format(
+                args.timeout or mgr.config['idle']['timeout']))
+            try:
+                while True:
+                    time.sleep(1.)
+            except KeyboardInterrupt:
+                pass
+
+    @cement.ex(help='Get statistics about the resource usage of containers',
+               arguments=CONTAINER_SELECTION_ARGUMENTS + [
+                   (['--watch'], dict(action='store_true', default=False,
+                                      help='Continuously print statistics until interrupted')),
+                   (['--prometheus'], dict(action='store_true', default=False,
+                                           help='Expose the statistics at a local Prometheus endpoint (implies `--watch`)')),
+                   (['--port'], dict(type=int, default=None, help='Port for the Prometheus endpoint')),
+                   (['--json'], dict(action='store_true', default=False, help='Print the statistics as JSON')),
+               ])
+    def stats(self):
+        import wc_env_manager.telemetry
+        args = self.app.pargs
+        mgr = get_manager()
+        config = mgr.config['telemetry']
+        containers = get_selected_containers(mgr, args)
+
+        def print_sample(sample):
+            if args.json:
+                print(json.dumps(sample.to_dict()), flush=True)
+            else:
+                print(wc_env_manager.telemetry.format_sample(sample), flush=True)
+
+        if not args.json:
+            print(wc_env_manager.telemetry.SAMPLE_TABLE_HEADER)
+
+        if args.watch or args.prometheus:
+            print_lock = threading.Lock()
+
+            def callback(sample):
+                with print_lock:
+                    print_sample(sample)
+
+            with wc_env_manager.telemetry.ContainerMonitor(containers, buffer_size=config['buffer_size'],
+                                                           callbacks=[callback]) as monitor:
+                server = None
+                if args.prometheus:
+                    server = wc_env_manager.telemetry.PrometheusServer(
+                        monitor, host=config['prometheus_host'],
+                        port=config['prometheus_port'] if args.port is None else args.port)
+                    server.start()
+                    print('Serving Prometheus metrics at http://{}:{}/metrics'.format(server.host, server.port))
+                try:
+                    while True:
+                        time.sleep(1.)
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    if server:
+                        server.stop()
+
+        else:
+            # wait for two samples of each container so that rates can be calculated
+            with wc_env_manager.telemetry.ContainerMonitor(containers, buffer_size=2) as monitor:
+                start_time = time.time()
+                while time.time() - start_time < 10. and any(
+                        len(monitor.get_samples(container.name)) < 2 for container in containers):
+                    time.sleep(0.1)
+                samples = monitor.get_latest_samples()
+            for container in containers:
+                if container.name in samples:
+                    print_sample(samples[container.name])
+
+
+class HistoryController(cement.Controller):
+    """ Record and query the history of the resource usage of containers """
+
+    class Meta:
+        label = 'history'
+        description = 'Record and query the history of the resource usage of containers'
+        help = 'Record and query the history of the resource usage of containers'
+        stacked_on = 'base'
+        stacked_type = 'nested'
+        arguments = []
+
+    @cement.ex(hide=True)
+    def _default(self):
+        self._parser.print_help()
+
+    @cement.ex(help='Record the resource usage of all containers, and the commands executed in them, until interrupted')
+    def record(self):
+        import wc_env_manager.history
+        mgr = get_manager()
+        with wc_env_manager.history.HistoryRecorder(mgr) as recorder:
+            print('Recording the resource usage of containers to {}'.format(recorder.filename))
+            try:
+                while True:
+                    time.sleep(1.)
+            except KeyboardInterrupt:
+                pass
+
+    @cement.ex(help='Get the peak resource usage of each container',
+               arguments=[
+                   (['--container'], dict(dest='containers', action='append', default=None,
+                                          help='Name of a container (can be repeated); default: all containers')),
+                   (['--since'], dict(type=str, default=None,
+                                      help='Only consider the last period of time (e.g., `12h`, `7d`)')),
+                   (['--json'], dict(action='store_true', default=False, help='Print the usage as JSON')),
+               ])
+    def peak(self):
+        import wc_env_manager.history
+        import wc_env_manager.telemetry
+        args = self.app.pargs
+        mgr = get_manager()
+        since = time.time() - wc_env_manager.history.parse_duration(args.since) if args.since else None
+        with wc_env_manager.history.ResourceHistory(mgr.config['history']['path']) as history:
+            usages = history.get_peak_usage(containers=args.containers, since=since)
+
+        if args.json:
+            print(json.dumps(usages, indent=2))
+        else:
+            print('{:<32} {:>9} {:>9} {:>11} {:>11} {:>11}'.format(
+                'CONTAINER', 'CPU MEAN', 'CPU PEAK', 'MEM MEAN', 'MEM PEAK', 'MEM LIMIT'))
+            for usage in usages:
+                print('{:<32} {:>8.1f}% {:>8.1f}% {:>11} {:>11} {:>11}'.format(
+                    usage['container'], usage['cpu_percent_mean'] or 0., usage['cpu_percent_max'] or 0.,
+                    wc_env_manager.telemetry.format_bytes(usage['memory_working_set_mean']),
+                    wc_env_manager.telemetry.format_bytes(usage['memory_working_set_max']),
+                    wc_env_manager.telemetry.format_bytes(usage['memory_limit'])))
+
+    @cement.ex(help='Get the peak resource usage of the containers during each command',
+               arguments=[
+                   (['--container'], dict(dest='containers', action='append', default=None,
+                                          help='Name of a container (can be repeated); default: all containers')),
+                   (['--cmd'], dict(type=str, default=None,
+                                    help='Only get commands which contain this string')),
+                   (['--since'], dict(type=str, default=None,
+                                      help='Only consider the last period of time (e.g., `12h`, `7d`)')),
+                   (['--json'], dict(action='store_true', default=False, help='Print the usage as JSON')),
+               ])
+    def commands(self):
+        import wc_env_manager.history
+        import wc_env_manager.telemetry
+        args = self.app.pargs
+        mgr = get_manager()
+        since = time.time() - wc_env_manager.history.parse_duration(args.since) if args.since else None
+        with wc_env_manager.history.ResourceHistory(mgr.config['history']['path']) as history:
+            usages = history.get_command_usage(containers=args.containers, cmd=args.cmd, since=since)
+
+        if args.json:
+            print(json.dumps(usages, indent=2))
+        else:
+            print('{:<32} {:>10} {:>9} {:>11}  {}'.format('CONTAINER', 'DURATION', 'CPU PEAK', 'MEM PEAK', 'COMMAND'))
+            for usage in usages:
+                if usage['end_time'] is None:
+                    duration = 'running'
+                else:
+                    duration = '{:.0f} s'.format(usage['end_time'] - usage['start_time'])
+                print('{:<32} {:>10} {:>8.1f}% {:>11}  {}'.format(
+                    usage['container'], duration, usage['cpu_percent_max'] or 0.,
+                    wc_env_manager.telemetry.format_bytes(usage['memory_working_set_max']),
+                    usage['cmd']))
 
 
 class AllController(cement.Controller):
@@ -197,23 +700,26 @@ class AllController(cement.Controller):
     # def _default(self):
     #   self._parser.print_help()
 
-    @cement.ex(help='Build base image, image, and container')
+    @cement.ex(help='Build base image, image, and container',
+               arguments=[
+                   (['--max-workers'], dict(type=int, default=None,
+                                            help='Maximum number of stages of the build to run concurrently')),
+               ])
     def build(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
-        mgr.remove_containers()
-        mgr.build_base_image()
-        mgr.build_image()
-        mgr.build_container()
+        mgr = get_manager()
+        pipeline = mgr.build_all(max_workers=self.app.pargs.max_workers)
 
         print('Built base image {}:{{{}}}'.format(
             mgr.config['base_image']['repo'], ', '.join(mgr.config['base_image']['tags'])))
         print('Built image {}:{{{}}}'.format(
             mgr.config['image']['repo'], ', '.join(mgr.config['image']['tags'])))
         print('Built container {}'.format(mgr._container.name))
+        print(pipeline.format_stages())
+        print(pipeline.format_critical_path())
 
     @cement.ex(help='Push base image and image')
     def push(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
         mgr.login_docker_hub()
 
         config = mgr.config['base_image']
@@ -227,7 +733,7 @@ class AllController(cement.Controller):
 
     @cement.ex(help='Pull base image and image')
     def pull(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
 
         config = mgr.config['base_image']
         mgr.pull_image(config['repo_unsquashed'], config['tags'])
@@ -240,7 +746,7 @@ class AllController(cement.Controller):
 
     @cement.ex(help='Remove base image, image, and containers')
     def remove(self):
-        mgr = wc_env_manager.core.WcEnvManager({'verbose': VERBOSE})
+        mgr = get_manager()
 
         config = mgr.config['base_image']
         mgr.remove_image(config['repo_unsquashed'], config['tags'], force=True)
@@ -253,22 +759,188 @@ class AllController(cement.Controller):
 
         mgr.remove_containers(force=True)
 
+    @cement.ex(help='Remove old images, stopped containers, dangling images, and build cache',
+               arguments=[
+                   (['--keep-tags'], dict(type=int, default=None,
+                                          help='Number of the most recent version tags of each image repository to keep')),
+                   (['--stopped-container-max-age'], dict(type=str, default=None,
+                                                          help='Maximum age of stopped containers (e.g., `7d`)')),
+                   (['--build-cache-max-size'], dict(type=str, default=None,
+                                                     help='Maximum size of the build cache (e.g., `10g`)')),
+                   (['--dry-run'], dict(action='store_true', default=False,
+                                        help='Only list the images and containers that would be removed')),
+                   (['--json'], dict(action='store_true', default=False, help='Print the report as JSON')),
+               ])
+    def gc(self):
+        import wc_env_manager.cleanup
+        import wc_env_manager.telemetry
+        args = self.app.pargs
+        mgr = get_manager()
+        collector = wc_env_manager.cleanup.GarbageCollector(
+            mgr, keep_tags=args.keep_tags,
+            stopped_container_max_age=args.stopped_container_max_age,
+            build_cache_max_size=args.build_cache_max_size)
+        report = collector.run(dry_run=args.dry_run)
+
+        if args.json:
+            print(json.dumps(report.to_dict(), indent=2))
+        else:
+            verb = 'Would remove' if report.dry_run else 'Removed'
+            print('{} {} images:'.format(verb, len(report.removed_images)))
+            for ref in report.removed_images:
+                print('  {}'.format(ref))
+            print('{} {} containers:'.format(verb, len(report.removed_containers)))
+            for name in report.removed_containers:
+                print('  {}'.format(name))
+            if not report.dry_run:
+                print('Pruned {} dangling images and {} build cache records'.format(
+                    report.pruned_images, report.pruned_build_cache))
+                print('Reclaimed {}'.format(wc_env_manager.telemetry.format_bytes(report.space_reclaimed)))
+            for error in report.errors:
+                print('Error: {}'.format(error))
+
+        if report.errors:
+            self.app.exit_code = 1
+
+
+class DaemonController(cement.Controller):
+    """ Run a resident daemon which runs commands with warm managers """
+
+    class Meta:
+        label = 'daemon'
+        description = 'Run a resident daemon which runs commands with warm managers'
+        help = 'Run a resident daemon which runs commands with warm managers'
+        stacked_on = 'base'
+        stacked_type = 'nested'
+        arguments = []
+
+    @cement.ex(hide=True)
+    def _default(self):
+        self._parser.print_help()
+
+    @cement.ex(help='Run the daemon until it is stopped or interrupted',
+               arguments=[
+                   (['--socket'], dict(type=str, default=None, help='Path to the socket of the daemon')),
+               ])
+    def start(self):
+        daemon = wc_env_manager.daemon.ManagerDaemon(socket_path=self.app.pargs.socket)
+        daemon.start()
+        print('Listening on {}'.format(daemon.socket_path), flush=True)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    @cement.ex(help='Stop the daemon',
+               arguments=[
+                   (['--socket'], dict(type=str, default=None, help='Path to the socket of the daemon')),
+               ])
+    def stop(self):
+        response = wc_env_manager.daemon.send_command('stop', socket_path=self.app.pargs.socket)
+        if response is None:
+            print('The daemon is not running')
+            self.app.exit_code = 1
+        else:
+            print('Stopped the daemon (pid {})'.format(response['pid']))
+
+    @cement.ex(help='Get the status of the daemon',
+               arguments=[
+                   (['--socket'], dict(type=str, default=None, help='Path to the socket of the daemon')),
+               ])
+    def status(self):
+        response = wc_env_manager.daemon.send_command('status', socket_path=self.app.pargs.socket)
+        if response is None:
+            print('The daemon is not running')
+            self.app.exit_code = 1
+        else:
+            print('The daemon (pid {}) is listening on {}'.format(response['pid'], response['socket']))
+
 
 class App(cement.App):
     """ Command line application """
     class Meta:
         label = 'wc-env-manager'
         base_controller = 'base'
+        hooks = [
+            ('post_argument_parsing', start_tracing),
+            ('pre_close', save_trace),
+        ]
         handlers = [
             BaseController,
             BaseImageController,
             ImageController,
             NetworkController,
             ContainerController,
+            HistoryController,
             AllController,
+            DaemonController,
         ]
 
 
+def parse_args(argv):
+    """ Parse the arguments of a command without running it (e.g., to determine whether the
+    command can be forwarded to the daemon)
+
+    Args:
+        argv (:obj:`list` of :obj:`str`): arguments
+
+    Returns:
+        :obj:`tuple`: labels of the controller and function of the command (e.g., `('container', 'idle')`),
+            and the parsed arguments, or :obj:`None` if the parser exits (e.g., for `--help`, `--version`,
+            or invalid arguments)
+    """
+    import contextlib
+    import io
+
+    with App(argv=argv, catch_signals=None) as app:
+        # build the parsers of the controllers as :obj:`cement.Controller._dispatch` does
+        controller = app.controller
+        controller._setup_controllers()
+        controller._setup_parsers()
+        for sub_controller in controller._controllers:
+            controller._process_arguments(sub_controller)
+            controller._process_commands(sub_controller)
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                pargs = app.args.parse_args(argv)
+        except SystemExit:
+            return None
+
+    if hasattr(pargs, '__dispatch__'):
+        command = tuple(pargs.__dispatch__.split('.'))
+    else:
+        command = (pargs.__controller_namespace__,)
+    return (command, pargs)
+
+
+def run(argv=None, manager_pool=None):
+    """ Run a command
+
+    Args:
+        argv (:obj:`list` of :obj:`str`, optional): arguments; default: the arguments of the process
+        manager_pool (:obj:`wc_env_manager.daemon.ManagerPool`, optional): pool of warm managers
+            of the daemon which is running the command
+
+    Returns:
+        :obj:`int`: exit code
+    """
+    global _manager_pool
+    _manager_pool = manager_pool
+    try:
+        # the daemon runs commands outside of the main thread, where signal handlers can't be installed
+        meta = {'catch_signals': None} if manager_pool else {}
+        with App(argv=argv, **meta) as app:
+            app.run()
+        return app.exit_code
+    finally:
+        _manager_pool = None
+
+
 def main():
-    with App() as app:
-        app.run()
+    # run the command with the daemon, if it is running
+    exit_code = wc_env_manager.daemon.forward(sys.argv[1:])
+    if exit_code is not None:
+        return exit_code
+
+    return run()
@@ -0,0 +1,752 @@
+""" Asynchronous (asyncio) tools for managing computing environments for whole-cell modeling
+
+:obj:`AsyncWcEnvManager` talks to the Docker Engine API over the Docker daemon's unix socket
+with an asynchronous HTTP client. This enables orchestration code to manage many containers
+concurrently from a single event loop, e.g.::
+
+    async with AsyncWcEnvManager() as mgr:
+        containers = await mgr.get_containers()
+        results = await asyncio.gather(*[
+            mgr.run_process_in_container(['python', '--version'], container=container['Id'])
+            for container in containers])
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import asyncio
+import base64
+import dateutil.parser
+import docker
+import json
+import os
+import posixpath
+import shlex
+import shutil
+import struct
+import tarfile
+import tempfile
+import urllib.parse
+import wc_env_manager.config.core
+import wc_env_manager.core
+import wc_env_manager.resources
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None  # pragma: no cover
+
+
+class AsyncWcEnvManager(object):
+    """ Asynchronously manage computing environments (Docker containers) for whole-cell modeling
+
+    Containers are referenced by their names or ids. Methods which operate on a container
+    operate on the container passed via their `container` argument or, by default, on the
+    current container (see :obj:`set_container`).
+
+    Attributes:
+        config (:obj:`configobj.ConfigObj`): Dictionary of configuration options. See
+            `wc_env_manager/config/core.schema.cfg`.
+        _docker_socket_path (:obj:`str`): path to the unix socket of the Docker daemon
+        _session (:obj:`aiohttp.ClientSession`): HTTP session connected to the Docker daemon
+        _registry_auth (:obj:`str`): base64-encoded credentials for DockerHub
+        _container (:obj:`str`): name or id of the current Docker container
+    """
+
+    DEFAULT_DOCKER_HOST = 'unix:///var/run/docker.sock'
+    DOCKER_API_URL = 'http://docker'
+
+    def __init__(self, config=None, docker_host=None):
+        """
+        Args:
+            config (:obj:`dict`, optional): Dictionary of configuration options. See
+                `wc_env_manager/config/core.schema.cfg`.
+            docker_host (:obj:`str`, optional): URL of the Docker daemon (e.g.,
+                `unix:///var/run/docker.sock`). Default: `DOCKER_HOST` environment variable
+                or `unix:///var/run/docker.sock`
+
+        Raises:
+            :obj:`WcEnvManagerError`: if aiohttp is not installed or the Docker daemon
+                is not reachable via a unix socket
+        """
+        if aiohttp is None:
+            raise wc_env_manager.core.WcEnvManagerError('aiohttp must be installed to use `AsyncWcEnvManager`')  # pragma: no cover
+
+        # get configuration
+        self.config = wc_env_manager.config.core.get_config(extra={
+            'wc_env_manager': config or {}})['wc_env_manager']
+
+        # get the socket of the Docker daemon
+        docker_host = docker_host or os.getenv('DOCKER_HOST', None) or self.DEFAULT_DOCKER_HOST
+        if not docker_host.startswith('unix://'):
+            raise wc_env_manager.core.WcEnvManagerError(
+                'Docker daemon must be reachable via a unix socket, not "{}"'.format(docker_host))
+        self._docker_socket_path = docker_host[len('unix://'):]
+
+        self._session = None
+        self._registry_auth = None
+        self._container = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def open(self):
+        """ Connect to the Docker daemon and set the current container to the latest container """
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.UnixConnector(path=self._docker_socket_path),
+            timeout=aiohttp.ClientTimeout(total=None))
+        latest_container = await self.get_latest_container()
+        if latest_container:
+            self.set_container(latest_container['Id'])
+
+    async def close(self):
+        """ Disconnect from the Docker daemon """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method, path, params=None, json_data=None, data=None, headers=None):
+        """ Send a request to the Docker Engine API and read the response
+
+        Args:
+            method (:obj:`str`): HTTP method
+            path (:obj:`str`): path of the API endpoint
+            params (:obj:`dict`, optional): query parameters
+            json_data (:obj:`object`, optional): JSON-encodable body
+            data (:obj:`bytes` or file-like, optional): raw body
+            headers (:obj:`dict`, optional): HTTP headers
+
+        Returns:
+            :obj:`tuple`:
+
+                * :obj:`int`: HTTP status
+                * :obj:`bytes`: body of the response
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the Docker daemon returns an error
+        """
+        async with self._session.request(method, self.DOCKER_API_URL + path, params=params,
+                                         json=json_data, data=data, headers=headers) as response:
+            body = await response.read()
+            if response.status >= 400:
+                raise wc_env_manager.core.WcEnvManagerError('Docker API error ({} {}): {}'.format(
+                    response.status, path, self._get_error_message(body)))
+            return response.status, body
+
+    async def _request_json_stream(self, method, path, params=None, headers=None):
+        """ Send a request to the Docker Engine API and collect the errors reported in its
+        stream of JSON-encoded progress messages (e.g., for pushing and pulling images)
+
+        Args:
+            method (:obj:`str`): HTTP method
+            path (:obj:`str`): path of the API endpoint
+            params (:obj:`dict`, optional): query parameters
+            headers (:obj:`dict`, optional): HTTP headers
+
+        Returns:
+            :obj:`list` of :obj:`str`: errors
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the Docker daemon returns an error
+        """
+        errors = []
+        async with self._session.request(method, self.DOCKER_API_URL + path, params=params,
+                                         headers=headers) as response:
+            if response.status >= 400:
+                raise wc_env_manager.core.WcEnvManagerError('Docker API error ({} {}): {}'.format(
+                    response.status, path, self._get_error_message(await response.read())))
+
+            async for line in response.content:
+                line = line.strip()
+                if not line:
+                    continue
+                message = json.loads(line.decode('utf-8'))
+                if 'error' in message:
+                    errors.append(message['error'])
+                elif self.config['verbose'] and 'status' in message:
+                    if 'id' in message:
+                        print('{}: {}'.format(message['id'], message['status']))
+                    else:
+                        print(message['status'])
+        return errors
+
+    @staticmethod
+    def _get_error_message(body):
+        """ Get the error message from the body of a response of the Docker Engine API
+
+        Args:
+            body (:obj:`bytes`): body of the response
+
+        Returns:
+            :obj:`str`: error message
+        """
+        try:
+            return json.loads(body.decode('utf-8'))['message']
+        except (ValueError, KeyError, UnicodeDecodeError):
+            return body.decode('utf-8', errors='replace')
+
+    def _get_container_path(self, container):
+        """ Get the API path of a container
+
+        Args:
+            container (:obj:`str`): name or id of a container, or :obj:`None` for the
+                current container
+
+        Returns:
+            :obj:`str`: API path of the container
+
+        Raises:
+            :obj:`WcEnvManagerError`: if no container is specified and there is no current container
+        """
+        container = container or self._container
+        if not container:
+            raise wc_env_manager.core.WcEnvManagerError('A container must be specified')
+        return '/containers/' + urllib.parse.quote(container, safe='')
+
+    def set_container(self, container):
+        """ Set the Docker container
+
+        Args:
+            container (:obj:`str`): name or id of a Docker container
+        """
+        self._container = container
+
+    async def get_latest_container(self):
+        """ Get current Docker container
+
+        Returns:
+            :obj:`dict`: summary of the Docker container (see the `/containers/json` endpoint
+                of the Docker Engine API)
+        """
+        containers = await self.get_containers(sort_by_read_time=True)
+        if containers:
+            return containers[0]
+        else:
+            return None
+
+    async def get_containers(self, sort_by_read_time=False):
+        """ Get list of Docker containers that are WC modeling environments
+
+        Args:
+            sort_by_read_time (:obj:`bool`): if :obj:`True`, sort by read time in descending order
+                (latest first)
+
+        Returns:
+            :obj:`list` of :obj:`dict`: list of summaries of Docker containers that are WC modeling
+                environments (see the `/containers/json` endpoint of the Docker Engine API)
+        """
+        _, body = await self._request('GET', '/containers/json', params={'all': '1'})
+        containers = []
+        for container in json.loads(body.decode('utf-8')):
+            names = [name.lstrip('/') for name in container['Names']]
+            name_format = self.config['container']['name_format']
+            if any(wc_env_manager.core.WcEnvManager.is_container_name(name, name_format) for name in names):
+                containers.append(container)
+
+        if sort_by_read_time:
+            stats = await asyncio.gather(*[self.get_container_stats(container=container['Id'])
+                                           for container in containers])
+            read_times = {container['Id']: dateutil.parser.parse(container_stats['read'])
+                          for container, container_stats in zip(containers, stats)}
+            containers.sort(reverse=True, key=lambda container: read_times[container['Id']])
+
+        return containers
+
+    async def run_process_in_container(self, cmd, work_dir=None, env=None, check=True,
+                                       container_user=wc_env_manager.core.WcEnvUser.root, container=None):
+        """ Run a process in a Docker container
+
+        As with :obj:`WcEnvManager.run_process_in_container`, the thread pools of numerical libraries are
+        limited to the CPUs allocated to the container (`config['container']['resources']['thread_env']`),
+        and containers which have been hibernated (see :obj:`wc_env_manager.idle`) are transparently
+        unpaused or restarted.
+
+        Args:
+            cmd (:obj:`list` of :obj:`str` or :obj:`str`): command to run
+            work_dir (:obj:`str`, optional): path to working directory within container
+            env (:obj:`dict`, optional): key/value pairs of environment variables
+            check (:obj:`bool`, optional): if :obj:`True`, raise exception if exit code is not 0
+            container_user (:obj:`WcEnvUser`, optional): user to run commands in container
+            container (:obj:`str`, optional): name or id of the container; default: current container
+
+        Returns:
+            :obj:`tuple`:
+
+                * :obj:`str`: output of the process
+                * :obj:`int`: exit code of the process
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the command is not executed successfully
+        """
+        resources_config = self.config['container']['resources']
+        if resources_config['thread_env']:
+            env = wc_env_manager.resources.get_process_env(
+                resources_config, docker.models.containers.Container(attrs=await self._inspect_container(container)),
+                env=env)
+        else:
+            env = dict(env or {})
+        if isinstance(cmd, str):
+            cmd_list = shlex.split(cmd)
+        else:
+            cmd_list = cmd
+
+        # create and start execution
+        exec_config = {
+            'AttachStdout': True,
+            'AttachStderr': True,
+            'Cmd': cmd_list,
+            'Env': ['{}={}'.format(key, val) for key, val in env.items()],
+            'User': container_user.name,
+        }
+        if work_dir:
+            exec_config['WorkingDir'] = work_dir
+
+        async def create_exec():
+            _, body = await self._request('POST', self._get_container_path(container) + '/exec', json_data=exec_config)
+            return json.loads(body.decode('utf-8'))['Id']
+
+        try:
+            exec_id = await create_exec()
+        except wc_env_manager.core.WcEnvManagerError:
+            # wake the container if it has been hibernated (see :obj:`wc_env_manager.idle`), and retry
+            if not await self.wake_container(container=container):
+                raise
+            exec_id = await create_exec()
+
+        _, body = await self._request('POST', '/exec/{}/start'.format(exec_id),
+                                      json_data={'Detach': False, 'Tty': False})
+        output = self._demultiplex(body).decode('utf-8', errors='replace')
+        if output.endswith('\n'):
+            output = output[0:-1]
+
+        _, body = await self._request('GET', '/exec/{}/json'.format(exec_id))
+        exit_code = json.loads(body.decode('utf-8'))['ExitCode']
+
+        # print output
+        if self.config['verbose'] and output:
+            print(output)
+
+        # check for errors
+        if check and exit_code != 0:
+            raise wc_env_manager.core.WcEnvManagerError(
+                ('Command not successfully executed in Docker container:\n'
+                 '  command: {}\n'
+                 '  working directory: {}\n'
+                 '  environment:\n    {}\n'
+                 '  exit code: {}\n'
+                 '  output: {}').format(
+                    cmd, work_dir,
+                    '\n    '.join('{}: {}'.format(key, val) for key, val in env.items()),
+                    exit_code,
+                    output))
+
+        return (output, exit_code)
+
+    async def _inspect_container(self, container=None):
+        """ Get the attributes of a Docker container
+
+        Args:
+            container (:obj:`str`, optional): name or id of the container; default: current container
+
+        Returns:
+            :obj:`dict`: attributes of the container (see the `/containers/{id}/json` endpoint of the
+                Docker Engine API)
+        """
+        _, body = await self._request('GET', self._get_container_path(container) + '/json')
+        return json.loads(body.decode('utf-8'))
+
+    async def wake_container(self, container=None):
+        """ Unpause or restart a container which has been hibernated (see :obj:`wc_env_manager.idle`)
+
+        As with :obj:`WcEnvManager.wake_container`, with the `numa` placement, a stopped container is
+        re-pinned to free CPUs before it is restarted if other containers have been pinned to its CPUs
+        in the meantime.
+
+        Args:
+            container (:obj:`str`, optional): name or id of the container; default: current container
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the container was unpaused or restarted
+        """
+        attrs = await self._inspect_container(container)
+        container_path = '/containers/' + attrs['Id']
+        status = attrs['State']['Status']
+        if status == 'paused':
+            await self._request('POST', container_path + '/unpause')
+        elif status in ('exited', 'created'):
+            config = self.config['container']['resources']
+            if wc_env_manager.resources.is_numa_placement(config):
+                await self._repin_container(attrs)
+            await self._request('POST', container_path + '/start')
+        else:
+            return False
+        return True
+
+    async def _repin_container(self, attrs):
+        """ Pin a stopped container to free CPUs if other containers are pinned to its CPUs
+
+        Args:
+            attrs (:obj:`dict`): attributes of the container
+        """
+        active_containers = [other for other in await self.get_containers()
+                             if other['State'] in ('created', 'running', 'paused', 'restarting')
+                             and other['Id'] != attrs['Id']]
+        active_attrs = await asyncio.gather(*[self._inspect_container(other['Id']) for other in active_containers])
+        used_cpus = wc_env_manager.resources.get_pinned_cpus(
+            docker.models.containers.Container(attrs=other_attrs) for other_attrs in active_attrs)
+        pinned_cpus = wc_env_manager.resources.get_pinned_cpus([docker.models.containers.Container(attrs=attrs)])
+        if pinned_cpus.isdisjoint(used_cpus):
+            return
+        args = wc_env_manager.resources.get_container_run_args(
+            self.config['container']['resources'], used_cpus=used_cpus)
+        update = {'CpusetCpus': args['cpuset_cpus']}
+        if args.get('cpuset_mems', None):
+            update['CpusetMems'] = args['cpuset_mems']
+        await self._request('POST', '/containers/{}/update'.format(attrs['Id']), json_data=update)
+
+    @staticmethod
+    def _demultiplex(stream):
+        """ Concatenate the payloads of the frames of a multiplexed stdout/stderr stream of
+        the Docker Engine API
+
+        Args:
+            stream (:obj:`bytes`): multiplexed stream
+
+        Returns:
+            :obj:`bytes`: stdout and stderr, in the order in which they were written
+        """
+        payloads = []
+        i_byte = 0
+        while i_byte + 8 <= len(stream):
+            _, size = struct.unpack('>BxxxL', stream[i_byte:i_byte + 8])
+            payloads.append(stream[i_byte + 8:i_byte + 8 + size])
+            i_byte += 8 + size
+        return b''.join(payloads)
+
+    async def get_container_stats(self, container=None):
+        """ Get statistics about the CPU, io, memory, network performance of a Docker container
+
+        Args:
+            container (:obj:`str`, optional): name or id of the container; default: current container
+
+        Returns:
+            :obj:`dict`: statistics about the CPU, io, memory, network performance of the Docker container
+        """
+        _, body = await self._request('GET', self._get_container_path(container) + '/stats', params={'stream': '0'})
+        return json.loads(body.decode('utf-8'))
+
+    async def _container_path_exists(self, container_path, container=None):
+        """ Determine whether a path exists in a Docker container
+
+        Args:
+            container_path (:obj:`str`): path within the container
+            container (:obj:`str`, optional): name or id of the container; default: current container
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the path exists
+        """
+        async with self._session.head(self.DOCKER_API_URL + self._get_container_path(container) + '/archive',
+                                      params={'path': container_path}) as response:
+            return response.status == 200
+
+    async def copy_path_to_container(self, local_path, container_path, overwrite=True, container=None):
+        """ Copy file or directory to a Docker container
+
+        Args:
+            local_path (:obj:`str`): path to local file/directory to copy to container
+            container_path (:obj:`str`): path to copy file/directory within container
+            overwrite (:obj:`bool`, optional): if :obj:`True`, overwrite file
+            container (:obj:`str`, optional): name or id of the container; default: current container
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the container_path already exists and
+                :obj:`overwrite` is :obj:`False`
+        """
+        if not overwrite and await self._container_path_exists(container_path, container=container):
+            raise wc_env_manager.core.WcEnvManagerError('File {} already exists'.format(container_path))
+
+        container_dirname, container_basename = posixpath.split(
+            container_path.rstrip(wc_env_manager.core.WcEnvManager.IMAGE_OS_SEP))
+
+        def make_archive():
+            archive = tempfile.TemporaryFile()
+            with tarfile.open(fileobj=archive, mode='w') as tar_file:
+                tar_file.add(local_path, arcname=container_basename)
+            archive.seek(0)
+            return archive
+
+        archive = await asyncio.get_event_loop().run_in_executor(None, make_archive)
+        try:
+            await self._request('PUT', self._get_container_path(container) + '/archive',
+                                params={'path': container_dirname or wc_env_manager.core.WcEnvManager.IMAGE_OS_SEP},
+                                data=archive,
+                                headers={'Content-Type': 'application/x-tar'})
+        finally:
+            archive.close()
+
+    async def copy_path_from_container(self, container_path, local_path, overwrite=True, container=None):
+        """ Copy file/directory from a Docker container
+
+        Args:
+            container_path (:obj:`str`): path to file/directory within container
+            local_path (:obj:`str`): local path to copy file/directory from container
+            overwrite (:obj:`bool`, optional): if :obj:`True`, overwrite file
+            container (:obj:`str`, optional): name or id of the container; default: current container
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the container_path already exists and
+                :obj:`overwrite` is :obj:`False`
+        """
+        is_file = os.path.isfile(local_path) or os.path.isdir(local_path)
+        if is_file and not overwrite:
+            raise wc_env_manager.core.WcEnvManagerError('File {} already exists'.format(local_path))
+
+        archive = tempfile.TemporaryFile()
+        try:
+            async with self._session.get(self.DOCKER_API_URL + self._get_container_path(container) + '/archive',
+                                         params={'path': container_path}) as response:
+                if response.status >= 400:
+                    raise wc_env_manager.core.WcEnvManagerError('Docker API error ({} {}): {}'.format(
+                        response.status, container_path, self._get_error_message(await response.read())))
+                async for chunk in response.content.iter_chunked(2 ** 20):
+                    archive.write(chunk)
+            archive.seek(0)
+
+            await asyncio.get_event_loop().run_in_executor(None, self._extract_archive, archive, local_path)
+        finally:
+            archive.close()
+
+    @staticmethod
+    def _extract_archive(archive, local_path):
+        """ Extract an archive of a file or directory copied from a container, following the
+        semantics of `docker cp`
+
+        The members of the archive are validated before they are extracted (see
+        :obj:`_check_archive_members`), and, with Python versions which support extraction filters,
+        they are also extracted with the `data` filter.
+
+        Args:
+            archive (:obj:`file`): tar archive
+            local_path (:obj:`str`): local path to copy file/directory from container
+
+        Raises:
+            :obj:`WcEnvManagerError`: if a member of the archive would be extracted outside of the
+                destination
+        """
+        temp_dirname = tempfile.mkdtemp()
+        try:
+            with tarfile.open(fileobj=archive, mode='r') as tar_file:
+                AsyncWcEnvManager._check_archive_members(tar_file)
+                if hasattr(tarfile, 'data_filter'):
+                    tar_file.extractall(temp_dirname, filter='data')
+                else:
+                    tar_file.extractall(temp_dirname)  # pragma: no cover # Python without extraction filters
+            src_path = os.path.join(temp_dirname, os.listdir(temp_dirname)[0])
+
+            if os.path.isdir(src_path) and os.path.isdir(local_path):
+                for name in os.listdir(src_path):
+                    dest_path = os.path.join(local_path, name)
+                    if os.path.isdir(dest_path) and not os.path.islink(dest_path):
+                        shutil.rmtree(dest_path)
+                    elif os.path.lexists(dest_path):
+                        os.remove(dest_path)
+                    shutil.move(os.path.join(src_path, name), dest_path)
+            else:
+                if os.path.isdir(local_path) and not os.path.islink(local_path):
+                    shutil.rmtree(local_path)
+                elif os.path.lexists(local_path):
+                    os.remove(local_path)
+                shutil.move(src_path, local_path)
+        finally:
+            shutil.rmtree(temp_dirname)
+
+    @staticmethod
+    def _check_archive_members(tar_file):
+        """ Check that the members of an archive can be extracted safely: that their paths are
+        relative and don't escape the destination, that links don't point outside of the archive,
+        and that no member is a device
+
+        Args:
+            tar_file (:obj:`tarfile.TarFile`): archive
+
+        Raises:
+            :obj:`WcEnvManagerError`: if a member is unsafe
+        """
+        def is_outside(path):
+            return posixpath.isabs(path) or path == '..' or path.startswith('../')
+
+        for member in tar_file.getmembers():
+            name = posixpath.normpath(member.name)
+            if is_outside(name):
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Archive member {} is outside of the destination'.format(member.name))
+
+            if member.issym():
+                target = posixpath.normpath(posixpath.join(posixpath.dirname(name), member.linkname))
+            elif member.islnk():
+                target = posixpath.normpath(member.linkname)
+            else:
+                target = None
+            if target is not None and (posixpath.isabs(member.linkname) or is_outside(target)):
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Archive member {} links outside of the destination to {}'.format(member.name, member.linkname))
+
+            if member.isdev():
+                raise wc_env_manager.core.WcEnvManagerError('Archive member {} is a device'.format(member.name))
+
+    async def login_docker_hub(self):
+        """ Login to DockerHub """
+        config = self.config['docker_hub']
+        auth_config = {
+            'username': config['username'],
+            'password': config['password'],
+            'serveraddress': 'https://index.docker.io/v1/',
+        }
+        await self._request('POST', '/auth', json_data=auth_config)
+        self._registry_auth = base64.urlsafe_b64encode(json.dumps(auth_config).encode('utf-8')).decode('utf-8')
+
+    async def push_image(self, image_repo, image_tags):
+        """ Push Docker image to DockerHub
+
+        Args:
+            image_repo (:obj:`str`): image repository
+            image_tags (:obj:`list` of :obj:`str`): list of tags
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the image could not be pushed
+        """
+        headers = {'X-Registry-Auth': self._registry_auth or base64.urlsafe_b64encode(b'{}').decode('utf-8')}
+        tags_errors = await asyncio.gather(*[
+            self._request_json_stream('POST', '/images/{}/push'.format(image_repo),
+                                      params={'tag': tag}, headers=headers)
+            for tag in image_tags])
+        for tag, errors in zip(image_tags, tags_errors):
+            if errors:
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Push {}:{} failed:\n  {}'.format(image_repo, tag, '\n  '.join(errors)))
+
+    async def pull_image(self, image_repo, image_tags):
+        """ Pull Docker image for WC modeling environment
+
+        Args:
+            image_repo (:obj:`str`): image repository
+            image_tags (:obj:`list` of :obj:`str`): list of tags
+
+        Returns:
+            :obj:`dict`: low-level information about the Docker image (see the `/images/{name}/json`
+                endpoint of the Docker Engine API)
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the image could not be pulled
+        """
+        headers = {}
+        if self._registry_auth:
+            headers['X-Registry-Auth'] = self._registry_auth
+        tags_errors = await asyncio.gather(*[
+            self._request_json_stream('POST', '/images/create',
+                                      params={'fromImage': image_repo, 'tag': tag}, headers=headers)
+            for tag in image_tags])
+        for tag, errors in zip(image_tags, tags_errors):
+            if errors:
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Pull {}:{} failed:\n  {}'.format(image_repo, tag, '\n  '.join(errors)))
+
+        _, body = await self._request('GET', '/images/{}:{}/json'.format(image_repo, image_tags[-1]))
+        return json.loads(body.decode('utf-8'))
+
+    async def remove_image(self, image_repo, image_tags, force=False):
+        """ Remove version of Docker image
+
+        Args:
+            image_repo (:obj:`str`): image repository
+            image_tags (:obj:`list` of :obj:`str`): list of tags
+            force (:obj:`bool`, optional): if :obj:`True`, force removal of the version of the
+                image (e.g. even if a container with the image is running)
+        """
+        await asyncio.gather(*[
+            self._request('DELETE', '/images/{}:{}'.format(image_repo, tag), params={'force': '1' if force else '0'})
+            for tag in image_tags])
+
+    async def remove_container(self, force=False, container=None):
+        """ Remove a Docker container
+
+        Args:
+            force (:obj:`bool`, optional): if :obj:`True`, force removal of the container
+                (e.g. remove container even if it is running)
+            container (:obj:`str`, optional): name or id of the container; default: current container
+        """
+        container_path = self._get_container_path(container)
+        _, body = await self._request('GET', container_path + '/json')
+        name = json.loads(body.decode('utf-8'))['Name'].lstrip('/')
+
+        await self._request('DELETE', container_path, params={'force': '1' if force else '0'})
+        await self.remove_path_overlays(name)
+
+        if not container or container == self._container:
+            self._container = None
+
+    async def remove_containers(self, force=False):
+        """ Remove Docker all containers that are WC modeling environments
+
+        Args:
+            force (:obj:`bool`, optional): if :obj:`True`, force removal of the container
+                (e.g. remove containers even if they are running)
+        """
+        containers = await self.get_containers()
+        await asyncio.gather(*[self.remove_container(force=force, container=container['Id'])
+                               for container in containers])
+        self._container = None
+
+    async def remove_path_overlays(self, container_name):
+        """ Remove the volumes and upper layers of the overlays of a container
+
+        The upper layers contain the files which the container changed. These files are usually
+        owned by root. Files which the user can't remove are removed by a container of the image.
+
+        Args:
+            container_name (:obj:`str`): name of the container
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the upper layers couldn't be removed
+        """
+        filters = {'label': ['{}={}'.format(wc_env_manager.core.WcEnvManager.OVERLAY_VOLUME_LABEL, container_name)]}
+        _, body = await self._request('GET', '/volumes', params={'filters': json.dumps(filters)})
+        volumes = json.loads(body.decode('utf-8'))['Volumes'] or []
+        await asyncio.gather(*[self._request('DELETE', '/volumes/' + volume['Name'], params={'force': '1'})
+                               for volume in volumes])
+
+        overlay_path = os.path.abspath(self.config['container']['overlay_path'])
+        overlay_dirname = os.path.join(overlay_path, container_name)
+        if not os.path.isdir(overlay_dirname):
+            return
+
+        errors = []
+        await asyncio.get_event_loop().run_in_executor(None, lambda: shutil.rmtree(
+            overlay_dirname, onerror=lambda func, path, exc_info: errors.append(path)))
+        if not errors:
+            return
+
+        img_config = self.config['image']
+        _, body = await self._request('POST', '/containers/create', json_data={
+            'Image': img_config['repo'] + ':' + img_config['tags'][0],
+            'Entrypoint': [],
+            'Cmd': ['rm', '-rf', '/overlays/' + container_name],
+            'User': 'root',
+            'HostConfig': {'Binds': ['{}:/overlays:rw'.format(overlay_path)]},
+        })
+        container_id = json.loads(body.decode('utf-8'))['Id']
+        try:
+            await self._request('POST', '/containers/{}/start'.format(container_id))
+            _, body = await self._request('POST', '/containers/{}/wait'.format(container_id))
+            exit_code = json.loads(body.decode('utf-8'))['StatusCode']
+        finally:
+            await self._request('DELETE', '/containers/' + container_id, params={'force': '1'})
+        if exit_code:
+            raise wc_env_manager.core.WcEnvManagerError(
+                'Upper layers of the overlays of container {} could not be removed from {}'.format(
+                    container_name, overlay_dirname))
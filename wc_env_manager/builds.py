@@ -0,0 +1,304 @@
+""" Coordination of the builds of Docker images by the processes of a host
+
+When several processes of a host (e.g., the builds of several developers or CI jobs) build images at
+the same time, :obj:`BuildCoordinator` coalesces the builds with identical inputs and limits the
+number of concurrent builds with different inputs. The coordination uses advisory file locks
+(`fcntl.flock`) in a directory which is shared by the processes of the host:
+
+* `<repo>/<fingerprint>.lock`: held by the process which is building an image from the inputs with
+  the fingerprint (see :obj:`get_fingerprint`). Other processes which request the same build wait for
+  this lock, and then reuse the image recorded in `<repo>/<fingerprint>.json` rather than building it again.
+  Each result has a unique build id. A waiting process only reuses a result whose id differs from the id of
+  the result it read before it requested the lock, i.e. a build which completed while it waited. This
+  doesn't depend on the clocks of the processes (e.g., of containers) agreeing.
+* `slot-<i>.lock`: the slots for concurrent builds (`config['build']['max_concurrent_builds']`). Builds
+  with different inputs queue for a free slot.
+
+Locks are released by the operating system when their processes exit, so the builds of processes
+which crash don't block the other processes.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import contextlib
+import docker
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+import wc_env_manager.core
+
+
+class BuildTicket(object):
+    """ Permission to build an image, or the result of an identical build by another process
+
+    Attributes:
+        repo (:obj:`str`): repository of the image
+        fingerprint (:obj:`str`): fingerprint of the inputs of the build
+        result (:obj:`dict`): result of an identical build which completed while the request waited
+            (`build_id`, `image_id`, `tags`, `time`, and `pid`), or :obj:`None` if the image must be built
+        wait_time (:obj:`float`): time spent waiting for other builds (seconds)
+        _result_path (:obj:`str`): path to save the result of the build
+    """
+
+    def __init__(self, repo, fingerprint, result_path, result=None, wait_time=0.):
+        """
+        Args:
+            repo (:obj:`str`): repository of the image
+            fingerprint (:obj:`str`): fingerprint of the inputs of the build
+            result_path (:obj:`str`): path to save the result of the build
+            result (:obj:`dict`, optional): result of an identical build by another process
+            wait_time (:obj:`float`, optional): time spent waiting for other builds (seconds)
+        """
+        self.repo = repo
+        self.fingerprint = fingerprint
+        self.result = result
+        self.wait_time = wait_time
+        self._result_path = result_path
+
+    def get_image(self, docker_client):
+        """ Get the image built by another process with identical inputs
+
+        Args:
+            docker_client (:obj:`docker.client.DockerClient`): client connected to the Docker daemon
+
+        Returns:
+            :obj:`docker.models.images.Image`: image, or :obj:`None` if there is no result or its image
+                has been removed
+        """
+        if self.result is None:
+            return None
+        try:
+            return docker_client.images.get(self.result['image_id'])
+        except docker.errors.ImageNotFound:
+            return None
+
+    def save_result(self, image):
+        """ Record the image built with the inputs, so that the processes which are waiting for the
+        build can reuse it
+
+        Args:
+            image (:obj:`docker.models.images.Image`): image
+        """
+        temp_path = '{}.{}.tmp'.format(self._result_path, os.getpid())
+        try:
+            with open(temp_path, 'w') as file:
+                json.dump({
+                    'build_id': uuid.uuid4().hex,
+                    'image_id': image.id,
+                    'tags': image.tags,
+                    'time': time.time(),
+                    'pid': os.getpid(),
+                }, file)
+            os.replace(temp_path, self._result_path)
+        except OSError:
+            # e.g., the result of a previous build is owned by another user; the waiting processes
+            # will then build the image themselves
+            pass
+
+
+class BuildCoordinator(object):
+    """ Coalesce identical builds of images by the processes of a host, and limit the number of
+    concurrent builds
+
+    Attributes:
+        lock_path (:obj:`str`): path to the directory of the locks and results of the builds
+        max_concurrent_builds (:obj:`int`): maximum number of concurrent builds with different inputs
+        timeout (:obj:`float`): maximum time to wait for other builds (seconds), or :obj:`None` to wait indefinitely
+        poll_interval (:obj:`float`): interval between attempts to acquire locks (seconds)
+    """
+
+    def __init__(self, lock_path, max_concurrent_builds=1, timeout=None, poll_interval=1.):
+        """
+        Args:
+            lock_path (:obj:`str`): path to the directory of the locks and results of the builds
+            max_concurrent_builds (:obj:`int`, optional): maximum number of concurrent builds with different inputs
+            timeout (:obj:`float`, optional): maximum time to wait for other builds (seconds); default: wait indefinitely
+            poll_interval (:obj:`float`, optional): interval between attempts to acquire locks (seconds)
+        """
+        self.lock_path = lock_path
+        self.max_concurrent_builds = max_concurrent_builds
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def from_config(cls, config):
+        """ Create a coordinator from its configuration
+
+        Args:
+            config (:obj:`dict`): configuration (`config['build']`)
+
+        Returns:
+            :obj:`BuildCoordinator`: coordinator, or :obj:`None` if coordination is disabled (no `lock_path`)
+        """
+        import wc_env_manager.history
+
+        if not config.get('lock_path', None):
+            return None
+        timeout = config.get('timeout', None)
+        return cls(os.path.expanduser(config['lock_path']),
+                   max_concurrent_builds=config.get('max_concurrent_builds', 1),
+                   timeout=wc_env_manager.history.parse_duration(timeout) if timeout else None,
+                   poll_interval=config.get('poll_interval', 1.))
+
+    @contextlib.contextmanager
+    def coordinate(self, repo, fingerprint, verbose=False):
+        """ Wait until an image can be built, or until an identical build by another process completes
+
+        Within the context, the caller should reuse the image of :obj:`BuildTicket.result`, if it is available,
+        or build the image and record it with :obj:`BuildTicket.save_result`.
+
+        Args:
+            repo (:obj:`str`): repository of the image
+            fingerprint (:obj:`str`): fingerprint of the inputs of the build (see :obj:`get_fingerprint`)
+            verbose (:obj:`bool`, optional): if :obj:`True`, report when the build waits for other builds
+
+        Yields:
+            :obj:`BuildTicket`: ticket
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the build waits longer than the timeout
+        """
+        start = time.perf_counter()
+        repo_dir = os.path.join(self.lock_path, re.sub(r'[^a-zA-Z0-9_.-]', '_', repo))
+        make_shared_dir(self.lock_path)
+        make_shared_dir(repo_dir)
+        result_path = os.path.join(repo_dir, fingerprint + '.json')
+
+        # results are only written by the holders of the lock, so a result whose id differs from the
+        # id of the result before the request was written by a build which completed after the request
+        prev_result = read_result(result_path)
+        prev_build_id = prev_result.get('build_id', None) if prev_result else None
+
+        with self._acquire([os.path.join(repo_dir, fingerprint + '.lock')], start,
+                           'Waiting for an identical build of {} by another process ...'.format(repo) if verbose else None):
+            # reuse the result of an identical build which completed after the request
+            result = read_result(result_path)
+            if result is not None and result.get('build_id', None) not in (None, prev_build_id):
+                if verbose:
+                    print('Reusing image {} of an identical build by another process (pid {})'.format(
+                        result['image_id'], result['pid']), flush=True)
+                yield BuildTicket(repo, fingerprint, result_path, result=result, wait_time=time.perf_counter() - start)
+                return
+
+            slot_paths = [os.path.join(self.lock_path, 'slot-{}.lock'.format(i_slot))
+                          for i_slot in range(self.max_concurrent_builds)]
+            with self._acquire(slot_paths, start,
+                               'Waiting for one of the other builds of the host to complete ...' if verbose else None):
+                yield BuildTicket(repo, fingerprint, result_path, wait_time=time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def _acquire(self, paths, start, message=None):
+        """ Acquire an exclusive lock on one of several files, waiting until one is available
+
+        Args:
+            paths (:obj:`list` of :obj:`str`): paths to the lock files
+            start (:obj:`float`): time at which the request started (:obj:`time.perf_counter`)
+            message (:obj:`str`, optional): message to print if the lock isn't immediately available
+
+        Yields:
+            :obj:`str`: path to the locked file
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if a lock isn't acquired before the timeout
+        """
+        while True:
+            for path in paths:
+                # the lock files are opened read-only, so that the other users of the host can lock them
+                fd = os.open(path, os.O_RDONLY | os.O_CREAT, 0o666)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError as exception:
+                    os.close(fd)
+                    if exception.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                    continue
+
+                try:
+                    yield path
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                return
+
+            if message:
+                print(message, flush=True)
+                message = None
+            if self.timeout is not None and time.perf_counter() - start + self.poll_interval > self.timeout:
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Timed out after {:.0f} s waiting for the other builds of the host'.format(self.timeout))
+            time.sleep(self.poll_interval)
+
+
+def get_fingerprint(context, repo, tags, inputs=None):
+    """ Get a fingerprint of the inputs of a build: the files of its context (including the Dockerfile),
+    its build arguments, the repository and tags of the image, and additional inputs (e.g., the id of the
+    image which the Dockerfile is based on)
+
+    Args:
+        context (:obj:`wc_env_manager.core.ImageContext`): context of the build
+        repo (:obj:`str`): repository of the image
+        tags (:obj:`list` of :obj:`str`): tags of the image
+        inputs (:obj:`dict`, optional): additional JSON-encodable inputs of the build
+
+    Returns:
+        :obj:`str`: fingerprint (SHA-256 hex digest)
+    """
+    hash = hashlib.sha256()
+    hash.update(json.dumps([repo, list(tags), dict(context.build_args),
+                            os.path.relpath(context.dockerfile_path, context.path),
+                            inputs or {}], sort_keys=True).encode())
+    for dir_name, sub_dir_names, file_names in os.walk(context.path):
+        sub_dir_names.sort()
+        for file_name in sorted(file_names):
+            path = os.path.join(dir_name, file_name)
+            hash.update(b'\0' + os.path.relpath(path, context.path).encode() + b'\0')
+            if os.path.islink(path):
+                hash.update(b'link:' + os.readlink(path).encode())
+                continue
+            hash.update(b'x' if os.access(path, os.X_OK) else b'-')
+            with open(path, 'rb') as file:
+                for block in iter(lambda: file.read(1024 * 1024), b''):
+                    hash.update(block)
+    return hash.hexdigest()
+
+
+def read_result(path):
+    """ Read the result of a build
+
+    Args:
+        path (:obj:`str`): path to the result
+
+    Returns:
+        :obj:`dict`: result, or :obj:`None` if there is no (valid) result
+    """
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (IOError, ValueError):
+        return None
+
+
+def make_shared_dir(path):
+    """ Create a directory which all users of the host can create lock files in
+
+    Args:
+        path (:obj:`str`): path
+    """
+    if os.path.isdir(path):
+        return
+    try:
+        os.makedirs(path)
+    except FileExistsError:
+        return
+    try:
+        os.chmod(path, 0o1777)
+    except OSError:  # pragma: no cover
+        pass
@@ -0,0 +1,324 @@
+""" Retention-based garbage collection of the images, containers, and build cache of WC modeling environments
+
+:obj:`GarbageCollector` applies a retention policy (`config['gc']`) to the Docker resources
+which accumulate as WC modeling environments are rebuilt:
+
+* Old versions of the images: for each repository (e.g., `karrlab/wc_env_dependencies_unsquashed`),
+  only the most recent semantic version tags are kept. Tags which aren't semantic versions
+  (e.g., `latest`), the configured tags, and the tags of images which are used by containers
+  are always kept.
+* Stopped WC modeling containers which exited before a maximum age, and their overlays
+* Dangling (untagged) images, such as intermediate images of builds
+* The build cache, which is pruned to a maximum size
+
+Images and containers are removed concurrently, and the space reclaimed is measured from
+the disk usage reported by the Docker daemon before and after the collection.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import concurrent.futures
+import dateutil.parser
+import docker
+import re
+import time
+import wc_env_manager.core
+import wc_env_manager.history
+
+
+SEMVER_PATTERN = re.compile(r'^v?(\d+)\.(\d+)\.(\d+)(.*)$')
+
+
+def parse_version(tag):
+    """ Parse a tag which is a semantic version (e.g., `0.0.52` or `1.2.3rc1`) into a sortable key
+
+    Pre-release versions (e.g., `1.2.3rc1`) are sorted before the corresponding releases (`1.2.3`).
+
+    Args:
+        tag (:obj:`str`): tag
+
+    Returns:
+        :obj:`tuple`: sortable key, or :obj:`None` if the tag isn't a semantic version
+    """
+    match = SEMVER_PATTERN.match(tag)
+    if not match:
+        return None
+    major, minor, patch, suffix = match.groups()
+    return (int(major), int(minor), int(patch), 0 if suffix else 1, suffix)
+
+
+def get_tags_to_remove(tags, keep, protected_tags=None):
+    """ Select the tags of a repository which are older than the most recent semantic versions
+
+    Args:
+        tags (:obj:`list` of :obj:`str`): tags of the repository
+        keep (:obj:`int`): number of the most recent semantic version tags to keep
+        protected_tags (:obj:`set` of :obj:`str`, optional): tags which must be kept
+
+    Returns:
+        :obj:`list` of :obj:`str`: tags to remove, from oldest to newest
+    """
+    protected_tags = set(protected_tags or [])
+    versioned_tags = sorted((tag for tag in set(tags) if parse_version(tag) is not None), key=parse_version)
+    old_tags = versioned_tags[0:max(len(versioned_tags) - keep, 0)]
+    return [tag for tag in old_tags if tag not in protected_tags]
+
+
+class GarbageCollectionReport(object):
+    """ Report of a garbage collection
+
+    Attributes:
+        dry_run (:obj:`bool`): if :obj:`True`, the resources were only selected, and not removed
+        removed_images (:obj:`list` of :obj:`str`): references (`repo:tag`) of the removed tags of images
+        removed_containers (:obj:`list` of :obj:`str`): names of the removed containers
+        pruned_images (:obj:`int`): number of pruned dangling images
+        pruned_build_cache (:obj:`int`): number of pruned records of the build cache
+        space_reclaimed (:obj:`int`): space reclaimed (bytes)
+        errors (:obj:`list` of :obj:`str`): errors
+    """
+
+    def __init__(self, dry_run=False):
+        """
+        Args:
+            dry_run (:obj:`bool`, optional): if :obj:`True`, the resources were only selected, and not removed
+        """
+        self.dry_run = dry_run
+        self.removed_images = []
+        self.removed_containers = []
+        self.pruned_images = 0
+        self.pruned_build_cache = 0
+        self.space_reclaimed = 0
+        self.errors = []
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the report
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the report
+        """
+        return {
+            'dry_run': self.dry_run,
+            'removed_images': self.removed_images,
+            'removed_containers': self.removed_containers,
+            'pruned_images': self.pruned_images,
+            'pruned_build_cache': self.pruned_build_cache,
+            'space_reclaimed': self.space_reclaimed,
+            'errors': self.errors,
+        }
+
+
+class GarbageCollector(object):
+    """ Garbage collector for the images, containers, and build cache of WC modeling environments
+
+    Attributes:
+        mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+        keep_tags (:obj:`int`): number of the most recent semantic version tags of each repository to keep
+        stopped_container_max_age (:obj:`float`): maximum age of stopped containers (seconds), or
+            :obj:`None` to keep stopped containers
+        build_cache_max_size (:obj:`int`): maximum size of the build cache (bytes), or :obj:`None`
+            to keep the build cache
+        prune_dangling_images (:obj:`bool`): if :obj:`True`, remove dangling images
+        max_workers (:obj:`int`): maximum number of resources to remove concurrently
+    """
+
+    def __init__(self, mgr, keep_tags=None, stopped_container_max_age=None, build_cache_max_size=None,
+                 prune_dangling_images=None, max_workers=None):
+        """
+        Args:
+            mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+            keep_tags (:obj:`int`, optional): number of the most recent semantic version tags of
+                each repository to keep; default: `config['gc']['keep_tags']`
+            stopped_container_max_age (:obj:`str` or :obj:`float`, optional): maximum age of stopped
+                containers (e.g., `7d`); default: `config['gc']['stopped_container_max_age']`
+            build_cache_max_size (:obj:`str` or :obj:`int`, optional): maximum size of the build cache
+                (e.g., `10g`); default: `config['gc']['build_cache_max_size']`
+            prune_dangling_images (:obj:`bool`, optional): if :obj:`True`, remove dangling images;
+                default: `config['gc']['prune_dangling_images']`
+            max_workers (:obj:`int`, optional): maximum number of resources to remove concurrently;
+                default: `config['gc']['max_workers']`
+        """
+        config = mgr.config['gc']
+        self.mgr = mgr
+
+        self.keep_tags = config['keep_tags'] if keep_tags is None else keep_tags
+
+        if stopped_container_max_age is None:
+            stopped_container_max_age = config['stopped_container_max_age']
+        if stopped_container_max_age in (None, ''):
+            self.stopped_container_max_age = None
+        else:
+            self.stopped_container_max_age = wc_env_manager.history.parse_duration(stopped_container_max_age)
+
+        if build_cache_max_size is None:
+            build_cache_max_size = config['build_cache_max_size']
+        if build_cache_max_size in (None, ''):
+            self.build_cache_max_size = None
+        else:
+            self.build_cache_max_size = docker.utils.parse_bytes(build_cache_max_size)
+
+        self.prune_dangling_images = config['prune_dangling_images'] if prune_dangling_images is None \
+            else prune_dangling_images
+        self.max_workers = max_workers or config['max_workers']
+
+    def get_repos(self):
+        """ Get the repositories of the images of the WC modeling environment and their configured tags
+
+        Returns:
+            :obj:`dict`: dictionary which maps each repository to its configured tags
+        """
+        config = self.mgr.config
+        return {
+            config['base_image']['repo_unsquashed']: config['base_image']['tags'],
+            config['base_image']['repo']: config['base_image']['tags'],
+            config['image']['repo']: config['image']['tags'],
+        }
+
+    def get_images_to_remove(self):
+        """ Select the tags of the images which are older than the retention policy
+
+        Returns:
+            :obj:`list` of :obj:`str`: references (`repo:tag`) of the tags to remove
+        """
+        client = self.mgr._docker_client
+        used_image_ids = set(container.attrs.get('Image', None)
+                             for container in client.containers.list(all=True))
+
+        refs = []
+        for repo, configured_tags in self.get_repos().items():
+            tags = []
+            protected_tags = set(configured_tags)
+            for image in client.images.list(name=repo):
+                for ref in image.tags:
+                    ref_repo, _, tag = ref.rpartition(':')
+                    if ref_repo != repo:
+                        continue
+                    tags.append(tag)
+                    if image.id in used_image_ids:
+                        protected_tags.add(tag)
+            refs.extend('{}:{}'.format(repo, tag)
+                        for tag in get_tags_to_remove(tags, self.keep_tags, protected_tags=protected_tags))
+        return refs
+
+    def get_containers_to_remove(self, now=None):
+        """ Select the stopped WC modeling containers which are older than the retention policy
+
+        Args:
+            now (:obj:`float`, optional): current time (seconds since the epoch)
+
+        Returns:
+            :obj:`list` of :obj:`docker.models.containers.Container`: containers to remove
+        """
+        if self.stopped_container_max_age is None:
+            return []
+        if now is None:
+            now = time.time()
+
+        containers = []
+        for container in self.mgr.get_containers():
+            if container.status not in ('exited', 'dead', 'created'):
+                continue
+            state = container.attrs.get('State', None) or {}
+            finished_at = state.get('FinishedAt', None)
+            if not finished_at or finished_at.startswith('0001-01-01'):
+                finished_at = container.attrs.get('Created', None)
+            if not finished_at:
+                continue
+            if now - dateutil.parser.parse(finished_at).timestamp() > self.stopped_container_max_age:
+                containers.append(container)
+        return containers
+
+    def get_disk_usage(self):
+        """ Get the disk usage of the images, containers, and build cache of the Docker daemon
+
+        Returns:
+            :obj:`int`: disk usage (bytes)
+        """
+        usage = self.mgr._docker_client.df()
+        size = usage.get('LayersSize', None) or 0
+        size += sum(container.get('SizeRw', None) or 0 for container in usage.get('Containers', None) or [])
+        size += sum(record.get('Size', None) or 0 for record in usage.get('BuildCache', None) or [])
+        return size
+
+    def run(self, dry_run=False):
+        """ Collect garbage
+
+        Args:
+            dry_run (:obj:`bool`, optional): if :obj:`True`, only select the images and containers to remove
+
+        Returns:
+            :obj:`GarbageCollectionReport`: report
+        """
+        client = self.mgr._docker_client
+        report = GarbageCollectionReport(dry_run=dry_run)
+
+        image_refs = self.get_images_to_remove()
+        containers = self.get_containers_to_remove()
+
+        if dry_run:
+            report.removed_images = image_refs
+            report.removed_containers = [container.name for container in containers]
+            return report
+
+        initial_disk_usage = self.get_disk_usage()
+
+        # remove the containers before the images so that their images can be removed
+        def remove_container(container):
+            container.remove(force=True)
+            self.mgr.remove_path_overlays(container.name)
+            return container.name
+
+        def remove_image(ref):
+            # the tag may already have been removed with another tag of the same image
+            try:
+                client.images.remove(ref)
+            except docker.errors.ImageNotFound:
+                pass
+            return ref
+
+        report.removed_containers = self._run_concurrently(remove_container, containers, report.errors)
+        report.removed_images = self._run_concurrently(remove_image, image_refs, report.errors)
+
+        # prune dangling images and the build cache
+        if self.prune_dangling_images:
+            try:
+                result = client.images.prune(filters={'dangling': True})
+                report.pruned_images = len(result.get('ImagesDeleted', None) or [])
+            except docker.errors.APIError as exception:
+                report.errors.append('Dangling images: {}'.format(str(exception)))
+
+        if self.build_cache_max_size is not None:
+            try:
+                result = client.api.prune_builds(keep_storage=self.build_cache_max_size)
+                report.pruned_build_cache = len(result.get('CachesDeleted', None) or [])
+            except docker.errors.APIError as exception:
+                report.errors.append('Build cache: {}'.format(str(exception)))
+
+        report.space_reclaimed = max(initial_disk_usage - self.get_disk_usage(), 0)
+        return report
+
+    def _run_concurrently(self, func, items, errors):
+        """ Apply a function to items concurrently, and collect the errors
+
+        Args:
+            func (:obj:`callable`): function which returns a description of the item
+            items (:obj:`list`): items
+            errors (:obj:`list` of :obj:`str`): list to append the errors to
+
+        Returns:
+            :obj:`list`: descriptions of the items for which the function succeeded, in the order of the items
+        """
+        if not items:
+            return []
+
+        results = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            futures = [executor.submit(func, item) for item in items]
+            for item, future in zip(items, futures):
+                try:
+                    results.append(future.result())
+                except (docker.errors.APIError, OSError, wc_env_manager.core.WcEnvManagerError) as exception:
+                    errors.append('{}: {}'.format(getattr(item, 'name', item), str(exception)))
+        return results
@@ -1,5 +1,17 @@
 """ Configuration
 
+Reading the configuration requires parsing, merging, and repeatedly validating the default,
+user, environment, and extra configuration. To avoid these costs when managers are created
+repeatedly (e.g., in loops), validated configurations are cached in memory and in
+:obj:`CACHE_DIR`. Configurations are cached by the paths, modification times, sizes, and
+contents of their files (including the default configuration and the schema); the versions of
+the package and of the readers of the configuration (wc_utils and configobj); the configuration
+environment variables; the extra configuration; and the context (e.g., `${HOME}`), so that they
+are read again whenever any of these changes.
+
+The cache can be moved or disabled with the :obj:`CACHE_ENV_VAR` environment variable (e.g.,
+`WC_ENV_MANAGER_CONFIG_CACHE=0`).
+
 :Author: Jonathan Karr <jonrkarr@gmail.com>
 :Date: 2018-02-09
 :Copyright: 2018, Karr Lab
@@ -7,33 +19,237 @@
 """
 
 import configobj
+import functools
+import hashlib
+import importlib.resources
+import json
 import os
 import pathlib
-import pkg_resources
-import wc_utils.config
+import pickle
+import tempfile
+import threading
+import wc_env_manager._version
+
+CACHE_DIR = os.path.expanduser('~/.wc/cache/wc_env_manager/config')
+# directory of the cache of validated configurations
+
+CACHE_ENV_VAR = 'WC_ENV_MANAGER_CONFIG_CACHE'
+# environment variable which overrides the default directory of the cache, or, if it is `0`,
+# `false`, `no`, or `off`, disables the default cache
+
+MAX_CACHED_CONFIGS = 32
+# maximum number of configurations to cache
+
+ENV_VAR_PREFIX = 'CONFIG__DOT__'
+# prefix of the environment variables which override the configuration
+
+_memory_cache = {}
+_memory_cache_lock = threading.Lock()
+
 
+def get_resource_filename(package, resource):
+    """ Get the path to a file of a package
 
-def get_config(extra=None):
+    Args:
+        package (:obj:`str`): name of the package
+        resource (:obj:`str`): name of the file
+
+    Returns:
+        :obj:`str`: path to the file
+    """
+    if hasattr(importlib.resources, 'files'):
+        return str(importlib.resources.files(package).joinpath(resource))
+    with importlib.resources.path(package, resource) as path:  # pragma: no cover # Python < 3.9
+        return str(path)
+
+
+def get_config(extra=None, cache_dir=CACHE_DIR):
     """ Get configuration
 
     Args:
         extra (:obj:`dict`, optional): additional configuration to override
+        cache_dir (:obj:`str`, optional): directory to cache validated configurations in;
+            if :obj:`None`, configurations are neither cached nor read from the cache; default:
+            the value of :obj:`CACHE_ENV_VAR` or :obj:`CACHE_DIR`
 
     Returns:
         :obj:`configobj.ConfigObj`: nested dictionary with the configuration settings loaded from the configuration source(s).
+            Configurations which are read from the cache only contain the validated values; unlike
+            configurations which are read from their files, they have no schema (`configspec`) and
+            don't record which values are defaults.
     """
-    paths = wc_utils.config.ConfigPaths(
-        default=pkg_resources.resource_filename('wc_env_manager', 'config/core.default.cfg'),
-        schema=pkg_resources.resource_filename('wc_env_manager', 'config/core.schema.cfg'),
-        user=(
-            'wc_env_manager.cfg',
-            os.path.expanduser('~/.wc/wc_env_manager.cfg'),
-        ),
+    default_path = get_resource_filename('wc_env_manager.config', 'core.default.cfg')
+    schema_path = get_resource_filename('wc_env_manager.config', 'core.schema.cfg')
+    user_paths = (
+        'wc_env_manager.cfg',
+        os.path.expanduser('~/.wc/wc_env_manager.cfg'),
     )
-
     context = {
         'HOME': str(pathlib.Path.home()),
-        'ROOT': pkg_resources.resource_filename('wc_env_manager', '.'),
+        'ROOT': os.path.dirname(os.path.dirname(default_path)),
     }
 
+    cache_dir = get_cache_dir(cache_dir)
+    if cache_dir is None:
+        return read_config(default_path, schema_path, user_paths, extra, context)
+
+    key = get_cache_key([default_path, schema_path] + list(user_paths), extra, context)
+    cache_filename = os.path.join(cache_dir, key + '.pickle')
+
+    # read the configuration from the cache
+    with _memory_cache_lock:
+        pickled_config = _memory_cache.get((cache_dir, key), None)
+    if pickled_config is None:
+        try:
+            with open(cache_filename, 'rb') as file:
+                pickled_config = file.read()
+        except OSError:
+            pass
+    if pickled_config is not None:
+        try:
+            config = configobj.ConfigObj(pickle.loads(pickled_config))
+        except Exception:
+            pickled_config = None
+        else:
+            with _memory_cache_lock:
+                _memory_cache[(cache_dir, key)] = pickled_config
+            return config
+
+    # read the configuration, and save it to the cache
+    config = read_config(default_path, schema_path, user_paths, extra, context)
+    pickled_config = pickle.dumps(config.dict(), protocol=pickle.HIGHEST_PROTOCOL)
+
+    with _memory_cache_lock:
+        if len(_memory_cache) >= MAX_CACHED_CONFIGS:
+            _memory_cache.clear()
+        _memory_cache[(cache_dir, key)] = pickled_config
+
+    try:
+        write_cache_file(cache_dir, cache_filename, pickled_config)
+    except OSError:
+        pass
+
+    return config
+
+
+def get_cache_dir(cache_dir=CACHE_DIR):
+    """ Get the directory of the cache, applying :obj:`CACHE_ENV_VAR` to the default directory
+
+    Args:
+        cache_dir (:obj:`str`, optional): directory of the cache, or :obj:`None` to disable the cache
+
+    Returns:
+        :obj:`str`: directory of the cache, or :obj:`None` if the cache is disabled
+    """
+    env_cache_dir = os.environ.get(CACHE_ENV_VAR, None)
+    if cache_dir != CACHE_DIR or env_cache_dir is None:
+        return cache_dir
+    if env_cache_dir.strip().lower() in ('', '0', 'false', 'no', 'off'):
+        return None
+    return os.path.expanduser(env_cache_dir)
+
+
+@functools.lru_cache(maxsize=None)
+def get_reader_versions():
+    """ Get the versions of the packages which read the configuration
+
+    Returns:
+        :obj:`dict`: dictionary which maps the names of the packages to their versions
+    """
+    try:
+        import importlib.metadata
+        get_version = importlib.metadata.version
+    except ImportError:  # pragma: no cover # Python 3.7
+        import pkg_resources
+
+        def get_version(package):
+            return pkg_resources.get_distribution(package).version
+
+    versions = {}
+    for package in ['wc_utils', 'configobj']:
+        try:
+            versions[package] = get_version(package)
+        except Exception:
+            versions[package] = None
+    return versions
+
+
+def read_config(default_path, schema_path, user_paths, extra, context):
+    """ Read and validate configuration
+
+    Args:
+        default_path (:obj:`str`): path to the default configuration
+        schema_path (:obj:`str`): path to the schema of the configuration
+        user_paths (:obj:`tuple` of :obj:`str`): paths to the user configuration
+        extra (:obj:`dict`): additional configuration to override
+        context (:obj:`dict`): context for template substitution (e.g., `${HOME}`)
+
+    Returns:
+        :obj:`configobj.ConfigObj`: nested dictionary with the configuration settings loaded from the configuration source(s).
+    """
+    import wc_utils.config
+
+    paths = wc_utils.config.ConfigPaths(default=default_path, schema=schema_path, user=user_paths)
     return wc_utils.config.ConfigManager(paths).get_config(extra=extra, context=context)
+
+
+def get_cache_key(paths, extra, context):
+    """ Get the key of a configuration in the cache
+
+    Args:
+        paths (:obj:`list` of :obj:`str`): paths to the configuration files
+        extra (:obj:`dict`): additional configuration
+        context (:obj:`dict`): context for template substitution
+
+    Returns:
+        :obj:`str`: key
+    """
+    files = []
+    for path in paths:
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+            with open(path, 'rb') as file:
+                digest = hashlib.sha256(file.read()).hexdigest()
+            files.append([path, stat.st_mtime_ns, stat.st_size, digest])
+        except OSError:
+            files.append([path, None, None, None])
+
+    inputs = {
+        'version': wc_env_manager._version.__version__,
+        'readers': get_reader_versions(),
+        'files': files,
+        'env': sorted([key, val] for key, val in os.environ.items() if key.startswith(ENV_VAR_PREFIX)),
+        'extra': extra,
+        'context': context,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def write_cache_file(cache_dir, filename, pickled_config):
+    """ Atomically write a configuration to the cache, and remove the least recently
+    written configurations beyond :obj:`MAX_CACHED_CONFIGS`
+
+    Args:
+        cache_dir (:obj:`str`): directory of the cache
+        filename (:obj:`str`): path to save the configuration
+        pickled_config (:obj:`bytes`): pickled configuration
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_filename = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(pickled_config)
+        os.replace(temp_filename, filename)
+    except Exception:
+        os.remove(temp_filename)
+        raise
+
+    cached_filenames = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.pickle')]
+    if len(cached_filenames) > MAX_CACHED_CONFIGS:
+        cached_filenames.sort(key=lambda name: os.path.getmtime(name))
+        for name in cached_filenames[0:len(cached_filenames) - MAX_CACHED_CONFIGS]:
+            try:
+                os.remove(name)
+            except OSError:  # pragma: no cover
+                pass
@@ -5,20 +5,29 @@
     * *wc_env*: image with WC models and WC modeling tools and their dependencies
     * *wc_env_dependencies*: base image with third party dependencies
 
+* Build the images and the container in a pipeline which overlaps independent stages
+
 * Remove the Docker images
 * Push/pull the Docker images
 * Create Docker containers
 
     1. Mount host directories into container
-    2. Copy files (such as configuration files and authentication keys) into container
-    3. Install GitHub SSH key
-    4. Verify access to GitHub
-    5. Install Python packages in mounted directories from host
+    2. Limit the CPUs, memory, and I/O of the container, and pin it to CPUs of a NUMA node
+    3. Copy or mount files (such as configuration files and authentication keys) into container
+    4. Install GitHub SSH key
+    5. Verify access to GitHub
+    6. Install Python packages in mounted directories from host
 
 * Copy files to/from Docker container
+* Run processes concurrently in multiple Docker containers
+* Run sequences of processes in persistent shell sessions in Docker containers
 * List Docker containers of the image
+* Index the Docker images and containers in memory, and update the index from the events of the Docker daemon
 * Get CPU, memory, network usage statistics of Docker containers
+* Trace the operations of the manager and their Docker API calls, git clones, subprocesses, and file copies
+* Measure the throughput and latency of the network between Docker containers
 * Stop Docker containers
+* Hibernate (pause or stop) idle Docker containers
 * Remove Docker containers
 * Login to DockerHub
 
@@ -30,28 +39,32 @@
 """
 
 from datetime import datetime
+import codecs
+import collections
+import concurrent.futures
+import contextlib
 import copy
-import configobj
-import dateutil.parser
 import docker
-import docker_squash.squash
 import enum
-import git
 import glob
-import jinja2
 import logging
 import os
+import posixpath
 import re
 import requests
-import requirements
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 import time
+import uuid
 import warnings
 import wc_env_manager.config.core
-import yaml
+import wc_env_manager.readiness
+import wc_env_manager.resources
+import wc_env_manager.session
+import wc_env_manager.tracing
 
 
 class WcEnvUser(enum.Enum):
@@ -60,6 +73,20 @@ class WcEnvUser(enum.Enum):
     container_user = 999
 
 
+class PathCopyMode(enum.Enum):
+    """ Modes for delivering host paths (`config['image']['paths_to_copy']`) to images and containers
+
+    * copy: physically copy the path into the image and container
+    * bind: mount the path into the container as a read-only bind mount
+    * overlay: mount the path into the container as an overlay whose lower layer is shared
+      among containers and whose upper layer captures the container's (copy-on-write) changes
+    """
+    copy = 'copy'
+    bind = 'bind'
+    overlay = 'overlay'
+
+
+@wc_env_manager.tracing.trace_methods
 class WcEnvManager(object):
     """ Manage computing environments (Docker containers) for whole-cell modeling
 
@@ -71,9 +98,22 @@ class WcEnvManager(object):
         _base_image (:obj:`docker.models.images.Image`): current base Docker image
         _image (:obj:`docker.models.images.Image`): current Docker image
         _container (:obj:`docker.models.containers.Container`): current Docker container
+        _index (:obj:`wc_env_manager.index.ResourceIndex`): in-memory index of the images and containers,
+            which serves lookups while it is running (see :obj:`start_index`)
+        _tracer (:obj:`wc_env_manager.tracing.Tracer`): tracer which records the operations of the manager
+            while tracing is enabled (see :obj:`start_tracing`)
     """
 
     IMAGE_OS_SEP = '/'
+    LOCAL_DOCKER_BASE_URLS = ('http+docker://localhost', 'http+docker://localnpipe')
+    UNMOUNTABLE_FILESYSTEM_TYPES = ('fuse', 'fuse.sshfs', 'fuse.s3fs', 'fuse.rclone', 'fuse.gvfsd-fuse')
+    OVERLAY_UPPER_UNSUPPORTED_FILESYSTEM_TYPES = ('overlay', 'aufs', 'nfs', 'nfs4', 'cifs', 'smb3')
+    OVERLAY_VOLUME_LABEL = 'wc_env_manager.container'
+    GROUP_LABEL = 'wc_env_manager.group'
+    CONTAINER_NAME_SUFFIX_LEN = 8
+    MAX_STREAMED_OUTPUT_LINES = 1000
+    MAX_STREAMED_OUTPUT_SIZE = 1024 * 1024
+    UNTRACED_METHODS = ('start_tracing', 'stop_tracing')
 
     def __init__(self, config=None):
         """
@@ -88,38 +128,172 @@ class WcEnvManager(object):
 
         # load Docker client
         self._docker_client = docker.from_env()
+        self._tracer = None
 
         # get image and current container
         self._base_image_unsquashed = None
         self._base_image = None
         self._image = None
         self._container = None
+        self._index = None
+        self.refresh()
 
+    def refresh(self):
+        """ Discover the latest images and the current container (e.g., after they have been
+        changed by another process)
+        """
+        config = self.config
         self.set_image(config['base_image']['repo_unsquashed'], self.get_latest_image(config['base_image']['repo_unsquashed']))
         self.set_image(config['base_image']['repo'], self.get_latest_image(config['base_image']['repo']))
         self.set_image(config['image']['repo'], self.get_latest_image(config['image']['repo']))
         self.set_container(self.get_latest_container())
 
-    def build_base_image(self):
-        """ Build base Docker image for WC modeling environment
+    def start_index(self):
+        """ Start an in-memory index of the images and containers, which is updated from the events
+        of the Docker daemon
 
-        Before executing this method, you must download CPLEX and obtain licenses for
-        Gurobi, MINOS, Mosek, and XPRESS. See the `documentation <building_images>` for more information.
+        While the index is running, images and containers are looked up from memory, and the
+        current images and container are updated when they are changed by other processes. While
+        the index is resubscribing to the events of the Docker daemon (e.g., after the daemon
+        restarted), they are looked up from the Docker daemon.
 
         Returns:
-            :obj:`docker.models.images.Image`: Docker image
+            :obj:`wc_env_manager.index.ResourceIndex`: index
+        """
+        import wc_env_manager.index
+
+        if self._index is None:
+            self._index = wc_env_manager.index.ResourceIndex(self, callbacks=[self._update_from_index])
+            self._index.start()
+            self.refresh()
+        return self._index
+
+    def stop_index(self):
+        """ Stop the in-memory index of the images and containers """
+        if self._index is not None:
+            self._index.stop()
+            self._index = None
+
+    def _is_index_running(self):
+        """ Determine whether lookups can be served by the in-memory index, i.e., whether it has been
+        started and is consuming the events of the Docker daemon
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the index is running
+        """
+        return self._index is not None and self._index.is_running
+
+    def start_tracing(self, tracer=None):
+        """ Start recording the operations of the manager, and their Docker API calls, git clones,
+        subprocesses, and file copies
+
+        Args:
+            tracer (:obj:`wc_env_manager.tracing.Tracer`, optional): tracer; default: a new tracer
+
+        Returns:
+            :obj:`wc_env_manager.tracing.Tracer`: tracer
+        """
+        self.stop_tracing()
+        self._tracer = tracer or wc_env_manager.tracing.Tracer()
+        self._tracer.instrument(self._docker_client.api)
+        return self._tracer
+
+    def stop_tracing(self):
+        """ Stop recording the operations of the manager
+
+        Returns:
+            :obj:`wc_env_manager.tracing.Tracer`: tracer, or :obj:`None` if tracing wasn't enabled
+        """
+        tracer = self._tracer
+        if tracer is not None:
+            tracer.uninstrument(self._docker_client.api)
+            self._tracer = None
+        return tracer
+
+    def _update_from_index(self, change):
+        """ Update the current images and container after a change of the index
+
+        Args:
+            change (:obj:`wc_env_manager.index.IndexChange`): change
+        """
+        if change.kind == 'image':
+            for repo in self._index.get_repos():
+                self.set_image(repo, self._index.get_latest_image(repo))
+        elif change.kind == 'container':
+            if self._container is None or self._container.id == change.id:
+                self._container = change.resource if change.resource is not None and \
+                    self._index.is_env_container(change.resource.name) else self._index.get_latest_container()
+
+    def build_all(self, max_workers=None):
+        """ Remove the containers, and build the base image, image, and container in a pipeline
+        which runs independent stages concurrently
+
+        The Python requirements of the base image are collected, the context of the image is
+        prepared, the images of the other containers of the network are pulled, the network is
+        created, and the old containers are removed while the base image is built.
+
+        Args:
+            max_workers (:obj:`int`, optional): maximum number of stages to run concurrently;
+                default: all stages whose dependencies have completed
+
+        Returns:
+            :obj:`wc_env_manager.pipeline.Pipeline`: pipeline, which reports the durations of
+                the stages and the critical path of the build
         """
+        import wc_env_manager.pipeline
+
+        pipeline = wc_env_manager.pipeline.Pipeline(max_workers=max_workers)
+        pipeline.add_stage('remove_containers', self.remove_containers)
+        pipeline.add_stage('get_required_python_packages', self.get_required_python_packages)
+        pipeline.add_stage('prepare_base_image_context', self.prepare_base_image_context,
+                           ['get_required_python_packages'])
+        pipeline.add_stage('build_base_image', self.build_base_image,
+                           ['prepare_base_image_context'])
+        pipeline.add_stage('prepare_image_context', self.prepare_image_context)
+        pipeline.add_stage('build_image', lambda base_image, context: self.build_image(context),
+                           ['build_base_image', 'prepare_image_context'])
+        pipeline.add_stage('build_network', self.build_network)
+        pipeline.add_stage('build_container', lambda containers, image, network: self.build_container(),
+                           ['remove_containers', 'build_image', 'build_network'])
+        try:
+            pipeline.run()
+        finally:
+            # remove the prepared contexts of the builds which never started (e.g., because another stage failed)
+            for context_stage, build_stage in [('prepare_base_image_context', 'build_base_image'),
+                                               ('prepare_image_context', 'build_image')]:
+                context = pipeline.stages[context_stage].result
+                if context is not None and pipeline.stages[build_stage].start is None:
+                    context.remove()
+        return pipeline
+
+    def prepare_base_image_context(self, requirements=None):
+        """ Prepare the context for building the base Docker image: copy the context, save the
+        Python requirements, and render the Dockerfile
+
+        Args:
+            requirements (:obj:`list` of :obj:`str`, optional): Python requirements in requirements.txt
+                format; default: :obj:`get_required_python_packages`
+
+        Returns:
+            :obj:`ImageContext`: context
+        """
+        import jinja2
+
         config = self.config['base_image']
 
         # create temporary directory for build context
         temp_dir_name = tempfile.mkdtemp()
         shutil.rmtree(temp_dir_name)
-        shutil.copytree(config['context_path'], temp_dir_name)
+        with wc_env_manager.tracing.span(self._tracer, 'copy', 'file', path=config['context_path']) as span:
+            shutil.copytree(config['context_path'], temp_dir_name)
+            if span:
+                span.attrs['bytes'] = wc_env_manager.tracing.get_path_size(temp_dir_name)
 
         # save list of Python package requirements to context path
-        reqs = self.get_required_python_packages()
+        if requirements is None:
+            requirements = self.get_required_python_packages()
         with open(os.path.join(temp_dir_name, 'requirements.txt'), 'w') as file:
-            file.write('\n'.join(reqs))
+            file.write('\n'.join(requirements))
 
         # render Dockerfile
         template_dockerfile_name = config['dockerfile_template_path']
@@ -131,17 +305,80 @@ class WcEnvManager(object):
         dockerfile_path = os.path.join(temp_dir_name, 'Dockerfile')
         template.stream(**build_args).dump(dockerfile_path)
 
+        return ImageContext(temp_dir_name, dockerfile_path, build_args)
+
+    def build_base_image(self, context=None):
+        """ Build base Docker image for WC modeling environment
+
+        Before executing this method, you must download CPLEX and obtain licenses for
+        Gurobi, MINOS, Mosek, and XPRESS. See the `documentation <building_images>` for more information.
+
+        Args:
+            context (:obj:`ImageContext`, optional): context prepared by :obj:`prepare_base_image_context`,
+                which is removed after the build, even if the build fails; default: prepare a context
+
+        Returns:
+            :obj:`docker.models.images.Image`: Docker image
+        """
+        config = self.config['base_image']
+        if context is None:
+            context = self.prepare_base_image_context()
+
+        # build the image, unless another process of the host built it from identical inputs (including
+        # the same slimming)
+        try:
+            with self._coordinate_build(config['repo'], config['tags'], context,
+                                        inputs={'slim': config['slim']}) as ticket:
+                image = ticket.get_image(self._docker_client) if ticket else None
+                if image is None:
+                    image = self._build_base_image(context)
+                    if ticket:
+                        ticket.save_result(image)
+                else:
+                    self._base_image_unsquashed = self._docker_client.images.get(
+                        config['repo_unsquashed'] + ':' + config['tags'][0])
+            self._base_image = image
+
+        finally:
+            # cleanup temporary directory
+            context.remove()
+
+        # return image
+        return image
+
+    def _build_base_image(self, context):
+        """ Build and squash the base Docker image
+
+        Args:
+            context (:obj:`ImageContext`): context
+
+        Returns:
+            :obj:`docker.models.images.Image`: squashed Docker image
+        """
+        import docker_squash.squash
+        import wc_env_manager.slimming
+
+        config = self.config['base_image']
+
         # build image
-        image_unsquashed = self._build_image(config['repo_unsquashed'], config['tags'], dockerfile_path,
-                                             build_args, temp_dir_name,
+        image_unsquashed = self._build_image(config['repo_unsquashed'], config['tags'], context.dockerfile_path,
+                                             context.build_args, context.path,
                                              pull_base_image=True)
-        self._base_image_unsquashed = image_unsquashed
 
-        # cleanup temporary directory
-        shutil.rmtree(temp_dir_name)
+        # optionally, remove the files which aren't needed at runtime; this precedes squashing so
+        # that the squashed image doesn't contain the removed files
+        if config['slim']['enabled']:
+            with wc_env_manager.tracing.span(self._tracer, 'slim', 'docker') as span:
+                image_unsquashed, report = wc_env_manager.slimming.ImageSlimmer(self).slim(
+                    image_unsquashed, config['repo_unsquashed'], config['tags'])
+                if span:
+                    span.attrs['bytes_saved'] = report.saved
+        self._base_image_unsquashed = image_unsquashed
 
-        # squash image
-        log = logging.getLogger()
+        # squash image; the handler is removed after squashing so that repeated builds don't print
+        # each message multiple times
+        log = logging.getLogger(__name__ + '.squash')
+        handler = None
         if self.config['verbose']:
             log.setLevel(logging.INFO)
 
@@ -151,21 +388,24 @@ class WcEnvManager(object):
             formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
             handler.setFormatter(formatter)
 
-        docker_squash.squash.Squash(
-            log=log,
-            image=config['repo_unsquashed'] + ':' + config['tags'][0],
-            tag=config['repo'] + ':' + config['tags'][0]).run()
+        try:
+            with wc_env_manager.tracing.span(self._tracer, 'squash', 'docker'):
+                docker_squash.squash.Squash(
+                    log=log,
+                    image=config['repo_unsquashed'] + ':' + config['tags'][0],
+                    tag=config['repo'] + ':' + config['tags'][0]).run()
+        finally:
+            if handler:
+                log.removeHandler(handler)
 
         # get squashed image
         image = self._docker_client.images.get(config['repo'] + ':' + config['tags'][0])
-        self._base_image = image
 
         # tag squashed image
         for tag in config['tags']:
             assert(image.tag(config['repo'], tag=tag))
         image.reload()
 
-        # return image
         return image
 
     def get_required_python_packages(self):
@@ -176,6 +416,8 @@ class WcEnvManager(object):
             :obj:`list` of :obj:`str`: list of Python requirements in
                 requirements.txt format
         """
+        import git
+
         # make temporary directory
         temp_dir_name = tempfile.mkdtemp()
 
@@ -199,7 +441,10 @@ class WcEnvManager(object):
             max_tries = 5
             for i_try in range(max_tries):
                 try:
-                    git.Repo.clone_from(url, dir_name)
+                    with wc_env_manager.tracing.span(self._tracer, 'clone', 'git', url=url) as span:
+                        git.Repo.clone_from(url, dir_name)
+                        if span:
+                            span.attrs['bytes'] = wc_env_manager.tracing.get_path_size(dir_name)
                     break
                 except git.exc.GitCommandError as exception:  # pragma: no cover
                     if i_try == max_tries - 1:  # pragma: no cover
@@ -263,22 +508,27 @@ class WcEnvManager(object):
         # return requirements
         return sorted(unique_reqs)
 
-    def build_image(self):
-        """ Build Docker image for WC modeling environment
+    def prepare_image_context(self):
+        """ Prepare the context for building the Docker image: copy the paths which will not be
+        mounted into the containers (e.g., configuration files), save the Python requirements, and
+        render the Dockerfile
 
         Returns:
-            :obj:`docker.models.images.Image`: Docker image
+            :obj:`ImageContext`: context
 
         Raises:
-            :obj:`WcEnvManagerError`: if a copied configuration file clashes with
+            :obj:`WcEnvManagerError`: if a copied configuration file clashes with the file of the
+                Python requirements (`requirements.txt`) of the context
         """
+        import jinja2
+
         # create temporary directory for build context
         temp_dir_name = tempfile.mkdtemp()
 
-        # add files to context and prepare for copy directives in Dockerfile
-        paths_to_copy = \
-            self.get_config_file_paths_to_copy_to_image() \
-            + copy.deepcopy(self.config['image']['paths_to_copy'].values())
+        # add files to context and prepare for copy directives in Dockerfile; paths
+        # which will be mounted into containers are not copied into the image
+        paths_to_copy = [path for path in self.get_paths_to_copy()
+                         if not self.is_path_mountable(path['host'], PathCopyMode[path['mode']])]
 
         for path in paths_to_copy:
             temp_path_host = os.path.join(temp_dir_name, os.path.abspath(path['host'])[1:])
@@ -286,10 +536,13 @@ class WcEnvManager(object):
             if not os.path.isdir(os.path.dirname(temp_path_host)):
                 os.makedirs(os.path.dirname(temp_path_host))
 
-            if os.path.isfile(path['host']):
-                shutil.copyfile(path['host'], temp_path_host)
-            else:
-                shutil.copytree(path['host'], temp_path_host)
+            with wc_env_manager.tracing.span(self._tracer, 'copy', 'file', path=path['host']) as span:
+                if os.path.isfile(path['host']):
+                    shutil.copyfile(path['host'], temp_path_host)
+                else:
+                    shutil.copytree(path['host'], temp_path_host)
+                if span:
+                    span.attrs['bytes'] = wc_env_manager.tracing.get_path_size(temp_path_host)
             path['host'] = os.path.abspath(path['host'])[1:]
 
         if self.config['image']['python_packages']:
@@ -323,18 +576,74 @@ class WcEnvManager(object):
         dockerfile_name = os.path.join(temp_dir_name, 'Dockerfile')
         template.stream(**context).dump(dockerfile_name)
 
-        # build image
+        return ImageContext(temp_dir_name, dockerfile_name, {})
+
+    def build_image(self, context=None):
+        """ Build Docker image for WC modeling environment
+
+        Args:
+            context (:obj:`ImageContext`, optional): context prepared by :obj:`prepare_image_context`,
+                which is removed after the build, even if the build fails; default: prepare a context
+
+        Returns:
+            :obj:`docker.models.images.Image`: Docker image
+
+        Raises:
+            :obj:`WcEnvManagerError`: if a copied configuration file clashes with the file of the
+                Python requirements (`requirements.txt`) of the context
+        """
+        if context is None:
+            context = self.prepare_image_context()
+
+        # build image, unless another process of the host built it from identical inputs (including
+        # the same base image)
         config = self.config['image']
-        image = self._build_image(config['repo'], config['tags'],
-                                  dockerfile_name, {}, temp_dir_name)
-        self._image = image
+        base_config = self.config['base_image']
+        try:
+            try:
+                base_image_id = self._docker_client.images.get(base_config['repo'] + ':' + base_config['tags'][0]).id
+            except docker.errors.ImageNotFound:
+                base_image_id = None
+
+            with self._coordinate_build(config['repo'], config['tags'], context,
+                                        inputs={'base_image': base_image_id}) as ticket:
+                image = ticket.get_image(self._docker_client) if ticket else None
+                if image is None:
+                    image = self._build_image(config['repo'], config['tags'],
+                                              context.dockerfile_path, context.build_args, context.path)
+                    if ticket:
+                        ticket.save_result(image)
+            self._image = image
 
-        # cleanup temporary directory
-        shutil.rmtree(temp_dir_name)
+        finally:
+            # cleanup temporary directory
+            context.remove()
 
         # return image
         return image
 
+    def _coordinate_build(self, image_repo, image_tags, context, inputs=None):
+        """ Coordinate a build of an image with the other processes of the host (`config['build']`):
+        wait for an identical build by another process, or for a free slot to build the image
+
+        Args:
+            image_repo (:obj:`str`): image repository
+            image_tags (:obj:`list` of :obj:`str`): list of tags
+            context (:obj:`ImageContext`): context of the build
+            inputs (:obj:`dict`, optional): additional inputs of the build (e.g., the id of the base image)
+
+        Returns:
+            :obj:`contextlib.AbstractContextManager`: context manager which yields a
+                :obj:`wc_env_manager.builds.BuildTicket`, or :obj:`None` if coordination is disabled
+        """
+        import wc_env_manager.builds
+
+        coordinator = wc_env_manager.builds.BuildCoordinator.from_config(self.config['build'])
+        if coordinator is None:
+            return contextlib.nullcontext()
+        fingerprint = wc_env_manager.builds.get_fingerprint(context, image_repo, image_tags, inputs=inputs)
+        return coordinator.coordinate(image_repo, fingerprint, verbose=self.config['verbose'])
+
     def _build_image(self, image_repo, image_tags,
                      dockerfile_path, build_args, context_path,
                      pull_base_image=False):
@@ -415,12 +724,96 @@ class WcEnvManager(object):
         # return image
         return image
 
+    def get_paths_to_copy(self):
+        """ Get list of paths to copy or mount from the host to Docker images and containers,
+        including configuration files from ~/.wc and `config['image']['paths_to_copy']`
+
+        Returns:
+            :obj:`list` of :obj:`dict`: paths to copy or mount from the host to Docker images
+                and containers. Each dictionary contains the keys `host`, `image`, and `mode`.
+        """
+        paths = self.get_config_file_paths_to_copy_to_image() \
+            + copy.deepcopy(list(self.config['image']['paths_to_copy'].values()))
+        for path in paths:
+            path['mode'] = path.get('mode', None) or PathCopyMode.copy.name
+        return paths
+
+    def is_path_mountable(self, host_path, mode):
+        """ Determine whether a host path can be delivered to containers by mounting it
+        rather than by physically copying it
+
+        Paths can only be mounted if the Docker daemon runs on the host and the path
+        is on a filesystem which the daemon can mount (e.g., not a FUSE filesystem). In
+        addition, overlays require Linux, can only be applied to directories, and require
+        `config['container']['overlay_path']` to be on a filesystem that can store the upper
+        layers of overlays.
+
+        Args:
+            host_path (:obj:`str`): path on the host
+            mode (:obj:`PathCopyMode`): mode for delivering the path to containers
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the path can be mounted in mode :obj:`mode`
+        """
+        if mode == PathCopyMode.copy:
+            return False
+
+        if self._docker_client.api.base_url not in self.LOCAL_DOCKER_BASE_URLS:
+            return False
+
+        if not os.path.exists(host_path):
+            return False
+
+        if self.get_filesystem_type(host_path) in self.UNMOUNTABLE_FILESYSTEM_TYPES:
+            return False
+
+        if mode == PathCopyMode.overlay:
+            if not sys.platform.startswith('linux') or not os.path.isdir(host_path):
+                return False
+
+            overlay_path = os.path.abspath(self.config['container']['overlay_path'])
+            while not os.path.exists(overlay_path) and os.path.dirname(overlay_path) != overlay_path:
+                overlay_path = os.path.dirname(overlay_path)
+            if self.get_filesystem_type(overlay_path) in self.OVERLAY_UPPER_UNSUPPORTED_FILESYSTEM_TYPES:
+                return False
+
+        return True
+
+    @staticmethod
+    def get_filesystem_type(path):
+        """ Get the type of the filesystem which contains a path
+
+        Args:
+            path (:obj:`str`): path
+
+        Returns:
+            :obj:`str`: type of the filesystem (e.g., `ext4`), or :obj:`None` if the type
+                cannot be determined (e.g., because `/proc/mounts` is not available)
+        """
+        if not os.path.isfile('/proc/mounts'):
+            return None
+
+        path = os.path.realpath(path)
+        fs_type = None
+        fs_mount_point = ''
+        with open('/proc/mounts', 'r') as file:
+            for line in file:
+                _, mount_point, mount_type, *_ = line.split()
+                mount_point = mount_point.replace('\\040', ' ')
+                if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) \
+                        and len(mount_point) >= len(fs_mount_point):
+                    fs_type = mount_type
+                    fs_mount_point = mount_point
+        return fs_type
+
     def get_config_file_paths_to_copy_to_image(self):
         """ Get list of configuration file paths to copy from ~/.wc to Docker image
 
         Returns:
             :obj:`list` of :obj:`dict`: configuration file paths to copy from ~/.wc to Docker image
         """
+        import yaml
+
         host_dirname = self.config['image']['config_path']
         image_dirname = self.IMAGE_OS_SEP.join(['/root', '.wc'])
 
@@ -465,8 +858,22 @@ class WcEnvManager(object):
             force (:obj:`bool`, optional): if :obj:`True`, force removal of the version of the
                 image (e.g. even if a container with the image is running)
         """
+        # remove the tags of the same image sequentially because removing the last tag of an image
+        # also removes the image, which races with the removal of its other tags
+        image_refs = collections.OrderedDict()
         for tag in image_tags:
-            self._docker_client.images.remove('{}:{}'.format(image_repo, tag), force=True)
+            ref = '{}:{}'.format(image_repo, tag)
+            image_refs.setdefault(self._docker_client.images.get(ref).id, []).append(ref)
+        if not image_refs:
+            return
+
+        def remove_refs(refs):
+            for ref in refs:
+                self._docker_client.images.remove(ref, force=force)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(image_refs)) as executor:
+            for future in [executor.submit(remove_refs, refs) for refs in image_refs.values()]:
+                future.result()
 
     def login_docker_hub(self):
         """ Login to DockerHub """
@@ -518,7 +925,8 @@ class WcEnvManager(object):
                 or name of Docker image
         """
         if isinstance(image, str):
-            image = self._docker_client.images.get(image)
+            image = (self._is_index_running() and self._index.get_image(image)) or \
+                self._docker_client.images.get(image)
 
         if image_repo == self.config['base_image']['repo_unsquashed']:
             self._base_image_unsquashed = image
@@ -536,6 +944,8 @@ class WcEnvManager(object):
         Returns:
             :obj:`docker.models.images.Image`: Docker image
         """
+        if self._is_index_running():
+            return self._index.get_latest_image(image_repo)
         try:
             return self._docker_client.images.get(image_repo)
         except docker.errors.ImageNotFound:
@@ -557,52 +967,165 @@ class WcEnvManager(object):
                 return version
 
     def build_network(self):
-        """ Create Docker network """
+        """ Create Docker network and start its other containers (e.g., databases)
+
+        The images of the other containers are pulled concurrently, and then the containers
+        are started concurrently. This method doesn't wait for the containers to be ready
+        (see :obj:`wait_for_network_containers`).
+        """
         config = self.config['network']
 
         # create network, if necessary
-        try:
-            self._docker_client.networks.get(config['name'])
-        except docker.errors.NotFound:
-            self._docker_client.networks.create(config['name'])
-
-        # create other containers, if necessary
+        if not self.is_host_network():
+            try:
+                self._docker_client.networks.get(config['name'])
+            except docker.errors.NotFound:
+                options = dict(config['options'])
+                if config['mtu']:
+                    options['com.docker.network.driver.mtu'] = str(config['mtu'])
+                # standalone containers can only join overlay (swarm) networks which are attachable
+                self._docker_client.networks.create(config['name'],
+                                                    driver=config['driver'],
+                                                    internal=config['internal'],
+                                                    attachable=config['driver'] == 'overlay' or None,
+                                                    options=options or None)
+
+        # determine which of the other containers need to be created
+        new_containers = []
         for name, attrs in config['containers'].items():
             try:
-                container = self._docker_client.containers.get(name)
+                self._docker_client.containers.get(name)
             except docker.errors.NotFound:
+                new_containers.append((name, attrs))
+        if not new_containers:
+            return
+
+        def run_container(name, attrs):
+            try:
                 self._docker_client.containers.run(
                     attrs['image'], name=name,
                     environment=attrs['environment'],
-                    network=config['name'],
                     shm_size=attrs['shm_size'],
+                    tmpfs=dict(attrs.get('tmpfs', {})) or None,
                     detach=True,
-                    restart_policy={'name': 'always'})
+                    restart_policy={'name': 'always'},
+                    **self.get_network_run_args())
+            except docker.errors.APIError as exception:
+                # ignore containers which were concurrently created by another process
+                if exception.status_code != 409:
+                    raise
+
+        images = sorted(set(attrs['image'] for _, attrs in new_containers))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(images), len(new_containers))) as executor:
+            for future in [executor.submit(self.get_or_pull_image, image) for image in images]:
+                future.result()
+            for future in [executor.submit(run_container, name, attrs) for name, attrs in new_containers]:
+                future.result()
+
+    def is_host_network(self):
+        """ Determine whether the containers run in the network namespace of the host, rather
+        than in a Docker network
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the containers run in the network namespace of the host
+        """
+        return self.config['network']['driver'] == 'host'
+
+    def get_network_run_args(self):
+        """ Get the arguments to :obj:`docker.models.containers.ContainerCollection.run` which
+        connect a container to the network
+
+        Returns:
+            :obj:`dict`: arguments
+        """
+        if self.is_host_network():
+            return {'network_mode': 'host'}
+        return {'network': self.config['network']['name']}
+
+    def get_or_pull_image(self, image):
+        """ Get an image, pulling it if it isn't available locally
+
+        Args:
+            image (:obj:`str`): reference to the image (e.g., `postgres:10.5-alpine`)
+
+        Returns:
+            :obj:`docker.models.images.Image`: image
+        """
+        try:
+            return self._docker_client.images.get(image)
+        except docker.errors.ImageNotFound:
+            repo, tag = docker.utils.parse_repository_tag(image)
+            return self._docker_client.images.pull(repo, tag=tag or 'latest')
+
+    def wait_for_network_containers(self, names=None):
+        """ Wait until the other containers of the network are ready (see
+        `config['network']['containers'][name]['readiness']`)
+
+        Args:
+            names (:obj:`list` of :obj:`str`, optional): names of the containers to wait for;
+                default: all of the other containers of the network
+
+        Raises:
+            :obj:`WcEnvManagerError`: if a container isn't a container of the network, or isn't
+                ready before the timeout of its probe
+        """
+        config = self.config['network']
+        if names is None:
+            names = list(config['containers'].keys())
+        for name in names:
+            if name not in config['containers']:
+                raise WcEnvManagerError('{} is not a container of network {}'.format(name, config['name']))
+        if not names:
+            return
+
+        def wait(name):
+            probe = wc_env_manager.readiness.ReadinessProbe.from_config(config['containers'][name].get('readiness', {}))
+            probe.wait(self._docker_client.containers.get(name), network=config['name'])
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(names)) as executor:
+            for future in [executor.submit(wait, name) for name in names]:
+                future.result()
 
     def remove_network(self):
         """ Remove Docker network """
         config = self.config['network']
 
         # remove other containers, if they exist
-        for name, attrs in config['containers'].items():
+        def remove_container(name):
             try:
                 container = self._docker_client.containers.get(name)
                 container.remove(force=True)
             except docker.errors.NotFound:
                 pass
 
+        names = list(config['containers'].keys())
+        if names:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(names)) as executor:
+                for future in [executor.submit(remove_container, name) for name in names]:
+                    future.result()
+
         # remove network, if it exists
+        if self.is_host_network():
+            return
         try:
             network = self._docker_client.networks.get(config['name'])
             network.remove()
         except docker.errors.NotFound:
             pass
 
-    def build_container(self, tty=True):
+    def build_container(self, tty=True, group=None, resources=None, build_network=True, set_current=True):
         """ Create Docker container for WC modeling environmet
 
         Args:
             tty (:obj:`bool`): if :obj:`True`, allocate a pseudo-TTY
+            group (:obj:`str`, optional): name of a group of replicas to label the container with
+            resources (:obj:`dict`, optional): arguments to :obj:`docker.models.containers.ContainerCollection.run`
+                which implement the resource controls of the container; default: :obj:`get_container_resources`
+            build_network (:obj:`bool`, optional): if :obj:`True`, build the network and start its other
+                containers, if needed; :obj:`False` if the caller has already built the network
+            set_current (:obj:`bool`, optional): if :obj:`True`, make the container the current container;
+                :obj:`False` if the caller builds containers concurrently and sets the current container
+                once they have been built (e.g., :obj:`build_containers`)
 
         Returns:
             :obj:`docker.models.containers.Container`: Docker container
@@ -610,82 +1133,394 @@ class WcEnvManager(object):
         # make name for container
         name = self.make_container_name()
 
-        # build network if needed
-        self.build_network()
+        # build network and start its other containers, if needed
+        if build_network:
+            self.build_network()
 
-        # create container
+        # mount paths which are configured to be bound or overlaid rather than copied
+        mounts = self.make_path_mounts(name)
+
+        # allocate CPUs, memory, and I/O
+        if resources is None:
+            resources = self.get_container_resources()
+
+        # label container with its group
+        labels = {}
+        if group:
+            labels[self.GROUP_LABEL] = group
+
+        # limit the thread pools of numerical libraries to the CPUs of the container
         img_config = self.config['image']
         cnt_config = self.config['container']
-        container = self._container = self._docker_client.containers.run(
+        environment = dict(cnt_config['environment'])
+        if cnt_config['resources']['thread_env']:
+            num_cpus = wc_env_manager.resources.get_allocated_cpus(
+                nano_cpus=resources.get('nano_cpus', None), cpuset_cpus=resources.get('cpuset_cpus', None))
+            environment.update(wc_env_manager.resources.get_thread_env(num_cpus, environment))
+
+        # create container
+        container = self._docker_client.containers.run(
             img_config['repo'] + ':' + img_config['tags'][0], name=name,
-            environment=cnt_config['environment'],
+            environment=environment,
             volumes=cnt_config['paths_to_mount'],
-            ports=cnt_config['ports'],
+            mounts=mounts,
+            ports=None if self.is_host_network() else cnt_config['ports'],
             entrypoint=[],
             command='bash',
             stdin_open=True, tty=tty,
             detach=True,
             user=WcEnvUser.root.name,
-            network=self.config['network']['name'])
+            labels=labels,
+            **self.get_network_run_args(),
+            **resources)
+
+        if set_current:
+            self._container = container
+
+        # wait until the other containers of the network that the container depends on are ready
+        self.wait_for_network_containers(cnt_config['depends_on'])
 
         # return container
         return container
 
+    def build_containers(self, replicas, tty=True, group=None, setup=True, upgrade=False, max_workers=8,
+                         shared_ipc=None):
+        """ Concurrently create and set up a group of replicas of the Docker container for the
+        WC modeling environment
+
+        The replicas are labeled with the name of their group (:obj:`GROUP_LABEL`), which can be used
+        to select them (e.g., :obj:`get_containers`, :obj:`run_process_in_containers`). With the `numa`
+        placement, the replicas are pinned to disjoint sets of CPUs.
+
+        With a shared IPC namespace, the first replica is created with a shareable IPC namespace
+        whose `/dev/shm` has the configured size (`config['container']['resources']['shm_size']`),
+        and the other replicas join it. This enables the replicas to exchange data through shared
+        memory without copying it (see :obj:`wc_env_manager.shm`).
+
+        Args:
+            replicas (:obj:`int`): number of replicas
+            tty (:obj:`bool`, optional): if :obj:`True`, allocate a pseudo-TTY
+            group (:obj:`str`, optional): name of the group; default: a new unique name
+            setup (:obj:`bool`, optional): if :obj:`True`, set up the replicas (see :obj:`setup_container`)
+            upgrade (:obj:`bool`, optional): if :obj:`True`, upgrade the Python packages of the replicas
+            max_workers (:obj:`int`, optional): maximum number of replicas to create concurrently
+            shared_ipc (:obj:`bool`, optional): if :obj:`True`, the replicas share an IPC namespace;
+                default: `config['container']['shared_ipc']`
+
+        Returns:
+            :obj:`list` of :obj:`docker.models.containers.Container`: replicas
+
+        Raises:
+            :obj:`WcEnvManagerError`: if any of the replicas can't be created or set up; the
+                replicas which were created are then removed
+        """
+        if group is None:
+            group = 'group-{}'.format(uuid.uuid4().hex[0:self.CONTAINER_NAME_SUFFIX_LEN])
+        prev_container_ids = set(container.id for container in self.get_containers(group=group))
+
+        # build the network once, rather than concurrently for each replica
+        self.build_network()
+
+        # allocate the CPUs, memory, and I/O of the replicas sequentially so that they are disjoint
+        used_cpus = set()
+        replica_resources = []
+        for i_replica in range(replicas):
+            resources = self.get_container_resources(used_cpus=used_cpus)
+            used_cpus.update(wc_env_manager.resources.parse_cpu_list(resources.get('cpuset_cpus', None)))
+            replica_resources.append(resources)
+
+        # create the replica which owns the shared IPC namespace before the replicas which join it
+        ipc_owner = None
+        if shared_ipc is None:
+            shared_ipc = self.config['container']['shared_ipc']
+        if shared_ipc and replica_resources:
+            replica_resources[0]['ipc_mode'] = 'shareable'
+            try:
+                ipc_owner = self.build_container(tty=tty, group=group, resources=replica_resources[0],
+                                                 build_network=False, set_current=False)
+            except Exception as exception:
+                self._remove_new_replicas(group, prev_container_ids)
+                raise WcEnvManagerError('{} of {} replicas of group {} could not be built:\n  {}: {}'.format(
+                    replicas, replicas, group, exception.__class__.__name__, str(exception)))
+            for resources in replica_resources[1:]:
+                resources.pop('shm_size', None)
+                resources['ipc_mode'] = 'container:' + ipc_owner.name
+
+        def build_replica(resources, container=None):
+            if container is None:
+                container = self.build_container(tty=tty, group=group, resources=resources, build_network=False,
+                                                 set_current=False)
+            if setup:
+                self.setup_container(upgrade=upgrade, container=container)
+            return container
+
+        containers = []
+        errors = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, replicas))) as executor:
+            futures = [executor.submit(build_replica, resources, ipc_owner if i_replica == 0 else None)
+                       for i_replica, resources in enumerate(replica_resources)]
+            for future in futures:
+                try:
+                    containers.append(future.result())
+                except Exception as exception:
+                    errors.append('{}: {}'.format(exception.__class__.__name__, str(exception)))
+
+        if errors:
+            self._remove_new_replicas(group, prev_container_ids)
+            raise WcEnvManagerError('{} of {} replicas of group {} could not be built:\n  {}'.format(
+                len(errors), replicas, group, '\n  '.join(errors)))
+
+        if containers:
+            self._container = containers[-1]
+        return containers
+
+    def _remove_new_replicas(self, group, prev_container_ids):
+        """ Remove the replicas of a group which were created by a failed build of the group
+
+        Args:
+            group (:obj:`str`): name of the group
+            prev_container_ids (:obj:`set` of :obj:`str`): ids of the replicas of the group before the build
+        """
+        for container in self.get_containers(group=group):
+            if container.id not in prev_container_ids:
+                try:
+                    container.remove(force=True)
+                    self.remove_path_overlays(container.name)
+                except (docker.errors.APIError, WcEnvManagerError):
+                    pass
+                if self._container is not None and self._container.id == container.id:
+                    self._container = None
+
+    def get_container_resources(self, used_cpus=None):
+        """ Get the resource controls for a new container (`config['container']['resources']`)
+
+        With the `numa` placement, the container is pinned to CPUs which are disjoint from the
+        CPUs pinned to the other WC modeling containers.
+
+        Args:
+            used_cpus (:obj:`set` of :obj:`int`, optional): ids of additional CPUs which the container
+                shouldn't be pinned to (e.g., CPUs allocated to containers which haven't been created yet)
+
+        Returns:
+            :obj:`dict`: arguments to :obj:`docker.models.containers.ContainerCollection.run`
+                which implement the resource controls
+        """
+        config = self.config['container']['resources']
+        used_cpus = set(used_cpus or [])
+        if self.is_numa_placement():
+            used_cpus.update(self.get_active_pinned_cpus())
+        return wc_env_manager.resources.get_container_run_args(config, used_cpus=used_cpus)
+
+    def is_numa_placement(self):
+        """ Determine whether containers are pinned to CPUs by the `numa` placement
+
+        Returns:
+            :obj:`bool`: :obj:`True` if containers are pinned to CPUs by the `numa` placement
+        """
+        return wc_env_manager.resources.is_numa_placement(self.config['container']['resources'])
+
+    def get_active_pinned_cpus(self, exclude=None):
+        """ Get the CPUs which are pinned to the WC modeling containers which haven't exited
+
+        The pins of exited containers aren't reserved; these containers are re-pinned when they are
+        restarted (see :obj:`wake_container`).
+
+        Args:
+            exclude (:obj:`docker.models.containers.Container`, optional): container whose CPUs to ignore
+
+        Returns:
+            :obj:`set` of :obj:`int`: ids of the CPUs
+        """
+        return wc_env_manager.resources.get_pinned_cpus(
+            container for container in self.get_containers()
+            if container.status in ('created', 'running', 'paused', 'restarting')
+            and (exclude is None or container.id != exclude.id))
+
+    def make_path_mounts(self, container_name):
+        """ Make mounts for the paths which are configured to be delivered to a container
+        by bind mounts or overlays (`config['image']['paths_to_copy']`)
+
+        Paths which cannot be mounted (see :obj:`is_path_mountable`) are skipped; these paths
+        are copied into the container by :obj:`setup_container`.
+
+        Args:
+            container_name (:obj:`str`): name of the container
+
+        Returns:
+            :obj:`list` of :obj:`docker.types.Mount`: mounts
+        """
+        mounts = []
+        for i_path, path in enumerate(self.get_paths_to_copy()):
+            mode = PathCopyMode[path['mode']]
+            if not self.is_path_mountable(path['host'], mode):
+                continue
+
+            host_path = os.path.abspath(path['host'])
+            if mode == PathCopyMode.bind:
+                mounts.append(docker.types.Mount(path['image'], host_path, type='bind', read_only=True))
+
+            else:
+                overlay_dirname = os.path.join(os.path.abspath(self.config['container']['overlay_path']),
+                                               container_name, str(i_path))
+                upper_dirname = os.path.join(overlay_dirname, 'upper')
+                work_dirname = os.path.join(overlay_dirname, 'work')
+                os.makedirs(upper_dirname, exist_ok=True)
+                os.makedirs(work_dirname, exist_ok=True)
+
+                volume = self._docker_client.volumes.create(
+                    name='{}-overlay-{}'.format(container_name, i_path),
+                    driver='local',
+                    driver_opts={
+                        'type': 'overlay',
+                        'device': 'overlay',
+                        'o': 'lowerdir={},upperdir={},workdir={}'.format(host_path, upper_dirname, work_dirname),
+                    },
+                    labels={self.OVERLAY_VOLUME_LABEL: container_name})
+                mounts.append(docker.types.Mount(path['image'], volume.name, type='volume'))
+
+        return mounts
+
     def make_container_name(self):
         """ Create a timestamped name for a Docker container
 
+        The timestamp is followed by a random suffix so that containers which are created in
+        the same second (e.g., replicas) have distinct names.
+
         Returns:
             :obj:`str`: container name
         """
-        return datetime.now().strftime(self.config['container']['name_format'])
+        return '{}-{}'.format(datetime.now().strftime(self.config['container']['name_format']),
+                              uuid.uuid4().hex[0:self.CONTAINER_NAME_SUFFIX_LEN])
 
-    def setup_container(self, upgrade=False):
+    def setup_container(self, upgrade=False, container=None):
         """ Install Python packages into Docker container
 
         Args:
             upgrade (:obj:`bool`, optional): if :obj:`True`, upgrade package
+            container (:obj:`docker.models.containers.Container`, optional): container; default:
+                current container
         """
-        # copy paths to container
-        paths_to_copy = \
-            self.get_config_file_paths_to_copy_to_image() \
-            + copy.deepcopy(self.config['image']['paths_to_copy'].values())
-        for path in paths_to_copy:
-            if os.path.isfile(path['host']) or os.path.isdir(path['host']):
-                # make directory
-                if os.path.isfile(path['host']):
-                    img_dir = os.path.dirname(path['image'])
-                else:
-                    img_dir = path['image']
-                self.run_process_in_container(['mkdir', '-p', img_dir])
+        container = container or self._container
+
+        # run the commands for the setup in a single session to avoid creating an exec for each command
+        with self.open_session(container_user=WcEnvUser.root, container=container) as session:
+            # copy paths to container, except paths which were mounted into the container
+            mounted_paths = set(posixpath.normpath(mount['Destination'])
+                                for mount in container.attrs.get('Mounts', []))
+            for path in self.get_paths_to_copy():
+                if posixpath.normpath(path['image']) in mounted_paths:
+                    continue
+                if os.path.isfile(path['host']) or os.path.isdir(path['host']):
+                    # make directory
+                    if os.path.isfile(path['host']):
+                        img_dir = os.path.dirname(path['image'])
+                    else:
+                        img_dir = path['image']
+                    session.run(['mkdir', '-p', img_dir])
+
+                    # copy file/directory
+                    with wc_env_manager.tracing.span(self._tracer, 'copy', 'file', path=path['host']) as span:
+                        if span:
+                            span.attrs['bytes'] = wc_env_manager.tracing.get_path_size(path['host'])
+                        self.run_process_on_host(['docker', 'cp',
+                                                  path['host'],
+                                                  container.name + ':' + path['image']])
+
+            session.run(['chmod', '0600', '/root/.ssh/id_rsa'])
+
+            # install Python packages
+            lines = self.config['container']['python_packages'].split('\n')
+            for line in lines:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    cmd = ['pip{}'.format(self.config['image']['python_version']), 'install']
+
+                    if line.startswith('-e '):
+                        cmd += ['-e', line[3:].strip()]
+                    else:
+                        cmd += [line]
+
+                    if upgrade:
+                        cmd.append('-U')
+
+                    session.run(cmd)
+
+            # run additional setup
+            cmd = self.config['container']['setup_script']
+            if cmd:
+                session.run(['bash', '-c', cmd])
+
+    def open_session(self, container_user=WcEnvUser.root, env=None, work_dir=None, container=None):
+        """ Open a persistent shell session in a Docker container, which can run a sequence of
+        commands without creating a new exec for each command
 
-                # copy file/directory
-                self.run_process_on_host(['docker', 'cp',
-                                          path['host'],
-                                          self._container.name + ':' + path['image']])
+        Args:
+            container_user (:obj:`WcEnvUser`, optional): user to run commands in container
+            env (:obj:`dict`, optional): key/value pairs of environment variables for the session
+            work_dir (:obj:`str`, optional): initial working directory of the session
+            container (:obj:`docker.models.containers.Container`, optional): container; default:
+                current container
 
-        self.run_process_in_container(['chmod', '0600', '/root/.ssh/id_rsa'])
+        Returns:
+            :obj:`wc_env_manager.session.ContainerSession`: session
+        """
+        container = container or self._container
+        env = self.get_thread_env(container, env)
 
-        # install Python packages
-        lines = self.config['container']['python_packages'].split('\n')
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                cmd = ['pip{}'.format(self.config['image']['python_version']), 'install']
+        def create_session():
+            return wc_env_manager.session.ContainerSession(
+                self._docker_client, container,
+                container_user=container_user, env=env, work_dir=work_dir,
+                verbose=self.config['verbose'])
 
-                if line.startswith('-e '):
-                    cmd += ['-e', line[3:].strip()]
-                else:
-                    cmd += [line]
+        try:
+            return create_session()
+        except docker.errors.APIError as exception:
+            # wake the container if it has been hibernated (see :obj:`wc_env_manager.idle`), and retry
+            if exception.status_code != 409 or not self.wake_container(container):
+                raise
+            return create_session()
 
-                if upgrade:
-                    cmd.append('-U')
+    def wake_container(self, container=None):
+        """ Unpause or restart a container which has been hibernated (see :obj:`wc_env_manager.idle`)
 
-                self.run_process_in_container(cmd, container_user=WcEnvUser.root)
+        With the `numa` placement, the CPUs of a stopped container aren't reserved while it is stopped.
+        If other containers have been pinned to its CPUs in the meantime, the container is re-pinned to
+        free CPUs before it is restarted.
 
-        # run additional setup
-        cmd = self.config['container']['setup_script']
-        if cmd:
-            self.run_process_in_container(['bash', '-c', cmd], container_user=WcEnvUser.root)
+        Args:
+            container (:obj:`docker.models.containers.Container`, optional): container; default:
+                current container
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the container was unpaused or restarted
+        """
+        container = container or self._container
+        container.reload()
+        if container.status == 'paused':
+            container.unpause()
+        elif container.status in ('exited', 'created'):
+            if self.is_numa_placement():
+                self._repin_container(container)
+            container.start()
+        else:
+            return False
+        container.reload()
+        return True
+
+    def _repin_container(self, container):
+        """ Pin a stopped container to free CPUs if other containers are pinned to its CPUs
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+        """
+        pinned_cpus = wc_env_manager.resources.get_pinned_cpus([container])
+        used_cpus = self.get_active_pinned_cpus(exclude=container)
+        if pinned_cpus.isdisjoint(used_cpus):
+            return
+        args = wc_env_manager.resources.get_container_run_args(
+            self.config['container']['resources'], used_cpus=used_cpus)
+        container.update(cpuset_cpus=args['cpuset_cpus'], cpuset_mems=args.get('cpuset_mems', None))
 
     def copy_path_to_container(self, local_path, container_path, overwrite=True, container_user=WcEnvUser.root):
         """ Copy file or directory to Docker container
@@ -707,6 +1542,8 @@ class WcEnvManager(object):
             container_user=container_user)
         if is_path and not overwrite:
             raise WcEnvManagerError('File {} already exists'.format(container_path))
+        if self._tracer:
+            self._tracer.annotate(bytes=wc_env_manager.tracing.get_path_size(local_path))
         self.run_process_on_host([
             'docker', 'cp',
             local_path,
@@ -736,6 +1573,8 @@ class WcEnvManager(object):
             self._container.name + ':' + container_path,
             local_path,
         ])
+        if self._tracer:
+            self._tracer.annotate(bytes=wc_env_manager.tracing.get_path_size(local_path))
 
     def set_container(self, container):
         """ Set the Docker containaer
@@ -745,7 +1584,8 @@ class WcEnvManager(object):
                 or name of Docker container
         """
         if isinstance(container, str):
-            container = self._docker_client.containers.get(container)
+            container = (self._is_index_running() and self._index.get_container(container)) or \
+                self._docker_client.containers.get(container)
         self._container = container
 
     def get_latest_container(self):
@@ -760,33 +1600,85 @@ class WcEnvManager(object):
         else:
             return None
 
-    def get_containers(self, sort_by_read_time=False):
+    def get_containers(self, sort_by_read_time=False, label=None, group=None):
         """ Get list of Docker containers that are WC modeling environments
 
         Args:
             sort_by_read_time (:obj:`bool`): if :obj:`True`, sort by read time in descending order
                 (latest first)
+            label (:obj:`str`, optional): if provided, only get containers with this label
+                (`key` or `key=value`)
+            group (:obj:`str`, optional): if provided, only get the replicas of this group
+                (see :obj:`build_containers`)
 
         Returns:
             :obj:`list` of :obj:`docker.models.containers.Container`: list of Docker containers
                 that are WC modeling environments
         """
+        import dateutil.parser
+
+        if self._is_index_running():
+            return self._index.get_containers(sort_by_activity=sort_by_read_time, label=label, group=group)
+
+        filters = {}
+        labels = []
+        if label:
+            labels.append(label)
+        if group:
+            labels.append('{}={}'.format(self.GROUP_LABEL, group))
+        if labels:
+            filters['label'] = labels
+
         containers = []
-        for container in self._docker_client.containers.list(all=True):
-            try:
-                datetime.strptime(container.name, self.config['container']['name_format'])
+        for container in self._docker_client.containers.list(all=True, filters=filters):
+            if self.is_container_name(container.name, self.config['container']['name_format']):
                 containers.append(container)
-            except ValueError:
-                pass
 
         if sort_by_read_time:
             containers.sort(reverse=True, key=lambda container: dateutil.parser.parse(container.stats(stream=False)['read']))
 
         return containers
 
+    @staticmethod
+    def is_container_name(name, name_format):
+        """ Determine whether a name of a Docker container is a name of a WC modeling environment
+
+        Args:
+            name (:obj:`str`): name of a Docker container
+            name_format (:obj:`str`): format of the names of WC modeling environments
+                (`config['container']['name_format']`)
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the name is a name of a WC modeling environment
+        """
+        candidates = [name]
+        match = re.match(r'^(.*)-[0-9a-f]{{{}}}$'.format(WcEnvManager.CONTAINER_NAME_SUFFIX_LEN), name)
+        if match:
+            candidates.append(match.group(1))
+
+        for candidate in candidates:
+            try:
+                datetime.strptime(candidate, name_format)
+                return True
+            except ValueError:
+                pass
+        return False
+
     def run_process_in_container(self, cmd, work_dir=None, env=None, check=True,
-                                 container_user=WcEnvUser.root):
-        """ Run a process in the current Docker container
+                                 container_user=WcEnvUser.root, container=None, verbose=None,
+                                 stream=False, stdout_callback=None, stderr_callback=None,
+                                 max_output_lines=None, max_output_size=None):
+        """ Run a process in a Docker container
+
+        By default, the output of the process is collected in memory and returned once the
+        process exits. With `stream=True`, the standard output and error of the process are
+        demultiplexed and delivered line-by-line to :obj:`stdout_callback` and :obj:`stderr_callback`
+        as they are produced, and only the last :obj:`max_output_lines` lines (and at most
+        :obj:`max_output_size` characters) of output are kept in memory (e.g., for error reports). This enables long-running processes which produce
+        large amounts of output to be monitored with bounded memory.
+
+        Containers which have been hibernated (see :obj:`wc_env_manager.idle`) are transparently
+        unpaused or restarted.
 
         Args:
             cmd (:obj:`list` of :obj:`str` or :obj:`str`): command to run
@@ -794,31 +1686,67 @@ class WcEnvManager(object):
             env (:obj:`dict`, optional): key/value pairs of environment variables
             check (:obj:`bool`, optional): if :obj:`True`, raise exception if exit code is not 0
             container_user (:obj:`WcEnvUser`, optional): user to run commands in container
+            container (:obj:`docker.models.containers.Container`, optional): container; default:
+                current container
+            verbose (:obj:`bool`, optional): if :obj:`True`, print the output of the process;
+                default: `config['verbose']`
+            stream (:obj:`bool`, optional): if :obj:`True`, stream the output of the process
+            stdout_callback (:obj:`callable`, optional): function which is called with each line
+                of the standard output of the process when streaming; default: print the line to
+                standard output if :obj:`verbose`
+            stderr_callback (:obj:`callable`, optional): function which is called with each line
+                of the standard error of the process when streaming; default: print the line to
+                standard error if :obj:`verbose`
+            max_output_lines (:obj:`int`, optional): maximum number of lines of output to keep when
+                streaming; default: :obj:`MAX_STREAMED_OUTPUT_LINES`
+            max_output_size (:obj:`int`, optional): maximum number of characters of output to keep when
+                streaming; default: :obj:`MAX_STREAMED_OUTPUT_SIZE`
 
         Returns:
-            :obj:`str`: output of the process
+            :obj:`tuple`:
+
+                * :obj:`str`: output of the process (when streaming, the last :obj:`max_output_lines`
+                  lines of the standard output and error of the process)
+                * :obj:`int`: exit code of the process
 
         Raises:
             :obj:`WcEnvManagerError`: if the command is not executed successfully
         """
-        if not env:
-            env = {}
+        container = container or self._container
+        env = self.get_thread_env(container, env)
+        if verbose is None:
+            verbose = self.config['verbose']
 
         # execute command
-        result = self._container.exec_run(
-            cmd, workdir=work_dir, environment=env, user=container_user.name)
-
-        # print output
-        if self.config['verbose']:
-            output = result.output.decode('utf-8')[0:-1]
-            if output:
+        def execute():
+            if stream:
+                return self._stream_process_in_container(
+                    container, cmd, work_dir, env, container_user, verbose,
+                    stdout_callback, stderr_callback, max_output_lines or self.MAX_STREAMED_OUTPUT_LINES,
+                    max_output_size or self.MAX_STREAMED_OUTPUT_SIZE)
+
+            result = container.exec_run(
+                cmd, workdir=work_dir, environment=env, user=container_user.name)
+            output = result.output.decode('utf-8', errors='replace')
+            if output.endswith('\n'):
+                output = output[0:-1]
+
+            # print output
+            if verbose and output:
                 print(output)
 
+            return (output, result.exit_code)
+
+        try:
+            output, exit_code = execute()
+        except docker.errors.APIError as exception:
+            # wake the container if it has been hibernated (see :obj:`wc_env_manager.idle`), and retry
+            if exception.status_code != 409 or not self.wake_container(container):
+                raise
+            output, exit_code = execute()
+
         # check for errors
-        if check and result.exit_code != 0:
-            if not work_dir:
-                result2 = self._container.exec_run('pwd', user=container_user.name)
-                work_dir = result2.output.decode('utf-8')[0:-1]
+        if check and exit_code != 0:
             raise WcEnvManagerError(
                 ('Command not successfully executed in Docker container:\n'
                  '  command: {}\n'
@@ -826,12 +1754,135 @@ class WcEnvManager(object):
                  '  environment:\n    {}\n'
                  '  exit code: {}\n'
                  '  output: {}').format(
-                    cmd, work_dir,
+                    cmd, work_dir or container.attrs['Config'].get('WorkingDir', None) or '/',
                     '\n    '.join('{}: {}'.format(key, val) for key, val in env.items()),
-                    result.exit_code,
-                    result.output.decode('utf-8')))
+                    exit_code,
+                    output))
+
+        return (output, exit_code)
+
+    def _stream_process_in_container(self, container, cmd, work_dir, env, container_user, verbose,
+                                     stdout_callback, stderr_callback, max_output_lines, max_output_size):
+        """ Run a process in a Docker container and stream its output
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+            cmd (:obj:`list` of :obj:`str` or :obj:`str`): command to run
+            work_dir (:obj:`str`): path to working directory within container
+            env (:obj:`dict`): key/value pairs of environment variables
+            container_user (:obj:`WcEnvUser`): user to run commands in container
+            verbose (:obj:`bool`): if :obj:`True`, print the output of the process if no callbacks
+                are provided
+            stdout_callback (:obj:`callable`): function which is called with each line of the
+                standard output of the process
+            stderr_callback (:obj:`callable`): function which is called with each line of the
+                standard error of the process
+            max_output_lines (:obj:`int`): maximum number of lines of output to keep
+            max_output_size (:obj:`int`): maximum number of characters of output to keep
+
+        Returns:
+            :obj:`tuple`:
+
+                * :obj:`str`: last :obj:`max_output_lines` lines (and at most :obj:`max_output_size`
+                  characters) of the output of the process
+                * :obj:`int`: exit code of the process
+        """
+        tail = collections.deque()
+        tail_size = [0]
+
+        def make_callback(callback, file):
+            def func(line):
+                tail.append(line)
+                tail_size[0] += len(line) + 1
+                while len(tail) > max_output_lines or (tail_size[0] > max_output_size and len(tail) > 1):
+                    tail_size[0] -= len(tail.popleft()) + 1
+                if callback:
+                    callback(line)
+                elif verbose:
+                    print(line, file=file)
+            return func
+
+        stdout_splitter = LineSplitter(make_callback(stdout_callback, sys.stdout))
+        stderr_splitter = LineSplitter(make_callback(stderr_callback, sys.stderr))
+
+        api = self._docker_client.api
+        exec_id = api.exec_create(container.id, cmd, stdout=True, stderr=True,
+                                  environment=env, workdir=work_dir, user=container_user.name)['Id']
+        for stdout, stderr in api.exec_start(exec_id, stream=True, demux=True):
+            if stdout:
+                stdout_splitter.write(stdout)
+            if stderr:
+                stderr_splitter.write(stderr)
+        stdout_splitter.close()
+        stderr_splitter.close()
+
+        exit_code = api.exec_inspect(exec_id)['ExitCode']
+
+        output = '\n'.join(tail)
+        return (output[-max_output_size:], exit_code)
+
+    def get_thread_env(self, container, env=None):
+        """ Get the environment of a process in a container, including variables which limit the
+        thread pools of numerical libraries (e.g., `OMP_NUM_THREADS`) to the CPUs allocated to the container
+
+        Variables which are defined by the environment of the process or of the container (e.g., by
+        `config['container']['environment']` or by :obj:`build_container`) aren't overridden.
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+            env (:obj:`dict`, optional): key/value pairs of environment variables of the process
+
+        Returns:
+            :obj:`dict`: key/value pairs of environment variables of the process
+        """
+        return wc_env_manager.resources.get_process_env(self.config['container']['resources'], container, env=env)
+
+    def run_process_in_containers(self, cmd, containers=None, label=None, work_dir=None, env=None,
+                                  container_user=WcEnvUser.root, max_workers=8):
+        """ Run a process concurrently in multiple Docker containers
+
+        Args:
+            cmd (:obj:`list` of :obj:`str` or :obj:`str`): command to run
+            containers (:obj:`list` of :obj:`docker.models.containers.Container` or :obj:`str`, optional):
+                containers or names of containers to run the process in
+            label (:obj:`str`, optional): if :obj:`containers` is not provided, run the process in
+                the WC modeling containers with this label (`key` or `key=value`); if neither
+                :obj:`containers` nor :obj:`label` is provided, run the process in all WC modeling
+                containers
+            work_dir (:obj:`str`, optional): path to working directory within containers
+            env (:obj:`dict`, optional): key/value pairs of environment variables
+            container_user (:obj:`WcEnvUser`, optional): user to run commands in containers
+            max_workers (:obj:`int`, optional): maximum number of processes to run concurrently
 
-        return (result.output.decode('utf-8')[0:-1], result.exit_code)
+        Returns:
+            :obj:`list` of :obj:`ContainerProcessResult`: result of the process in each container,
+                in the order of the containers; containers which don't exist are reported as
+                failures of their processes
+        """
+        if containers is None:
+            containers = self.get_containers(label=label)
+
+        def run_process(container):
+            start_time = time.time()
+            name = container if isinstance(container, str) else container.name
+            try:
+                if isinstance(container, str):
+                    container = self._docker_client.containers.get(container)
+                output, exit_code = self.run_process_in_container(
+                    cmd, work_dir=work_dir, env=env, check=False,
+                    container_user=container_user, container=container, verbose=False)
+                error = None
+            except Exception as exception:
+                output = ''
+                exit_code = None
+                error = '{}: {}'.format(exception.__class__.__name__, str(exception))
+            return ContainerProcessResult(name, exit_code, output,
+                                          time.time() - start_time, error=error)
+
+        if not containers:
+            return []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(containers))) as executor:
+            return list(executor.map(run_process, containers))
 
     def get_container_stats(self):
         """ Get statistics about the CPU, io, memory, network performance of the Docker container
@@ -853,33 +1904,247 @@ class WcEnvManager(object):
                 (e.g. remove container even if it is running)
         """
         self._container.remove(force=force)
+        self.remove_path_overlays(self._container.name)
         self._container = None
 
-    def remove_containers(self, force=False):
+    def remove_containers(self, force=False, group=None):
         """ Remove Docker all containers that are WC modeling environments
 
         Args:
             force (:obj:`bool`, optional): if :obj:`True`, force removal of the container
                 (e.g. remove containers even if they are running)
+            group (:obj:`str`, optional): if provided, only remove the replicas of this group
+
+        Raises:
+            :obj:`WcEnvManagerError`: if any of the containers or their overlays couldn't be removed
         """
-        for container in self.get_containers():
+        def remove_container(container):
             container.remove(force=force)
-        self._container = None
+            self.remove_path_overlays(container.name)
+
+        containers = self.get_containers(group=group)
+        errors = []
+        if containers:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(containers))) as executor:
+                futures = [executor.submit(remove_container, container) for container in containers]
+                for container, future in zip(containers, futures):
+                    try:
+                        future.result()
+                    except (docker.errors.DockerException, OSError, WcEnvManagerError) as exception:
+                        errors.append('{}: {}'.format(container.name, str(exception).replace('\n', '\n  ')))
+
+        if group is None or (self._container and self._container.name in [container.name for container in containers]):
+            self._container = None
+
+        if errors:
+            raise WcEnvManagerError('{} of {} containers could not be removed:\n  {}'.format(
+                len(errors), len(containers), '\n  '.join(errors)))
+
+    def remove_path_overlays(self, container_name):
+        """ Remove the volumes and upper layers of the overlays of a container
+
+        The upper layers contain the files which the container changed. These files are usually
+        owned by root. Files which the user can't remove are removed by a container of the image.
+
+        Args:
+            container_name (:obj:`str`): name of the container
+
+        Raises:
+            :obj:`WcEnvManagerError`: if the upper layers couldn't be removed
+        """
+        for volume in self._docker_client.volumes.list(
+                filters={'label': '{}={}'.format(self.OVERLAY_VOLUME_LABEL, container_name)}):
+            volume.remove(force=True)
+
+        overlay_path = os.path.abspath(self.config['container']['overlay_path'])
+        overlay_dirname = os.path.join(overlay_path, container_name)
+        if not os.path.isdir(overlay_dirname):
+            return
+
+        errors = []
+        shutil.rmtree(overlay_dirname, onerror=lambda func, path, exc_info: errors.append(path))
+        if errors:
+            img_config = self.config['image']
+            try:
+                self._docker_client.containers.run(
+                    img_config['repo'] + ':' + img_config['tags'][0],
+                    entrypoint=[], command=['rm', '-rf', '/overlays/' + container_name],
+                    user='root', volumes={overlay_path: {'bind': '/overlays', 'mode': 'rw'}},
+                    remove=True)
+            except docker.errors.DockerException as exception:
+                raise WcEnvManagerError('Upper layers of the overlays of container {} could not be removed from {}:\n  {}'.format(
+                    container_name, overlay_dirname, str(exception).replace('\n', '\n  ')))
 
     def run_process_on_host(self, cmd):
         """ Run a process on the host
 
+        If verbose, the output of the process is streamed line by line to :obj:`sys.stdout` and
+        :obj:`sys.stderr`, so that it follows their redirection (e.g., to the clients of the daemon).
+
         Args:
             cmd (:obj:`list` of :obj:`str` or :obj:`str`): command to run
+
+        Raises:
+            :obj:`subprocess.CalledProcessError`: if the process fails
         """
-        if self.config['verbose']:
-            stdout = None
-            stderr = None
-        else:
-            stdout = subprocess.PIPE
-            stderr = subprocess.PIPE
+        name = ' '.join((cmd.split() if isinstance(cmd, str) else cmd)[0:2])
+        with wc_env_manager.tracing.span(self._tracer, name, 'subprocess', cmd=cmd):
+            if not self.config['verbose']:
+                subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+                return
+
+            def relay(pipe, file):
+                for line in iter(pipe.readline, b''):
+                    file.write(line.decode(errors='replace'))
+                    file.flush()
+                pipe.close()
+
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            threads = [threading.Thread(target=relay, args=(process.stdout, sys.stdout), daemon=True),
+                       threading.Thread(target=relay, args=(process.stderr, sys.stderr), daemon=True)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+class ImageContext(object):
+    """ Context for building a Docker image
+
+    Attributes:
+        path (:obj:`str`): path to the (temporary) directory of the context
+        dockerfile_path (:obj:`str`): path to the rendered Dockerfile within the context
+        build_args (:obj:`dict`): build arguments for the Dockerfile
+    """
+
+    def __init__(self, path, dockerfile_path, build_args):
+        """
+        Args:
+            path (:obj:`str`): path to the (temporary) directory of the context
+            dockerfile_path (:obj:`str`): path to the rendered Dockerfile within the context
+            build_args (:obj:`dict`): build arguments for the Dockerfile
+        """
+        self.path = path
+        self.dockerfile_path = dockerfile_path
+        self.build_args = build_args
+
+    def remove(self):
+        """ Remove the directory of the context """
+        shutil.rmtree(self.path)
+
+
+class ContainerProcessResult(object):
+    """ Result of running a process in a Docker container
+
+    Attributes:
+        container (:obj:`str`): name of the container
+        exit_code (:obj:`int`): exit code of the process, or :obj:`None` if the process couldn't be run
+        output (:obj:`str`): output of the process
+        duration (:obj:`float`): duration of the process in seconds
+        error (:obj:`str`): error which prevented the process from being run
+    """
+
+    def __init__(self, container, exit_code, output, duration, error=None):
+        """
+        Args:
+            container (:obj:`str`): name of the container
+            exit_code (:obj:`int`): exit code of the process, or :obj:`None` if the process couldn't be run
+            output (:obj:`str`): output of the process
+            duration (:obj:`float`): duration of the process in seconds
+            error (:obj:`str`, optional): error which prevented the process from being run
+        """
+        self.container = container
+        self.exit_code = exit_code
+        self.output = output
+        self.duration = duration
+        self.error = error
+
+    @property
+    def success(self):
+        """ Get whether the process ran successfully
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the process exited with code 0
+        """
+        return self.exit_code == 0
 
-        subprocess.run(cmd, stdout=stdout, stderr=stderr, check=True)
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the result
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the result
+        """
+        return {
+            'container': self.container,
+            'exit_code': self.exit_code,
+            'output': self.output,
+            'duration': self.duration,
+            'error': self.error,
+        }
+
+
+class LineSplitter(object):
+    """ Split a stream of UTF-8-encoded bytes into lines, and deliver each line to a callback
+    as soon as it is complete
+
+    Lines are terminated by `\n`, `\r\n`, or `\r` (e.g., the updates of progress bars). Lines which
+    are longer than :obj:`max_line_size` are delivered in pieces, so that output without line breaks
+    (e.g., binary data) doesn't accumulate in memory.
+
+    Attributes:
+        callback (:obj:`callable`): function which is called with each line (without its line break)
+        max_line_size (:obj:`int`): maximum number of characters of a line to buffer
+        _decoder (:obj:`codecs.IncrementalDecoder`): incremental UTF-8 decoder
+        _partial_line (:obj:`str`): incomplete last line
+    """
+
+    LINE_BREAK_PATTERN = re.compile(r'\r\n|\r|\n')
+    MAX_LINE_SIZE = 64 * 1024
+
+    def __init__(self, callback, max_line_size=MAX_LINE_SIZE):
+        """
+        Args:
+            callback (:obj:`callable`): function which is called with each line (without its line break)
+            max_line_size (:obj:`int`, optional): maximum number of characters of a line to buffer
+        """
+        self.callback = callback
+        self.max_line_size = max_line_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._partial_line = ''
+
+    def write(self, data):
+        """ Process a chunk of the stream
+
+        Args:
+            data (:obj:`bytes`): chunk of the stream
+        """
+        text = self._partial_line + self._decoder.decode(data)
+
+        # a trailing `\r` may be the first half of a `\r\n`
+        held = ''
+        if text.endswith('\r'):
+            text, held = text[0:-1], '\r'
+
+        lines = self.LINE_BREAK_PATTERN.split(text)
+        partial_line = lines.pop()
+        for line in lines:
+            self.callback(line)
+
+        while len(partial_line) > self.max_line_size:
+            self.callback(partial_line[0:self.max_line_size])
+            partial_line = partial_line[self.max_line_size:]
+        self._partial_line = partial_line + held
+
+    def close(self):
+        """ Process the end of the stream """
+        line = self._partial_line + self._decoder.decode(b'', final=True)
+        self._partial_line = ''
+        if line.endswith('\r'):
+            line = line[0:-1]
+        if line:
+            self.callback(line)
 
 
 class WcEnvManagerError(Exception):
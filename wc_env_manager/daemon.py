@@ -0,0 +1,489 @@
+""" Resident manager daemon for fast repeated invocations of the command line program
+
+Each invocation of `wc-env-manager` otherwise creates a new manager, which reads the configuration,
+connects to Docker, and discovers the images and containers of the environment before doing any
+work. :obj:`ManagerDaemon` keeps warm managers, and runs the commands which the command line
+program forwards to it over a unix socket (:obj:`get_socket_path`). The daemon subscribes to the
+events of the Docker daemon, and only re-discovers the images and containers of its managers
+after they have changed.
+
+When the daemon isn't running, the command line program runs the commands itself. Commands which
+run until they are interrupted (e.g., `container stats --watch`) are always run by the
+command line program.
+
+Messages are JSON objects, one per line. The client sends a request (`argv`, `cwd`, the
+configuration environment variables, `env`, and the environment variables which configure the
+Docker client, `docker_env`). The daemon streams the output of the command (`stream`, `data`),
+and then its exit code (`exit_code`). The daemon refuses (`refused`) the commands of clients
+whose Docker clients are configured differently (e.g., to connect to another Docker daemon,
+`DOCKER_HOST`), because it watches the events of its own Docker daemon; these clients run the
+commands themselves.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+
+DEFAULT_SOCKET_PATH = os.path.expanduser('~/.wc/wc_env_manager.sock')
+
+SOCKET_PATH_ENV_VAR = 'WC_ENV_MANAGER_SOCKET'
+# environment variable which overrides the path to the socket of the daemon
+
+NO_DAEMON_ENV_VAR = 'WC_ENV_MANAGER_NO_DAEMON'
+# environment variable which, if set, prevents the command line program from forwarding commands
+
+CONFIG_ENV_VAR_PREFIX = 'CONFIG__DOT__'
+# prefix of the environment variables which override the configuration
+
+DOCKER_ENV_VAR_PREFIX = 'DOCKER_'
+# prefix of the environment variables which configure the Docker client (e.g., `DOCKER_HOST`)
+
+UNFORWARDED_COMMANDS = (
+    ('daemon',),
+    ('history', 'record'),
+    ('container', 'idle'),
+)
+# commands which are never forwarded to the daemon
+
+UNFORWARDED_ARGUMENTS = ('watch', 'prometheus')
+# destinations of the arguments of commands which run until they are interrupted (e.g., `--watch`),
+# which are never forwarded to the daemon
+
+
+def get_socket_path():
+    """ Get the path to the socket of the daemon
+
+    Returns:
+        :obj:`str`: path to the socket
+    """
+    return os.environ.get(SOCKET_PATH_ENV_VAR, None) or DEFAULT_SOCKET_PATH
+
+
+def get_docker_env():
+    """ Get the environment variables which configure the Docker client
+
+    Returns:
+        :obj:`dict`: dictionary which maps the names of the variables to their values
+    """
+    return {key: val for key, val in os.environ.items() if key.startswith(DOCKER_ENV_VAR_PREFIX)}
+
+
+def is_forwardable(argv):
+    """ Determine whether a command can be forwarded to the daemon
+
+    The arguments are parsed with the parser of the command line program, so that the values of
+    options (e.g., the path after `--trace`) aren't mistaken for commands.
+
+    Args:
+        argv (:obj:`list` of :obj:`str`): arguments of the command line program
+
+    Returns:
+        :obj:`bool`: :obj:`True` if the command can be forwarded
+    """
+    import wc_env_manager.__main__
+
+    parsed_args = wc_env_manager.__main__.parse_args(argv)
+    if parsed_args is None:
+        # the help, the version, and invalid arguments are printed by the daemon
+        return True
+
+    command, pargs = parsed_args
+    for unforwarded_command in UNFORWARDED_COMMANDS:
+        if tuple(command[0:len(unforwarded_command)]) == unforwarded_command:
+            return False
+    return not any(getattr(pargs, dest, None) for dest in UNFORWARDED_ARGUMENTS)
+
+
+def send_message(file, message):
+    """ Send a message
+
+    Args:
+        file (:obj:`io.BufferedIOBase`): file of a socket
+        message (:obj:`dict`): message
+    """
+    file.write(json.dumps(message).encode() + b'\n')
+    file.flush()
+
+
+def receive_message(file):
+    """ Receive a message
+
+    Args:
+        file (:obj:`io.BufferedIOBase`): file of a socket
+
+    Returns:
+        :obj:`dict`: message, or :obj:`None` if the connection was closed
+    """
+    line = file.readline()
+    if not line:
+        return None
+    return json.loads(line.decode())
+
+
+def connect(socket_path=None, timeout=None):
+    """ Connect to the daemon
+
+    Args:
+        socket_path (:obj:`str`, optional): path to the socket of the daemon; default: :obj:`get_socket_path`
+        timeout (:obj:`float`, optional): timeout for connecting (seconds)
+
+    Returns:
+        :obj:`socket.socket`: connection, or :obj:`None` if the daemon isn't running
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None  # pragma: no cover # Windows
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path or get_socket_path())
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def forward(argv, socket_path=None, stdout=None, stderr=None):
+    """ Run a command with the daemon, if it is running
+
+    Args:
+        argv (:obj:`list` of :obj:`str`): arguments of the command line program
+        socket_path (:obj:`str`, optional): path to the socket of the daemon; default: :obj:`get_socket_path`
+        stdout (:obj:`io.TextIOBase`, optional): file to write the standard output of the command to
+        stderr (:obj:`io.TextIOBase`, optional): file to write the standard error of the command to
+
+    Returns:
+        :obj:`int`: exit code of the command, or :obj:`None` if the command wasn't forwarded
+            (e.g., the daemon isn't running or refused the command)
+    """
+    if os.environ.get(NO_DAEMON_ENV_VAR, None):
+        return None
+
+    # only parse the arguments, which is much slower than checking for the socket, if a daemon is running
+    socket_path = socket_path or get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    sock = connect(socket_path, timeout=1.)
+    if sock is None:
+        return None
+    if not is_forwardable(argv):
+        sock.close()
+        return None
+
+    streams = {'stdout': stdout or sys.stdout, 'stderr': stderr or sys.stderr}
+    with sock, sock.makefile('rwb') as file:
+        send_message(file, {
+            'argv': list(argv),
+            'cwd': os.getcwd(),
+            'env': {key: val for key, val in os.environ.items() if key.startswith(CONFIG_ENV_VAR_PREFIX)},
+            'docker_env': get_docker_env(),
+        })
+        while True:
+            message = receive_message(file)
+            if message is None:
+                streams['stderr'].write('The connection to the wc-env-manager daemon was closed\n')
+                return 1
+            if 'refused' in message:
+                return None
+            if 'exit_code' in message:
+                return message['exit_code']
+            streams[message['stream']].write(message['data'])
+            streams[message['stream']].flush()
+
+
+def send_command(command, socket_path=None):
+    """ Send a control command (e.g., `status` or `stop`) to the daemon
+
+    Args:
+        command (:obj:`str`): command
+        socket_path (:obj:`str`, optional): path to the socket of the daemon; default: :obj:`get_socket_path`
+
+    Returns:
+        :obj:`dict`: response, or :obj:`None` if the daemon isn't running
+    """
+    sock = connect(socket_path, timeout=1.)
+    if sock is None:
+        return None
+    with sock, sock.makefile('rwb') as file:
+        send_message(file, {'command': command})
+        return receive_message(file)
+
+
+class StreamWriter(object):
+    """ File-like object which forwards the output of a command to the client
+
+    Attributes:
+        file (:obj:`io.BufferedIOBase`): file of the socket of the client
+        stream (:obj:`str`): name of the stream (`stdout` or `stderr`)
+        lock (:obj:`threading.Lock`): lock for writing to the socket
+    """
+
+    def __init__(self, file, stream, lock):
+        """
+        Args:
+            file (:obj:`io.BufferedIOBase`): file of the socket of the client
+            stream (:obj:`str`): name of the stream (`stdout` or `stderr`)
+            lock (:obj:`threading.Lock`): lock for writing to the socket
+        """
+        self.file = file
+        self.stream = stream
+        self.lock = lock
+
+    def write(self, data):
+        if data:
+            with self.lock:
+                send_message(self.file, {'stream': self.stream, 'data': data})
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class ManagerPool(object):
+    """ Pool of warm managers, which are refreshed after the images and containers of the
+    environment change
+
+    Attributes:
+        use_index (:obj:`bool`): if :obj:`True`, the managers look up images and containers from
+            in-memory indices (see :obj:`wc_env_manager.core.WcEnvManager.start_index`)
+        _managers (:obj:`dict`): dictionary which maps the configuration of each manager to the manager
+        _stale (:obj:`set`): configurations of the managers which must be refreshed
+        _lock (:obj:`threading.Lock`): lock
+    """
+
+    def __init__(self, use_index=False):
+        """
+        Args:
+            use_index (:obj:`bool`, optional): if :obj:`True`, the managers look up images and
+                containers from in-memory indices
+        """
+        self.use_index = use_index
+        self._managers = {}
+        self._stale = set()
+        self._lock = threading.Lock()
+
+    def get_manager(self, config):
+        """ Get a manager
+
+        Args:
+            config (:obj:`dict`): configuration
+
+        Returns:
+            :obj:`wc_env_manager.core.WcEnvManager`: manager
+        """
+        import wc_env_manager.core
+
+        key = json.dumps(config, sort_keys=True, default=repr)
+        with self._lock:
+            mgr = self._managers.get(key, None)
+            stale = key in self._stale
+            self._stale.discard(key)
+        if mgr is None:
+            mgr = wc_env_manager.core.WcEnvManager(config)
+            if self.use_index:
+                mgr.start_index()
+            with self._lock:
+                self._managers[key] = mgr
+        elif stale:
+            mgr.refresh()
+        return mgr
+
+    def invalidate(self):
+        """ Mark the managers to be refreshed before they're used again """
+        with self._lock:
+            self._stale.update(self._managers.keys())
+
+    def clear(self):
+        """ Remove the managers (e.g., after the configuration changed) """
+        with self._lock:
+            managers = list(self._managers.values())
+            self._managers.clear()
+            self._stale.clear()
+        for mgr in managers:
+            mgr.stop_index()
+
+
+class ManagerDaemon(object):
+    """ Daemon which runs the commands of the command line program with warm managers
+
+    Attributes:
+        socket_path (:obj:`str`): path to the socket
+        pool (:obj:`ManagerPool`): pool of managers
+        _server (:obj:`socketserver.ThreadingUnixStreamServer`): server
+        _command_lock (:obj:`threading.Lock`): lock which serializes the commands, which share the
+            working directory and standard output of the process
+        _events_thread (:obj:`threading.Thread`): thread which consumes the events of the Docker daemon
+        _events (:obj:`docker.types.daemon.CancellableStream`): stream of the events of the Docker daemon
+        _config_env (:obj:`tuple`): configuration environment variables and working directory of the
+            previous command, which determine the configuration of the managers
+        _docker_env (:obj:`dict`): environment variables which configure the Docker client of the daemon
+    """
+
+    def __init__(self, socket_path=None):
+        """
+        Args:
+            socket_path (:obj:`str`, optional): path to the socket; default: :obj:`get_socket_path`
+        """
+        self.socket_path = socket_path or get_socket_path()
+        self.pool = ManagerPool()
+        self._server = None
+        self._command_lock = threading.Lock()
+        self._events_thread = None
+        self._events = None
+        self._config_env = None
+        self._docker_env = get_docker_env()
+
+    def start(self, watch_events=True):
+        """ Start listening on the socket and consuming the events of the Docker daemon
+
+        Args:
+            watch_events (:obj:`bool`, optional): if :obj:`True`, refresh the managers after the
+                images and containers change
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if another daemon is already listening on the socket
+        """
+        import docker
+        import socketserver
+        import wc_env_manager.core
+
+        # remove the socket of a daemon which didn't exit cleanly
+        if os.path.exists(self.socket_path):
+            sock = connect(self.socket_path, timeout=1.)
+            if sock is not None:
+                sock.close()
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'A daemon is already listening on {}'.format(self.socket_path))
+            os.remove(self.socket_path)
+
+        # refresh the managers when images or containers change
+        if watch_events:
+            self.pool.use_index = True
+            self._events = docker.from_env().events(decode=True, filters={'type': ['container', 'image', 'network']})
+            self._events_thread = threading.Thread(target=self._consume_events, daemon=True,
+                                                   name='wc_env_manager.daemon.events')
+            self._events_thread.start()
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon.handle(self.rfile, self.wfile)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+
+    def serve_forever(self):
+        """ Run commands until the daemon is stopped """
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def stop(self):
+        """ Stop the daemon """
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def close(self):
+        """ Close the socket, the stream of events, and the indices of the managers """
+        self._server.server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        if self._events is not None:
+            self._events.close()
+        self.pool.clear()
+
+    def _consume_events(self):
+        """ Mark the managers to be refreshed after each event of the Docker daemon """
+        try:
+            for event in self._events:
+                self.pool.invalidate()
+        except Exception:
+            pass
+
+    def handle(self, rfile, wfile):
+        """ Handle a request from a client
+
+        Args:
+            rfile (:obj:`io.BufferedIOBase`): file to read requests from
+            wfile (:obj:`io.BufferedIOBase`): file to write responses to
+        """
+        request = receive_message(rfile)
+        if request is None:
+            return
+
+        command = request.get('command', None)
+        if command == 'status':
+            send_message(wfile, {'pid': os.getpid(), 'socket': self.socket_path})
+        elif command == 'stop':
+            send_message(wfile, {'pid': os.getpid()})
+            self.stop()
+        elif 'argv' in request and request.get('docker_env', None) != self._docker_env:
+            send_message(wfile, {'refused': 'The Docker client of the daemon is configured differently'})
+        elif 'argv' in request:
+            exit_code = self.run_command(request['argv'], request.get('cwd', None), request.get('env', None) or {},
+                                         wfile)
+            send_message(wfile, {'exit_code': exit_code})
+        else:
+            send_message(wfile, {'error': 'Invalid request'})
+
+    def run_command(self, argv, cwd, env, wfile):
+        """ Run a command of the command line program with the warm managers
+
+        Args:
+            argv (:obj:`list` of :obj:`str`): arguments of the command line program
+            cwd (:obj:`str`): working directory of the client
+            env (:obj:`dict`): configuration environment variables of the client
+            wfile (:obj:`io.BufferedIOBase`): file to stream the output of the command to
+
+        Returns:
+            :obj:`int`: exit code
+        """
+        import contextlib
+        import traceback
+        import wc_env_manager.__main__
+
+        write_lock = threading.Lock()
+        stdout = StreamWriter(wfile, 'stdout', write_lock)
+        stderr = StreamWriter(wfile, 'stderr', write_lock)
+
+        with self._command_lock:
+            # the configuration depends on the working directory (`./wc_env_manager.cfg`) and
+            # the configuration environment variables
+            for key in [key for key in os.environ.keys() if key.startswith(CONFIG_ENV_VAR_PREFIX)]:
+                os.environ.pop(key)
+            os.environ.update(env)
+            if cwd:
+                os.chdir(cwd)
+            config_env = (os.getcwd(), tuple(sorted(env.items())))
+            if config_env != self._config_env:
+                self.pool.clear()
+                self._config_env = config_env
+
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    return wc_env_manager.__main__.run(argv, manager_pool=self.pool)
+                except SystemExit as exception:
+                    if exception.code is None or isinstance(exception.code, int):
+                        return exception.code or 0
+                    print(exception.code, file=sys.stderr)
+                    return 1
+                except Exception:
+                    traceback.print_exc()
+                    return 1
@@ -0,0 +1,667 @@
+""" Persistent history of the resource usage of WC modeling containers
+
+:obj:`ResourceHistory` stores samples of the resource usage of containers in a local SQLite
+database at three resolutions. Samples are recorded at a resolution of 1 s; as samples age,
+they are downsampled to a resolution of 1 min and then to 1 h, and the oldest samples are
+deleted. Each downsampled sample retains the mean and peak CPU utilization and memory
+working set of the samples that it summarizes so that the history can be used to size
+memory limits and numbers of replicas.
+
+The history also records the commands which are executed in the containers (e.g., by
+`wc-env-manager container exec`), which enables queries of the peak usage of each command.
+
+:obj:`HistoryRecorder` feeds a history from a :obj:`wc_env_manager.telemetry.ContainerMonitor`
+of all of the WC modeling containers::
+
+    with HistoryRecorder(mgr) as recorder:
+        ...
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import docker
+import os
+import re
+import requests
+import sqlite3
+import threading
+import time
+import wc_env_manager.core
+import wc_env_manager.telemetry
+
+
+class ResourceHistory(object):
+    """ Downsampled history of the resource usage of containers, stored in a SQLite database
+
+    Attributes:
+        filename (:obj:`str`): path to the database
+        retention (:obj:`dict`): dictionary which maps each resolution (seconds) to the
+            duration for which samples at that resolution are retained (seconds)
+        _connection (:obj:`sqlite3.Connection`): connection to the database
+    """
+
+    RESOLUTIONS = (1, 60, 3600)
+    # resolutions of samples (seconds), from finest to coarsest
+
+    DEFAULT_RETENTION = {
+        1: 3600,
+        60: 7 * 24 * 3600,
+        3600: 365 * 24 * 3600,
+    }
+    # default durations for which samples at each resolution are retained (seconds)
+
+    SAMPLE_COLUMNS = (
+        'num_samples',
+        'cpu_percent_mean', 'cpu_percent_max',
+        'memory_working_set_mean', 'memory_working_set_max',
+        'memory_limit',
+        'block_io_read_rate_mean', 'block_io_write_rate_mean',
+        'network_rx_rate_mean', 'network_tx_rate_mean',
+        'pids_max',
+    )
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS samples (
+            resolution INTEGER NOT NULL,
+            container TEXT NOT NULL,
+            time REAL NOT NULL,
+            num_samples INTEGER NOT NULL,
+            cpu_percent_mean REAL,
+            cpu_percent_max REAL,
+            memory_working_set_mean REAL,
+            memory_working_set_max INTEGER,
+            memory_limit INTEGER,
+            block_io_read_rate_mean REAL,
+            block_io_write_rate_mean REAL,
+            network_rx_rate_mean REAL,
+            network_tx_rate_mean REAL,
+            pids_max INTEGER,
+            PRIMARY KEY (resolution, container, time)
+        );
+        CREATE TABLE IF NOT EXISTS commands (
+            container TEXT NOT NULL,
+            exec_id TEXT NOT NULL,
+            cmd TEXT NOT NULL,
+            start_time REAL NOT NULL,
+            end_time REAL,
+            exit_code INTEGER,
+            PRIMARY KEY (container, exec_id)
+        );
+        CREATE INDEX IF NOT EXISTS samples_container_time ON samples (container, time);
+    '''
+
+    def __init__(self, filename, retention=None):
+        """
+        Args:
+            filename (:obj:`str`): path to the database; the database is created if it doesn't exist
+            retention (:obj:`dict`, optional): dictionary which maps each resolution (seconds) to
+                the duration for which samples at that resolution are retained (seconds)
+        """
+        self.filename = filename
+        self.retention = dict(self.DEFAULT_RETENTION)
+        self.retention.update(retention or {})
+
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self._connection = sqlite3.connect(filename)
+        self._connection.executescript(self.SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Close the database """
+        self._connection.close()
+
+    def add_samples(self, samples):
+        """ Add samples at a resolution of 1 s
+
+        Args:
+            samples (:obj:`list` of :obj:`wc_env_manager.telemetry.StatsSample`): samples
+        """
+        rows = []
+        for sample in samples:
+            rows.append((
+                self.RESOLUTIONS[0], sample.container, float(int(sample.time)), 1,
+                sample.cpu_percent, sample.cpu_percent,
+                sample.memory_working_set, sample.memory_working_set,
+                sample.memory_limit,
+                sample.block_io_read_rate, sample.block_io_write_rate,
+                sample.network_rx_rate, sample.network_tx_rate,
+                sample.pids,
+            ))
+        values = 'VALUES ({})'.format(', '.join(['?'] * (3 + len(self.SAMPLE_COLUMNS))))
+        with self._connection:
+            self._connection.executemany(self._get_upsert_sql(values), rows)
+
+    def _get_upsert_sql(self, values):
+        """ Get a SQL statement which inserts samples, or merges them into existing samples with
+        the same resolution, container, and time
+
+        Args:
+            values (:obj:`str`): `VALUES` clause or `SELECT` statement which generates the
+                resolutions, containers, times, and :obj:`SAMPLE_COLUMNS` of the samples
+
+        Returns:
+            :obj:`str`: SQL statement
+        """
+        def mean(column):
+            return ('{0} = (COALESCE({0}, 0) * num_samples + COALESCE(excluded.{0}, 0) * excluded.num_samples) '
+                    '/ (num_samples + excluded.num_samples)').format(column)
+
+        def maximum(column):
+            return '{0} = MAX(COALESCE({0}, excluded.{0}), COALESCE(excluded.{0}, {0}))'.format(column)
+
+        return '''
+            INSERT INTO samples (resolution, container, time, {columns})
+            {values}
+            ON CONFLICT (resolution, container, time) DO UPDATE SET
+                {updates},
+                num_samples = num_samples + excluded.num_samples
+            '''.format(
+            columns=', '.join(self.SAMPLE_COLUMNS),
+            values=values,
+            updates=',\n                '.join([
+                mean('cpu_percent_mean'),
+                maximum('cpu_percent_max'),
+                mean('memory_working_set_mean'),
+                maximum('memory_working_set_max'),
+                maximum('memory_limit'),
+                mean('block_io_read_rate_mean'),
+                mean('block_io_write_rate_mean'),
+                mean('network_rx_rate_mean'),
+                mean('network_tx_rate_mean'),
+                maximum('pids_max'),
+            ]))
+
+    def downsample(self, now=None):
+        """ Downsample aged samples to coarser resolutions, and delete samples which are older
+        than the retention of the coarsest resolution
+
+        Samples at each resolution which are older than the retention of the resolution are
+        summarized into samples at the next coarser resolution and deleted.
+
+        Args:
+            now (:obj:`float`, optional): current time (seconds since the epoch)
+        """
+        if now is None:
+            now = time.time()
+
+        with self._connection:
+            for resolution, coarser_resolution in zip(self.RESOLUTIONS[0:-1], self.RESOLUTIONS[1:]):
+                cutoff = now - self.retention[resolution]
+                # only downsample complete buckets of the coarser resolution
+                cutoff = cutoff - cutoff % coarser_resolution
+                self._connection.execute(self._get_upsert_sql('''
+                    SELECT ?, container, CAST(time / ? AS INTEGER) * ? AS bucket,
+                        SUM(num_samples),
+                        SUM(cpu_percent_mean * num_samples) / SUM(num_samples),
+                        MAX(cpu_percent_max),
+                        SUM(memory_working_set_mean * num_samples) / SUM(num_samples),
+                        MAX(memory_working_set_max),
+                        MAX(memory_limit),
+                        SUM(block_io_read_rate_mean * num_samples) / SUM(num_samples),
+                        SUM(block_io_write_rate_mean * num_samples) / SUM(num_samples),
+                        SUM(network_rx_rate_mean * num_samples) / SUM(num_samples),
+                        SUM(network_tx_rate_mean * num_samples) / SUM(num_samples),
+                        MAX(pids_max)
+                    FROM samples
+                    WHERE resolution = ? AND time < ?
+                    GROUP BY container, bucket
+                    '''), (coarser_resolution, coarser_resolution, coarser_resolution, resolution, cutoff))
+                self._connection.execute('DELETE FROM samples WHERE resolution = ? AND time < ?',
+                                         (resolution, cutoff))
+
+            coarsest_resolution = self.RESOLUTIONS[-1]
+            cutoff = now - self.retention[coarsest_resolution]
+            self._connection.execute('DELETE FROM samples WHERE resolution = ? AND time < ?',
+                                     (coarsest_resolution, cutoff))
+            self._connection.execute('DELETE FROM commands WHERE end_time IS NOT NULL AND end_time < ?',
+                                     (cutoff, ))
+
+    def get_samples(self, container, since=None, until=None, resolution=None):
+        """ Get the samples of a container
+
+        Args:
+            container (:obj:`str`): name of the container
+            since (:obj:`float`, optional): start time (seconds since the epoch)
+            until (:obj:`float`, optional): end time (seconds since the epoch)
+            resolution (:obj:`int`, optional): if provided, only get samples at this resolution (seconds)
+
+        Returns:
+            :obj:`list` of :obj:`dict`: samples in chronological order; each sample includes its
+                resolution, time, and the columns in :obj:`SAMPLE_COLUMNS`
+        """
+        where, args = self._get_time_filter(since, until)
+        where.append('container = ?')
+        args.append(container)
+        if resolution is not None:
+            where.append('resolution = ?')
+            args.append(resolution)
+        cursor = self._connection.execute(
+            'SELECT resolution, time, {} FROM samples WHERE {} ORDER BY time, resolution'.format(
+                ', '.join(self.SAMPLE_COLUMNS), ' AND '.join(where)), args)
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_peak_usage(self, containers=None, since=None, until=None):
+        """ Get the peak and mean resource usage of each container
+
+        Args:
+            containers (:obj:`list` of :obj:`str`, optional): names of containers; default: all containers
+            since (:obj:`float`, optional): start time (seconds since the epoch)
+            until (:obj:`float`, optional): end time (seconds since the epoch)
+
+        Returns:
+            :obj:`list` of :obj:`dict`: peak and mean resource usage of each container, sorted by container
+        """
+        where, args = self._get_time_filter(since, until)
+        if containers:
+            where.append('container IN ({})'.format(', '.join(['?'] * len(containers))))
+            args.extend(containers)
+        cursor = self._connection.execute('''
+            SELECT container,
+                MIN(time) AS start_time,
+                MAX(time + resolution) AS end_time,
+                SUM(num_samples) AS num_samples,
+                SUM(cpu_percent_mean * num_samples) / SUM(num_samples) AS cpu_percent_mean,
+                MAX(cpu_percent_max) AS cpu_percent_max,
+                SUM(memory_working_set_mean * num_samples) / SUM(num_samples) AS memory_working_set_mean,
+                MAX(memory_working_set_max) AS memory_working_set_max,
+                MAX(memory_limit) AS memory_limit,
+                MAX(pids_max) AS pids_max
+            FROM samples
+            {}
+            GROUP BY container
+            ORDER BY container
+            '''.format('WHERE ' + ' AND '.join(where) if where else ''), args)
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_command_usage(self, containers=None, cmd=None, since=None, until=None):
+        """ Get the peak and mean resource usage of the container of each recorded command
+        while the command was running
+
+        Because samples are downsampled as they age, the usage of older commands is calculated
+        from the coarser samples which overlap the execution of each command. Consequently, the
+        usage of older commands also includes the usage of other processes which ran during the
+        same minutes or hours.
+
+        Args:
+            containers (:obj:`list` of :obj:`str`, optional): names of containers; default: all containers
+            cmd (:obj:`str`, optional): if provided, only get commands which contain this string
+            since (:obj:`float`, optional): start time (seconds since the epoch)
+            until (:obj:`float`, optional): end time (seconds since the epoch)
+
+        Returns:
+            :obj:`list` of :obj:`dict`: usage of each command, in chronological order
+        """
+        where = []
+        args = []
+        if containers:
+            where.append('commands.container IN ({})'.format(', '.join(['?'] * len(containers))))
+            args.extend(containers)
+        if cmd:
+            where.append('INSTR(commands.cmd, ?) > 0')
+            args.append(cmd)
+        if since is not None:
+            where.append('COALESCE(commands.end_time, ?) >= ?')
+            args.extend([time.time(), since])
+        if until is not None:
+            where.append('commands.start_time < ?')
+            args.append(until)
+        cursor = self._connection.execute('''
+            SELECT commands.container AS container,
+                commands.cmd AS cmd,
+                commands.start_time AS start_time,
+                commands.end_time AS end_time,
+                commands.exit_code AS exit_code,
+                SUM(samples.num_samples) AS num_samples,
+                SUM(samples.cpu_percent_mean * samples.num_samples) / SUM(samples.num_samples) AS cpu_percent_mean,
+                MAX(samples.cpu_percent_max) AS cpu_percent_max,
+                SUM(samples.memory_working_set_mean * samples.num_samples) / SUM(samples.num_samples)
+                    AS memory_working_set_mean,
+                MAX(samples.memory_working_set_max) AS memory_working_set_max,
+                MAX(samples.pids_max) AS pids_max
+            FROM commands
+            LEFT JOIN samples ON
+                samples.container = commands.container
+                AND samples.time + samples.resolution > commands.start_time
+                AND samples.time <= COALESCE(commands.end_time, samples.time)
+            {}
+            GROUP BY commands.container, commands.exec_id
+            ORDER BY commands.start_time
+            '''.format('WHERE ' + ' AND '.join(where) if where else ''), args)
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _get_time_filter(since, until):
+        """ Get SQL conditions which select the samples within a range of time
+
+        Args:
+            since (:obj:`float`): start time (seconds since the epoch)
+            until (:obj:`float`): end time (seconds since the epoch)
+
+        Returns:
+            :obj:`tuple`:
+
+                * :obj:`list` of :obj:`str`: conditions
+                * :obj:`list`: arguments of the conditions
+        """
+        where = []
+        args = []
+        if since is not None:
+            where.append('time + resolution > ?')
+            args.append(since)
+        if until is not None:
+            where.append('time < ?')
+            args.append(until)
+        return where, args
+
+    def start_command(self, container, exec_id, cmd, start_time):
+        """ Record the start of a command
+
+        Args:
+            container (:obj:`str`): name of the container
+            exec_id (:obj:`str`): id of the Docker exec which runs the command
+            cmd (:obj:`str`): command
+            start_time (:obj:`float`): start time (seconds since the epoch)
+        """
+        with self._connection:
+            self._connection.execute(
+                'INSERT OR IGNORE INTO commands (container, exec_id, cmd, start_time) VALUES (?, ?, ?, ?)',
+                (container, exec_id, cmd, start_time))
+
+    def end_command(self, container, exec_id, end_time, exit_code=None):
+        """ Record the end of a command
+
+        Args:
+            container (:obj:`str`): name of the container
+            exec_id (:obj:`str`): id of the Docker exec which ran the command
+            end_time (:obj:`float`): end time (seconds since the epoch)
+            exit_code (:obj:`int`, optional): exit code
+        """
+        with self._connection:
+            self._connection.execute(
+                'UPDATE commands SET end_time = ?, exit_code = ? WHERE container = ? AND exec_id = ? AND end_time IS NULL',
+                (end_time, exit_code, container, exec_id))
+
+    def get_running_commands(self):
+        """ Get the commands which have been started, but whose ends haven't been recorded
+
+        Returns:
+            :obj:`list` of :obj:`tuple` of :obj:`str`: container and exec id of each command
+        """
+        return self._connection.execute('SELECT container, exec_id FROM commands WHERE end_time IS NULL').fetchall()
+
+
+class HistoryRecorder(object):
+    """ Record the resource usage of all WC modeling containers, and the commands executed in
+    them, to a :obj:`ResourceHistory`
+
+    The recorder consumes the streams of statistics of the containers with a
+    :obj:`wc_env_manager.telemetry.ContainerMonitor` and the `exec_start` and `exec_die` events
+    of the Docker daemon, and periodically (a) writes the new samples to the history, (b) discovers
+    new containers, (c) records the Docker execs which have started and finished, and (d)
+    downsamples the history. The times of the execs are the times of their events, so that short
+    commands are recorded with their actual start and end times. Execs whose events were missed
+    (e.g., execs which started before the recorder) are discovered by polling the execs of the
+    containers each :obj:`flush_interval`; their times are only accurate to this interval.
+
+    Attributes:
+        mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+        filename (:obj:`str`): path to the database of the history
+        retention (:obj:`dict`): retention of each resolution (seconds)
+        flush_interval (:obj:`float`): interval at which samples are written to the history (seconds)
+        downsample_interval (:obj:`float`): interval at which the history is downsampled (seconds)
+        _monitor (:obj:`wc_env_manager.telemetry.ContainerMonitor`): monitor
+        _pending_samples (:obj:`list` of :obj:`wc_env_manager.telemetry.StatsSample`): samples
+            which haven't been written to the history
+        _pending_commands (:obj:`list` of :obj:`tuple`): starts (`start`, container, exec id, command, time)
+            and ends (`end`, container, exec id, time, exit code) of commands which haven't been written
+            to the history
+        _lock (:obj:`threading.Lock`): lock for :obj:`_pending_samples` and :obj:`_pending_commands`
+        _events (:obj:`docker.types.daemon.CancellableStream`): stream of the exec events of the Docker daemon
+        _events_thread (:obj:`threading.Thread`): thread which consumes the exec events
+        _thread (:obj:`threading.Thread`): thread which writes the history
+        _stopped (:obj:`threading.Event`): event which signals the thread to stop
+    """
+
+    EXEC_EVENT_ACTIONS = ('exec_start', 'exec_die')
+
+    def __init__(self, mgr, filename=None, retention=None, flush_interval=5., downsample_interval=60.):
+        """
+        Args:
+            mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+            filename (:obj:`str`, optional): path to the database of the history; default:
+                `config['history']['path']`
+            retention (:obj:`dict`, optional): retention of each resolution (seconds); default:
+                `config['history']['retention']`
+            flush_interval (:obj:`float`, optional): interval at which samples are written to the history (seconds)
+            downsample_interval (:obj:`float`, optional): interval at which the history is downsampled (seconds)
+        """
+        config = mgr.config['history']
+        self.mgr = mgr
+        self.filename = filename or config['path']
+        if retention is None:
+            retention = get_retention(config)
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.downsample_interval = downsample_interval
+        self._monitor = wc_env_manager.telemetry.ContainerMonitor([], buffer_size=1, callbacks=[self._add_sample])
+        self._pending_samples = []
+        self._pending_commands = []
+        self._lock = threading.Lock()
+        self._events = None
+        self._events_thread = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _add_sample(self, sample):
+        """ Queue a sample to be written to the history
+
+        Args:
+            sample (:obj:`wc_env_manager.telemetry.StatsSample`): sample
+        """
+        with self._lock:
+            self._pending_samples.append(sample)
+
+    def _add_exec_event(self, event):
+        """ Queue the start or end of a command reported by an exec event of the Docker daemon to be
+        written to the history
+
+        Args:
+            event (:obj:`dict`): event
+        """
+        action, _, cmd = (event.get('Action', None) or event.get('status', None) or '').partition(': ')
+        attrs = (event.get('Actor', None) or {}).get('Attributes', None) or {}
+        container = attrs.get('name', None)
+        exec_id = attrs.get('execID', None)
+        if action not in self.EXEC_EVENT_ACTIONS or not container or not exec_id or \
+                not wc_env_manager.core.WcEnvManager.is_container_name(container,
+                                                                       self.mgr.config['container']['name_format']):
+            return
+        if event.get('timeNano', None):
+            event_time = event['timeNano'] / 1e9
+        else:
+            event_time = event.get('time', None) or time.time()
+
+        with self._lock:
+            if action == 'exec_start':
+                self._pending_commands.append(('start', container, exec_id, cmd, event_time))
+            else:
+                exit_code = attrs.get('exitCode', None)
+                exit_code = int(exit_code) if exit_code not in (None, '') else None
+                self._pending_commands.append(('end', container, exec_id, event_time, exit_code))
+
+    def start(self):
+        """ Start recording """
+        self._stopped.clear()
+        self._monitor.start()
+        self._events = self.mgr._docker_client.events(
+            decode=True, filters={'type': 'container', 'event': list(self.EXEC_EVENT_ACTIONS)})
+        self._events_thread = threading.Thread(target=self._consume_exec_events, daemon=True,
+                                               name='wc_env_manager.history.events')
+        self._events_thread.start()
+        self._thread = threading.Thread(target=self._record, daemon=True, name='wc_env_manager.history')
+        self._thread.start()
+
+    def stop(self):
+        """ Stop recording, and write the remaining samples to the history """
+        self._stopped.set()
+        self._thread.join()
+        self._events.close()
+        self._events_thread.join(5.)
+        self._monitor.stop()
+
+    def _consume_exec_events(self):
+        """ Queue the commands reported by the exec events of the Docker daemon until recording is stopped """
+        try:
+            for event in self._events:
+                self._add_exec_event(event)
+        except Exception:
+            # the stream is closed by :obj:`stop`, or dropped by the Docker daemon, after which execs
+            # are only discovered by polling
+            pass
+
+    def _record(self):
+        """ Periodically write samples, commands, and new containers to the history """
+        # SQLite connections can only be used by the thread which created them
+        with ResourceHistory(self.filename, retention=self.retention) as history:
+            last_downsample_time = 0.
+            while True:
+                stopped = self._stopped.wait(self.flush_interval)
+
+                with self._lock:
+                    samples = self._pending_samples
+                    self._pending_samples = []
+                    commands = self._pending_commands
+                    self._pending_commands = []
+                history.add_samples(samples)
+                self.write_commands(history, commands)
+
+                try:
+                    containers = self.mgr.get_containers()
+                    for container in containers:
+                        if container.status == 'running':
+                            self._monitor.add_container(container)
+                    self.record_commands(history, containers)
+                except (docker.errors.APIError, requests.exceptions.RequestException):
+                    pass
+
+                if time.time() - last_downsample_time >= self.downsample_interval or stopped:
+                    history.downsample()
+                    last_downsample_time = time.time()
+
+                if stopped:
+                    break
+
+    @staticmethod
+    def write_commands(history, commands):
+        """ Write the starts and ends of commands reported by exec events to the history
+
+        Args:
+            history (:obj:`ResourceHistory`): history
+            commands (:obj:`list` of :obj:`tuple`): starts (`start`, container, exec id, command, time)
+                and ends (`end`, container, exec id, time, exit code) of commands, in chronological order
+        """
+        for command in commands:
+            if command[0] == 'start':
+                history.start_command(*command[1:])
+            else:
+                history.end_command(*command[1:4], exit_code=command[4])
+
+    def record_commands(self, history, containers):
+        """ Record the Docker execs which have started or finished since the last call, whose
+        events were missed
+
+        Args:
+            history (:obj:`ResourceHistory`): history
+            containers (:obj:`list` of :obj:`docker.models.containers.Container`): containers
+        """
+        api = self.mgr._docker_client.api
+        now = time.time()
+
+        running_exec_ids = set()
+        for container in containers:
+            for exec_id in container.attrs.get('ExecIDs', None) or []:
+                try:
+                    info = api.exec_inspect(exec_id)
+                except docker.errors.NotFound:
+                    continue
+                if not info['Running']:
+                    continue
+                running_exec_ids.add((container.name, exec_id))
+                process = info['ProcessConfig']
+                cmd = ' '.join([process['entrypoint']] + process['arguments'])
+                history.start_command(container.name, exec_id, cmd, now)
+
+        for container, exec_id in history.get_running_commands():
+            if (container, exec_id) in running_exec_ids:
+                continue
+            try:
+                exit_code = api.exec_inspect(exec_id)['ExitCode']
+            except docker.errors.NotFound:
+                exit_code = None
+            history.end_command(container, exec_id, now, exit_code=exit_code)
+
+
+def get_retention(config):
+    """ Get the retention of each resolution of a history from its configuration
+
+    Args:
+        config (:obj:`dict`): configuration of the history (`config['history']`)
+
+    Returns:
+        :obj:`dict`: dictionary which maps each resolution (seconds) to its retention (seconds)
+    """
+    return {
+        1: parse_duration(config['retention_1s']),
+        60: parse_duration(config['retention_1min']),
+        3600: parse_duration(config['retention_1h']),
+    }
+
+
+DURATION_UNITS = {
+    's': 1,
+    'm': 60,
+    'h': 3600,
+    'd': 24 * 3600,
+    'w': 7 * 24 * 3600,
+}
+
+
+def parse_duration(duration):
+    """ Parse a duration (e.g., `90s`, `30m`, `12h`, `7d`, `2w`)
+
+    Args:
+        duration (:obj:`str` or :obj:`float`): duration; numbers without units are interpreted as seconds
+
+    Returns:
+        :obj:`float`: duration (seconds)
+
+    Raises:
+        :obj:`ValueError`: if the duration is invalid
+    """
+    if isinstance(duration, (int, float)):
+        return float(duration)
+    match = re.match(r'^\s*(\d+(\.\d*)?)\s*([smhdw]?)\s*$', duration)
+    if not match:
+        raise ValueError('Invalid duration: {}'.format(duration))
+    return float(match.group(1)) * DURATION_UNITS[match.group(3) or 's']
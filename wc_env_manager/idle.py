@@ -0,0 +1,223 @@
+""" Detection and hibernation of idle WC modeling containers
+
+:obj:`IdleMonitor` periodically checks the activity of all running WC modeling containers, and
+hibernates (pauses or stops) the containers which have been idle for longer than a threshold
+(`config['idle']`). A container is active if, since the previous check,
+
+* it has used more than a threshold of CPU,
+* a Docker exec (e.g., a process started by :obj:`wc_env_manager.core.WcEnvManager.run_process_in_container`
+  or an interactive session) has been started in it, or
+* a Docker exec is running in it.
+
+Paused containers release their CPU, and stopped containers also release their memory.
+:obj:`wc_env_manager.core.WcEnvManager.run_process_in_container` and
+:obj:`wc_env_manager.core.WcEnvManager.open_session` transparently unpause or restart hibernated
+containers (see :obj:`wc_env_manager.core.WcEnvManager.wake_container`).
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import concurrent.futures
+import docker
+import enum
+import requests
+import threading
+import time
+import wc_env_manager.history
+
+
+class HibernationAction(enum.Enum):
+    """ Actions for hibernating idle containers
+
+    * pause: freeze the processes of the container, which releases its CPU
+    * stop: stop the container, which releases its CPU and memory
+    """
+    pause = 'pause'
+    stop = 'stop'
+
+
+class IdleMonitor(object):
+    """ Monitor which hibernates idle WC modeling containers
+
+    Attributes:
+        mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+        timeout (:obj:`float`): duration of inactivity after which containers are hibernated (seconds)
+        cpu_threshold (:obj:`float`): CPU utilization below which containers are idle (percent of one CPU)
+        action (:obj:`HibernationAction`): action for hibernating idle containers
+        interval (:obj:`float`): interval between checks (seconds)
+        max_workers (:obj:`int`): maximum number of containers to check concurrently
+        callbacks (:obj:`list` of :obj:`callable`): functions which are called with each hibernated container
+        _last_activity (:obj:`dict`): dictionary which maps the name of each container to the time of its last activity
+        _cpu_usage (:obj:`dict`): dictionary which maps the name of each container to the time and its
+            cumulative CPU usage (nanoseconds) at the previous check
+        _exec_ids (:obj:`dict`): dictionary which maps the name of each container to the ids of its execs
+            at the previous check
+        _thread (:obj:`threading.Thread`): thread which periodically checks the containers
+        _stopped (:obj:`threading.Event`): event which signals the thread to stop
+    """
+
+    def __init__(self, mgr, timeout=None, cpu_threshold=None, action=None, interval=None, max_workers=8,
+                 callbacks=None):
+        """
+        Args:
+            mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+            timeout (:obj:`str` or :obj:`float`, optional): duration of inactivity after which containers
+                are hibernated (e.g., `4h`); default: `config['idle']['timeout']`
+            cpu_threshold (:obj:`float`, optional): CPU utilization below which containers are idle
+                (percent of one CPU); default: `config['idle']['cpu_threshold']`
+            action (:obj:`str` or :obj:`HibernationAction`, optional): action for hibernating idle
+                containers; default: `config['idle']['action']`
+            interval (:obj:`float`, optional): interval between checks (seconds);
+                default: `config['idle']['interval']`
+            max_workers (:obj:`int`, optional): maximum number of containers to check concurrently
+            callbacks (:obj:`list` of :obj:`callable`, optional): functions which are called with
+                each hibernated container
+        """
+        config = mgr.config['idle']
+        self.mgr = mgr
+        self.timeout = wc_env_manager.history.parse_duration(config['timeout'] if timeout is None else timeout)
+        self.cpu_threshold = config['cpu_threshold'] if cpu_threshold is None else cpu_threshold
+        self.action = HibernationAction(config['action'] if action is None else action)
+        self.interval = interval or config['interval']
+        self.max_workers = max_workers
+        self.callbacks = callbacks or []
+        self._last_activity = {}
+        self._cpu_usage = {}
+        self._exec_ids = {}
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """ Start periodically checking the containers """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='wc_env_manager.idle')
+        self._thread.start()
+
+    def stop(self):
+        """ Stop checking the containers """
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        """ Periodically check the containers """
+        while True:
+            try:
+                self.check()
+            except (docker.errors.APIError, requests.exceptions.RequestException):
+                pass
+            if self._stopped.wait(self.interval):
+                break
+
+    def check(self, now=None, dry_run=False):
+        """ Update the activity of the running containers, and hibernate the idle containers
+
+        Args:
+            now (:obj:`float`, optional): current time (seconds since the epoch)
+            dry_run (:obj:`bool`, optional): if :obj:`True`, only select the idle containers
+
+        Returns:
+            :obj:`list` of :obj:`docker.models.containers.Container`: hibernated (or, with
+                :obj:`dry_run`, idle) containers
+        """
+        if now is None:
+            now = time.time()
+
+        containers = [container for container in self.mgr.get_containers() if container.status == 'running']
+
+        # forget containers which are no longer running
+        names = set(container.name for container in containers)
+        for activity in (self._last_activity, self._cpu_usage, self._exec_ids):
+            for name in list(activity.keys()):
+                if name not in names:
+                    activity.pop(name)
+
+        if not containers:
+            return []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(containers))) as executor:
+            active = list(executor.map(lambda container: self.is_active(container, now), containers))
+
+        idle_containers = []
+        for container, is_active in zip(containers, active):
+            if is_active or container.name not in self._last_activity:
+                self._last_activity[container.name] = now
+            elif now - self._last_activity[container.name] >= self.timeout:
+                idle_containers.append(container)
+
+        if dry_run:
+            return idle_containers
+
+        hibernated_containers = []
+        for container in idle_containers:
+            try:
+                self.hibernate(container)
+            except docker.errors.APIError:
+                continue
+            hibernated_containers.append(container)
+            self._last_activity.pop(container.name, None)
+            self._cpu_usage.pop(container.name, None)
+            self._exec_ids.pop(container.name, None)
+            for callback in self.callbacks:
+                callback(container)
+        return hibernated_containers
+
+    def is_active(self, container, now):
+        """ Determine whether a container has been active since the previous check
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+            now (:obj:`float`): current time (seconds since the epoch)
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the container has been active
+        """
+        active = False
+
+        # execs which were started since the previous check, or which are running
+        exec_ids = set(container.attrs.get('ExecIDs', None) or [])
+        previous_exec_ids = self._exec_ids.get(container.name, None)
+        self._exec_ids[container.name] = exec_ids
+        if previous_exec_ids is not None and exec_ids - previous_exec_ids:
+            active = True
+        else:
+            api = self.mgr._docker_client.api
+            for exec_id in exec_ids:
+                try:
+                    if api.exec_inspect(exec_id)['Running']:
+                        active = True
+                        break
+                except docker.errors.NotFound:
+                    continue
+
+        # CPU utilization since the previous check
+        stats = container.stats(stream=False)
+        cpu_usage = ((stats.get('cpu_stats', None) or {}).get('cpu_usage', None) or {}).get('total_usage', 0)
+        previous = self._cpu_usage.get(container.name, None)
+        self._cpu_usage[container.name] = (now, cpu_usage)
+        if previous and now > previous[0]:
+            cpu_percent = max(cpu_usage - previous[1], 0) / 1e9 / (now - previous[0]) * 100.
+            if cpu_percent > self.cpu_threshold:
+                active = True
+
+        return active
+
+    def hibernate(self, container):
+        """ Hibernate a container
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+        """
+        if self.action == HibernationAction.pause:
+            container.pause()
+        else:
+            container.stop()
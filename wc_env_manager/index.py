@@ -0,0 +1,615 @@
+""" In-memory index of the images, containers, and network members of a WC modeling environment
+
+Without an index, :obj:`wc_env_manager.core.WcEnvManager` queries the Docker daemon each time it
+looks up an image or a container, and its handles to the current images and container
+(e.g., `_image` and `_container`) become stale as soon as they are changed by another process.
+:obj:`ResourceIndex` lists the images of the repositories of the environment, the WC modeling
+containers, and the members of its network once, and then subscribes to the events of the
+Docker daemon and updates itself incrementally (only the resource named by each event is
+re-inspected). Lookups are served from memory, and callbacks are notified of each change
+(:obj:`IndexChange`), e.g., to update the handles of the manager (see
+:obj:`wc_env_manager.core.WcEnvManager.start_index`) or to print the changes as they happen
+(`wc-env-manager container list --watch`).
+
+If the stream of events ends (e.g., because the Docker daemon restarted), the index resubscribes
+and rebuilds itself. Until then, :obj:`ResourceIndex.is_running` is :obj:`False`, and the manager
+queries the Docker daemon instead of the index.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import docker
+import requests
+import threading
+import time
+import wc_env_manager.core
+
+
+class IndexChange(object):
+    """ Change of a resource of the index
+
+    Attributes:
+        kind (:obj:`str`): kind of resource (`image`, `container`, or `network`)
+        action (:obj:`str`): action reported by the Docker daemon (e.g., `start`, `die`, or `tag`)
+        id (:obj:`str`): id of the resource
+        name (:obj:`str`): name of the resource (e.g., the name of the container or a tag of the image)
+        resource (:obj:`docker.models.resource.Model`): updated resource, or :obj:`None` if it was removed
+            from the index
+        time (:obj:`float`): time of the change (seconds since the epoch)
+    """
+
+    def __init__(self, kind, action, id, name, resource, time):
+        """
+        Args:
+            kind (:obj:`str`): kind of resource (`image`, `container`, or `network`)
+            action (:obj:`str`): action reported by the Docker daemon
+            id (:obj:`str`): id of the resource
+            name (:obj:`str`): name of the resource
+            resource (:obj:`docker.models.resource.Model`): updated resource, or :obj:`None` if
+                it was removed from the index
+            time (:obj:`float`): time of the change (seconds since the epoch)
+        """
+        self.kind = kind
+        self.action = action
+        self.id = id
+        self.name = name
+        self.resource = resource
+        self.time = time
+
+    @property
+    def status(self):
+        """ Get the status of the resource after the change
+
+        Returns:
+            :obj:`str`: status of containers (e.g., `running`), `present` for other resources,
+                or `removed` if the resource was removed from the index
+        """
+        if self.resource is None:
+            return 'removed'
+        return getattr(self.resource, 'status', None) or 'present'
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the change
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the change
+        """
+        return {
+            'kind': self.kind,
+            'action': self.action,
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'time': self.time,
+        }
+
+    def format(self):
+        """ Format the change as a line of a table
+
+        Returns:
+            :obj:`str`: formatted change
+        """
+        return '{} {:<9} {:<12} {:<40} {}'.format(
+            time.strftime('%H:%M:%S', time.localtime(self.time)),
+            self.kind, self.action, self.name or self.id, self.status)
+
+
+class ResourceIndex(object):
+    """ Index of the images, containers, and network members of a WC modeling environment, which
+    is updated from the events of the Docker daemon
+
+    Attributes:
+        mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+        callbacks (:obj:`list` of :obj:`callable`): functions which are called with each change (:obj:`IndexChange`)
+        _images (:obj:`dict`): dictionary which maps the id of each image of the repositories of the
+            environment to the image
+        _containers (:obj:`dict`): dictionary which maps the id of each WC modeling container to the container
+        _network_members (:obj:`dict`): dictionary which maps the id of each member of the network
+            (including the other containers of the network, such as databases) to the container
+        _activity (:obj:`dict`): dictionary which maps the id of each container to the time of its last event
+        _lock (:obj:`threading.RLock`): lock for the index
+        _events (:obj:`docker.types.daemon.CancellableStream`): stream of the events of the Docker daemon
+        _subscribed (:obj:`bool`): :obj:`True` if the index is consuming a stream of events
+        _stopped (:obj:`threading.Event`): event which is set when the index is stopped
+        _thread (:obj:`threading.Thread`): thread which consumes the events
+    """
+
+    EVENT_TYPES = ('container', 'image', 'network')
+    REMOVE_CONTAINER_ACTIONS = ('destroy',)
+    ACTIVITY_ONLY_CONTAINER_ACTIONS = ('exec_create', 'exec_start', 'exec_die', 'attach', 'top', 'resize',
+                                       'export', 'copy', 'archive-path', 'extract-to-dir', 'commit')
+    RESUBSCRIBE_INTERVAL = 1.
+    # seconds to wait before resubscribing to the events of the Docker daemon after their stream ends
+
+    def __init__(self, mgr, callbacks=None):
+        """
+        Args:
+            mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+            callbacks (:obj:`list` of :obj:`callable`, optional): functions which are called with each
+                change (:obj:`IndexChange`)
+        """
+        self.mgr = mgr
+        self.callbacks = list(callbacks or [])
+        self._images = {}
+        self._containers = {}
+        self._network_members = {}
+        self._activity = {}
+        self._lock = threading.RLock()
+        self._events = None
+        self._subscribed = False
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def is_running(self):
+        """ Determine whether the index is consuming the events of the Docker daemon, and therefore
+        up to date
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the index is consuming the events of the Docker daemon
+        """
+        return self._subscribed and self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """ Subscribe to the events of the Docker daemon, build the index, and start updating it
+
+        The subscription is opened before the index is built so that no change is missed; events
+        which are reported while the index is built are applied afterwards, which is harmless
+        because each event re-inspects the current state of its resource.
+        """
+        self._stopped.clear()
+        self._subscribe()
+        self._thread = threading.Thread(target=self._consume_events, daemon=True, name='wc_env_manager.index')
+        self._thread.start()
+
+    def stop(self):
+        """ Stop updating the index """
+        self._stopped.set()
+        with self._lock:
+            self._subscribed = False
+            events = self._events
+            self._events = None
+        if events is not None:
+            events.close()
+        if self._thread is not None:
+            self._thread.join(5.)
+            self._thread = None
+
+    def _subscribe(self):
+        """ Subscribe to the events of the Docker daemon and build the index """
+        events = self.mgr._docker_client.events(decode=True, filters={'type': list(self.EVENT_TYPES)})
+        try:
+            self.sync()
+        except Exception:
+            events.close()
+            raise
+        with self._lock:
+            if not self._stopped.is_set():
+                self._events = events
+                self._subscribed = True
+                return
+        events.close()
+
+    def sync(self):
+        """ Build the index from the current state of the Docker daemon """
+        client = self.mgr._docker_client
+
+        images = {}
+        for repo in self.get_repos():
+            for image in client.images.list(name=repo):
+                images[image.id] = image
+
+        containers = {}
+        network_members = {}
+        activity = {}
+        member_ids = self._get_network_member_ids()
+        for container in client.containers.list(all=True):
+            if self.is_env_container(container.name):
+                containers[container.id] = container
+            if container.id in member_ids or self.is_network_container(container.name):
+                network_members[container.id] = container
+            activity[container.id] = self._get_start_time(container)
+
+        with self._lock:
+            self._images = images
+            self._containers = containers
+            self._network_members = network_members
+            self._activity = activity
+
+    def _consume_events(self):
+        """ Apply the events of the Docker daemon until the index is stopped, and resubscribe to the
+        events and rebuild the index whenever their stream ends before the index is stopped
+        """
+        while not self._stopped.is_set():
+            with self._lock:
+                events = self._events
+            if events is not None:
+                try:
+                    for event in events:
+                        try:
+                            self.apply_event(event)
+                        except (docker.errors.APIError, requests.exceptions.RequestException):
+                            pass
+                except Exception:
+                    # the stream is closed by :obj:`stop` or dropped by the Docker daemon
+                    pass
+
+            with self._lock:
+                self._subscribed = False
+                if self._events is events:
+                    self._events = None
+            if events is not None:
+                events.close()
+
+            if self._stopped.wait(self.RESUBSCRIBE_INTERVAL):
+                break
+            try:
+                self._subscribe()
+            except Exception:
+                # e.g., the Docker daemon is still restarting; retry after the interval
+                pass
+
+    def apply_event(self, event):
+        """ Update the index from an event of the Docker daemon
+
+        Args:
+            event (:obj:`dict`): event
+
+        Returns:
+            :obj:`list` of :obj:`IndexChange`: changes of the index
+        """
+        kind = event.get('Type', None)
+        action = (event.get('Action', None) or event.get('status', None) or '').partition(':')[0]
+        actor = event.get('Actor', None) or {}
+        id = actor.get('ID', None) or event.get('id', None)
+        attrs = actor.get('Attributes', None) or {}
+        if event.get('timeNano', None):
+            event_time = event['timeNano'] / 1e9
+        else:
+            event_time = event.get('time', None) or time.time()
+
+        if kind == 'container':
+            changes = self._apply_container_event(action, id, attrs.get('name', None), event_time)
+        elif kind == 'image':
+            changes = self._apply_image_event(action, id, attrs.get('name', None), event_time)
+        elif kind == 'network':
+            changes = self._apply_network_event(action, attrs.get('name', None), attrs.get('container', None),
+                                                event_time)
+        else:
+            changes = []
+
+        for change in changes:
+            for callback in self.callbacks:
+                callback(change)
+        return changes
+
+    def _apply_container_event(self, action, id, name, event_time):
+        """ Update the index from an event of a container
+
+        Args:
+            action (:obj:`str`): action
+            id (:obj:`str`): id of the container
+            name (:obj:`str`): name of the container
+            event_time (:obj:`float`): time of the event
+
+        Returns:
+            :obj:`list` of :obj:`IndexChange`: changes of the index
+        """
+        with self._lock:
+            known = id in self._containers or id in self._network_members
+        if not known and not (name and (self.is_env_container(name) or self.is_network_container(name))):
+            return []
+
+        with self._lock:
+            self._activity[id] = max(self._activity.get(id, 0.), event_time)
+        if action in self.ACTIVITY_ONLY_CONTAINER_ACTIONS:
+            return []
+
+        container = None
+        if action not in self.REMOVE_CONTAINER_ACTIONS:
+            try:
+                container = self.mgr._docker_client.containers.get(id)
+            except docker.errors.NotFound:
+                container = None
+
+        with self._lock:
+            if container is None:
+                self._containers.pop(id, None)
+                self._network_members.pop(id, None)
+                self._activity.pop(id, None)
+            else:
+                name = container.name
+                if self.is_env_container(name):
+                    self._containers[id] = container
+                if id in self._network_members or self.is_network_container(name):
+                    self._network_members[id] = container
+
+        return [IndexChange('container', action, id, name, container, event_time)]
+
+    def _apply_image_event(self, action, id, name, event_time):
+        """ Update the index from an event of an image
+
+        Args:
+            action (:obj:`str`): action
+            id (:obj:`str`): id or reference of the image
+            name (:obj:`str`): reference of the image
+            event_time (:obj:`float`): time of the event
+
+        Returns:
+            :obj:`list` of :obj:`IndexChange`: changes of the index
+        """
+        client = self.mgr._docker_client
+        repos = self.get_repos()
+
+        # images whose tags may have changed: the image of the event and the images of the index
+        # which had the reference of the event (e.g., the previous image of a moved tag)
+        ids = [id]
+        with self._lock:
+            for image in self._images.values():
+                if image.id != id and name and self._normalize_ref(name) in image.tags:
+                    ids.append(image.id)
+
+        changes = []
+        for image_id in ids:
+            try:
+                image = client.images.get(image_id)
+            except (docker.errors.ImageNotFound, docker.errors.NotFound):
+                image = None
+
+            with self._lock:
+                if image is not None and any(tag.rpartition(':')[0] in repos for tag in image.tags):
+                    previous = self._images.get(image.id, None)
+                    self._images[image.id] = image
+                    if previous is None or previous.tags != image.tags:
+                        changes.append(IndexChange('image', action, image.id, ', '.join(image.tags), image,
+                                                   event_time))
+                else:
+                    removed_id = image.id if image is not None else image_id
+                    previous = self._images.pop(removed_id, None)
+                    if previous is not None:
+                        changes.append(IndexChange('image', action, removed_id, ', '.join(previous.tags), None,
+                                                   event_time))
+        return changes
+
+    def _apply_network_event(self, action, network_name, container_id, event_time):
+        """ Update the index from an event of a network
+
+        Args:
+            action (:obj:`str`): action
+            network_name (:obj:`str`): name of the network
+            container_id (:obj:`str`): id of the container which was connected or disconnected
+            event_time (:obj:`float`): time of the event
+
+        Returns:
+            :obj:`list` of :obj:`IndexChange`: changes of the index
+        """
+        if not network_name or network_name != self.mgr.config['network']['name']:
+            return []
+
+        if action == 'connect' and container_id:
+            try:
+                container = self.mgr._docker_client.containers.get(container_id)
+            except docker.errors.NotFound:
+                return []
+            with self._lock:
+                self._network_members[container.id] = container
+            return [IndexChange('network', action, container.id, container.name, container, event_time)]
+
+        elif action == 'disconnect' and container_id:
+            with self._lock:
+                container = self._network_members.get(container_id, None)
+                if container is None or self.is_network_container(container.name):
+                    return []
+                self._network_members.pop(container_id)
+            return [IndexChange('network', action, container_id, container.name, None, event_time)]
+
+        elif action == 'destroy':
+            with self._lock:
+                removed = [container for container in self._network_members.values()
+                           if not self.is_network_container(container.name)]
+                for container in removed:
+                    self._network_members.pop(container.id)
+            return [IndexChange('network', action, container.id, container.name, None, event_time)
+                    for container in removed]
+
+        return []
+
+    def get_repos(self):
+        """ Get the repositories of the images of the environment
+
+        Returns:
+            :obj:`list` of :obj:`str`: repositories
+        """
+        config = self.mgr.config
+        return [config['base_image']['repo_unsquashed'], config['base_image']['repo'], config['image']['repo']]
+
+    def is_env_container(self, name):
+        """ Determine whether a container is a WC modeling container
+
+        Args:
+            name (:obj:`str`): name of the container
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the container is a WC modeling container
+        """
+        return wc_env_manager.core.WcEnvManager.is_container_name(name, self.mgr.config['container']['name_format'])
+
+    def is_network_container(self, name):
+        """ Determine whether a container is one of the other containers of the network (e.g., a database)
+
+        Args:
+            name (:obj:`str`): name of the container
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the container is one of the other containers of the network
+        """
+        return name in self.mgr.config['network']['containers']
+
+    def _get_network_member_ids(self):
+        """ Get the ids of the containers which are connected to the network
+
+        Returns:
+            :obj:`set` of :obj:`str`: ids of the containers
+        """
+        name = self.mgr.config['network']['name']
+        if not name or self.mgr.is_host_network():
+            return set()
+        try:
+            network = self.mgr._docker_client.networks.get(name)
+        except docker.errors.NotFound:
+            return set()
+        return set((network.attrs.get('Containers', None) or {}).keys())
+
+    @staticmethod
+    def _get_start_time(container):
+        """ Get the time when a container was last started, or created if it has never been started
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+
+        Returns:
+            :obj:`float`: time (seconds since the epoch)
+        """
+        import dateutil.parser
+
+        state = container.attrs.get('State', None) or {}
+        for timestamp in [state.get('StartedAt', None), container.attrs.get('Created', None)]:
+            if timestamp and not timestamp.startswith('0001-01-01'):
+                try:
+                    return dateutil.parser.parse(timestamp).timestamp()
+                except (ValueError, OverflowError):
+                    pass
+        return 0.
+
+    @staticmethod
+    def _normalize_ref(ref):
+        """ Add the default tag (`latest`) to a reference which doesn't have a tag
+
+        Args:
+            ref (:obj:`str`): reference (e.g., `karrlab/wc_env` or `karrlab/wc_env:0.0.1`)
+
+        Returns:
+            :obj:`str`: reference with a tag
+        """
+        if ':' not in ref.rpartition('/')[2]:
+            ref += ':latest'
+        return ref
+
+    def get_image(self, ref):
+        """ Get an image of the repositories of the environment
+
+        Args:
+            ref (:obj:`str`): reference of the image (e.g., `karrlab/wc_env:0.0.1`, or `karrlab/wc_env`
+                for its `latest` tag) or id of the image
+
+        Returns:
+            :obj:`docker.models.images.Image`: image, or :obj:`None` if the index doesn't contain the image
+        """
+        normalized_ref = self._normalize_ref(ref)
+        with self._lock:
+            for image in self._images.values():
+                if image.id == ref or normalized_ref in image.tags:
+                    return image
+        return None
+
+    def get_latest_image(self, image_repo):
+        """ Get the latest version (`latest` tag) of an image
+
+        Args:
+            image_repo (:obj:`str`): image repository
+
+        Returns:
+            :obj:`docker.models.images.Image`: image, or :obj:`None` if the repository doesn't have a `latest` tag
+        """
+        return self.get_image(image_repo)
+
+    def get_images(self, image_repo=None):
+        """ Get the images of the repositories of the environment
+
+        Args:
+            image_repo (:obj:`str`, optional): if provided, only get the images of this repository
+
+        Returns:
+            :obj:`list` of :obj:`docker.models.images.Image`: images
+        """
+        with self._lock:
+            images = list(self._images.values())
+        if image_repo:
+            images = [image for image in images if any(tag.rpartition(':')[0] == image_repo for tag in image.tags)]
+        return images
+
+    def get_container(self, name):
+        """ Get a WC modeling container or a member of the network
+
+        Args:
+            name (:obj:`str`): name or id of the container
+
+        Returns:
+            :obj:`docker.models.containers.Container`: container, or :obj:`None` if the index doesn't contain the container
+        """
+        with self._lock:
+            for containers in (self._containers, self._network_members):
+                if name in containers:
+                    return containers[name]
+                for container in containers.values():
+                    if container.name == name:
+                        return container
+        return None
+
+    def get_containers(self, sort_by_activity=False, label=None, group=None):
+        """ Get the WC modeling containers
+
+        Args:
+            sort_by_activity (:obj:`bool`, optional): if :obj:`True`, sort by the time of the last event
+                in descending order (latest first)
+            label (:obj:`str`, optional): if provided, only get containers with this label (`key` or `key=value`)
+            group (:obj:`str`, optional): if provided, only get the replicas of this group
+
+        Returns:
+            :obj:`list` of :obj:`docker.models.containers.Container`: containers
+        """
+        with self._lock:
+            containers = list(self._containers.values())
+            activity = dict(self._activity)
+
+        labels = []
+        if label:
+            labels.append(label)
+        if group:
+            labels.append('{}={}'.format(wc_env_manager.core.WcEnvManager.GROUP_LABEL, group))
+        for label in labels:
+            key, sep, value = label.partition('=')
+            containers = [container for container in containers
+                          if key in container.labels and (not sep or container.labels[key] == value)]
+
+        if sort_by_activity:
+            containers.sort(reverse=True, key=lambda container: activity.get(container.id, 0.))
+        return containers
+
+    def get_latest_container(self):
+        """ Get the WC modeling container with the most recent activity
+
+        Returns:
+            :obj:`docker.models.containers.Container`: container, or :obj:`None` if there are no containers
+        """
+        containers = self.get_containers(sort_by_activity=True)
+        return containers[0] if containers else None
+
+    def get_network_members(self):
+        """ Get the members of the network, including its other containers (e.g., databases)
+
+        Returns:
+            :obj:`list` of :obj:`docker.models.containers.Container`: containers
+        """
+        with self._lock:
+            return list(self._network_members.values())
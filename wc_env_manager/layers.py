@@ -0,0 +1,632 @@
+""" Analysis of the sizes of the layers and files of Docker images
+
+:obj:`analyze_image_archive` streams the archive of an image (:obj:`docker.models.images.Image.save`)
+without extracting it to disk, and determines:
+
+* the number of bytes added by each layer,
+* the largest files of the image, and
+* the files which a layer added and a later layer deleted or overwrote, whose bytes are still pulled
+  with the image although they are not visible in its containers.
+
+:obj:`diff_images` compares the analyses of two versions of an image, and reports which directories
+grew or shrank.
+
+Both the `docker save` format (`<id>/layer.tar`) and the OCI image layout (`blobs/sha256/<digest>`)
+are supported. Because the manifest of an archive may follow its layers, the files of each layer are
+listed as the archive is streamed, and the layers are applied in the order of the manifest after
+the archive has been read.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import collections
+import io
+import itertools
+import json
+import posixpath
+import tarfile
+import wc_env_manager.telemetry
+
+WHITEOUT_PREFIX = '.wh.'
+OPAQUE_WHITEOUT = '.wh..wh..opq'
+MAX_JSON_SIZE = 16 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+
+class LayerSummary(object):
+    """ Summary of a layer of an image
+
+    Attributes:
+        index (:obj:`int`): index of the layer (0 is the bottom layer)
+        id (:obj:`str`): id of the layer (e.g., its path within the archive of the image)
+        size (:obj:`int`): size of the layer (bytes of its uncompressed tar archive)
+        files_size (:obj:`int`): total size of the files which the layer adds or overwrites (bytes)
+        num_files (:obj:`int`): number of files which the layer adds or overwrites
+        num_deletions (:obj:`int`): number of paths which the layer deletes
+        created_by (:obj:`str`): command which created the layer (e.g., `RUN apt-get install ...`)
+    """
+
+    def __init__(self, index, id, size=0, files_size=0, num_files=0, num_deletions=0, created_by=None):
+        """
+        Args:
+            index (:obj:`int`): index of the layer
+            id (:obj:`str`): id of the layer
+            size (:obj:`int`, optional): size of the layer
+            files_size (:obj:`int`, optional): total size of the files which the layer adds or overwrites
+            num_files (:obj:`int`, optional): number of files which the layer adds or overwrites
+            num_deletions (:obj:`int`, optional): number of paths which the layer deletes
+            created_by (:obj:`str`, optional): command which created the layer
+        """
+        self.index = index
+        self.id = id
+        self.size = size
+        self.files_size = files_size
+        self.num_files = num_files
+        self.num_deletions = num_deletions
+        self.created_by = created_by
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the layer
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the layer
+        """
+        return {
+            'index': self.index,
+            'id': self.id,
+            'size': self.size,
+            'files_size': self.files_size,
+            'num_files': self.num_files,
+            'num_deletions': self.num_deletions,
+            'created_by': self.created_by,
+        }
+
+
+class WastedFile(object):
+    """ File which a layer added and a later layer deleted or overwrote
+
+    Attributes:
+        path (:obj:`str`): path
+        size (:obj:`int`): size (bytes)
+        layer (:obj:`int`): index of the layer which added the file
+        removed_by (:obj:`int`): index of the layer which deleted or overwrote the file
+        action (:obj:`str`): `deleted` or `overwritten`
+    """
+
+    def __init__(self, path, size, layer, removed_by, action):
+        """
+        Args:
+            path (:obj:`str`): path
+            size (:obj:`int`): size (bytes)
+            layer (:obj:`int`): index of the layer which added the file
+            removed_by (:obj:`int`): index of the layer which deleted or overwrote the file
+            action (:obj:`str`): `deleted` or `overwritten`
+        """
+        self.path = path
+        self.size = size
+        self.layer = layer
+        self.removed_by = removed_by
+        self.action = action
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the file
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the file
+        """
+        return {
+            'path': self.path,
+            'size': self.size,
+            'layer': self.layer,
+            'removed_by': self.removed_by,
+            'action': self.action,
+        }
+
+
+class ImageAnalysis(object):
+    """ Analysis of the sizes of the layers and files of an image
+
+    Attributes:
+        ref (:obj:`str`): reference to the image (e.g., `karrlab/wc_env:0.0.1`)
+        layers (:obj:`list` of :obj:`LayerSummary`): layers, from the bottom to the top
+        files (:obj:`dict`): dictionary which maps the path of each file of the image to a tuple
+            of its size (bytes) and the index of the layer which added it
+        wasted_files (:obj:`list` of :obj:`WastedFile`): files which a layer added and a later layer
+            deleted or overwrote
+    """
+
+    def __init__(self, ref=None):
+        """
+        Args:
+            ref (:obj:`str`, optional): reference to the image
+        """
+        self.ref = ref
+        self.layers = []
+        self.files = {}
+        self.wasted_files = []
+
+    @property
+    def size(self):
+        """ Get the size of the layers of the image
+
+        Returns:
+            :obj:`int`: size (bytes)
+        """
+        return sum(layer.size for layer in self.layers)
+
+    @property
+    def files_size(self):
+        """ Get the size of the files which are visible in the image
+
+        Returns:
+            :obj:`int`: size (bytes)
+        """
+        return sum(size for size, _ in self.files.values())
+
+    @property
+    def wasted_size(self):
+        """ Get the size of the files which a layer added and a later layer deleted or overwrote
+
+        Returns:
+            :obj:`int`: size (bytes)
+        """
+        return sum(file.size for file in self.wasted_files)
+
+    def get_largest_files(self, num=20):
+        """ Get the largest files of the image
+
+        Args:
+            num (:obj:`int`, optional): number of files
+
+        Returns:
+            :obj:`list` of :obj:`tuple`: path, size, and index of the layer of each file, sorted by decreasing size
+        """
+        return [(path, size, layer) for path, (size, layer) in
+                sorted(self.files.items(), key=lambda item: (-item[1][0], item[0]))[0:num]]
+
+    def get_largest_wasted_files(self, num=20):
+        """ Get the largest files which a layer added and a later layer deleted or overwrote
+
+        Args:
+            num (:obj:`int`, optional): number of files
+
+        Returns:
+            :obj:`list` of :obj:`WastedFile`: files, sorted by decreasing size
+        """
+        return sorted(self.wasted_files, key=lambda file: (-file.size, file.path))[0:num]
+
+    def get_directory_sizes(self, depth=3):
+        """ Get the total size of the files of each directory at a depth of the file system
+        (e.g., `/usr/local/lib` for a depth of 3)
+
+        Files which are shallower than the depth are reported at their own paths.
+
+        Args:
+            depth (:obj:`int`, optional): depth
+
+        Returns:
+            :obj:`dict`: dictionary which maps the paths of the directories to their sizes (bytes)
+        """
+        sizes = collections.Counter()
+        for path, (size, _) in self.files.items():
+            sizes['/' + '/'.join(path.strip('/').split('/')[0:depth])] += size
+        return dict(sizes)
+
+    def to_dict(self, num=20):
+        """ Get a JSON-serializable representation of the analysis
+
+        Args:
+            num (:obj:`int`, optional): number of the largest files and wasted files to include
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the analysis
+        """
+        return {
+            'ref': self.ref,
+            'size': self.size,
+            'files_size': self.files_size,
+            'wasted_size': self.wasted_size,
+            'num_files': len(self.files),
+            'layers': [layer.to_dict() for layer in self.layers],
+            'largest_files': [{'path': path, 'size': size, 'layer': layer}
+                              for path, size, layer in self.get_largest_files(num)],
+            'wasted_files': [file.to_dict() for file in self.get_largest_wasted_files(num)],
+        }
+
+    def format(self, num=20):
+        """ Format the analysis for humans
+
+        Args:
+            num (:obj:`int`, optional): number of the largest files and wasted files to report
+
+        Returns:
+            :obj:`str`: formatted analysis
+        """
+        format_bytes = wc_env_manager.telemetry.format_bytes
+        lines = []
+        lines.append('Image {}: {} in {} layers; {} in {} paths; {} deleted or overwritten by later layers'.format(
+            self.ref, format_bytes(self.size), len(self.layers),
+            format_bytes(self.files_size), len(self.files), format_bytes(self.wasted_size)))
+
+        lines.append('')
+        lines.append('{:>5} {:>10} {:>8}  {}'.format('Layer', 'Size', 'Files', 'Created by'))
+        for layer in self.layers:
+            lines.append('{:>5} {:>10} {:>8}  {}'.format(
+                layer.index, format_bytes(layer.size), layer.num_files, shorten(layer.created_by or layer.id, 100)))
+
+        lines.append('')
+        lines.append('Largest files:')
+        lines.append('{:>10} {:>5}  {}'.format('Size', 'Layer', 'Path'))
+        for path, size, layer in self.get_largest_files(num):
+            lines.append('{:>10} {:>5}  {}'.format(format_bytes(size), layer, path))
+
+        lines.append('')
+        lines.append('Largest files deleted or overwritten by later layers:')
+        lines.append('{:>10} {:>5} {:>7}  {}'.format('Size', 'Layer', 'Removed', 'Path'))
+        for file in self.get_largest_wasted_files(num):
+            lines.append('{:>10} {:>5} {:>7}  {} ({})'.format(
+                format_bytes(file.size), file.layer, file.removed_by, file.path, file.action))
+
+        return '\n'.join(lines)
+
+
+class ImageDiff(object):
+    """ Comparison of the sizes of two versions of an image
+
+    Attributes:
+        old (:obj:`ImageAnalysis`): analysis of the old version
+        new (:obj:`ImageAnalysis`): analysis of the new version
+        depth (:obj:`int`): depth of the directories which are compared
+        changes (:obj:`list` of :obj:`tuple`): path, old size, new size, and change in size of each
+            directory whose size changed, sorted by decreasing growth
+    """
+
+    def __init__(self, old, new, depth=3):
+        """
+        Args:
+            old (:obj:`ImageAnalysis`): analysis of the old version
+            new (:obj:`ImageAnalysis`): analysis of the new version
+            depth (:obj:`int`, optional): depth of the directories which are compared
+        """
+        self.old = old
+        self.new = new
+        self.depth = depth
+
+        old_sizes = old.get_directory_sizes(depth)
+        new_sizes = new.get_directory_sizes(depth)
+        self.changes = []
+        for path in set(old_sizes.keys()) | set(new_sizes.keys()):
+            old_size = old_sizes.get(path, 0)
+            new_size = new_sizes.get(path, 0)
+            if old_size != new_size:
+                self.changes.append((path, old_size, new_size, new_size - old_size))
+        self.changes.sort(key=lambda change: (-change[3], change[0]))
+
+    def to_dict(self, num=20):
+        """ Get a JSON-serializable representation of the comparison
+
+        Args:
+            num (:obj:`int`, optional): number of the directories which grew and shrank the most to include
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the comparison
+        """
+        return {
+            'old': {'ref': self.old.ref, 'size': self.old.size, 'num_layers': len(self.old.layers)},
+            'new': {'ref': self.new.ref, 'size': self.new.size, 'num_layers': len(self.new.layers)},
+            'depth': self.depth,
+            'grew': [{'path': path, 'old_size': old_size, 'new_size': new_size, 'change': change}
+                     for path, old_size, new_size, change in self.changes if change > 0][0:num],
+            'shrank': [{'path': path, 'old_size': old_size, 'new_size': new_size, 'change': change}
+                       for path, old_size, new_size, change in reversed(self.changes) if change < 0][0:num],
+        }
+
+    def format(self, num=20):
+        """ Format the comparison for humans
+
+        Args:
+            num (:obj:`int`, optional): number of the directories which grew and shrank the most to report
+
+        Returns:
+            :obj:`str`: formatted comparison
+        """
+        format_bytes = wc_env_manager.telemetry.format_bytes
+        lines = []
+        lines.append('{} -> {}: {} -> {} ({}{}), {} -> {} layers'.format(
+            self.old.ref, self.new.ref, format_bytes(self.old.size), format_bytes(self.new.size),
+            '+' if self.new.size >= self.old.size else '', format_bytes(self.new.size - self.old.size),
+            len(self.old.layers), len(self.new.layers)))
+
+        for title, changes in [
+                ('Paths which grew:', [change for change in self.changes if change[3] > 0][0:num]),
+                ('Paths which shrank:', [change for change in reversed(self.changes) if change[3] < 0][0:num])]:
+            lines.append('')
+            lines.append(title)
+            lines.append('{:>10} {:>10} {:>11}  {}'.format('Old', 'New', 'Change', 'Path'))
+            for path, old_size, new_size, change in changes:
+                lines.append('{:>10} {:>10} {:>11}  {}'.format(
+                    format_bytes(old_size), format_bytes(new_size),
+                    ('+' if change > 0 else '') + format_bytes(change), path))
+
+        return '\n'.join(lines)
+
+
+class ImageLayerAnalyzer(object):
+    """ Analyze the layers of the images of a WC modeling environment
+
+    Attributes:
+        mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+    """
+
+    def __init__(self, mgr):
+        """
+        Args:
+            mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+        """
+        self.mgr = mgr
+
+    def get_image(self, ref=None):
+        """ Get an image
+
+        Args:
+            ref (:obj:`str`, optional): reference to the image (e.g., `karrlab/wc_env:0.0.1` or `sha256:...`),
+                or a tag of the image of the environment (e.g., `0.0.1`); default: the image of the environment
+
+        Returns:
+            :obj:`tuple`: image (:obj:`docker.models.images.Image`) and its reference (:obj:`str`)
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the image doesn't exist
+        """
+        import docker
+        import wc_env_manager.core
+
+        if ref is None:
+            if self.mgr._image is None:
+                raise wc_env_manager.core.WcEnvManagerError('The image has not been built or pulled')
+            return (self.mgr._image, self.mgr._image.tags[0] if self.mgr._image.tags else self.mgr._image.id)
+
+        if '/' not in ref and ':' not in ref:
+            ref = '{}:{}'.format(self.mgr.config['image']['repo'], ref)
+        try:
+            return (self.mgr._docker_client.images.get(ref), ref)
+        except docker.errors.ImageNotFound:
+            raise wc_env_manager.core.WcEnvManagerError('Image {} does not exist'.format(ref))
+
+    def analyze(self, ref=None):
+        """ Analyze the layers and files of an image
+
+        Args:
+            ref (:obj:`str`, optional): reference to the image (see :obj:`get_image`)
+
+        Returns:
+            :obj:`ImageAnalysis`: analysis
+        """
+        image, ref = self.get_image(ref)
+        return analyze_image_archive(image.save(chunk_size=READ_SIZE), ref=ref)
+
+    def diff(self, old_ref, new_ref, depth=3):
+        """ Compare the sizes of the directories of two versions of an image
+
+        Args:
+            old_ref (:obj:`str`): reference to the old version (see :obj:`get_image`)
+            new_ref (:obj:`str`): reference to the new version (see :obj:`get_image`)
+            depth (:obj:`int`, optional): depth of the directories which are compared
+
+        Returns:
+            :obj:`ImageDiff`: comparison
+        """
+        return ImageDiff(self.analyze(old_ref), self.analyze(new_ref), depth=depth)
+
+
+class ChunkReader(io.RawIOBase):
+    """ Read-only file-like object over an iterator of chunks of bytes (e.g., the stream of
+    :obj:`docker.models.images.Image.save`)
+
+    Attributes:
+        _chunks (:obj:`iterator` of :obj:`bytes`): chunks
+        _buffer (:obj:`bytes`): remainder of the current chunk
+    """
+
+    def __init__(self, chunks):
+        """
+        Args:
+            chunks (:obj:`iterable` of :obj:`bytes`): chunks
+        """
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        """ Read bytes into a buffer
+
+        Args:
+            buffer (:obj:`bytearray`): buffer
+
+        Returns:
+            :obj:`int`: number of bytes read (0 at the end of the stream)
+        """
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        num_bytes = min(len(buffer), len(self._buffer))
+        buffer[0:num_bytes] = self._buffer[0:num_bytes]
+        self._buffer = self._buffer[num_bytes:]
+        return num_bytes
+
+
+def analyze_image_archive(chunks, ref=None):
+    """ Analyze the archive of an image (e.g., :obj:`docker.models.images.Image.save`) as it is streamed
+
+    Args:
+        chunks (:obj:`iterable` of :obj:`bytes`): chunks of the archive
+        ref (:obj:`str`, optional): reference to the image
+
+    Returns:
+        :obj:`ImageAnalysis`: analysis
+
+    Raises:
+        :obj:`ValueError`: if the archive doesn't contain a manifest
+    """
+    layer_entries = {}
+    layer_sizes = {}
+    aliases = {}
+    documents = {}
+
+    archive = tarfile.open(fileobj=io.BufferedReader(ChunkReader(chunks), READ_SIZE), mode='r|')
+    for member in archive:
+        name = posixpath.normpath(member.name)
+        if member.issym() or member.islnk():
+            target = member.linkname if member.islnk() else posixpath.join(posixpath.dirname(name), member.linkname)
+            aliases[name] = posixpath.normpath(target)
+            continue
+        if not member.isfile():
+            continue
+
+        file = archive.extractfile(member)
+        head = file.read(512)
+        if is_tar(head):
+            layer_entries[name] = list_layer(itertools.chain([head], iter(lambda: file.read(READ_SIZE), b'')))
+            layer_sizes[name] = member.size
+        elif head.lstrip()[0:1] in (b'{', b'[') and member.size <= MAX_JSON_SIZE:
+            try:
+                documents[name] = json.loads((head + file.read()).decode())
+            except ValueError:
+                pass
+
+    manifest = documents.get('manifest.json', None)
+    if not manifest:
+        raise ValueError('The archive of the image does not contain a manifest')
+    manifest = manifest[0]
+
+    # get the commands which created the layers from the history of the image
+    config = documents.get(posixpath.normpath(manifest['Config']), {})
+    created_by = [entry.get('created_by', None) for entry in config.get('history', [])
+                  if not entry.get('empty_layer', False)]
+
+    analysis = ImageAnalysis(ref=ref or ', '.join(manifest.get('RepoTags', None) or []) or None)
+    children = collections.defaultdict(set)
+    for index, layer_id in enumerate(manifest['Layers']):
+        layer_id = posixpath.normpath(layer_id)
+        name = layer_id
+        while name in aliases:
+            name = aliases[name]
+        layer = LayerSummary(index, layer_id, size=layer_sizes.get(name, 0),
+                             created_by=created_by[index] if len(created_by) == len(manifest['Layers']) else None)
+        analysis.layers.append(layer)
+        apply_layer(analysis, layer, layer_entries.get(name, []), children)
+
+    return analysis
+
+
+def is_tar(head):
+    """ Determine whether the beginning of a file is the beginning of a tar archive
+
+    Args:
+        head (:obj:`bytes`): first 512 bytes of the file
+
+    Returns:
+        :obj:`bool`: :obj:`True` if the file is a tar archive
+    """
+    return len(head) == 512 and head[257:262] == b'ustar'
+
+
+def list_layer(chunks):
+    """ List the files of the tar archive of a layer
+
+    Args:
+        chunks (:obj:`iterable` of :obj:`bytes`): chunks of the archive
+
+    Returns:
+        :obj:`list` of :obj:`tuple`: path, size, and type (`file`, `dir`, `whiteout`, or `opaque`) of each entry
+    """
+    entries = []
+    with tarfile.open(fileobj=io.BufferedReader(ChunkReader(chunks), READ_SIZE), mode='r|') as layer:
+        for member in layer:
+            path = posixpath.normpath('/' + member.name.lstrip('/'))
+            basename = posixpath.basename(path)
+            if basename == OPAQUE_WHITEOUT:
+                entries.append((posixpath.dirname(path), 0, 'opaque'))
+            elif basename.startswith(WHITEOUT_PREFIX):
+                entries.append((posixpath.join(posixpath.dirname(path), basename[len(WHITEOUT_PREFIX):]), 0, 'whiteout'))
+            elif member.isdir():
+                entries.append((path, 0, 'dir'))
+            else:
+                entries.append((path, member.size if member.isfile() else 0, 'file'))
+    return entries
+
+
+def apply_layer(analysis, layer, entries, children):
+    """ Apply the entries of a layer to the files of an image
+
+    Args:
+        analysis (:obj:`ImageAnalysis`): analysis, whose files and wasted files are updated
+        layer (:obj:`LayerSummary`): layer, whose statistics are updated
+        entries (:obj:`list` of :obj:`tuple`): path, size, and type of each entry of the layer (see :obj:`list_layer`)
+        children (:obj:`dict`): dictionary which maps the path of each directory to the paths of its children
+    """
+    files = analysis.files
+
+    def remove(path, keep_root=False):
+        stack = [path]
+        while stack:
+            path = stack.pop()
+            stack.extend(children.pop(path, ()))
+            if keep_root:
+                keep_root = False
+                continue
+            children[posixpath.dirname(path)].discard(path)
+            entry = files.pop(path, None)
+            if entry is not None and entry[0]:
+                analysis.wasted_files.append(WastedFile(path, entry[0], entry[1], layer.index, 'deleted'))
+
+    # opaque directories and whiteouts hide the files of the lower layers, so they are applied first
+    type_order = {'opaque': 0, 'whiteout': 1, 'dir': 2, 'file': 2}
+    for path, size, type in sorted(entries, key=lambda entry: type_order[entry[2]]):
+        if type == 'opaque':
+            remove(path, keep_root=True)
+            layer.num_deletions += 1
+        elif type == 'whiteout':
+            remove(path)
+            layer.num_deletions += 1
+        else:
+            entry = files.get(path, None)
+            if entry is not None and entry[0]:
+                analysis.wasted_files.append(WastedFile(path, entry[0], entry[1], layer.index, 'overwritten'))
+            if type == 'dir' and entry is not None:
+                continue
+            files[path] = (size, layer.index)
+            if type == 'file':
+                layer.num_files += 1
+                layer.files_size += size
+
+            # index the path in its parent directories
+            while path != '/':
+                parent = posixpath.dirname(path)
+                if path in children[parent]:
+                    break
+                children[parent].add(path)
+                path = parent
+
+
+def shorten(text, max_len):
+    """ Shorten text to a maximum length
+
+    Args:
+        text (:obj:`str`): text
+        max_len (:obj:`int`): maximum length
+
+    Returns:
+        :obj:`str`: shortened text
+    """
+    text = ' '.join(text.split())
+    if len(text) > max_len:
+        return text[0:max_len - 3] + '...'
+    return text
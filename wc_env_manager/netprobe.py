@@ -0,0 +1,259 @@
+""" Measurement of the throughput and latency of the network between WC modeling containers
+
+:obj:`NetworkProbe` starts a server container and a client container on the network of the
+WC modeling environment (`config['network']`), and then measures
+
+* the latency: the round-trip time of 1-byte messages over a TCP connection, and
+* the throughput: the rate at which a large amount of data is transferred over a TCP connection.
+
+This makes it possible to compare network configurations (e.g., bridge vs. host networking,
+or jumbo frames). Both containers run short Python programs, so the probe image
+(`config['network']['probe']['image']`) must provide Python.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import docker
+import json
+import requests
+import uuid
+import wc_env_manager.core
+import wc_env_manager.readiness
+
+SERVER_SCRIPT = '''
+import socket
+import sys
+
+server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+server.bind(('0.0.0.0', int(sys.argv[1])))
+server.listen(1)
+print('listening', flush=True)
+
+while True:
+    conn, _ = server.accept()
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    with conn:
+        mode = conn.recv(1)
+        if mode == b'L':
+            # echo each byte to measure the latency
+            while True:
+                data = conn.recv(1)
+                if not data:
+                    break
+                conn.sendall(data)
+        elif mode == b'T':
+            # count the received bytes to measure the throughput
+            total = 0
+            while True:
+                data = conn.recv(1 << 20)
+                if not data:
+                    break
+                total += len(data)
+            conn.sendall(str(total).encode())
+'''
+# program which serves the measurements; arguments: port
+
+CLIENT_SCRIPT = '''
+import json
+import socket
+import sys
+import time
+
+host, port, size, count = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+
+
+def connect(mode):
+    deadline = time.time() + 30.
+    while True:
+        try:
+            conn = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.time() >= deadline:
+                raise
+            time.sleep(0.1)
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    conn.sendall(mode)
+    return conn
+
+
+conn = connect(b'L')
+round_trip_times = []
+for _ in range(count):
+    start = time.perf_counter()
+    conn.sendall(b'x')
+    conn.recv(1)
+    round_trip_times.append(time.perf_counter() - start)
+conn.close()
+round_trip_times.sort()
+
+conn = connect(b'T')
+chunk = bytes(min(size, 1 << 20))
+start = time.perf_counter()
+sent = 0
+while sent < size:
+    n = min(len(chunk), size - sent)
+    conn.sendall(chunk[0:n])
+    sent += n
+conn.shutdown(socket.SHUT_WR)
+received = b''
+while True:
+    data = conn.recv(64)
+    if not data:
+        break
+    received += data
+duration = time.perf_counter() - start
+conn.close()
+
+print(json.dumps({
+    'latency_median': round_trip_times[len(round_trip_times) // 2],
+    'latency_p99': round_trip_times[min(int(len(round_trip_times) * 0.99), len(round_trip_times) - 1)],
+    'throughput': int(received) / duration,
+    'size': int(received),
+}))
+'''
+# program which measures the latency and throughput; arguments: host, port, size (bytes), count
+
+
+class NetworkProbeResult(object):
+    """ Measurements of the throughput and latency of a network
+
+    Attributes:
+        driver (:obj:`str`): driver of the network
+        latency_median (:obj:`float`): median round-trip time (seconds)
+        latency_p99 (:obj:`float`): 99th percentile of the round-trip time (seconds)
+        throughput (:obj:`float`): throughput (bytes per second)
+        size (:obj:`int`): amount of data transferred to measure the throughput (bytes)
+    """
+
+    def __init__(self, driver, latency_median, latency_p99, throughput, size):
+        """
+        Args:
+            driver (:obj:`str`): driver of the network
+            latency_median (:obj:`float`): median round-trip time (seconds)
+            latency_p99 (:obj:`float`): 99th percentile of the round-trip time (seconds)
+            throughput (:obj:`float`): throughput (bytes per second)
+            size (:obj:`int`): amount of data transferred to measure the throughput (bytes)
+        """
+        self.driver = driver
+        self.latency_median = latency_median
+        self.latency_p99 = latency_p99
+        self.throughput = throughput
+        self.size = size
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the measurements
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the measurements
+        """
+        return {
+            'driver': self.driver,
+            'latency_median': self.latency_median,
+            'latency_p99': self.latency_p99,
+            'throughput': self.throughput,
+            'size': self.size,
+        }
+
+    def format(self):
+        """ Format the measurements for display
+
+        Returns:
+            :obj:`str`: measurements
+        """
+        return '\n'.join([
+            'Driver: {}'.format(self.driver),
+            'Latency (median): {:.1f} us'.format(self.latency_median * 1e6),
+            'Latency (99th percentile): {:.1f} us'.format(self.latency_p99 * 1e6),
+            'Throughput: {:.1f} MB/s'.format(self.throughput / 1e6),
+        ])
+
+
+class NetworkProbe(object):
+    """ Probe which measures the throughput and latency of the network between containers
+
+    Attributes:
+        mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+        image (:obj:`str`): image (with Python) to run the server and client
+        port (:obj:`int`): port of the server
+        size (:obj:`int`): amount of data to transfer to measure the throughput (bytes)
+        count (:obj:`int`): number of round trips to measure the latency
+        timeout (:obj:`float`): maximum duration of the measurements (seconds)
+    """
+
+    def __init__(self, mgr, image=None, port=None, size=None, count=None, timeout=None):
+        """
+        Args:
+            mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+            image (:obj:`str`, optional): image (with Python) to run the server and client;
+                default: `config['network']['probe']['image']`
+            port (:obj:`int`, optional): port of the server; default: `config['network']['probe']['port']`
+            size (:obj:`str` or :obj:`int`, optional): amount of data to transfer to measure the
+                throughput (e.g., `256m`); default: `config['network']['probe']['size']`
+            count (:obj:`int`, optional): number of round trips to measure the latency;
+                default: `config['network']['probe']['count']`
+            timeout (:obj:`float`, optional): maximum duration of the measurements (seconds);
+                default: `config['network']['probe']['timeout']`
+        """
+        config = mgr.config['network']['probe']
+        self.mgr = mgr
+        self.image = image or config['image']
+        self.port = port or config['port']
+        self.size = docker.utils.parse_bytes(size or config['size'])
+        self.count = count or config['count']
+        self.timeout = timeout or config['timeout']
+
+    def run(self):
+        """ Measure the throughput and latency of the network
+
+        Returns:
+            :obj:`NetworkProbeResult`: measurements
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the measurements fail
+        """
+        mgr = self.mgr
+        client = mgr._docker_client
+        suffix = uuid.uuid4().hex[0:8]
+
+        mgr.build_network()
+        mgr.get_or_pull_image(self.image)
+        run_args = mgr.get_network_run_args()
+
+        containers = []
+        try:
+            server = client.containers.run(self.image, name='wc_env_netprobe_server_' + suffix,
+                                           command=['python', '-c', SERVER_SCRIPT, str(self.port)],
+                                           detach=True, **run_args)
+            containers.append(server)
+            wc_env_manager.readiness.ReadinessProbe(log_regex=r'^listening$', timeout=self.timeout) \
+                .wait(server)
+
+            host = '127.0.0.1' if mgr.is_host_network() else server.name
+            probe_client = client.containers.run(self.image, name='wc_env_netprobe_client_' + suffix,
+                                                 command=['python', '-c', CLIENT_SCRIPT, host, str(self.port),
+                                                          str(self.size), str(self.count)],
+                                                 detach=True, **run_args)
+            containers.append(probe_client)
+
+            try:
+                status = probe_client.wait(timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Network probe did not finish within {} s'.format(self.timeout))
+            if status['StatusCode'] != 0:
+                raise wc_env_manager.core.WcEnvManagerError('Network probe failed:\n  {}'.format(
+                    probe_client.logs().decode('utf-8', errors='replace').strip().replace('\n', '\n  ')))
+            result = json.loads(probe_client.logs(stdout=True, stderr=False).decode().strip().split('\n')[-1])
+        finally:
+            for container in containers:
+                try:
+                    container.remove(force=True)
+                except docker.errors.NotFound:  # pragma: no cover
+                    pass
+
+        return NetworkProbeResult(mgr.config['network']['driver'], **result)
@@ -0,0 +1,220 @@
+""" Pipelines of stages which run concurrently as soon as the stages that they depend on complete
+
+:obj:`Pipeline` runs a directed acyclic graph of stages (e.g., the stages of building the images and
+the container of the WC modeling environment; see :obj:`wc_env_manager.core.WcEnvManager.build_all`)
+with a pool of threads, and reports the duration of each stage and the critical path of the
+pipeline, i.e., the chain of dependent stages which determined its total duration.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import collections
+import concurrent.futures
+import time
+
+
+class PipelineStage(object):
+    """ Stage of a pipeline
+
+    Attributes:
+        name (:obj:`str`): name
+        func (:obj:`callable`): function which runs the stage; it is called with the results of
+            the stages that the stage depends on, in the order of :obj:`dependencies`
+        dependencies (:obj:`list` of :obj:`str`): names of the stages that the stage depends on
+        result (:obj:`object`): result of the stage
+        error (:obj:`Exception`): exception raised by the stage
+        start (:obj:`float`): start time, relative to the start of the pipeline (seconds)
+        end (:obj:`float`): end time, relative to the start of the pipeline (seconds)
+    """
+
+    def __init__(self, name, func, dependencies=None):
+        """
+        Args:
+            name (:obj:`str`): name
+            func (:obj:`callable`): function which runs the stage
+            dependencies (:obj:`list` of :obj:`str`, optional): names of the stages that the stage depends on
+        """
+        self.name = name
+        self.func = func
+        self.dependencies = list(dependencies or [])
+        self.result = None
+        self.error = None
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self):
+        """ Get the duration of the stage
+
+        Returns:
+            :obj:`float`: duration (seconds), or :obj:`None` if the stage hasn't run
+        """
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the stage
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the stage
+        """
+        return {
+            'name': self.name,
+            'dependencies': self.dependencies,
+            'start': self.start,
+            'end': self.end,
+            'duration': self.duration,
+            'error': str(self.error) if self.error else None,
+        }
+
+
+class Pipeline(object):
+    """ Directed acyclic graph of stages which runs each stage as soon as the stages that it depends on complete
+
+    Attributes:
+        stages (:obj:`collections.OrderedDict`): dictionary which maps the names of the stages to the stages
+        max_workers (:obj:`int`): maximum number of stages to run concurrently
+        duration (:obj:`float`): duration of the pipeline (seconds)
+    """
+
+    def __init__(self, max_workers=None):
+        """
+        Args:
+            max_workers (:obj:`int`, optional): maximum number of stages to run concurrently; default:
+                the number of stages
+        """
+        self.stages = collections.OrderedDict()
+        self.max_workers = max_workers
+        self.duration = None
+
+    def add_stage(self, name, func, dependencies=None):
+        """ Add a stage to the pipeline
+
+        Args:
+            name (:obj:`str`): name
+            func (:obj:`callable`): function which runs the stage; it is called with the results of
+                the stages that the stage depends on, in the order of :obj:`dependencies`
+            dependencies (:obj:`list` of :obj:`str`, optional): names of the stages that the stage depends on,
+                which must have been added to the pipeline
+
+        Returns:
+            :obj:`PipelineStage`: stage
+
+        Raises:
+            :obj:`ValueError`: if the pipeline already has a stage with the name or a dependency isn't a stage of the pipeline
+        """
+        if name in self.stages:
+            raise ValueError('Pipeline already has stage {}'.format(name))
+        for dependency in dependencies or []:
+            if dependency not in self.stages:
+                raise ValueError('Stage {} depends on {}, which is not a stage of the pipeline'.format(name, dependency))
+        stage = self.stages[name] = PipelineStage(name, func, dependencies)
+        return stage
+
+    def run(self):
+        """ Run the stages of the pipeline
+
+        Each stage is started as soon as the stages that it depends on have completed. If a stage fails,
+        no further stages are started, the running stages are allowed to complete, and the exception of
+        the failed stage is raised.
+
+        Returns:
+            :obj:`dict`: dictionary which maps the names of the stages to their results
+
+        Raises:
+            :obj:`Exception`: the exception raised by the first stage that failed
+        """
+        if not self.stages:
+            self.duration = 0.
+            return {}
+
+        start = time.perf_counter()
+        pending = collections.OrderedDict(self.stages)
+        completed = set()
+        running = {}
+        error = None
+
+        def run_stage(stage):
+            stage.start = time.perf_counter() - start
+            try:
+                stage.result = stage.func(*[self.stages[dependency].result for dependency in stage.dependencies])
+            finally:
+                stage.end = time.perf_counter() - start
+            return stage.result
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers or len(self.stages)) as executor:
+            while True:
+                if error is None:
+                    for name, stage in list(pending.items()):
+                        if all(dependency in completed for dependency in stage.dependencies):
+                            running[executor.submit(run_stage, stage)] = stage
+                            pending.pop(name)
+                if not running:
+                    break
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    exception = future.exception()
+                    if exception is None:
+                        completed.add(stage.name)
+                    else:
+                        stage.error = exception
+                        if error is None:
+                            error = exception
+
+        self.duration = time.perf_counter() - start
+        if error is not None:
+            raise error
+        return {name: stage.result for name, stage in self.stages.items()}
+
+    def get_critical_path(self):
+        """ Get the critical path of the pipeline: the chain of dependent stages, ending with the last
+        stage to complete, in which each stage was started by the completion of the last of its dependencies
+
+        Returns:
+            :obj:`list` of :obj:`PipelineStage`: stages of the critical path, in the order in which they ran
+        """
+        completed = [stage for stage in self.stages.values() if stage.end is not None]
+        if not completed:
+            return []
+
+        path = []
+        stage = max(completed, key=lambda stage: stage.end)
+        while stage is not None:
+            path.append(stage)
+            dependencies = [self.stages[dependency] for dependency in stage.dependencies]
+            stage = max(dependencies, key=lambda stage: stage.end) if dependencies else None
+        path.reverse()
+        return path
+
+    def format_critical_path(self):
+        """ Get a description of the critical path of the pipeline
+
+        Returns:
+            :obj:`str`: description of the critical path
+        """
+        path = self.get_critical_path()
+        return 'Critical path ({:.1f} s): {}'.format(
+            sum(stage.duration for stage in path),
+            ' -> '.join('{} ({:.1f} s)'.format(stage.name, stage.duration) for stage in path))
+
+    def format_stages(self):
+        """ Get a table of the start times and durations of the stages, sorted by their start times
+
+        Returns:
+            :obj:`str`: table
+        """
+        critical_path = set(stage.name for stage in self.get_critical_path())
+        lines = ['{:<32} {:>10} {:>10}  {}'.format('Stage', 'Start (s)', 'Time (s)', 'Critical')]
+        for stage in sorted(self.stages.values(), key=lambda stage: (stage.start is None, stage.start or 0.)):
+            if stage.start is None:
+                lines.append('{:<32} {:>10} {:>10}'.format(stage.name, '-', '-'))
+            else:
+                lines.append('{:<32} {:>10.1f} {:>10.1f}  {}'.format(
+                    stage.name, stage.start, stage.duration, '*' if stage.name in critical_path else '').rstrip())
+        return '\n'.join(lines)
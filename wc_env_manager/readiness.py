@@ -0,0 +1,155 @@
+""" Readiness probes for the containers of the network of a WC modeling environment (e.g., databases)
+
+A sidecar container is ready when all of its configured probes pass
+(`config['network']['containers'][name]['readiness']`):
+
+* healthcheck: the Docker healthcheck of the container reports that it is healthy
+* tcp_port: the container accepts TCP connections on a port
+* log_regex: the log of the container matches a regular expression (e.g., `ready to accept connections`)
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import re
+import socket
+import time
+import wc_env_manager.core
+
+
+class ReadinessProbe(object):
+    """ Probe which determines whether a container is ready
+
+    Attributes:
+        healthcheck (:obj:`bool`): if :obj:`True`, wait until the Docker healthcheck of the container reports that it is healthy
+        tcp_port (:obj:`int`): if provided, wait until the container accepts TCP connections on this port
+        log_regex (:obj:`str`): if provided, wait until the log of the container matches this regular expression
+        timeout (:obj:`float`): maximum time to wait for the container to be ready (seconds)
+        interval (:obj:`float`): interval between attempts of the probe (seconds)
+    """
+
+    def __init__(self, healthcheck=False, tcp_port=None, log_regex=None, timeout=60., interval=0.5):
+        """
+        Args:
+            healthcheck (:obj:`bool`, optional): if :obj:`True`, wait until the Docker healthcheck of the
+                container reports that it is healthy
+            tcp_port (:obj:`int`, optional): if provided, wait until the container accepts TCP connections on this port
+            log_regex (:obj:`str`, optional): if provided, wait until the log of the container matches this
+                regular expression
+            timeout (:obj:`float`, optional): maximum time to wait for the container to be ready (seconds)
+            interval (:obj:`float`, optional): interval between attempts of the probe (seconds)
+        """
+        self.healthcheck = healthcheck
+        self.tcp_port = tcp_port
+        self.log_regex = log_regex
+        self.timeout = timeout
+        self.interval = interval
+
+    @classmethod
+    def from_config(cls, config):
+        """ Create a probe from its configuration
+
+        Args:
+            config (:obj:`dict`): configuration (`config['network']['containers'][name]['readiness']`)
+
+        Returns:
+            :obj:`ReadinessProbe`: probe
+        """
+        return cls(healthcheck=config.get('healthcheck', False),
+                   tcp_port=config.get('tcp_port', None),
+                   log_regex=config.get('log_regex', None),
+                   timeout=config.get('timeout', 60.),
+                   interval=config.get('interval', 0.5))
+
+    def is_ready(self, container, network=None):
+        """ Determine whether a container is ready
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+            network (:obj:`str`, optional): name of the network whose address of the container is
+                used by the TCP probe; default: the first network of the container
+
+        Returns:
+            :obj:`bool`: :obj:`True` if the container is ready
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the container has exited, is unhealthy,
+                or has no healthcheck
+        """
+        container.reload()
+        state = container.attrs.get('State', None) or {}
+        if container.status in ('exited', 'dead'):
+            raise wc_env_manager.core.WcEnvManagerError('Container {} exited with code {}:\n  {}'.format(
+                container.name, state.get('ExitCode', None),
+                container.logs(tail=20).decode('utf-8', errors='replace').replace('\n', '\n  ')))
+        if container.status != 'running':
+            return False
+
+        if self.healthcheck:
+            health = state.get('Health', None)
+            if not health:
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Container {} has no healthcheck'.format(container.name))
+            if health['Status'] == 'unhealthy':
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Container {} is unhealthy'.format(container.name))
+            if health['Status'] != 'healthy':
+                return False
+
+        if self.tcp_port:
+            address = self.get_ip_address(container, network)
+            if not address:
+                return False
+            try:
+                with socket.create_connection((address, self.tcp_port), timeout=self.interval):
+                    pass
+            except OSError:
+                return False
+
+        if self.log_regex:
+            logs = container.logs(stdout=True, stderr=True).decode('utf-8', errors='replace')
+            if not re.search(self.log_regex, logs, re.MULTILINE):
+                return False
+
+        return True
+
+    @staticmethod
+    def get_ip_address(container, network=None):
+        """ Get the IP address of a container
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+            network (:obj:`str`, optional): name of the network; default: the first network of the container
+
+        Returns:
+            :obj:`str`: IP address, or :obj:`None` if the container doesn't have an address yet
+        """
+        if (container.attrs.get('HostConfig', None) or {}).get('NetworkMode', None) == 'host':
+            return '127.0.0.1'
+        networks = (container.attrs.get('NetworkSettings', None) or {}).get('Networks', None) or {}
+        if network in networks:
+            return networks[network].get('IPAddress', None) or None
+        for settings in networks.values():
+            if settings.get('IPAddress', None):
+                return settings['IPAddress']
+        return None
+
+    def wait(self, container, network=None):
+        """ Wait until a container is ready
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+            network (:obj:`str`, optional): name of the network whose address of the container is
+                used by the TCP probe
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the container isn't ready before the timeout
+        """
+        deadline = time.time() + self.timeout
+        while not self.is_ready(container, network=network):
+            if time.time() >= deadline:
+                raise wc_env_manager.core.WcEnvManagerError(
+                    'Container {} was not ready within {} s'.format(container.name, self.timeout))
+            time.sleep(self.interval)
@@ -0,0 +1,395 @@
+""" CPU, memory, and I/O resource controls for WC modeling containers
+
+Containers can be limited to a quota of CPUs, pinned to a set of CPUs, and limited in their
+memory, shared memory, resource limits (ulimits), tmpfs scratch space, and block I/O weight
+(see `config['container']['resources']`).
+
+With the `numa` placement, each container is pinned to a set of CPUs which is disjoint from
+the CPUs of the other running containers, and which is drawn from a single NUMA node when
+possible, and the memory of the container is bound to the same node. Containers are spread
+across the nodes. This prevents concurrent simulations from thrashing each other's caches and
+from accessing memory across NUMA nodes.
+
+Numerical libraries (OpenMP, OpenBLAS, MKL, numexpr, numba) size their thread pools by the
+number of CPUs of the host, rather than by the CPUs allocated to their container. To prevent
+replicas from oversubscribing the host, the thread counts of these libraries are set from
+the CPU allocation of each container (see :obj:`get_thread_env`).
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import docker
+import enum
+import glob
+import math
+import os
+import re
+import wc_env_manager.core
+
+
+class CpuPlacement(enum.Enum):
+    """ Modes for placing containers on CPUs
+
+    * none: don't pin containers to CPUs, unless `cpuset_cpus` is configured
+    * numa: pin each container to a set of CPUs which is disjoint from the CPUs of the
+      other running containers, and which is drawn from a single NUMA node when possible
+    """
+    none = 'none'
+    numa = 'numa'
+
+
+NUMA_NODES_PATH = '/sys/devices/system/node'
+
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'NUMEXPR_MAX_THREADS',
+    'NUMBA_NUM_THREADS',
+)
+# environment variables which control the sizes of the thread pools of numerical libraries
+
+
+def parse_cpu_list(cpu_list):
+    """ Parse a list of CPUs in the Linux list format (e.g., `0-3,8,10-11`)
+
+    Args:
+        cpu_list (:obj:`str`): list of CPUs
+
+    Returns:
+        :obj:`list` of :obj:`int`: sorted ids of the CPUs
+
+    Raises:
+        :obj:`ValueError`: if the list is invalid
+    """
+    cpus = set()
+    for range_str in (cpu_list or '').strip().split(','):
+        range_str = range_str.strip()
+        if not range_str:
+            continue
+        match = re.match(r'^(\d+)(-(\d+))?$', range_str)
+        if not match:
+            raise ValueError('Invalid list of CPUs: {}'.format(cpu_list))
+        start = int(match.group(1))
+        end = int(match.group(3)) if match.group(3) else start
+        if end < start:
+            raise ValueError('Invalid list of CPUs: {}'.format(cpu_list))
+        cpus.update(range(start, end + 1))
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus):
+    """ Format CPUs in the Linux list format (e.g., `0-3,8,10-11`)
+
+    Args:
+        cpus (:obj:`list` of :obj:`int`): ids of CPUs
+
+    Returns:
+        :obj:`str`: list of CPUs
+    """
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(str(start) if start == end else '{}-{}'.format(start, end) for start, end in ranges)
+
+
+def get_numa_nodes(path=NUMA_NODES_PATH):
+    """ Get the CPUs of each NUMA node of the host
+
+    Args:
+        path (:obj:`str`, optional): path to the sysfs directory which describes the NUMA nodes
+
+    Returns:
+        :obj:`list` of :obj:`list` of :obj:`int`: ids of the CPUs of each NUMA node; if the host
+            doesn't describe its NUMA nodes (e.g., it isn't Linux), one node with all of the
+            CPUs available to this process
+    """
+    nodes = [cpus for _, cpus in read_numa_nodes(path)]
+
+    if not nodes:
+        if hasattr(os, 'sched_getaffinity'):
+            nodes = [sorted(os.sched_getaffinity(0))]
+        else:
+            nodes = [list(range(os.cpu_count() or 1))]  # pragma: no cover
+
+    return nodes
+
+
+def get_numa_node_ids(path=NUMA_NODES_PATH):
+    """ Get the ids of the NUMA nodes of the host, in the order of :obj:`get_numa_nodes`
+
+    Args:
+        path (:obj:`str`, optional): path to the sysfs directory which describes the NUMA nodes
+
+    Returns:
+        :obj:`list` of :obj:`int`: ids of the NUMA nodes which have CPUs, or :obj:`None` if the
+            host doesn't describe its NUMA nodes
+    """
+    return [node_id for node_id, _ in read_numa_nodes(path)] or None
+
+
+def read_numa_nodes(path=NUMA_NODES_PATH):
+    """ Read the ids and CPUs of the NUMA nodes of the host which have CPUs
+
+    Args:
+        path (:obj:`str`, optional): path to the sysfs directory which describes the NUMA nodes
+
+    Returns:
+        :obj:`list` of :obj:`tuple`: id and ids of the CPUs of each NUMA node
+    """
+    nodes = []
+    for node_path in sorted(glob.glob(os.path.join(path, 'node[0-9]*')),
+                            key=lambda node_path: int(os.path.basename(node_path)[4:])):
+        try:
+            with open(os.path.join(node_path, 'cpulist'), 'r') as file:
+                cpus = parse_cpu_list(file.read())
+        except (IOError, ValueError):
+            continue
+        if cpus:
+            nodes.append((int(os.path.basename(node_path)[4:]), cpus))
+    return nodes
+
+
+def allocate_cpuset(num_cpus, numa_nodes, used_cpus=None):
+    """ Allocate a set of CPUs which is disjoint from the CPUs which are already in use
+
+    The CPUs are drawn from the NUMA node with the most free CPUs, which spreads containers
+    across the nodes so that they don't compete for the caches and memory bandwidth of one node.
+    If no single node can accommodate the CPUs, the CPUs are drawn from the nodes with the most
+    free CPUs.
+
+    Args:
+        num_cpus (:obj:`int`): number of CPUs
+        numa_nodes (:obj:`list` of :obj:`list` of :obj:`int`): ids of the CPUs of each NUMA node
+        used_cpus (:obj:`set` of :obj:`int`, optional): ids of the CPUs which are already in use
+
+    Returns:
+        :obj:`list` of :obj:`int`: ids of the allocated CPUs
+
+    Raises:
+        :obj:`wc_env_manager.core.WcEnvManagerError`: if there aren't enough free CPUs
+    """
+    used_cpus = set(used_cpus or [])
+    free_cpus_per_node = [[cpu for cpu in node if cpu not in used_cpus] for node in numa_nodes]
+
+    free_cpus = max(free_cpus_per_node, key=len) if free_cpus_per_node else []
+    if len(free_cpus) >= num_cpus:
+        return free_cpus[0:num_cpus]
+
+    cpus = []
+    for free_cpus in sorted(free_cpus_per_node, key=len, reverse=True):
+        cpus.extend(free_cpus[0:num_cpus - len(cpus)])
+        if len(cpus) == num_cpus:
+            return sorted(cpus)
+
+    raise wc_env_manager.core.WcEnvManagerError(
+        'Unable to allocate {} CPUs; only {} of the {} CPUs of the host are free'.format(
+            num_cpus, len(cpus), sum(len(node) for node in numa_nodes)))
+
+
+def parse_ulimit(name, value):
+    """ Parse a resource limit (e.g., `nofile`, `65536` or `1024:65536`)
+
+    Args:
+        name (:obj:`str`): name of the limit
+        value (:obj:`str`): soft limit, or soft and hard limits separated by a colon
+
+    Returns:
+        :obj:`docker.types.Ulimit`: limit
+
+    Raises:
+        :obj:`ValueError`: if the value is invalid
+    """
+    match = re.match(r'^\s*(-?\d+)\s*(:\s*(-?\d+)\s*)?$', str(value))
+    if not match:
+        raise ValueError('Invalid limit for {}: {}'.format(name, value))
+    soft = int(match.group(1))
+    hard = int(match.group(3)) if match.group(3) else soft
+    return docker.types.Ulimit(name=name, soft=soft, hard=hard)
+
+
+def get_container_run_args(config, used_cpus=None, numa_nodes=None, numa_node_ids=None):
+    """ Get the arguments to :obj:`docker.models.containers.ContainerCollection.run` which
+    implement the resource controls of a container
+
+    Args:
+        config (:obj:`dict`): resource controls (`config['container']['resources']`)
+        used_cpus (:obj:`set` of :obj:`int`, optional): ids of the CPUs which are pinned to other
+            containers; only used by the `numa` placement
+        numa_nodes (:obj:`list` of :obj:`list` of :obj:`int`, optional): ids of the CPUs of each
+            NUMA node; default: the NUMA nodes of the host; only used by the `numa` placement
+        numa_node_ids (:obj:`list` of :obj:`int`, optional): ids of the NUMA nodes of `numa_nodes`,
+            which the memory of the container is bound to; default: the ids of the NUMA nodes of
+            the host, or the indices of `numa_nodes` if they are given; only used by the `numa` placement
+
+    Returns:
+        :obj:`dict`: arguments
+
+    Raises:
+        :obj:`wc_env_manager.core.WcEnvManagerError`: if the `numa` placement is configured
+            without a number of CPUs, or there aren't enough free CPUs
+    """
+    args = {}
+
+    if config['cpus']:
+        args['nano_cpus'] = int(config['cpus'] * 1e9)
+
+    placement = CpuPlacement[config['placement']]
+    if config['cpuset_cpus']:
+        args['cpuset_cpus'] = format_cpu_list(parse_cpu_list(config['cpuset_cpus']))
+    elif placement == CpuPlacement.numa:
+        if not config['cpus']:
+            raise wc_env_manager.core.WcEnvManagerError(
+                'The `numa` placement requires a number of CPUs (`resources.cpus`)')
+        if numa_nodes is None:
+            numa_nodes = get_numa_nodes()
+            numa_node_ids = get_numa_node_ids()
+        elif numa_node_ids is None:
+            numa_node_ids = list(range(len(numa_nodes)))
+        cpus = allocate_cpuset(int(math.ceil(config['cpus'])), numa_nodes, used_cpus=used_cpus)
+        args['cpuset_cpus'] = format_cpu_list(cpus)
+
+        # bind the memory of the container to the nodes of its CPUs, unless the host doesn't
+        # describe its NUMA nodes
+        if numa_node_ids:
+            args['cpuset_mems'] = format_cpu_list(
+                node_id for node_id, node_cpus in zip(numa_node_ids, numa_nodes)
+                if not set(cpus).isdisjoint(node_cpus))
+
+    if config['mem_limit']:
+        args['mem_limit'] = config['mem_limit']
+    if config['shm_size']:
+        args['shm_size'] = config['shm_size']
+    if config['blkio_weight']:
+        args['blkio_weight'] = config['blkio_weight']
+    if config['ulimits']:
+        args['ulimits'] = [parse_ulimit(name, value) for name, value in config['ulimits'].items()]
+    if config['tmpfs']:
+        args['tmpfs'] = dict(config['tmpfs'])
+
+    return args
+
+
+def is_numa_placement(config):
+    """ Determine whether containers are pinned to CPUs by the `numa` placement
+
+    Args:
+        config (:obj:`dict`): resource controls (`config['container']['resources']`)
+
+    Returns:
+        :obj:`bool`: :obj:`True` if containers are pinned to CPUs by the `numa` placement
+    """
+    return config['placement'] == CpuPlacement.numa.name and not config['cpuset_cpus']
+
+
+def get_pinned_cpus(containers):
+    """ Get the CPUs which are pinned to containers
+
+    Args:
+        containers (:obj:`list` of :obj:`docker.models.containers.Container`): containers
+
+    Returns:
+        :obj:`set` of :obj:`int`: ids of the CPUs which are pinned to the containers
+    """
+    cpus = set()
+    for container in containers:
+        cpus.update(parse_cpu_list(container.attrs.get('HostConfig', {}).get('CpusetCpus', None) or ''))
+    return cpus
+
+
+def get_allocated_cpus(nano_cpus=None, cpu_quota=None, cpu_period=None, cpuset_cpus=None):
+    """ Get the number of CPUs allocated to a container
+
+    Args:
+        nano_cpus (:obj:`int`, optional): CPU quota in units of 1e-9 CPUs
+        cpu_quota (:obj:`int`, optional): CPU time per period (microseconds)
+        cpu_period (:obj:`int`, optional): length of the period of :obj:`cpu_quota` (microseconds)
+        cpuset_cpus (:obj:`str`, optional): CPUs which the container is pinned to
+
+    Returns:
+        :obj:`int`: number of CPUs allocated to the container (at least 1), or :obj:`None` if the
+            container isn't limited
+    """
+    limits = []
+    if nano_cpus:
+        limits.append(nano_cpus / 1e9)
+    if cpu_quota and cpu_quota > 0:
+        limits.append(cpu_quota / (cpu_period or 100000))
+    if cpuset_cpus:
+        limits.append(len(parse_cpu_list(cpuset_cpus)))
+    if not limits:
+        return None
+    return max(1, int(min(limits)))
+
+
+def get_container_allocated_cpus(container):
+    """ Get the number of CPUs allocated to a container
+
+    Args:
+        container (:obj:`docker.models.containers.Container`): container
+
+    Returns:
+        :obj:`int`: number of CPUs allocated to the container, or :obj:`None` if the container isn't limited
+    """
+    host_config = container.attrs.get('HostConfig', None) or {}
+    return get_allocated_cpus(nano_cpus=host_config.get('NanoCpus', None),
+                              cpu_quota=host_config.get('CpuQuota', None),
+                              cpu_period=host_config.get('CpuPeriod', None),
+                              cpuset_cpus=host_config.get('CpusetCpus', None))
+
+
+def get_thread_env(num_cpus, env=None):
+    """ Get environment variables which limit the thread pools of numerical libraries to the
+    CPUs allocated to a container
+
+    Args:
+        num_cpus (:obj:`int`): number of CPUs allocated to the container, or :obj:`None` if the
+            container isn't limited
+        env (:obj:`dict` or :obj:`list` of :obj:`str`, optional): environment variables which are
+            already defined (dictionary or list of `key=value` strings); these aren't overridden
+
+    Returns:
+        :obj:`dict`: environment variables
+    """
+    if not num_cpus:
+        return {}
+
+    if isinstance(env, dict):
+        defined = set(env.keys())
+    else:
+        defined = set(var.partition('=')[0] for var in env or [])
+
+    return {key: str(num_cpus) for key in THREAD_ENV_VARS if key not in defined}
+
+
+def get_process_env(config, container, env=None):
+    """ Get the environment of a process in a container, including variables which limit the
+    thread pools of numerical libraries (e.g., `OMP_NUM_THREADS`) to the CPUs allocated to the container
+
+    Variables which are defined by the environment of the process or of the container aren't overridden.
+
+    Args:
+        config (:obj:`dict`): resource controls (`config['container']['resources']`)
+        container (:obj:`docker.models.containers.Container`): container
+        env (:obj:`dict`, optional): key/value pairs of environment variables of the process
+
+    Returns:
+        :obj:`dict`: key/value pairs of environment variables of the process
+    """
+    env = dict(env or {})
+    if config['thread_env']:
+        num_cpus = get_container_allocated_cpus(container)
+        if num_cpus:
+            container_env = (container.attrs.get('Config', None) or {}).get('Env', None) or []
+            defined_env = list(env.keys()) + [var.partition('=')[0] for var in container_env]
+            env.update(get_thread_env(num_cpus, defined_env))
+    return env
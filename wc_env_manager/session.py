@@ -0,0 +1,286 @@
+""" Persistent shell sessions in Docker containers
+
+Each call to :obj:`wc_env_manager.core.WcEnvManager.run_process_in_container` creates and
+starts a new Docker exec, which costs tens of milliseconds of API calls and process setup.
+A :obj:`ContainerSession` instead starts a single long-lived shell in the container, attaches
+to its standard input and output over a socket, and runs a sequence of commands in the shell.
+Each command is followed by a marker which reports its exit code, which enables the session
+to return the exit code, output, and duration of each command without a new exec per command::
+
+    with mgr.open_session() as session:
+        for cmd in cmds:
+            result = session.run(cmd)
+
+Because all commands run in the same shell, changes to the working directory and environment
+variables persist from one command to the next. For the same reason, the output of background
+jobs (e.g., `server &`) isn't separated from the output of the commands: whatever a background
+job writes is attributed to the command which is running (or which runs next) when it arrives.
+Background jobs should therefore redirect their output (e.g., `server > server.log 2>&1 &`).
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import docker
+import docker.utils.socket
+import re
+import shlex
+import time
+import uuid
+import wc_env_manager.core
+
+
+ENV_KEY_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+# pattern of the names of the environment variables which can be exported by the shell
+
+
+class ContainerSession(object):
+    """ Persistent shell session in a Docker container
+
+    Attributes:
+        container (:obj:`docker.models.containers.Container`): container
+        container_user (:obj:`wc_env_manager.core.WcEnvUser`): user which runs the shell
+        verbose (:obj:`bool`): if :obj:`True`, print the output of each command
+        _api (:obj:`docker.api.client.APIClient`): low-level client connected to the Docker daemon
+        _exec_id (:obj:`str`): id of the exec which runs the shell
+        _socket (:obj:`socket.SocketIO`): socket attached to the shell
+        _raw_socket (:obj:`socket.socket`): raw socket attached to the shell, which the input of the
+            shell is written to
+        _marker (:obj:`bytes`): marker which delimits the output of each command
+        _closed (:obj:`bool`): if :obj:`True`, the session has been closed
+    """
+
+    def __init__(self, docker_client, container, container_user=None, env=None, work_dir=None,
+                 shell='bash', verbose=False):
+        """
+        Args:
+            docker_client (:obj:`docker.client.DockerClient`): client connected to the Docker daemon
+            container (:obj:`docker.models.containers.Container`): container
+            container_user (:obj:`wc_env_manager.core.WcEnvUser`, optional): user which runs the shell;
+                default: root
+            env (:obj:`dict`, optional): key/value pairs of environment variables for the shell
+            work_dir (:obj:`str`, optional): initial working directory of the shell
+            shell (:obj:`str`, optional): shell
+            verbose (:obj:`bool`, optional): if :obj:`True`, print the output of each command
+        """
+        self.container = container
+        self.container_user = container_user or wc_env_manager.core.WcEnvUser.root
+        self.verbose = verbose
+        self._api = docker_client.api
+        self._marker = '__wc_env_session_{}__'.format(uuid.uuid4().hex).encode('utf-8')
+        self._closed = False
+
+        self._exec_id = self._api.exec_create(container.id, [shell], stdin=True, stdout=True, stderr=True,
+                                              environment=env or {}, workdir=work_dir,
+                                              user=self.container_user.name)['Id']
+        self._socket = self._api.exec_start(self._exec_id, socket=True)
+        self._raw_socket = self._get_raw_socket(self._socket)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def run(self, cmd, work_dir=None, env=None, check=True):
+        """ Run a command in the session
+
+        Args:
+            cmd (:obj:`list` of :obj:`str` or :obj:`str`): command to run; strings are interpreted
+                by the shell of the session
+            work_dir (:obj:`str`, optional): path to working directory for the command; if
+                :obj:`work_dir` or :obj:`env` are provided, the command is run in a subshell so
+                that they don't persist beyond the command
+            env (:obj:`dict`, optional): key/value pairs of environment variables for the command
+            check (:obj:`bool`, optional): if :obj:`True`, raise exception if exit code is not 0
+
+        Returns:
+            :obj:`wc_env_manager.core.ContainerProcessResult`: exit code, output, and duration of the command;
+                the output also includes the output of background jobs which arrives while the command runs
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the session has been closed, the name of
+                an environment variable is invalid, the shell exits, or the command is not executed successfully
+        """
+        if self._closed:
+            raise wc_env_manager.core.WcEnvManagerError('Session has been closed')
+
+        invalid_keys = [key for key in (env or {}) if not ENV_KEY_PATTERN.match(key)]
+        if invalid_keys:
+            raise wc_env_manager.core.WcEnvManagerError('Names of environment variables are invalid: {}'.format(
+                ', '.join(sorted(invalid_keys))))
+
+        if isinstance(cmd, str):
+            script = cmd
+        else:
+            script = ' '.join(shlex.quote(arg) for arg in cmd)
+        if work_dir or env:
+            prefix = []
+            if work_dir:
+                prefix.append('cd {} &&'.format(shlex.quote(work_dir)))
+            for key, val in (env or {}).items():
+                prefix.append('export {}={} &&'.format(key, shlex.quote(val)))
+            script = '( {} {{\n{}\n}} )'.format(' '.join(prefix), script)
+        else:
+            script = '{{\n{}\n}}'.format(script)
+
+        marker = self._marker.decode('utf-8')
+        script = (
+            '{} < /dev/null\n'
+            '__wc_env_session_exit_code=$?\n'
+            'printf "\\n%s %d\\n" "{}" "$__wc_env_session_exit_code"\n'
+            'printf "\\n%s\\n" "{}" >&2\n'
+        ).format(script, marker, marker)
+
+        start_time = time.time()
+        self._send(script.encode('utf-8'))
+        output, exit_code = self._read_until_markers()
+        duration = time.time() - start_time
+
+        if self.verbose and output:
+            print(output)
+
+        if check and exit_code != 0:
+            raise wc_env_manager.core.WcEnvManagerError(
+                ('Command not successfully executed in Docker container:\n'
+                 '  command: {}\n'
+                 '  working directory: {}\n'
+                 '  environment:\n    {}\n'
+                 '  exit code: {}\n'
+                 '  output: {}').format(
+                    cmd, work_dir,
+                    '\n    '.join('{}: {}'.format(key, val) for key, val in (env or {}).items()),
+                    exit_code,
+                    output))
+
+        return wc_env_manager.core.ContainerProcessResult(self.container.name, exit_code, output, duration)
+
+    def run_many(self, cmds, check=True):
+        """ Run a sequence of commands in the session
+
+        Args:
+            cmds (:obj:`list`): commands to run
+            check (:obj:`bool`, optional): if :obj:`True`, raise exception if the exit code of a
+                command is not 0, and don't run the subsequent commands
+
+        Returns:
+            :obj:`list` of :obj:`wc_env_manager.core.ContainerProcessResult`: exit code, output, and
+                duration of each command
+        """
+        return [self.run(cmd, check=check) for cmd in cmds]
+
+    def _send(self, data):
+        """ Send data to the standard input of the shell
+
+        Args:
+            data (:obj:`bytes`): data
+        """
+        self._raw_socket.sendall(data)
+
+    @staticmethod
+    def _get_raw_socket(sock):
+        """ Get the raw socket of the socket which :obj:`docker.api.client.APIClient.exec_start` returns
+
+        With `socket=True`, docker-py returns the buffered reader of the response (:obj:`socket.SocketIO`),
+        which can't be written to; its raw socket is its private `_sock` attribute.
+
+        Args:
+            sock (:obj:`socket.SocketIO` or :obj:`socket.socket`): socket
+
+        Returns:
+            :obj:`socket.socket`: raw socket
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the raw socket can't be found (e.g., because
+                docker-py changed)
+        """
+        raw_sock = getattr(sock, '_sock', sock)
+        if not hasattr(raw_sock, 'sendall'):
+            raise wc_env_manager.core.WcEnvManagerError(
+                'The input of the shell of the session can\'t be written to the socket returned by docker-py {} ({})'.format(
+                    docker.__version__, type(sock).__name__))
+        return raw_sock
+
+    def _read_until_markers(self):
+        """ Read the output of the shell until the end of the current command
+
+        Returns:
+            :obj:`tuple`:
+
+                * :obj:`str`: output of the command
+                * :obj:`int`: exit code of the command
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the shell exits
+        """
+        stdout_pattern = re.compile(b'\n' + re.escape(self._marker) + b' (-?\\d+)\n$')
+        stderr_trailer = b'\n' + self._marker + b'\n'
+        max_trailer_len = len(self._marker) + 16
+        stdout_end = b''
+        stderr_end = b''
+        stdout_trailer_len = None
+        exit_code = None
+        frames = []
+
+        while exit_code is None or not stderr_end.endswith(stderr_trailer):
+            stream, size = docker.utils.socket.next_frame_header(self._socket)
+            if size < 0:
+                self._closed = True
+                output = b''.join(data for _, data in frames)
+                raise wc_env_manager.core.WcEnvManagerError('Shell of session exited:\n  {}'.format(
+                    output.decode('utf-8', errors='replace').replace('\n', '\n  ')))
+            if size == 0:
+                continue
+            data = docker.utils.socket.read_exactly(self._socket, size)
+            frames.append((stream, data))
+
+            # check for the markers which signal the end of the command
+            if stream == docker.utils.socket.STDOUT:
+                stdout_end = (stdout_end + data)[-max_trailer_len:]
+                match = stdout_pattern.search(stdout_end)
+                if match:
+                    exit_code = int(match.group(1))
+                    stdout_trailer_len = len(match.group(0))
+            elif stream == docker.utils.socket.STDERR:
+                stderr_end = (stderr_end + data)[-max_trailer_len:]
+
+        # remove the markers (and the newlines which precede them) from the ends of stdout and stderr
+        self._trim_frames(frames, docker.utils.socket.STDOUT, stdout_trailer_len)
+        self._trim_frames(frames, docker.utils.socket.STDERR, len(stderr_trailer))
+
+        output = b''.join(data for _, data in frames).decode('utf-8', errors='replace')
+        if output.endswith('\n'):
+            output = output[0:-1]
+        return output, exit_code
+
+    @staticmethod
+    def _trim_frames(frames, stream, num_bytes):
+        """ Remove bytes from the end of a stream
+
+        Args:
+            frames (:obj:`list` of :obj:`tuple`): list of pairs of streams and frames of data
+            stream (:obj:`int`): stream
+            num_bytes (:obj:`int`): number of bytes to remove from the end of the stream
+        """
+        for i_frame in range(len(frames) - 1, -1, -1):
+            if num_bytes <= 0:
+                break
+            frame_stream, data = frames[i_frame]
+            if frame_stream != stream:
+                continue
+            num_frame_bytes = min(num_bytes, len(data))
+            frames[i_frame] = (frame_stream, data[0:len(data) - num_frame_bytes])
+            num_bytes -= num_frame_bytes
+
+    def close(self):
+        """ Exit the shell and close the session """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._send(b'exit\n')
+        except OSError:  # pragma: no cover
+            pass  # pragma: no cover
+        self._socket.close()
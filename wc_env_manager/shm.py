@@ -0,0 +1,300 @@
+""" Named shared-memory buffers for exchanging data between processes and containers
+
+Replicas which share an IPC namespace (see :obj:`wc_env_manager.core.WcEnvManager.build_containers`)
+also share `/dev/shm`. This module publishes named buffers (e.g., NumPy arrays) in `/dev/shm`,
+and attaches them in other processes or replicas as memory-mapped views, so that co-located
+simulations can share state without copying it. The module only depends on the standard
+library (and NumPy to publish and attach arrays), so that it can be used inside containers.
+
+Each buffer is a file which consists of a header, which describes the type and shape of its
+data, followed by the data, which is aligned to :obj:`ALIGNMENT` bytes. Buffers are created
+under temporary names and renamed when they are published, so that other processes never
+attach to partially written buffers. The buffers are files in `/dev/shm` rather than blocks of
+:obj:`multiprocessing.shared_memory` because that module requires Python 3.8, whereas the package
+supports Python 3.7 (see `setup.py`)::
+
+    # in one replica
+    buffer = wc_env_manager.shm.create('state', shape=(1000, 1000), dtype='float64')
+    array = buffer.as_array()
+    array[:] = ...
+    buffer.publish()
+
+    # in another replica
+    with wc_env_manager.shm.attach('state') as buffer:
+        array = buffer.as_array()
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import uuid
+
+SHM_DIR = '/dev/shm'
+# directory of the shared memory of the IPC namespace
+
+PREFIX = 'wc_env.'
+# prefix of the names of the files of the buffers
+
+MAGIC = b'WCENVSHM'
+# signature of the files of the buffers
+
+ALIGNMENT = 64
+# alignment of the data of the buffers (bytes)
+
+NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.\-]+$')
+
+
+class SharedBuffer(object):
+    """ Named buffer of shared memory
+
+    Attributes:
+        name (:obj:`str`): name
+        filename (:obj:`str`): path to the file of the buffer
+        dtype (:obj:`str`): NumPy type of the data (e.g., `<f8`), or :obj:`None` for raw bytes
+        shape (:obj:`tuple` of :obj:`int`): shape of the data
+        nbytes (:obj:`int`): size of the data (bytes)
+        published (:obj:`bool`): if :obj:`True`, the buffer has been published
+        _mmap (:obj:`mmap.mmap`): memory map of the file
+        _offset (:obj:`int`): offset of the data in the file (bytes)
+    """
+
+    def __init__(self, name, filename, dtype, shape, nbytes, file_mmap, offset, published):
+        """
+        Args:
+            name (:obj:`str`): name
+            filename (:obj:`str`): path to the file of the buffer
+            dtype (:obj:`str`): NumPy type of the data, or :obj:`None` for raw bytes
+            shape (:obj:`tuple` of :obj:`int`): shape of the data
+            nbytes (:obj:`int`): size of the data (bytes)
+            file_mmap (:obj:`mmap.mmap`): memory map of the file
+            offset (:obj:`int`): offset of the data in the file (bytes)
+            published (:obj:`bool`): if :obj:`True`, the buffer has been published
+        """
+        self.name = name
+        self.filename = filename
+        self.dtype = dtype
+        self.shape = shape
+        self.nbytes = nbytes
+        self.published = published
+        self._mmap = file_mmap
+        self._offset = offset
+
+    @property
+    def buffer(self):
+        """ Get a view of the data
+
+        Returns:
+            :obj:`memoryview`: view of the data
+        """
+        return memoryview(self._mmap)[self._offset:self._offset + self.nbytes]
+
+    def as_array(self):
+        """ Get a NumPy array which is a view of the data
+
+        Returns:
+            :obj:`numpy.ndarray`: view of the data
+        """
+        import numpy
+        return numpy.ndarray(self.shape, dtype=self.dtype or 'u1', buffer=self._mmap, offset=self._offset)
+
+    def publish(self):
+        """ Publish the buffer, so that other processes can attach to it
+
+        Raises:
+            :obj:`FileExistsError`: if another buffer with the same name has been published
+        """
+        if self.published:
+            return
+        final_filename = get_filename(self.name, os.path.dirname(self.filename))
+        os.link(self.filename, final_filename)
+        os.remove(self.filename)
+        self.filename = final_filename
+        self.published = True
+
+    def close(self):
+        """ Unmap the buffer; unpublished buffers are also removed
+
+        Views of the data (e.g., arrays) must be released before the buffer is closed.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if not self.published and os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+def get_filename(name, path=SHM_DIR):
+    """ Get the path to the file of a buffer
+
+    Args:
+        name (:obj:`str`): name of the buffer
+        path (:obj:`str`, optional): directory of the shared memory
+
+    Returns:
+        :obj:`str`: path to the file of the buffer
+
+    Raises:
+        :obj:`ValueError`: if the name is invalid
+    """
+    if not NAME_PATTERN.match(name):
+        raise ValueError('Invalid name of shared buffer: {}'.format(name))
+    return os.path.join(path, PREFIX + name)
+
+
+def _get_data_offset(header):
+    """ Get the offset of the data of a buffer
+
+    Args:
+        header (:obj:`bytes`): encoded header
+
+    Returns:
+        :obj:`int`: offset (bytes)
+    """
+    size = len(MAGIC) + 8 + len(header)
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def create(name, shape, dtype=None, path=SHM_DIR):
+    """ Create a buffer, which can be filled and then published
+
+    Args:
+        name (:obj:`str`): name of the buffer
+        shape (:obj:`int` or :obj:`tuple` of :obj:`int`): shape of the data (number of bytes for raw bytes)
+        dtype (:obj:`str`, optional): NumPy type of the data (e.g., `float64`); default: raw bytes
+        path (:obj:`str`, optional): directory of the shared memory
+
+    Returns:
+        :obj:`SharedBuffer`: buffer
+    """
+    get_filename(name, path)
+
+    if isinstance(shape, int):
+        shape = (shape,)
+    shape = tuple(int(dim) for dim in shape)
+    num_items = 1
+    for dim in shape:
+        num_items *= dim
+    if dtype is None:
+        nbytes = num_items
+    else:
+        import numpy
+        dtype = numpy.dtype(dtype).str
+        nbytes = num_items * numpy.dtype(dtype).itemsize
+
+    header = json.dumps({'name': name, 'dtype': dtype, 'shape': shape, 'nbytes': nbytes}).encode()
+    offset = _get_data_offset(header)
+
+    filename = os.path.join(path, '.{}{}.{}'.format(PREFIX, name, uuid.uuid4().hex))
+    fd = os.open(filename, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o666)
+    try:
+        os.ftruncate(fd, max(offset + nbytes, 1))
+        file_mmap = mmap.mmap(fd, max(offset + nbytes, 1))
+    except Exception:
+        os.close(fd)
+        os.remove(filename)
+        raise
+    os.close(fd)
+
+    file_mmap[0:len(MAGIC)] = MAGIC
+    file_mmap[len(MAGIC):len(MAGIC) + 8] = struct.pack('<Q', len(header))
+    file_mmap[len(MAGIC) + 8:len(MAGIC) + 8 + len(header)] = header
+
+    return SharedBuffer(name, filename, dtype, shape, nbytes, file_mmap, offset, False)
+
+
+def publish(name, data, path=SHM_DIR):
+    """ Publish data (e.g., a NumPy array or bytes) in a buffer
+
+    Args:
+        name (:obj:`str`): name of the buffer
+        data (:obj:`numpy.ndarray` or :obj:`bytes`): data
+        path (:obj:`str`, optional): directory of the shared memory
+
+    Returns:
+        :obj:`SharedBuffer`: published buffer
+
+    Raises:
+        :obj:`FileExistsError`: if another buffer with the same name has been published
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = memoryview(data).cast('B')
+        buffer = create(name, len(data), path=path)
+        buffer.buffer[:] = data
+    else:
+        buffer = create(name, data.shape, dtype=data.dtype, path=path)
+        buffer.as_array()[...] = data
+
+    try:
+        buffer.publish()
+    except Exception:
+        buffer.close()
+        raise
+    return buffer
+
+
+def attach(name, path=SHM_DIR, writable=False):
+    """ Attach to a published buffer
+
+    Args:
+        name (:obj:`str`): name of the buffer
+        path (:obj:`str`, optional): directory of the shared memory
+        writable (:obj:`bool`, optional): if :obj:`True`, map the buffer writable
+
+    Returns:
+        :obj:`SharedBuffer`: buffer
+
+    Raises:
+        :obj:`FileNotFoundError`: if the buffer hasn't been published
+        :obj:`ValueError`: if the file isn't a buffer
+    """
+    filename = get_filename(name, path)
+    with open(filename, 'r+b' if writable else 'rb') as file:
+        file_mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+    if file_mmap[0:len(MAGIC)] != MAGIC:
+        file_mmap.close()
+        raise ValueError('{} is not a shared buffer'.format(filename))
+    header_len, = struct.unpack('<Q', file_mmap[len(MAGIC):len(MAGIC) + 8])
+    header = file_mmap[len(MAGIC) + 8:len(MAGIC) + 8 + header_len]
+    attrs = json.loads(header.decode())
+
+    return SharedBuffer(name, filename, attrs['dtype'], tuple(attrs['shape']), attrs['nbytes'],
+                        file_mmap, _get_data_offset(header), True)
+
+
+def unlink(name, path=SHM_DIR):
+    """ Remove a published buffer; processes which are attached to it can continue to use it
+
+    Args:
+        name (:obj:`str`): name of the buffer
+        path (:obj:`str`, optional): directory of the shared memory
+    """
+    filename = get_filename(name, path)
+    if os.path.isfile(filename):
+        os.remove(filename)
+
+
+def list_buffers(path=SHM_DIR):
+    """ Get the names of the published buffers
+
+    Args:
+        path (:obj:`str`, optional): directory of the shared memory
+
+    Returns:
+        :obj:`list` of :obj:`str`: names of the buffers
+    """
+    return sorted(filename[len(PREFIX):] for filename in os.listdir(path)
+                  if filename.startswith(PREFIX))
@@ -0,0 +1,382 @@
+""" Slimming of the base image
+
+The base image compiles several dependencies (e.g., Python, SUNDIALS, SoPlex, Open Babel, CBC,
+and qpOASES) from source. Their installations contain debug symbols, headers, and static archives
+which the WC modeling tools don't need at runtime, and the installations of the Python packages
+leave behind the caches of pip and apt. :obj:`ImageSlimmer` removes these files from the unsquashed
+base image before it is squashed, so that the squashed image doesn't contain them:
+
+* `strip_debug_symbols`: strip the debug symbols from the shared libraries and executables
+* `remove_static_libraries`: remove static archives (`*.a`)
+* `remove_headers`: remove C/C++ headers, except those of Python, which are needed to build
+  Python packages with extensions in the *wc_env* image
+* `remove_caches`: remove the caches of pip and apt
+* `compile_bytecode`: replace the `__pycache__` directories of the standard library and the
+  site packages with bytecode compiled at a single optimization level with unchecked hash-based
+  invalidation, so that all modules are precompiled, the bytecode doesn't depend on the
+  timestamps of the sources, and imports don't read and hash the sources (which don't change
+  within the image) to validate the bytecode
+
+The slimming reports the number of bytes saved by each step, and then imports the Python modules
+of the compiled dependencies in the slimmed image to check that the slimming didn't break them.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import json
+import shlex
+import time
+import wc_env_manager.core
+import wc_env_manager.telemetry
+
+REPORT_PREFIX = 'WC_ENV_MANAGER_SLIM'
+
+SMOKE_TEST_MODULES = {
+    'cbc_install': 'cylp',
+    'minos_install': 'qminospy',
+    'openbabel_install': 'openbabel',
+    'qpoases_install': 'qpoases',
+    'soplex_install': 'soplex',
+    'sundials_install': 'scikits.odes',
+}
+# Python modules of the compiled dependencies of the base image, by the build argument which installs them
+
+SMOKE_TEST_SCRIPT = '\n'.join([
+    'import importlib, sys',
+    'failed = False',
+    'for name in sys.argv[1:]:',
+    '    try:',
+    '        importlib.import_module(name)',
+    '    except Exception as exception:',
+    '        failed = True',
+    '        print("{}: {}: {}".format(name, exception.__class__.__name__, exception), file=sys.stderr)',
+    'sys.exit(1 if failed else 0)',
+])
+
+
+class SlimmingStep(object):
+    """ Result of a step of the slimming of an image
+
+    Attributes:
+        name (:obj:`str`): name of the step (e.g., `strip_debug_symbols`)
+        size_before (:obj:`int`): size of the paths affected by the step before the step (bytes)
+        size_after (:obj:`int`): size of the paths affected by the step after the step (bytes)
+    """
+
+    def __init__(self, name, size_before, size_after):
+        """
+        Args:
+            name (:obj:`str`): name of the step
+            size_before (:obj:`int`): size of the paths affected by the step before the step (bytes)
+            size_after (:obj:`int`): size of the paths affected by the step after the step (bytes)
+        """
+        self.name = name
+        self.size_before = size_before
+        self.size_after = size_after
+
+    @property
+    def saved(self):
+        """ Get the number of bytes saved by the step
+
+        Returns:
+            :obj:`int`: number of bytes saved (negative if the step added bytes)
+        """
+        return self.size_before - self.size_after
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the step
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the step
+        """
+        return {
+            'name': self.name,
+            'size_before': self.size_before,
+            'size_after': self.size_after,
+            'saved': self.saved,
+        }
+
+
+class SlimmingReport(object):
+    """ Report of the slimming of an image
+
+    Attributes:
+        image_id (:obj:`str`): id of the slimmed image
+        steps (:obj:`list` of :obj:`SlimmingStep`): results of the steps
+        smoke_test_modules (:obj:`list` of :obj:`str`): Python modules imported by the smoke test
+        duration (:obj:`float`): duration of the slimming and the smoke test (seconds)
+    """
+
+    def __init__(self, image_id=None, steps=None, smoke_test_modules=None, duration=None):
+        """
+        Args:
+            image_id (:obj:`str`, optional): id of the slimmed image
+            steps (:obj:`list` of :obj:`SlimmingStep`, optional): results of the steps
+            smoke_test_modules (:obj:`list` of :obj:`str`, optional): Python modules imported by the smoke test
+            duration (:obj:`float`, optional): duration of the slimming and the smoke test (seconds)
+        """
+        self.image_id = image_id
+        self.steps = steps or []
+        self.smoke_test_modules = smoke_test_modules or []
+        self.duration = duration
+
+    @property
+    def saved(self):
+        """ Get the number of bytes saved by the slimming
+
+        Returns:
+            :obj:`int`: number of bytes saved
+        """
+        return sum(step.saved for step in self.steps)
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the report
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the report
+        """
+        return {
+            'image_id': self.image_id,
+            'steps': [step.to_dict() for step in self.steps],
+            'saved': self.saved,
+            'smoke_test_modules': self.smoke_test_modules,
+            'duration': self.duration,
+        }
+
+    def format(self):
+        """ Format the report for humans
+
+        Returns:
+            :obj:`str`: formatted report
+        """
+        format_bytes = wc_env_manager.telemetry.format_bytes
+        lines = ['Slimming saved {}{}'.format(
+            format_bytes(self.saved), ' in {:.1f} s'.format(self.duration) if self.duration is not None else '')]
+        for step in self.steps:
+            lines.append('  {:<24} {:>10} -> {:>10} ({}{})'.format(
+                step.name, format_bytes(step.size_before), format_bytes(step.size_after),
+                '-' if step.saved >= 0 else '+', format_bytes(abs(step.saved))))
+        if self.smoke_test_modules:
+            lines.append('Smoke test imported {}'.format(', '.join(self.smoke_test_modules)))
+        return '\n'.join(lines)
+
+
+class ImageSlimmer(object):
+    """ Remove the files which aren't needed at runtime from an image
+
+    Attributes:
+        mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+        config (:obj:`dict`): configuration of the slimming (`config['base_image']['slim']`)
+    """
+
+    def __init__(self, mgr, config=None):
+        """
+        Args:
+            mgr (:obj:`wc_env_manager.core.WcEnvManager`): manager
+            config (:obj:`dict`, optional): configuration of the slimming; default: `config['base_image']['slim']`
+        """
+        self.mgr = mgr
+        self.config = mgr.config['base_image']['slim'] if config is None else config
+
+    def get_script(self):
+        """ Get the shell script which slims the image
+
+        The script prints the sizes of the paths affected by each step before and after the step
+        (lines which begin with :obj:`REPORT_PREFIX`).
+
+        Returns:
+            :obj:`str`: script
+        """
+        config = self.config
+        paths = ' '.join(config['paths'])
+        header_paths = ' '.join(config['header_paths'])
+        cache_paths = ' '.join(config['cache_paths'])
+        python = shlex.quote(config['python'])
+
+        lines = [
+            'set -o pipefail',
+            # the paths are shell patterns; patterns which don't match any path are ignored
+            'size() { { du -scb "$@" 2>/dev/null || true; } | tail -n 1 | cut -f 1; }',
+            'report() {{ echo "{} $1 $2 $3"; }}'.format(REPORT_PREFIX),
+        ]
+
+        if config['strip_debug_symbols']:
+            lines += [
+                'before=$(size {})'.format(paths),
+                'if ! command -v strip > /dev/null; then',
+                '    apt-get update -y && apt-get install -y --no-install-recommends binutils && installed_binutils=1',
+                'fi',
+                # the libraries which wheels vendor (`*.libs`) are patched with patchelf, which strip can corrupt
+                "find {} -type f \\( -name '*.so' -o -name '*.so.*' -o -perm -u+x \\) -not -path '*.libs/*' -print0 2>/dev/null"
+                " | xargs -0 -r strip --strip-debug 2>/dev/null".format(paths),
+                'if [ -n "$installed_binutils" ]; then',
+                '    apt-get remove -y binutils && apt-get autoremove -y && rm -rf /var/lib/apt/lists/*',
+                'fi',
+                'report strip_debug_symbols $before $(size {})'.format(paths),
+            ]
+
+        if config['remove_static_libraries']:
+            lines += [
+                'before=$(size {})'.format(paths),
+                "find {} -type f -name '*.a' -delete 2>/dev/null".format(paths),
+                'report remove_static_libraries $before $(size {})'.format(paths),
+            ]
+
+        if config['remove_headers']:
+            keep_headers = '|'.join(config['keep_headers'])
+            lines += [
+                'before=$(size {})'.format(header_paths),
+                'for dir in {}; do'.format(header_paths),
+                '    [ -d "$dir" ] || continue',
+                '    for entry in "$dir"/*; do',
+                '        case "${entry##*/}" in',
+            ]
+            if keep_headers:
+                lines.append('            {}) ;;'.format(keep_headers))
+            lines += [
+                '            *) rm -rf "$entry" ;;',
+                '        esac',
+                '    done',
+                'done',
+                'report remove_headers $before $(size {})'.format(header_paths),
+            ]
+
+        if config['remove_caches']:
+            lines += [
+                'before=$(size {})'.format(cache_paths),
+                'rm -rf {}'.format(cache_paths),
+                'report remove_caches $before $(size {})'.format(cache_paths),
+            ]
+
+        if config['compile_bytecode']:
+            lines += [
+                # the standard library and the site packages, excluding directories nested in other directories
+                'dirs=$({} -c \'import sysconfig; paths = sorted(set(sysconfig.get_paths()[key] for key in ("stdlib", "purelib", "platlib")));'
+                ' print(" ".join(path for path in paths if not any(path.startswith(other + "/") for other in paths)))\')'.format(python),
+                'if [ -n "$dirs" ]; then',
+                '    before=$(size $dirs)',
+                '    find $dirs -type d -name __pycache__ -prune -exec rm -rf {} +',
+                # sources which aren't valid for the version of Python (e.g., test data) can't be compiled
+                '    {} -m compileall -q -j 0 --invalidation-mode unchecked-hash $dirs > /dev/null 2>&1'.format(python),
+                '    report compile_bytecode $before $(size $dirs)',
+                'fi',
+            ]
+
+        return '\n'.join(lines) + '\n'
+
+    def get_smoke_test_modules(self):
+        """ Get the Python modules which the smoke test imports: the modules of the compiled
+        dependencies which the build arguments install, and `config['base_image']['slim']['smoke_test_modules']`
+
+        Returns:
+            :obj:`list` of :obj:`str`: Python modules
+        """
+        build_args = self.mgr.config['base_image']['build_args']
+        modules = [module for arg, module in sorted(SMOKE_TEST_MODULES.items()) if build_args.get(arg, None)]
+        for module in self.config['smoke_test_modules'] or []:
+            if module not in modules:
+                modules.append(module)
+        return modules
+
+    def slim(self, image, image_repo, image_tags):
+        """ Slim an image, tag the slimmed image, and import the Python modules of its compiled
+        dependencies in the slimmed image
+
+        Args:
+            image (:obj:`docker.models.images.Image`): image
+            image_repo (:obj:`str`): repository of the slimmed image
+            image_tags (:obj:`list` of :obj:`str`): tags of the slimmed image
+
+        Returns:
+            :obj:`tuple`: slimmed image (:obj:`docker.models.images.Image`) and report (:obj:`SlimmingReport`)
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if the slimming or the smoke test fails
+        """
+        start = time.time()
+        verbose = self.mgr.config['verbose']
+        if verbose:
+            print('Slimming image {} ...'.format(image.id), flush=True)
+
+        # run the script in a container of the image, and commit the container as the slimmed image
+        container = self.mgr._docker_client.containers.run(
+            image.id, command=['bash', '-c', self.get_script()], user='root', detach=True)
+        try:
+            status = container.wait()
+            output = container.logs(stdout=True, stderr=True).decode(errors='replace')
+            if status['StatusCode'] != 0:
+                raise wc_env_manager.core.WcEnvManagerError('Slimming of image {} failed:\n  {}'.format(
+                    image.id, output.strip().replace('\n', '\n  ')))
+
+            # the command of the container replaces the command of the image, unless it is restored
+            cmd = image.attrs['Config'].get('Cmd', None)
+            slimmed_image = container.commit(repository=image_repo, tag=image_tags[0],
+                                             changes=['CMD {}'.format(json.dumps(cmd or []))])
+        finally:
+            container.remove(force=True)
+
+        for tag in image_tags[1:]:
+            assert(slimmed_image.tag(image_repo, tag=tag))
+        slimmed_image.reload()
+
+        steps, log = parse_script_output(output)
+        if verbose and log:
+            print(log)
+
+        modules = self.get_smoke_test_modules()
+        self.smoke_test(slimmed_image, modules)
+
+        report = SlimmingReport(image_id=slimmed_image.id, steps=steps, smoke_test_modules=modules,
+                                duration=time.time() - start)
+        if verbose:
+            print(report.format(), flush=True)
+        return (slimmed_image, report)
+
+    def smoke_test(self, image, modules):
+        """ Import Python modules in a container of an image
+
+        Args:
+            image (:obj:`docker.models.images.Image`): image
+            modules (:obj:`list` of :obj:`str`): Python modules
+
+        Raises:
+            :obj:`wc_env_manager.core.WcEnvManagerError`: if a module can't be imported
+        """
+        import docker
+
+        if not modules:
+            return
+        try:
+            self.mgr._docker_client.containers.run(
+                image.id, command=[self.config['python'], '-c', SMOKE_TEST_SCRIPT] + modules,
+                user='root', remove=True, stdout=False, stderr=True)
+        except docker.errors.ContainerError as exception:
+            stderr = exception.stderr.decode(errors='replace') if isinstance(exception.stderr, bytes) else str(exception.stderr)
+            raise wc_env_manager.core.WcEnvManagerError(
+                'Smoke test of the slimmed image {} failed; disable the slimming steps which removed the files '
+                'that the modules need (`config[\'base_image\'][\'slim\']`):\n  {}'.format(
+                    image.id, stderr.strip().replace('\n', '\n  ')))
+
+
+def parse_script_output(output):
+    """ Parse the output of the slimming script (see :obj:`ImageSlimmer.get_script`)
+
+    Args:
+        output (:obj:`str`): output
+
+    Returns:
+        :obj:`tuple`: results of the steps (:obj:`list` of :obj:`SlimmingStep`) and the other
+            output of the script (:obj:`str`)
+    """
+    steps = []
+    log = []
+    for line in output.split('\n'):
+        if line.startswith(REPORT_PREFIX + ' '):
+            _, name, size_before, size_after = line.split()
+            steps.append(SlimmingStep(name, int(size_before), int(size_after)))
+        elif line:
+            log.append(line)
+    return (steps, '\n'.join(log))
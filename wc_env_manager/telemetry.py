@@ -0,0 +1,441 @@
+""" Streaming telemetry about the resource usage of WC modeling containers
+
+:obj:`ContainerMonitor` consumes the stream of statistics which the Docker daemon reports for
+each container (about once per second), computes the CPU utilization, memory working set,
+and block I/O and network rates of each container, and retains a fixed number of recent
+samples for each container in a ring buffer. :obj:`PrometheusServer` exposes the latest samples
+in the Prometheus text format.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import collections
+import dateutil.parser
+import docker
+import http.server
+import requests
+import threading
+
+
+class StatsSample(object):
+    """ Sample of the resource usage of a container
+
+    Attributes:
+        container (:obj:`str`): name of the container
+        time (:obj:`float`): time of the sample (seconds since the epoch)
+        cpu_percent (:obj:`float`): CPU utilization (percent of one CPU; e.g., 200 for two fully-utilized CPUs)
+        online_cpus (:obj:`int`): number of CPUs available to the container
+        memory_usage (:obj:`int`): memory usage, including the page cache (bytes)
+        memory_working_set (:obj:`int`): memory working set, excluding the inactive page cache (bytes)
+        memory_limit (:obj:`int`): memory limit (bytes)
+        block_io_read_bytes (:obj:`int`): cumulative bytes read from block devices
+        block_io_write_bytes (:obj:`int`): cumulative bytes written to block devices
+        block_io_read_rate (:obj:`float`): rate of reading from block devices (bytes / s)
+        block_io_write_rate (:obj:`float`): rate of writing to block devices (bytes / s)
+        network_rx_bytes (:obj:`int`): cumulative bytes received over the network
+        network_tx_bytes (:obj:`int`): cumulative bytes transmitted over the network
+        network_rx_rate (:obj:`float`): rate of receiving data over the network (bytes / s)
+        network_tx_rate (:obj:`float`): rate of transmitting data over the network (bytes / s)
+        pids (:obj:`int`): number of processes
+    """
+
+    FIELDS = (
+        'container', 'time', 'cpu_percent', 'online_cpus',
+        'memory_usage', 'memory_working_set', 'memory_limit',
+        'block_io_read_bytes', 'block_io_write_bytes', 'block_io_read_rate', 'block_io_write_rate',
+        'network_rx_bytes', 'network_tx_bytes', 'network_rx_rate', 'network_tx_rate',
+        'pids',
+    )
+
+    def __init__(self, **kwargs):
+        """
+        Args:
+            **kwargs: values of the attributes of the sample
+        """
+        for field in self.FIELDS:
+            setattr(self, field, kwargs.get(field, None))
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the sample
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the sample
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def parse_stats(container, stats, previous_sample=None):
+    """ Calculate a sample of the resource usage of a container from the statistics reported
+    by the Docker daemon
+
+    Args:
+        container (:obj:`str`): name of the container
+        stats (:obj:`dict`): statistics reported by the Docker daemon (see the
+            `/containers/{id}/stats` endpoint of the Docker Engine API)
+        previous_sample (:obj:`StatsSample`, optional): previous sample of the container, which
+            is used to calculate the rates of block I/O and network usage
+
+    Returns:
+        :obj:`StatsSample`: sample
+    """
+    sample = StatsSample(container=container)
+    sample.time = dateutil.parser.parse(stats['read']).timestamp()
+
+    # CPU
+    cpu_stats = stats.get('cpu_stats', {})
+    precpu_stats = stats.get('precpu_stats', {})
+    cpu_usage = cpu_stats.get('cpu_usage', {})
+    sample.online_cpus = cpu_stats.get('online_cpus', None) \
+        or len(cpu_usage.get('percpu_usage', None) or []) \
+        or None
+    cpu_delta = cpu_usage.get('total_usage', 0) - precpu_stats.get('cpu_usage', {}).get('total_usage', 0)
+    system_delta = cpu_stats.get('system_cpu_usage', 0) - precpu_stats.get('system_cpu_usage', 0)
+    if cpu_delta > 0 and system_delta > 0 and precpu_stats.get('system_cpu_usage', 0):
+        sample.cpu_percent = cpu_delta / system_delta * (sample.online_cpus or 1) * 100.
+    else:
+        sample.cpu_percent = 0.
+
+    # memory
+    memory_stats = stats.get('memory_stats', {})
+    sample.memory_usage = memory_stats.get('usage', 0)
+    sample.memory_limit = memory_stats.get('limit', None)
+    memory_substats = memory_stats.get('stats', {})
+    if 'total_inactive_file' in memory_substats:
+        inactive_file = memory_substats['total_inactive_file']  # cgroups v1
+    else:
+        inactive_file = memory_substats.get('inactive_file', 0)  # cgroups v2
+    sample.memory_working_set = max(sample.memory_usage - inactive_file, 0)
+
+    # block I/O
+    sample.block_io_read_bytes = 0
+    sample.block_io_write_bytes = 0
+    for entry in (stats.get('blkio_stats', {}) or {}).get('io_service_bytes_recursive', None) or []:
+        op = entry.get('op', '').lower()
+        if op == 'read':
+            sample.block_io_read_bytes += entry['value']
+        elif op == 'write':
+            sample.block_io_write_bytes += entry['value']
+
+    # network
+    sample.network_rx_bytes = 0
+    sample.network_tx_bytes = 0
+    for network in (stats.get('networks', None) or {}).values():
+        sample.network_rx_bytes += network.get('rx_bytes', 0)
+        sample.network_tx_bytes += network.get('tx_bytes', 0)
+
+    # processes
+    sample.pids = (stats.get('pids_stats', None) or {}).get('current', None)
+
+    # rates
+    if previous_sample and sample.time > previous_sample.time:
+        duration = sample.time - previous_sample.time
+        sample.block_io_read_rate = max(sample.block_io_read_bytes - previous_sample.block_io_read_bytes, 0) / duration
+        sample.block_io_write_rate = max(sample.block_io_write_bytes - previous_sample.block_io_write_bytes, 0) / duration
+        sample.network_rx_rate = max(sample.network_rx_bytes - previous_sample.network_rx_bytes, 0) / duration
+        sample.network_tx_rate = max(sample.network_tx_bytes - previous_sample.network_tx_bytes, 0) / duration
+    else:
+        sample.block_io_read_rate = 0.
+        sample.block_io_write_rate = 0.
+        sample.network_rx_rate = 0.
+        sample.network_tx_rate = 0.
+
+    return sample
+
+
+class ContainerMonitor(object):
+    """ Monitor the resource usage of containers by consuming the streams of statistics
+    that the Docker daemon reports for each container
+
+    Attributes:
+        containers (:obj:`list` of :obj:`docker.models.containers.Container`): monitored containers
+        buffer_size (:obj:`int`): number of samples to retain for each container
+        callbacks (:obj:`list` of :obj:`callable`): functions which are called with each new sample
+        _samples (:obj:`dict`): dictionary which maps the name of each container to a ring buffer
+            of its most recent samples
+        _lock (:obj:`threading.Lock`): lock for :obj:`_samples`
+        _threads (:obj:`dict`): dictionary which maps the name of each container to the thread
+            which consumes its stream of statistics
+        _stopped (:obj:`threading.Event`): event which signals the threads to stop
+    """
+
+    def __init__(self, containers, buffer_size=600, callbacks=None):
+        """
+        Args:
+            containers (:obj:`list` of :obj:`docker.models.containers.Container`): containers to monitor
+            buffer_size (:obj:`int`, optional): number of samples to retain for each container
+            callbacks (:obj:`list` of :obj:`callable`, optional): functions which are called with each new sample
+        """
+        self.containers = list(containers)
+        self.buffer_size = buffer_size
+        self.callbacks = list(callbacks or [])
+        self._samples = {container.name: collections.deque(maxlen=buffer_size) for container in self.containers}
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._stopped = threading.Event()
+        self._stopped.set()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """ Start monitoring the containers """
+        self._stopped.clear()
+        for container in self.containers:
+            self._start_thread(container)
+
+    def add_container(self, container):
+        """ Add a container to the monitored containers
+
+        If the monitor has been started and the container isn't already being monitored, start
+        monitoring the container. This enables long-running monitors to pick up containers which
+        are created after the monitor is started.
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+        """
+        if container.name not in [monitored_container.name for monitored_container in self.containers]:
+            self.containers.append(container)
+        if not self._stopped.is_set():
+            self._start_thread(container)
+
+    def _start_thread(self, container):
+        """ Start a thread which consumes the stream of statistics of a container, unless one is
+        already running
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+        """
+        thread = self._threads.get(container.name, None)
+        if thread and thread.is_alive():
+            return
+        thread = threading.Thread(target=self._monitor, args=(container,), daemon=True,
+                                  name='wc_env_manager.telemetry.{}'.format(container.name))
+        thread.start()
+        self._threads[container.name] = thread
+
+    def stop(self, timeout=5.):
+        """ Stop monitoring the containers
+
+        The Docker daemon reports statistics about once per second; each thread stops after
+        it receives its next report.
+
+        Args:
+            timeout (:obj:`float`, optional): maximum time to wait for each thread to stop (seconds)
+        """
+        self._stopped.set()
+        for thread in self._threads.values():
+            thread.join(timeout)
+        self._threads = {}
+
+    def _monitor(self, container):
+        """ Consume the stream of statistics of a container
+
+        Args:
+            container (:obj:`docker.models.containers.Container`): container
+        """
+        previous_sample = None
+        try:
+            for stats in container.stats(stream=True, decode=True):
+                if self._stopped.is_set():
+                    break
+                if not stats.get('read', None) or stats['read'].startswith('0001-01-01'):
+                    continue
+                sample = parse_stats(container.name, stats, previous_sample=previous_sample)
+                previous_sample = sample
+                self.add_sample(sample)
+        except (docker.errors.APIError, requests.exceptions.RequestException):
+            # the container was removed or the connection to the Docker daemon was closed
+            pass
+
+    def add_sample(self, sample):
+        """ Add a sample to the ring buffer of its container, and call the callbacks
+
+        Args:
+            sample (:obj:`StatsSample`): sample
+        """
+        with self._lock:
+            if sample.container not in self._samples:
+                self._samples[sample.container] = collections.deque(maxlen=self.buffer_size)
+            self._samples[sample.container].append(sample)
+        for callback in self.callbacks:
+            callback(sample)
+
+    def get_samples(self, container):
+        """ Get the retained samples of a container
+
+        Args:
+            container (:obj:`str`): name of the container
+
+        Returns:
+            :obj:`list` of :obj:`StatsSample`: samples, in chronological order
+        """
+        with self._lock:
+            return list(self._samples.get(container, []))
+
+    def get_latest_samples(self):
+        """ Get the latest sample of each container
+
+        Returns:
+            :obj:`dict`: dictionary which maps the name of each container to its latest sample
+        """
+        with self._lock:
+            return {container: samples[-1] for container, samples in self._samples.items() if samples}
+
+
+PROMETHEUS_METRICS = (
+    ('cpu_percent', 'wc_env_container_cpu_percent', 'gauge',
+     'CPU utilization (percent of one CPU)'),
+    ('memory_usage', 'wc_env_container_memory_usage_bytes', 'gauge',
+     'Memory usage, including the page cache'),
+    ('memory_working_set', 'wc_env_container_memory_working_set_bytes', 'gauge',
+     'Memory working set'),
+    ('memory_limit', 'wc_env_container_memory_limit_bytes', 'gauge',
+     'Memory limit'),
+    ('block_io_read_bytes', 'wc_env_container_block_io_read_bytes_total', 'counter',
+     'Bytes read from block devices'),
+    ('block_io_write_bytes', 'wc_env_container_block_io_write_bytes_total', 'counter',
+     'Bytes written to block devices'),
+    ('block_io_read_rate', 'wc_env_container_block_io_read_bytes_per_second', 'gauge',
+     'Rate of reading from block devices'),
+    ('block_io_write_rate', 'wc_env_container_block_io_write_bytes_per_second', 'gauge',
+     'Rate of writing to block devices'),
+    ('network_rx_bytes', 'wc_env_container_network_receive_bytes_total', 'counter',
+     'Bytes received over the network'),
+    ('network_tx_bytes', 'wc_env_container_network_transmit_bytes_total', 'counter',
+     'Bytes transmitted over the network'),
+    ('network_rx_rate', 'wc_env_container_network_receive_bytes_per_second', 'gauge',
+     'Rate of receiving data over the network'),
+    ('network_tx_rate', 'wc_env_container_network_transmit_bytes_per_second', 'gauge',
+     'Rate of transmitting data over the network'),
+    ('pids', 'wc_env_container_pids', 'gauge',
+     'Number of processes'),
+)
+
+
+def format_prometheus(samples):
+    """ Format samples in the Prometheus text exposition format
+
+    Args:
+        samples (:obj:`list` of :obj:`StatsSample`): samples (e.g., the latest sample of each container)
+
+    Returns:
+        :obj:`str`: samples in the Prometheus text exposition format
+    """
+    lines = []
+    for field, name, metric_type, description in PROMETHEUS_METRICS:
+        lines.append('# HELP {} {}'.format(name, description))
+        lines.append('# TYPE {} {}'.format(name, metric_type))
+        for sample in samples:
+            value = getattr(sample, field)
+            if value is not None:
+                lines.append('{}{{container="{}"}} {} {}'.format(
+                    name, sample.container.replace('\\', '\\\\').replace('"', '\\"'),
+                    value, int(sample.time * 1000)))
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusServer(object):
+    """ Local HTTP server which exposes the latest samples of a :obj:`ContainerMonitor` in the
+    Prometheus text exposition format at `/metrics`
+
+    Attributes:
+        monitor (:obj:`ContainerMonitor`): monitor
+        host (:obj:`str`): host name to listen on
+        port (:obj:`int`): port to listen on
+        _server (:obj:`http.server.HTTPServer`): HTTP server
+        _thread (:obj:`threading.Thread`): thread which runs the server
+    """
+
+    def __init__(self, monitor, host='127.0.0.1', port=9101):
+        """
+        Args:
+            monitor (:obj:`ContainerMonitor`): monitor
+            host (:obj:`str`, optional): host name to listen on
+            port (:obj:`int`, optional): port to listen on; 0 chooses a free port
+        """
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """ Start the server """
+        monitor = self.monitor
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = format_prometheus(list(monitor.get_latest_samples().values())).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name='wc_env_manager.telemetry.prometheus')
+        self._thread.start()
+
+    def stop(self):
+        """ Stop the server """
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+
+def format_bytes(num_bytes):
+    """ Format a number of bytes for humans (e.g., `1.5 GiB`)
+
+    Args:
+        num_bytes (:obj:`float`): number of bytes
+
+    Returns:
+        :obj:`str`: formatted number of bytes
+    """
+    if num_bytes is None:
+        return '-'
+    for unit in ['B', 'KiB', 'MiB', 'GiB', 'TiB']:
+        if abs(num_bytes) < 1024. or unit == 'TiB':
+            break
+        num_bytes /= 1024.
+    if unit == 'B':
+        return '{:.0f} {}'.format(num_bytes, unit)
+    return '{:.1f} {}'.format(num_bytes, unit)
+
+
+def format_sample(sample):
+    """ Format a sample as a row of a table for humans
+
+    Args:
+        sample (:obj:`StatsSample`): sample
+
+    Returns:
+        :obj:`str`: formatted sample
+    """
+    return '{:<32} {:>7.1f}% {:>11} / {:<11} {:>11}/s {:>11}/s {:>11}/s {:>11}/s'.format(
+        sample.container, sample.cpu_percent,
+        format_bytes(sample.memory_working_set), format_bytes(sample.memory_limit),
+        format_bytes(sample.block_io_read_rate), format_bytes(sample.block_io_write_rate),
+        format_bytes(sample.network_rx_rate), format_bytes(sample.network_tx_rate))
+
+
+SAMPLE_TABLE_HEADER = '{:<32} {:>8} {:>25} {:>13} {:>13} {:>13} {:>13}'.format(
+    'CONTAINER', 'CPU', 'MEMORY / LIMIT', 'BLOCK READ', 'BLOCK WRITE', 'NET RX', 'NET TX')
@@ -0,0 +1,473 @@
+""" Tracing of the operations of the manager
+
+A :obj:`Tracer` records spans: timed, nested intervals with attributes such as byte counts. While
+a tracer is attached to a :obj:`wc_env_manager.core.WcEnvManager` (see
+:obj:`wc_env_manager.core.WcEnvManager.start_tracing`), each call of a public method of the manager,
+each request to the Docker Engine API, and each git clone, subprocess, and file copy of the
+manager is recorded as a span. Traces can be exported as JSON or in the Chrome trace event format
+(which can be viewed with `chrome://tracing` or `https://ui.perfetto.dev`), and the numbers of Docker
+API calls made by each operation can be counted, e.g., to assert the cost of operations in tests.
+
+:Author: Jonathan Karr <jonrkarr@gmail.com>
+:Date: 2026-10-18
+:Copyright: 2026, Karr Lab
+:License: MIT
+"""
+
+import collections
+import contextlib
+import functools
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import types
+
+DOCKER_API_VERSION_PATTERN = re.compile(r'^/v\d+\.\d+')
+DOCKER_API_RESOURCE_PATTERN = re.compile(
+    r'^/(containers|images|exec|networks|volumes)/(?!(json|create|prune|load|search|get)$)(.+?)'
+    r'(/(json|history|push|tag|get|start|stop|restart|kill|pause|unpause|wait|logs|stats|changes|export'
+    r'|archive|exec|resize|attach|top|rename|update|connect|disconnect))?$')
+# patterns for reducing the paths of Docker API requests to endpoints (e.g., `/containers/{id}/json`)
+
+TRACE_FORMATS = ('json', 'chrome')
+
+
+class Span(object):
+    """ Timed interval of an operation
+
+    Attributes:
+        id (:obj:`int`): id
+        name (:obj:`str`): name (e.g., `build_image` or `GET /containers/{id}/json`)
+        category (:obj:`str`): category (`manager`, `docker`, `git`, `subprocess`, or `file`)
+        parent (:obj:`Span`): enclosing span
+        start (:obj:`float`): start time (seconds since the epoch)
+        end (:obj:`float`): end time (seconds since the epoch), or :obj:`None` if the span is open
+        thread_id (:obj:`int`): id of the thread which ran the operation
+        attrs (:obj:`dict`): attributes (e.g., `bytes_sent`)
+    """
+
+    def __init__(self, id, name, category, parent=None, attrs=None):
+        """
+        Args:
+            id (:obj:`int`): id
+            name (:obj:`str`): name
+            category (:obj:`str`): category
+            parent (:obj:`Span`, optional): enclosing span
+            attrs (:obj:`dict`, optional): attributes
+        """
+        self.id = id
+        self.name = name
+        self.category = category
+        self.parent = parent
+        self.start = time.time()
+        self._start_counter = time.perf_counter()
+        self.end = None
+        self.duration = None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs or {}
+
+    def finish(self):
+        """ Mark the end of the span """
+        self.duration = time.perf_counter() - self._start_counter
+        self.end = self.start + self.duration
+
+    def get_operation(self):
+        """ Get the outermost manager operation which encloses the span
+
+        Returns:
+            :obj:`Span`: outermost enclosing span of category `manager`, or :obj:`None`
+        """
+        operation = None
+        span = self
+        while span is not None:
+            if span.category == 'manager':
+                operation = span
+            span = span.parent
+        return operation
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the span
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the span
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'category': self.category,
+            'parent_id': self.parent.id if self.parent else None,
+            'start': self.start,
+            'end': self.end,
+            'duration': self.duration,
+            'thread_id': self.thread_id,
+            'attrs': self.attrs,
+        }
+
+
+class Tracer(object):
+    """ Record the spans of operations
+
+    Spans are nested within the open span of the same thread. Spans which are opened by worker threads
+    (e.g., the threads which remove images concurrently) are nested within the most recent open manager
+    operation.
+
+    Attributes:
+        spans (:obj:`list` of :obj:`Span`): finished spans, in the order in which they finished
+        _ids (:obj:`itertools.count`): generator of the ids of spans
+        _local (:obj:`threading.local`): stack of the open spans of each thread
+        _operations (:obj:`list` of :obj:`Span`): open manager operations
+        _instrumented (:obj:`dict`): dictionary which maps the ids of the instrumented Docker API
+            clients to the clients
+        _lock (:obj:`threading.Lock`): lock for the spans
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._operations = []
+        self._instrumented = {}
+        self._lock = threading.Lock()
+
+    def _get_stack(self):
+        """ Get the stack of the open spans of the current thread
+
+        Returns:
+            :obj:`list` of :obj:`Span`: open spans
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name, category, **attrs):
+        """ Record a span around a block of code
+
+        Args:
+            name (:obj:`str`): name
+            category (:obj:`str`): category
+            **attrs: attributes
+
+        Yields:
+            :obj:`Span`: span, whose attributes can be updated within the block
+        """
+        stack = self._get_stack()
+        if stack:
+            parent = stack[-1]
+        else:
+            with self._lock:
+                parent = self._operations[-1] if self._operations else None
+        span = Span(next(self._ids), name, category, parent=parent, attrs=attrs)
+
+        stack.append(span)
+        if category == 'manager':
+            with self._lock:
+                self._operations.append(span)
+        try:
+            yield span
+        except BaseException as exception:
+            span.attrs['error'] = exception.__class__.__name__
+            raise
+        finally:
+            span.finish()
+            stack.pop()
+            with self._lock:
+                if category == 'manager':
+                    self._operations.remove(span)
+                self.spans.append(span)
+
+    def annotate(self, **attrs):
+        """ Set attributes of the innermost open span of the current thread
+
+        Args:
+            **attrs: attributes
+        """
+        stack = self._get_stack()
+        if stack:
+            stack[-1].attrs.update(attrs)
+
+    def clear(self):
+        """ Discard the finished spans """
+        with self._lock:
+            self.spans = []
+
+    def get_spans(self, category=None, name=None, operation=None):
+        """ Get the finished spans
+
+        Args:
+            category (:obj:`str`, optional): only get spans of this category
+            name (:obj:`str`, optional): only get spans with this name
+            operation (:obj:`str`, optional): only get spans within this manager operation (e.g., `build_image`)
+
+        Returns:
+            :obj:`list` of :obj:`Span`: spans
+        """
+        with self._lock:
+            spans = list(self.spans)
+        return [span for span in spans
+                if (category is None or span.category == category)
+                and (name is None or span.name == name)
+                and (operation is None or is_within(span, operation))]
+
+    def get_call_counts(self, category='docker', operation=None):
+        """ Count the calls (e.g., to the Docker Engine API) by name
+
+        Args:
+            category (:obj:`str`, optional): category of the calls (e.g., `docker`)
+            operation (:obj:`str`, optional): only count calls within this manager operation (e.g., `get_containers`)
+
+        Returns:
+            :obj:`collections.Counter`: dictionary which maps the name of each call (e.g., `GET /containers/{id}/json`)
+                to its number of calls
+        """
+        return collections.Counter(span.name for span in self.get_spans(category=category, operation=operation))
+
+    def get_call_counts_by_operation(self, category='docker'):
+        """ Count the calls (e.g., to the Docker Engine API) of each outermost manager operation
+
+        Args:
+            category (:obj:`str`, optional): category of the calls (e.g., `docker`)
+
+        Returns:
+            :obj:`dict`: dictionary which maps the name of each operation (or :obj:`None` for calls outside
+                of operations) to a :obj:`collections.Counter` of the names of its calls
+        """
+        counts = collections.defaultdict(collections.Counter)
+        for span in self.get_spans(category=category):
+            operation = span.get_operation()
+            counts[operation.name if operation else None][span.name] += 1
+        return dict(counts)
+
+    def summarize(self):
+        """ Summarize the numbers, durations, and byte counts of the spans of each category and name
+
+        Returns:
+            :obj:`list` of :obj:`dict`: summary of the spans of each category and name, sorted by
+                decreasing total duration
+        """
+        summaries = collections.OrderedDict()
+        for span in self.get_spans():
+            summary = summaries.get((span.category, span.name), None)
+            if summary is None:
+                summary = summaries[(span.category, span.name)] = {
+                    'category': span.category, 'name': span.name, 'calls': 0, 'duration': 0., 'bytes': 0}
+            summary['calls'] += 1
+            summary['duration'] += span.duration
+            for key in ('bytes', 'bytes_sent', 'bytes_received'):
+                summary['bytes'] += span.attrs.get(key, None) or 0
+        return sorted(summaries.values(), key=lambda summary: -summary['duration'])
+
+    def to_dict(self):
+        """ Get a JSON-serializable representation of the trace
+
+        Returns:
+            :obj:`dict`: JSON-serializable representation of the trace
+        """
+        return {'spans': [span.to_dict() for span in sorted(self.get_spans(), key=lambda span: span.start)]}
+
+    def to_chrome_trace(self):
+        """ Get the trace in the Chrome trace event format
+
+        Returns:
+            :obj:`dict`: trace in the Chrome trace event format
+        """
+        pid = os.getpid()
+        events = []
+        for span in sorted(self.get_spans(), key=lambda span: span.start):
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': span.start * 1e6,
+                'dur': span.duration * 1e6,
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': span.attrs,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, filename, format='json'):
+        """ Save the trace to a file
+
+        Args:
+            filename (:obj:`str`): path to save the trace
+            format (:obj:`str`, optional): format (`json` or `chrome`)
+
+        Raises:
+            :obj:`ValueError`: if the format is not supported
+        """
+        if format == 'json':
+            trace = self.to_dict()
+        elif format == 'chrome':
+            trace = self.to_chrome_trace()
+        else:
+            raise ValueError('Trace format must be one of {}'.format(', '.join(TRACE_FORMATS)))
+        with open(filename, 'w') as file:
+            json.dump(trace, file, default=str)
+
+    def instrument(self, api_client):
+        """ Record a span for each request of a Docker API client
+
+        Args:
+            api_client (:obj:`docker.api.client.APIClient`): Docker API client
+        """
+        if id(api_client) in self._instrumented:
+            return
+        send = api_client.send
+
+        @functools.wraps(send)
+        def traced_send(request, **kwargs):
+            with self.span(get_docker_endpoint(request.method, request.path_url), 'docker') as span:
+                span.attrs['bytes_sent'] = get_body_size(request.body)
+                response = send(request, **kwargs)
+                span.attrs['status'] = response.status_code
+                content_length = response.headers.get('Content-Length', None)
+                if content_length is not None:
+                    span.attrs['bytes_received'] = int(content_length)
+                return response
+
+        api_client.send = traced_send
+        self._instrumented[id(api_client)] = api_client
+
+    def uninstrument(self, api_client):
+        """ Stop recording the requests of a Docker API client
+
+        Args:
+            api_client (:obj:`docker.api.client.APIClient`): Docker API client
+        """
+        if self._instrumented.pop(id(api_client), None) is not None:
+            del api_client.send
+
+
+def span(tracer, name, category, **attrs):
+    """ Record a span around a block of code, if a tracer is available
+
+    Args:
+        tracer (:obj:`Tracer`): tracer, or :obj:`None`
+        name (:obj:`str`): name
+        category (:obj:`str`): category
+        **attrs: attributes
+
+    Returns:
+        :obj:`contextlib.AbstractContextManager`: context manager which yields a :obj:`Span`, or
+            :obj:`None` if there is no tracer
+    """
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.span(name, category, **attrs)
+
+
+def trace_methods(cls):
+    """ Record a span for each call of each public method of a class whose instances have a
+    `_tracer` attribute
+
+    Args:
+        cls (:obj:`type`): class
+
+    Returns:
+        :obj:`type`: class
+    """
+    for name, method in list(vars(cls).items()):
+        if name.startswith('_') or name in getattr(cls, 'UNTRACED_METHODS', ()) \
+                or not isinstance(method, types.FunctionType):
+            continue
+        setattr(cls, name, trace_method(method))
+    return cls
+
+
+def trace_method(method):
+    """ Record a span for each call of a method of an object with a `_tracer` attribute
+
+    Args:
+        method (:obj:`callable`): method
+
+    Returns:
+        :obj:`callable`: traced method
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def traced_method(self, *args, **kwargs):
+        tracer = self._tracer
+        if tracer is None:
+            return method(self, *args, **kwargs)
+        with tracer.span(name, 'manager'):
+            return method(self, *args, **kwargs)
+    return traced_method
+
+
+def is_within(span, operation):
+    """ Determine whether a span is within a manager operation
+
+    Args:
+        span (:obj:`Span`): span
+        operation (:obj:`str`): name of the operation (e.g., `build_image`)
+
+    Returns:
+        :obj:`bool`: :obj:`True` if the span is, or is nested in, a span of the operation
+    """
+    while span is not None:
+        if span.category == 'manager' and span.name == operation:
+            return True
+        span = span.parent
+    return False
+
+
+def get_docker_endpoint(method, path):
+    """ Get the endpoint of a request to the Docker Engine API (e.g., `GET /containers/{id}/json`)
+
+    Args:
+        method (:obj:`str`): HTTP method
+        path (:obj:`str`): path and query of the request
+
+    Returns:
+        :obj:`str`: endpoint
+    """
+    path = DOCKER_API_VERSION_PATTERN.sub('', path.partition('?')[0])
+    match = DOCKER_API_RESOURCE_PATTERN.match(path)
+    if match:
+        path = '/{}/{{{}}}{}'.format(match.group(1), 'name' if match.group(1) == 'images' else 'id',
+                                     match.group(4) or '')
+    return '{} {}'.format(method, path)
+
+
+def get_body_size(body):
+    """ Get the size of the body of a request
+
+    Args:
+        body (:obj:`bytes`, :obj:`str`, or :obj:`object`): body
+
+    Returns:
+        :obj:`int`: size (bytes), or :obj:`None` if the body is streamed
+    """
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return None
+
+
+def get_path_size(path):
+    """ Get the size of a file or directory
+
+    Args:
+        path (:obj:`str`): path
+
+    Returns:
+        :obj:`int`: size (bytes)
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    size = 0
+    for dir_name, _, file_names in os.walk(path):
+        for file_name in file_names:
+            file_path = os.path.join(dir_name, file_name)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size